@@ -4,6 +4,26 @@ from CLI        import konsol
 from fastapi    import FastAPI
 from contextlib import asynccontextmanager
 from DB         import db_manager
+from Public.API.v1.Libs import usage_store, task_executor, catalog_index, iot_service, baseline_store
+import asyncio
+
+_startup_tasks = set()
+
+async def _fill_last_roaming():
+    """Roaming alanını index'ler hazır olunca doldurur ($merge, sims.sim_id tekil index'ini ister)"""
+    try:
+        await db_manager.index_task
+        await iot_service.ensure_last_roaming()
+    except Exception as e:
+        konsol.log(f"❌ [red]Roaming alanı doldurulamadı:[/] {e}")
+
+async def _build_device_baselines():
+    """Cihaz tipi baseline'ları yoksa geçmişten bir kez hesaplar (kayıt başına yalnızca SIM baseline'ı güncellenir)"""
+    try:
+        if not await baseline_store.has_device_baselines():
+            await baseline_store.rebuild()
+    except Exception as e:
+        konsol.log(f"❌ [red]Cihaz tipi baseline'ları hesaplanamadı:[/] {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -16,15 +36,31 @@ async def lifespan(app: FastAPI):
     
     if not connection_results.get("mongodb", False):
         konsol.log("⚠️  [yellow]MongoDB bağlantısı başarısız, bazı özellikler çalışmayabilir[/]")
+    else:
+        # Sıcak SIM kullanım geçmişini belleğe al
+        await usage_store.warm()
+        
+        # Plan / ek paket kataloğunu belleğe al
+        await catalog_index.load()
+        
+        # Roaming filtresi için SIM başına son roaming zamanı ve cihaz tipi baseline'ları (arka planda)
+        for startup in (_fill_last_roaming, _build_device_baselines):
+            task = asyncio.create_task(startup())
+            _startup_tasks.add(task)
+            task.add_done_callback(_startup_tasks.discard)
     
     if not connection_results.get("redis", False):
         konsol.log("⚠️  [yellow]Redis bağlantısı başarısız, önbellekleme devre dışı[/]")
     
+    # CPU yoğun işler için işlem havuzu
+    task_executor.start()
+    
     konsol.log("✅ [green]Başlangıç tamamlandı[/]")
     
     yield
     
     # Kapanış
     konsol.log("🔄 [yellow]SimShield kapatılıyor...[/]")
+    task_executor.shutdown()
     await db_manager.disconnect_all()
     konsol.log("✅ [green]Güvenli kapanış tamamlandı[/]")
\ No newline at end of file
@@ -0,0 +1,162 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from CLI            import konsol
+from typing         import Dict, Any, List, Optional
+from pymongo        import IndexModel
+from pymongo.errors import OperationFailure
+
+class IndexSpec:
+    """Bir koleksiyonda bulunması gereken indeks ve hizmet ettiği sorgu"""
+
+    def __init__(self, collection: str, keys: List[tuple], purpose: str, unique: bool = False,
+                 partial_filter: Optional[Dict[str, Any]] = None):
+        self.collection = collection
+        self.keys = keys
+        self.purpose = purpose
+        self.unique = unique
+        self.partial_filter = partial_filter
+
+    @property
+    def name(self) -> str:
+        """MongoDB'nin varsayılan indeks adı (ör. sim_id_1_timestamp_-1)"""
+        return "_".join(f"{field}_{direction}" for field, direction in self.keys)
+
+    def model(self) -> IndexModel:
+        options = {"name": self.name, "unique": self.unique}
+        if self.partial_filter:
+            options["partialFilterExpression"] = self.partial_filter
+
+        return IndexModel(self.keys, **options)
+
+# Servislerin kullandığı tüm sorgu şekilleri; docker/mongo-init.js bu listeyle aynı tutulur
+INDEX_SPECS: List[IndexSpec] = [
+    # SIM kartları
+    IndexSpec("sims", [("sim_id", 1)], "SIM okuma/yazma, last_roaming $merge hedefi", unique=True),
+    IndexSpec("sims", [("customer_id", 1)], "Filo filtresi: müşteri"),
+    IndexSpec("sims", [("device_type", 1)], "Filo filtresi: cihaz tipi"),
+    IndexSpec("sims", [("status", 1)], "Filo filtresi: durum"),
+    IndexSpec("sims", [("risk_score", -1), ("sim_id", 1)], "/fleet keyset sayfalama ve risk seviyesi filtresi"),
+    IndexSpec("sims", [("last_roaming_at", 1)], "Filo filtresi: son 7 günde roaming"),
+    IndexSpec("sims", [("updated_seq", 1)], "/fleet/changes ve fleet_delta filigranı"),
+    # Kullanım
+    IndexSpec("usage", [("sim_id", 1), ("timestamp", -1)], "SIM kullanım geçmişi ve filo matrisleri"),
+    IndexSpec("usage", [("timestamp", 1)], "Sıcak önbellek yüklemesi ve baseline penceresi"),
+    # Anomaliler
+    IndexSpec("anomalies", [("sim_id", 1), ("detected_at", -1)], "SIM anomali geçmişi ve özetleri"),
+    IndexSpec(
+        "anomalies", [("sim_id", 1), ("type", 1), ("detection_day", 1)],
+        "Aynı gün aynı tip anomalinin tekrar yazılmasını engeller", unique=True,
+        partial_filter={"detection_day": {"$type": "date"}}
+    ),
+    # Eylemler
+    IndexSpec("actions_log", [("action_id", 1)], "Eylem kimliği", unique=True),
+    IndexSpec("actions_log", [("sim_id", 1), ("created_at", -1)], "SIM eylem geçmişi"),
+    # Analiz durumu
+    IndexSpec("detector_state", [("sim_id", 1)], "Artımlı dedektör durumu (SIM başına analiz noktası)", unique=True),
+    IndexSpec("baselines", [("scope", 1), ("key", 1)], "Haftanın günü baseline'ları", unique=True),
+    IndexSpec("usage_rollups", [("sim_id", 1), ("resolution", 1), ("bucket", 1)], "Kullanım özetleri ve $merge hedefi", unique=True),
+    IndexSpec("savings_results", [("job_id", 1), ("sim_id", 1)], "Tasarruf raporu indirme ve gruplama", unique=True),
+    # Fatura dönemleri
+    IndexSpec("billing_cycles", [("sim_id", 1), ("cycle", 1)], "Dönem belgesi", unique=True),
+    IndexSpec("billing_events", [("sim_id", 1), ("effective_at", 1)], "Dönem olayları"),
+    # Katalog
+    IndexSpec("customers", [("customer_id", 1)], "Müşteri kimliği", unique=True),
+    IndexSpec("iot_plans", [("plan_id", 1)], "Plan kataloğu", unique=True),
+    IndexSpec("device_profiles", [("device_type", 1)], "Cihaz profili", unique=True),
+    IndexSpec("add_on_packs", [("addon_id", 1)], "Ek paket kataloğu", unique=True)
+]
+
+def _key_pairs(key) -> List[tuple]:
+    """index_information (çift listesi) ve $indexStats (sözlük) anahtarlarını aynı biçime getirir"""
+    pairs = key.items() if isinstance(key, dict) else key
+    return [(field, int(direction) if isinstance(direction, (int, float)) else direction) for field, direction in pairs]
+
+async def ensure_indexes(database, specs: List[IndexSpec] = INDEX_SPECS) -> Dict[str, Any]:
+    """
+    Eksik indeksleri oluşturur; var olanlara dokunmaz (tekrar çalıştırmak güvenlidir)
+
+    Mevcut indeksler anahtarlarıyla karşılaştırılır, yalnızca eksikler koleksiyon başına tek
+    createIndexes ile kurulur. Bir koleksiyondaki hata (ör. tekil indekste mükerrer veri) diğerlerini durdurmaz.
+    """
+    result = {"created": [], "existing": 0, "failed": {}}
+
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in specs:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection_name, collection_specs in by_collection.items():
+        collection = database[collection_name]
+        try:
+            existing = [_key_pairs(info["key"]) for info in (await collection.index_information()).values()]
+        except OperationFailure:
+            existing = []  # Koleksiyon henüz yok
+
+        missing = [spec for spec in collection_specs if spec.keys not in existing]
+        result["existing"] += len(collection_specs) - len(missing)
+        if not missing:
+            continue
+
+        try:
+            await collection.create_indexes([spec.model() for spec in missing])
+            result["created"].extend(f"{collection_name}.{spec.name}" for spec in missing)
+        except Exception as e:
+            result["failed"][collection_name] = str(e)
+            konsol.log(f"❌ [red]{collection_name} indeksleri oluşturulamadı:[/] {e}")
+
+    if result["created"]:
+        konsol.log(f"🗂️  [green]Eksik indeksler oluşturuldu:[/] {', '.join(result['created'])}")
+
+    return result
+
+async def index_report(database, specs: List[IndexSpec] = INDEX_SPECS) -> List[Dict[str, Any]]:
+    """
+    Tanımlı ve mevcut indekslerin durumunu `$indexStats` kullanım sayılarıyla döndürür
+
+    Tanımlı olup olmayanlar `missing`, mevcut olup tanımlı olmayanlar `undeclared`, hiç kullanılmayan
+    tanımlılar `unused` işaretlenir; kullanım sayısı sunucu yeniden başlayınca sıfırlanır (`since`).
+    """
+    collection_names = list(dict.fromkeys(spec.collection for spec in specs))
+    rows = []
+
+    for collection_name in collection_names:
+        collection = database[collection_name]
+        declared = {tuple(spec.keys): spec for spec in specs if spec.collection == collection_name}
+
+        stats = {}
+        try:
+            async for stat in await collection.aggregate([{"$indexStats": {}}]):
+                stats[stat["name"]] = stat
+        except OperationFailure:
+            pass  # Koleksiyon henüz yok
+
+        present = set()
+        for name, stat in stats.items():
+            if name == "_id_":
+                continue
+
+            keys = tuple(_key_pairs(stat["key"]))
+            spec = declared.get(keys)
+            present.add(keys)
+            rows.append({
+                "collection": collection_name,
+                "name": name,
+                "keys": [list(pair) for pair in keys],
+                "status": ("ok" if stat["accesses"]["ops"] else "unused") if spec else "undeclared",
+                "purpose": spec.purpose if spec else None,
+                "ops": stat["accesses"]["ops"],
+                "since": stat["accesses"]["since"]
+            })
+
+        for keys, spec in declared.items():
+            if keys not in present:
+                rows.append({
+                    "collection": collection_name,
+                    "name": spec.name,
+                    "keys": [list(pair) for pair in keys],
+                    "status": "missing",
+                    "purpose": spec.purpose,
+                    "ops": 0,
+                    "since": None
+                })
+
+    return rows
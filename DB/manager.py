@@ -1,9 +1,10 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
 from CLI      import konsol
-from typing   import Dict, Any
+from typing   import Dict, Any, Optional
 from .mongodb import mongodb_manager
 from .redis   import redis_manager
+import asyncio
 
 class DatabaseManager:
     """Ana veritabanı yöneticisi - MongoDB ve Redis'i koordine eder"""
@@ -11,6 +12,7 @@ class DatabaseManager:
     def __init__(self):
         self.mongodb = mongodb_manager
         self.redis = redis_manager
+        self.index_task: Optional[asyncio.Task] = None
         
     async def connect_all(self) -> Dict[str, bool]:
         """Tüm veritabanı bağlantılarını başlat"""
@@ -24,9 +26,9 @@ class DatabaseManager:
         # Redis bağlantısı  
         results["redis"] = await self.redis.connect()
         
-        # Index'leri oluştur (sadece MongoDB başarılı ise)
-        # if results["mongodb"]:
-        #     await self.mongodb.create_indexes()
+        # Eksik index'leri arka planda oluştur (sadece MongoDB başarılı ise); başlangıcı bekletmez
+        if results["mongodb"]:
+            self.index_task = asyncio.create_task(self.mongodb.create_indexes())
         
         # Sonuçları özetle
         successful = sum(results.values())
@@ -0,0 +1,70 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from CLI            import konsol
+from datetime       import datetime
+from pymongo        import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Tek seferlik veri migrasyonlarının tamamlanma işaretleri `counters` koleksiyonundaki bu belgede tutulur
+MIGRATIONS_ID = "migrations"
+
+BACKFILL_BATCH = 1000
+
+async def is_applied(database, name: str) -> bool:
+    """Migrasyon daha önce tamamlandı mı"""
+    return await database["counters"].find_one({"_id": MIGRATIONS_ID, name: {"$exists": True}}, {"_id": 1}) is not None
+
+async def mark_applied(database, name: str):
+    """Migrasyonu tamamlandı olarak işaretler (sonraki başlangıçlar atlar)"""
+    await database["counters"].update_one({"_id": MIGRATIONS_ID}, {"$set": {name: datetime.now()}}, upsert=True)
+
+async def backfill_detection_day(database) -> int:
+    """
+    detection_day alanı olmayan (tekil indeksten önce yazılmış) anomalilere alanı ekler
+
+    Her (sim_id, type, gün) için en eski belge alanı alır; aynı anahtarda zaten kayıt varsa ya da
+    belge mükerrerse partial indeksin dışında kalır. Tekil indeks kurulduktan sonra çalıştırılır.
+    """
+    if await is_applied(database, "anomaly_detection_day"):
+        return 0
+
+    collection = database["anomalies"]
+    pipeline = [
+        {"$match": {"detection_day": {"$exists": False}}},
+        {"$sort": {"detected_at": 1}},
+        {"$group": {
+            "_id": {"sim_id": "$sim_id", "type": "$type", "day": {"$dateTrunc": {"date": "$detected_at", "unit": "day"}}},
+            "doc_id": {"$first": "$_id"}
+        }}
+    ]
+
+    filled = 0
+    operations = []
+
+    async def flush():
+        nonlocal filled, operations
+        try:
+            filled += (await collection.bulk_write(operations, ordered=False)).modified_count
+        except BulkWriteError as error:
+            # Aynı gün aynı tipte detection_day'li kayıt varsa (E11000) eski belge alansız kalır
+            if any(write_error["code"] != 11000 for write_error in error.details["writeErrors"]):
+                raise
+            filled += error.details.get("nModified", 0)
+        operations = []
+
+    async for group in await collection.aggregate(pipeline, allowDiskUse=True):
+        operations.append(UpdateOne(
+            {"_id": group["doc_id"], "detection_day": {"$exists": False}},
+            {"$set": {"detection_day": group["_id"]["day"]}}
+        ))
+        if len(operations) == BACKFILL_BATCH:
+            await flush()
+
+    if operations:
+        await flush()
+
+    await mark_applied(database, "anomaly_detection_day")
+    if filled:
+        konsol.log(f"🗂️  [green]Eski anomalilere detection_day eklendi:[/] {filled} belge")
+
+    return filled
@@ -5,6 +5,8 @@ from typing         import Optional, Dict, Any
 from pymongo        import AsyncMongoClient
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from Settings       import AYAR
+from .indexes       import ensure_indexes, index_report
+from .migrations    import backfill_detection_day
 
 class MongoDBManager:
     """MongoDB bağlantı ve işlem yöneticisi"""
@@ -83,41 +85,31 @@ class MongoDBManager:
         except Exception as e:
             return {"status": "error", "error": str(e)}
     
-    async def create_indexes(self):
-        """Önemli koleksiyonlar için index'ler oluştur"""
+    async def create_indexes(self) -> Dict[str, Any]:
+        """Tanımlı index'lerden eksik olanları oluştur (DB/indexes.py), eski anomalileri tekil index'e taşı"""
         if not self.is_connected:
-            return False
+            return {}
         
         try:
-            # SIM kartları için index'ler
-            sims_collection = self.get_collection("sims")
-            await sims_collection.create_index("sim_id", unique=True)
-            await sims_collection.create_index("customer_id")
-            await sims_collection.create_index("device_type")
-            await sims_collection.create_index("status")
-            
-            # Usage için index'ler
-            usage_collection = self.get_collection("usage")
-            await usage_collection.create_index([("sim_id", 1), ("timestamp", -1)])
-            await usage_collection.create_index("timestamp")
-            
-            # Anomalies için index'ler
-            anomalies_collection = self.get_collection("anomalies")
-            await anomalies_collection.create_index([("sim_id", 1), ("detected_at", -1)])
-            await anomalies_collection.create_index("type")
-            await anomalies_collection.create_index("severity")
-            
-            # Actions için index'ler
-            actions_collection = self.get_collection("actions_log")
-            await actions_collection.create_index([("sim_id", 1), ("created_at", -1)])
-            await actions_collection.create_index("action_id", unique=True)
-            
-            konsol.log("✅ [green]MongoDB index'ler oluşturuldu[/]")
-            return True
-            
+            result = await ensure_indexes(self.database)
         except Exception as e:
             konsol.log(f"❌ [red]MongoDB index oluşturma hatası:[/] {e}")
-            return False
+            return {}
+        
+        if "anomalies" not in result["failed"]:
+            try:
+                await backfill_detection_day(self.database)
+            except Exception as e:
+                konsol.log(f"❌ [red]Anomali detection_day doldurma hatası:[/] {e}")
+        
+        return result
+    
+    async def index_report(self) -> list:
+        """Tanımlı / mevcut index'lerin kullanım raporu ($indexStats)"""
+        if not self.is_connected:
+            return []
+        
+        return await index_report(self.database)
     
     async def get_stats(self) -> Dict[str, Any]:
         """Database istatistikleri"""
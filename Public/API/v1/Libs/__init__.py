@@ -2,4 +2,15 @@
 
 from .anomaly_detector import anomaly_detector
 from .cost_simulator   import cost_simulator
-from .iot_service      import iot_service
\ No newline at end of file
+from .iot_service      import iot_service
+from .usage_store      import usage_store
+from .task_executor    import task_executor
+from .baseline_store   import baseline_store
+from .usage_rollups    import usage_rollups
+from .usage_forecast   import usage_forecaster
+from .catalog_index    import catalog_index
+from .cost_cache       import cost_cache
+from .quota_projection import quota_projector
+from .billing_cycles   import billing_cycles
+from .fleet_changes    import fleet_changes
+from .fleet_delta      import fleet_delta_publisher
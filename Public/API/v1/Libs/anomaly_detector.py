@@ -1,10 +1,13 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
 from datetime import datetime, timedelta
-from typing   import List, Tuple
-from ..Models import Usage, Anomaly, AnomalyType, RiskLevel, DeviceProfile
+from typing   import List, Tuple, Dict, Optional, Sequence
+from ..Models import Usage, Anomaly, AnomalyType, RiskLevel, DeviceProfile, DetectorState, WeekdayBaseline
 from Settings import IOT_SETTINGS
+from .detectors import DETECTOR_REGISTRY, BUILTIN_DETECTORS, UsageFeatures
+import numpy as np
 import statistics
+import math
 
 class AnomalyDetector:
     def __init__(self):
@@ -15,147 +18,494 @@ class AnomalyDetector:
         self.roaming_threshold = IOT_SETTINGS["ANOMALY_DETECTION"]["UNEXPECTED_ROAMING_THRESHOLD"]
         
         self.risk_scores = IOT_SETTINGS["RISK_SCORING"]
+        self.baseline_min_samples = IOT_SETTINGS["BASELINES"]["MIN_SAMPLES"]
         
-    def analyze_sim(self, sim_id: str, usage_data: List[Usage], 
-                   device_profile: DeviceProfile) -> Tuple[List[Anomaly], int]:
+        # Etkin dedektörler AYAR'daki sırayla çalışır
+        detector_names = IOT_SETTINGS["ANOMALY_DETECTION"].get("DETECTORS", list(DETECTOR_REGISTRY))
+        unknown = [name for name in detector_names if name not in DETECTOR_REGISTRY]
+        if unknown:
+            raise ValueError(f"Tanımsız dedektör: {', '.join(unknown)}")
+        
+        self.detectors = [DETECTOR_REGISTRY[name](self) for name in detector_names]
+        self.enabled = set(detector_names)
+        windows = [detector.window for detector in self.detectors]
+        self.window = None if None in windows else max(windows, default=1)
+        
+        # Yerleşik olmayanlar filo ve artımlı yollarda ortak özelliklerle ayrıca çalışır
+        self.extra_detectors = [detector for detector in self.detectors if detector.name not in BUILTIN_DETECTORS]
+        unbounded = [detector.name for detector in self.extra_detectors if detector.window is None]
+        if unbounded:
+            raise ValueError(f"Artımlı analiz için dedektör penceresi (window) tanımlanmalı: {', '.join(unbounded)}")
+        # Durumda son kayıtlar: risk skoru için son 3, yerleşik olmayanlar varsa baseline için en az son 10
+        extra_windows = [10] + [detector.window for detector in self.extra_detectors] if self.extra_detectors else []
+        self.history_window = max([3] + extra_windows)
+        self.type_scores = {
+            detector_class.anomaly_type.value: self.risk_scores.get(detector_class.score_key, 0)
+            for detector_class in DETECTOR_REGISTRY.values() if detector_class.anomaly_type is not None
+        }
+        
+    def analyze_sim(self, sim_id: str, usage_data: List[Usage], device_profile: DeviceProfile,
+                    baseline: Optional[WeekdayBaseline] = None) -> Tuple[List[Anomaly], int]:
         """
         Bir SIM için anomali analizi yapar
+
+        Ortak özellikler (baseline, son günler, aktiflik, roaming) tek geçişte çıkarılır
+        ve etkin dedektörlerin hepsi aynı özellik nesnesini kullanır. Haftanın günü baseline'ı
+        verilirse yeterli örneği olan günlerde son günlerden hesaplanan baseline yerine o kullanılır.
         """
-        anomalies = []
-        
         if len(usage_data) < 7:
-            return anomalies, 0
-            
-        # Son günlerin ortalaması ve standart sapması (daha esnek baseline)
-        if len(usage_data) >= 10:
-            # Son 10 günden son 3'ü hariç ilk 7'sini al (baseline için)
-            baseline_data = usage_data[-10:-3]
-        elif len(usage_data) >= 7:
-            # 7-9 gün arası varsa, ilk yarısını baseline yap
-            baseline_data = usage_data[:len(usage_data)//2]
-        else:
-            # 7'den az varsa, ilk günleri baseline yap
-            baseline_data = usage_data[:-2] if len(usage_data) > 2 else usage_data[:-1]
-            
-        if len(baseline_data) < 2:
-            baseline_data = usage_data[:max(2, len(usage_data)//2)]
-
-        daily_usage = [usage.mb_used for usage in baseline_data if usage.mb_used > 0]  # Sıfır kullanımları hariç tut
-        
-        if not daily_usage:  # Eğer hiç pozitif kullanım yoksa
-            daily_usage = [usage.mb_used for usage in baseline_data]  # Tüm verileri al
-
-        ma7 = statistics.mean(daily_usage) if daily_usage else 0
-        std7 = statistics.stdev(daily_usage) if len(daily_usage) > 1 else ma7 * 0.3  # Std yoksa ma7'nin %30'u
-        
-        # Son 3 günü kontrol et (anomali için)
-        recent_days = usage_data[-3:] if len(usage_data) >= 3 else usage_data
-        
-        # Sudden Spike kontrolü - son 3 günde herhangi birinde
-        for usage in recent_days:
-            # Daha hassas threshold - minimum 20MB'a düştük ve daha düşük çarpan
-            spike_threshold = max(ma7 * self.spike_multiplier, ma7 + 2 * std7, 20)  # minimum 20MB threshold (50'den düştük)
-            if usage.mb_used > spike_threshold and ma7 > 0:
-                anomaly = Anomaly(
-                    sim_id=sim_id,
-                    type=AnomalyType.SUDDEN_SPIKE,
-                    detected_at=usage.timestamp,
-                    severity=RiskLevel.RED,
-                    reason=f"Günlük kullanım {usage.mb_used:.1f}MB, baseline ortalama {ma7:.1f}MB (eşik: {spike_threshold:.1f}MB)",
-                    evidence={
-                        "current_usage": usage.mb_used,
-                        "baseline_average": ma7,
-                        "threshold": spike_threshold,
-                        "multiplier": self.spike_multiplier
-                    }
-                )
-                anomalies.append(anomaly)
-        
-        # Sustained Drain kontrolü
-        if len(usage_data) >= self.drain_days:
-            recent_days_drain = usage_data[-self.drain_days:]
-            drain_threshold = max(ma7 * self.drain_multiplier, 10)  # minimum 10MB threshold (20'den düştük)
-            consecutive_high = all(usage.mb_used > drain_threshold for usage in recent_days_drain)
-            
-            if consecutive_high and ma7 > 0:
-                anomaly = Anomaly(
-                    sim_id=sim_id,
-                    type=AnomalyType.SUSTAINED_DRAIN,
-                    detected_at=recent_days_drain[-1].timestamp,
-                    severity=RiskLevel.ORANGE,
-                    reason=f"{self.drain_days} gün boyunca sürekli yüksek kullanım (ortalama: {ma7:.1f}MB, eşik: {drain_threshold:.1f}MB)",
-                    evidence={
-                        "days_count": self.drain_days,
-                        "threshold": drain_threshold,
-                        "recent_usage": [u.mb_used for u in recent_days_drain],
-                        "baseline_average": ma7
-                    }
-                )
-                anomalies.append(anomaly)
-        
-        # Inactivity kontrolü
-        inactive_hours = self._check_inactivity(usage_data)
-        if inactive_hours >= self.inactivity_hours:
-            last_active = next((u.timestamp for u in reversed(usage_data) if u.mb_used > 0), None)
-            anomaly = Anomaly(
-                sim_id=sim_id,
-                type=AnomalyType.INACTIVITY,
-                detected_at=usage_data[-1].timestamp if usage_data else datetime.now(),
-                severity=RiskLevel.ORANGE,
-                reason=f"{inactive_hours} saattir veri kullanımı yok",
-                evidence={
-                    "inactive_hours": inactive_hours,
-                    "last_active": last_active,
-                    "threshold_hours": self.inactivity_hours
-                }
-            )
-            anomalies.append(anomaly)
-        
-        # Unexpected Roaming kontrolü - sadece son 2 günde
-        if not device_profile.roaming_expected:
-            # Son 2 günde roaming kullanımı kontrol et (gerçek zamanlı analiz için)
-            two_days_ago = datetime.now() - timedelta(days=2)
-            recent_roaming_data = [u for u in recent_days if u.timestamp >= two_days_ago]
-            
-            for usage in recent_roaming_data:
-                if usage.roaming_mb > self.roaming_threshold:
-                    anomaly = Anomaly(
-                        sim_id=sim_id,
-                        type=AnomalyType.UNEXPECTED_ROAMING,
-                        detected_at=usage.timestamp,
-                        severity=RiskLevel.RED,
-                        reason=f"Beklenmeyen roaming kullanımı: {usage.roaming_mb}MB",
-                        evidence={
-                            "roaming_usage": usage.roaming_mb,
-                            "threshold": self.roaming_threshold,
-                            "device_allows_roaming": device_profile.roaming_expected
-                        }
-                    )
-                    anomalies.append(anomaly)
-                    break  # Sadece bir roaming anomalisi ekle
+            return [], 0
+        
+        features = UsageFeatures(sim_id, usage_data, device_profile, self.window, self._weekday_lookup(baseline))
+        
+        anomalies = []
+        for detector in self.detectors:
+            anomalies.extend(detector.detect(features))
         
         # Risk skoru hesaplama
         risk_score = self._calculate_risk_score(anomalies)
         
         return anomalies, risk_score
-    
-    def _check_inactivity(self, usage_data: List[Usage]) -> int:
+
+    def analyze_fleet(self, sim_ids: Sequence[str], mb_used: np.ndarray, roaming_mb: np.ndarray,
+                      timestamps: np.ndarray, roaming_expected: np.ndarray,
+                      baselines: Optional[Sequence[Optional[WeekdayBaseline]]] = None,
+                      now: Optional[datetime] = None,
+                      device_profiles: Optional[Sequence[DeviceProfile]] = None) -> Tuple[Dict[str, List[Anomaly]], np.ndarray]:
+        """
+        Tüm filo için tek geçişte vektörel anomali analizi yapar
+
+        mb_used / roaming_mb : (SIM × gün) matrisleri, kayıtlar sağa yaslı ve eksik günler NaN
+        timestamps           : (SIM × gün) ya da (gün,) boyutlu datetime64 dizisi
+        roaming_expected     : SIM başına cihaz profilinin roaming beklentisi
+        baselines            : SIM başına haftanın günü baseline'ı (opsiyonel, sim_ids sırasıyla)
+        device_profiles      : SIM başına cihaz profili (yerleşik olmayan dedektör etkinse zorunlu)
+
+        analyze_sim ile aynı anomalileri ve risk skorlarını üretir. Sözlükte sadece anomalisi
+        olan SIM'ler bulunur, risk skorları sim_ids sırasıyla döner. Vektörel yol yerleşik dört
+        dedektörü kapsar; DETECTORS listesinde olmayanlar maskelenir. Yerleşik olmayan etkin
+        dedektörler SIM başına satırdan kurulan ortak özelliklerle ayrıca çalışır.
+        """
+        mb_used = np.asarray(mb_used, dtype=np.float64)
+        if mb_used.ndim != 2:
+            raise ValueError("mb_used (SIM × gün) boyutlu bir matris olmalı")
+        if self.extra_detectors and device_profiles is None:
+            raise ValueError(f"{', '.join(d.name for d in self.extra_detectors)} dedektörleri için device_profiles verilmeli")
+
+        sim_count, day_count = mb_used.shape
+        roaming_mb = np.nan_to_num(np.asarray(roaming_mb, dtype=np.float64), nan=0.0)
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype="datetime64[us]"), mb_used.shape)
+        roaming_expected = np.broadcast_to(np.asarray(roaming_expected, dtype=bool), (sim_count,))
+        now = now or datetime.now()
+        now64 = np.datetime64(now, "us")
+        two_days_ago = np.datetime64(now - timedelta(days=2), "us")
+
+        # Haftanın günü baseline'ları (SIM × 7), yetersiz günler NaN
+        weekday_mean = np.full((sim_count, 7), np.nan)
+        weekday_std = np.full((sim_count, 7), np.nan)
+        for row, baseline in enumerate(baselines or []):
+            for weekday, (mean, std) in self._weekday_lookup(baseline).items():
+                weekday_mean[row, weekday] = mean
+                weekday_std[row, weekday] = std
+
+        lengths = (~np.isnan(mb_used)).sum(axis=1)
+        risk_scores = np.zeros(sim_count, dtype=np.int64)
+        anomalies_by_sim: Dict[str, List[Anomaly]] = {}
+
+        # Baseline dilimi kayıt sayısına bağlı; aynı uzunluktaki SIM'ler birlikte işlenir
+        for length in np.unique(lengths[lengths >= 7]):
+            length = int(length)
+            rows = np.flatnonzero(lengths == length)
+            offset = day_count - length
+            index = np.arange(len(rows))
+            usage = np.take(mb_used, rows, axis=0)[:, offset:]
+
+            # Baseline ortalaması ve standart sapması (sıfır kullanımlar hariç)
+            baseline = usage[:, length - 10:length - 3] if length >= 10 else usage[:, :length // 2]
+            positive = baseline > 0
+            mask = np.where(positive.any(axis=1)[:, None], positive, True)
+            count = mask.sum(axis=1)
+            # statistics.mean ile aynı yuvarlamayı yakalamak için toplamlar genişletilmiş hassasiyette
+            wide = baseline.astype(np.longdouble)
+            ma7_wide = np.where(mask, wide, 0).sum(axis=1) / count
+            squared = np.where(mask, (wide - ma7_wide[:, None]) ** 2, 0).sum(axis=1)
+            ma7 = ma7_wide.astype(np.float64)
+            std7 = np.where(count > 1, np.sqrt(squared / np.maximum(count - 1, 1)).astype(np.float64), ma7 * 0.3)
+
+            # Son günlerin baseline'ı: haftanın günü baseline'ı varsa o, yoksa ma7/std7
+            tail = min(max(3, self.drain_days), length)
+            tail_stamps = timestamps[rows[:, None], np.arange(day_count - tail, day_count)]
+            tail_weekdays = (tail_stamps.astype("datetime64[D]").astype(np.int64) + 3) % 7   # 1970-01-01 Perşembe
+            day_mean = weekday_mean[rows[:, None], tail_weekdays]
+            has_day = ~np.isnan(day_mean)
+            tail_ma = np.where(has_day, day_mean, ma7[:, None])
+            tail_std = np.where(has_day, weekday_std[rows[:, None], tail_weekdays], std7[:, None])
+
+            # Sudden Spike - son 3 gün
+            recent = usage[:, -3:]
+            recent_columns = np.arange(day_count - 3, day_count)
+            recent_ma = tail_ma[:, -3:]
+            spike_threshold = np.maximum(np.maximum(recent_ma * self.spike_multiplier, recent_ma + 2 * tail_std[:, -3:]), 20)
+            spikes = (recent > spike_threshold) & (recent_ma > 0) & (AnomalyType.SUDDEN_SPIKE.value in self.enabled)
+
+            # Sustained Drain
+            if length >= self.drain_days and AnomalyType.SUSTAINED_DRAIN.value in self.enabled:
+                drain_ma = tail_ma[:, -self.drain_days:]
+                drain_threshold = np.maximum(drain_ma * self.drain_multiplier, 10)
+                drain = (usage[:, -self.drain_days:] > drain_threshold).all(axis=1) & (drain_ma > 0).all(axis=1)
+            else:
+                drain = np.zeros(len(rows), dtype=bool)
+
+            # Inactivity - sondaki kesintisiz sıfır kullanım serisi
+            inactive_run = np.cumprod(usage[:, ::-1] <= 0, axis=1).sum(axis=1)
+            run_start = timestamps[rows, offset + np.minimum(length - inactive_run, length - 1)]
+            elapsed_us = (now64 - run_start) / np.timedelta64(1, "us")
+            inactive_hours = np.where(inactive_run > 0, np.trunc(elapsed_us / 10**6 / 3600), 0).astype(np.int64)
+            inactive = (inactive_hours >= self.inactivity_hours) & (AnomalyType.INACTIVITY.value in self.enabled)
+
+            # Unexpected Roaming - son 3 günün son 2 güne düşen kayıtları
+            recent_stamps = timestamps[rows[:, None], recent_columns]
+            roaming_hits = (
+                (roaming_mb[rows[:, None], recent_columns] > self.roaming_threshold)
+                & (recent_stamps >= two_days_ago)
+                & ~roaming_expected[rows][:, None]
+                & (AnomalyType.UNEXPECTED_ROAMING.value in self.enabled)
+            )
+            has_roaming = roaming_hits.any(axis=1)
+
+            scores = (
+                spikes.sum(axis=1) * self.risk_scores["SPIKE_SCORE"]
+                + drain * self.risk_scores["DRAIN_SCORE"]
+                + inactive * self.risk_scores["INACTIVITY_SCORE"]
+                + has_roaming * self.risk_scores["ROAMING_SCORE"]
+            )
+            risk_scores[rows] = np.minimum(scores, self.risk_scores["MAX_SCORE"])
+
+            # Pydantic nesneleri sadece anomalisi olan SIM'ler için üretilir
+            flagged = index[spikes.any(axis=1) | drain | inactive | has_roaming]
+            for i in flagged:
+                row = rows[i]
+                sim_id = sim_ids[row]
+                anomalies = []
+
+                for j in np.flatnonzero(spikes[i]):
+                    anomalies.append(self._spike_anomaly(
+                        sim_id, recent_stamps[i, j].item(), float(recent[i, j]),
+                        float(recent_ma[i, j]), float(spike_threshold[i, j])
+                    ))
+
+                if drain[i]:
+                    anomalies.append(self._drain_anomaly(
+                        sim_id, timestamps[row, -1].item(), usage[i, -self.drain_days:].tolist(),
+                        float(drain_ma[i, -1]), float(drain_threshold[i, -1])
+                    ))
+
+                if inactive[i]:
+                    last_active = None
+                    if inactive_run[i] < length:
+                        last_active = timestamps[row, day_count - inactive_run[i] - 1].item()
+                    anomalies.append(self._inactivity_anomaly(
+                        sim_id, timestamps[row, -1].item(), int(inactive_hours[i]), last_active
+                    ))
+
+                if has_roaming[i]:
+                    j = int(roaming_hits[i].argmax())
+                    anomalies.append(self._roaming_anomaly(
+                        sim_id, recent_stamps[i, j].item(), float(roaming_mb[row, recent_columns[j]]),
+                        bool(roaming_expected[row])
+                    ))
+
+                anomalies_by_sim[sim_id] = anomalies
+
+        if self.extra_detectors:
+            for row in np.flatnonzero(lengths >= 7):
+                offset = day_count - int(lengths[row])
+                usage_data = [
+                    Usage(sim_id=sim_ids[row], timestamp=timestamp, mb_used=float(mb), roaming_mb=float(roaming))
+                    for timestamp, mb, roaming in zip(
+                        timestamps[row, offset:].tolist(), mb_used[row, offset:], roaming_mb[row, offset:]
+                    )
+                ]
+                baseline = baselines[row] if baselines else None
+                features = UsageFeatures(
+                    sim_ids[row], usage_data, device_profiles[row], self.window, self._weekday_lookup(baseline), now
+                )
+                extra = [anomaly for detector in self.extra_detectors for anomaly in detector.detect(features)]
+                if extra:
+                    anomalies = anomalies_by_sim.setdefault(sim_ids[row], [])
+                    anomalies.extend(extra)
+                    risk_scores[row] = self._calculate_risk_score(anomalies)
+
+        return anomalies_by_sim, risk_scores
+
+    def update_state(self, state: DetectorState, usage: Usage, device_profile: Optional[DeviceProfile] = None,
+                     now: Optional[datetime] = None, baseline: Optional[WeekdayBaseline] = None) -> List[Anomaly]:
         """
-        Son kaç saattir inaktif olduğunu hesaplar
+        Yeni bir kullanım kaydıyla SIM dedektör durumunu günceller ve o kayıt için anomalileri döndürür
+
+        Geçmiş yeniden taranmaz; baseline Welford ile kayan pencerede tutulur (en fazla 10 kayıt).
+        Sırası bozuk (eski tarihli) kayıtlar durumu değiştirmez, bunlar için rebuild_state kullanılır.
+        device_profile verilmezse sadece durum güncellenir, anomali üretilmez. Haftanın günü
+        baseline'ı verilirse kaydın günü için kayan baseline yerine o kullanılır. Yerleşik olmayan
+        dedektörler durumda tutulan son kayıtlarla çalışır ve bu kayda ait anomalileri döndürür.
         """
-        if not usage_data:
+        if state.last_timestamp and usage.timestamp <= state.last_timestamp:
+            return []
+
+        now = now or datetime.now()
+        window = state.recent_usage + [usage.mb_used]
+        length = state.record_count + 1
+
+        # Baseline: analyze_sim ile aynı pencere (10+ kayıtta son 10'un ilk 7'si, öncesinde ilk yarı)
+        if length <= 10:
+            self._reset_baseline(state, window[:length - 3] if length == 10 else window[:length // 2])
+        else:
+            entering, leaving = state.recent_usage[-3], state.recent_usage[-10]
+            if entering > 0:
+                self._baseline_add(state, entering)
+            if leaving > 0:
+                self._baseline_remove(state, leaving)
+
+        state.recent_usage = window[-10:]
+        state.recent_records = (state.recent_records + [usage])[-self.history_window:]
+        state.record_count = length
+        state.last_timestamp = usage.timestamp
+        state.updated_at = now
+
+        ma7 = state.baseline_mean if state.baseline_count else 0
+        if state.baseline_count > 1:
+            std7 = math.sqrt(max(state.baseline_m2, 0) / (state.baseline_count - 1))
+        else:
+            std7 = ma7 * 0.3
+        ma7, std7 = self._weekday_lookup(baseline).get(usage.timestamp.weekday(), (ma7, std7))
+
+        # Drain serisi - eşik kaydın geldiği andaki baseline ile
+        drain_threshold = max(ma7 * self.drain_multiplier, 10)
+        state.drain_streak = state.drain_streak + 1 if usage.mb_used > drain_threshold else 0
+
+        # Aktiflik - sondaki kesintisiz sıfır kullanım serisinin başlangıcı
+        if usage.mb_used > 0:
+            state.last_active_at = usage.timestamp
+            state.inactive_since = None
+        elif state.inactive_since is None:
+            state.inactive_since = usage.timestamp
+
+        if usage.roaming_mb > self.roaming_threshold:
+            state.last_roaming_at = usage.timestamp
+            state.last_roaming_mb = usage.roaming_mb
+
+        # Spike, kaydın geldiği andaki baseline ile değerlendirilir; risk skoru için son 3 kaydın sonucu tutulur
+        spike_threshold = max(ma7 * self.spike_multiplier, ma7 + 2 * std7, 20)
+        is_spike = (AnomalyType.SUDDEN_SPIKE.value in self.enabled and length >= 7
+                    and usage.mb_used > spike_threshold and ma7 > 0)
+        state.recent_spikes = (state.recent_spikes + [is_spike])[-3:]
+
+        anomalies = []
+        if device_profile is None or length < 7:
+            return anomalies
+
+        if is_spike:
+            anomalies.append(self._spike_anomaly(state.sim_id, usage.timestamp, usage.mb_used, ma7, spike_threshold))
+
+        if AnomalyType.SUSTAINED_DRAIN.value in self.enabled and state.drain_streak >= self.drain_days and ma7 > 0:
+            anomalies.append(self._drain_anomaly(
+                state.sim_id, usage.timestamp, window[-self.drain_days:], ma7, drain_threshold
+            ))
+
+        if AnomalyType.INACTIVITY.value in self.enabled and state.inactive_since is not None:
+            inactive_hours = int((now - state.inactive_since).total_seconds() / 3600)
+            if inactive_hours >= self.inactivity_hours:
+                anomalies.append(self._inactivity_anomaly(
+                    state.sim_id, usage.timestamp, inactive_hours, state.last_active_at
+                ))
+
+        if (AnomalyType.UNEXPECTED_ROAMING.value in self.enabled and not device_profile.roaming_expected
+                and usage.roaming_mb > self.roaming_threshold
+                and usage.timestamp >= now - timedelta(days=2)):
+            anomalies.append(self._roaming_anomaly(
+                state.sim_id, usage.timestamp, usage.roaming_mb, device_profile.roaming_expected
+            ))
+
+        if self.extra_detectors:
+            features = UsageFeatures(
+                state.sim_id, state.recent_records, device_profile, self.window, self._weekday_lookup(baseline), now
+            )
+            for detector in self.extra_detectors:
+                anomalies.extend(anomaly for anomaly in detector.detect(features) if anomaly.detected_at == usage.timestamp)
+
+        return anomalies
+
+    def rebuild_state(self, sim_id: str, usage_data: List[Usage],
+                      baseline: Optional[WeekdayBaseline] = None) -> DetectorState:
+        """
+        Dedektör durumunu tüm kullanım geçmişini baştan oynatarak yeniden kurar (mutabakat için)
+        """
+        state = DetectorState(sim_id=sim_id)
+        for usage in sorted(usage_data, key=lambda u: u.timestamp):
+            self.update_state(state, usage, baseline=baseline)
+
+        return state
+
+    def risk_score(self, state: DetectorState, device_profile: DeviceProfile, now: Optional[datetime] = None,
+                   baseline: Optional[WeekdayBaseline] = None) -> int:
+        """
+        Dedektör durumundan SIM'in güncel risk skoru (analyze_sim ile aynı kurallar)
+
+        Tek kaydın anomalileri değil, durumda hâlâ geçerli olanlar sayılır: son 3 kayıttaki spike'lar,
+        süren drain serisi, süren inaktiflik ve son 2 gündeki beklenmeyen roaming.
+        """
+        if state.record_count < 7:
             return 0
-            
-        now = datetime.now()
-        inactive_hours = 0
-        
-        for usage in reversed(usage_data):
-            if usage.mb_used > 0:
-                break
-            time_diff = now - usage.timestamp
-            inactive_hours = time_diff.total_seconds() / 3600
-            
-        return int(inactive_hours)
+
+        now = now or datetime.now()
+        score = 0
+
+        if AnomalyType.SUDDEN_SPIKE.value in self.enabled:
+            score += sum(state.recent_spikes) * self.risk_scores["SPIKE_SCORE"]
+
+        if (AnomalyType.SUSTAINED_DRAIN.value in self.enabled and state.drain_streak >= self.drain_days
+                and state.baseline_mean > 0):
+            score += self.risk_scores["DRAIN_SCORE"]
+
+        if AnomalyType.INACTIVITY.value in self.enabled and state.inactive_since is not None:
+            if (now - state.inactive_since).total_seconds() / 3600 >= self.inactivity_hours:
+                score += self.risk_scores["INACTIVITY_SCORE"]
+
+        if AnomalyType.UNEXPECTED_ROAMING.value in self.enabled and not device_profile.roaming_expected:
+            two_days_ago = now - timedelta(days=2)
+            if any(usage.timestamp >= two_days_ago and usage.roaming_mb > self.roaming_threshold
+                   for usage in state.recent_records[-3:]):
+                score += self.risk_scores["ROAMING_SCORE"]
+
+        if self.extra_detectors:
+            features = UsageFeatures(
+                state.sim_id, state.recent_records, device_profile, self.window, self._weekday_lookup(baseline), now
+            )
+            for detector in self.extra_detectors:
+                score += self._calculate_risk_score(detector.detect(features))
+
+        return min(score, self.risk_scores["MAX_SCORE"])
+
+    def _reset_baseline(self, state: DetectorState, values: List[float]):
+        """
+        Baseline istatistiklerini verilen değerlerden sıfırdan hesaplar
+        """
+        state.baseline_count, state.baseline_mean, state.baseline_m2 = 0, 0.0, 0.0
+        for value in values:
+            if value > 0:
+                self._baseline_add(state, value)
+
+    def _baseline_add(self, state: DetectorState, value: float):
+        """
+        Welford - baseline penceresine değer ekler
+        """
+        state.baseline_count += 1
+        delta = value - state.baseline_mean
+        state.baseline_mean += delta / state.baseline_count
+        state.baseline_m2 += delta * (value - state.baseline_mean)
+
+    def _baseline_remove(self, state: DetectorState, value: float):
+        """
+        Welford - baseline penceresinden değer çıkarır
+        """
+        if state.baseline_count <= 1:
+            state.baseline_count, state.baseline_mean, state.baseline_m2 = 0, 0.0, 0.0
+            return
+
+        state.baseline_count -= 1
+        delta = value - state.baseline_mean
+        state.baseline_mean -= delta / state.baseline_count
+        state.baseline_m2 -= delta * (value - state.baseline_mean)
+
+    def _weekday_lookup(self, baseline: Optional[WeekdayBaseline]) -> Dict[int, Tuple[float, float]]:
+        """
+        Yeterli örneği olan günler için (ortalama, standart sapma) sözlüğü döndürür
+        """
+        if baseline is None:
+            return {}
+        
+        lookup = {}
+        for weekday, count in enumerate(baseline.counts):
+            if count >= self.baseline_min_samples:
+                mean = baseline.means[weekday]
+                std = math.sqrt(baseline.variances[weekday] * count / (count - 1)) if count > 1 else mean * 0.3
+                lookup[weekday] = (mean, std)
+        
+        return lookup
+
+    def _spike_anomaly(self, sim_id: str, timestamp: datetime, mb_used: float,
+                       ma7: float, spike_threshold: float) -> Anomaly:
+        """
+        Sudden spike anomalisini oluşturur
+        """
+        return Anomaly(
+            sim_id=sim_id,
+            type=AnomalyType.SUDDEN_SPIKE,
+            detected_at=timestamp,
+            severity=RiskLevel.RED,
+            reason=f"Günlük kullanım {mb_used:.1f}MB, baseline ortalama {ma7:.1f}MB (eşik: {spike_threshold:.1f}MB)",
+            evidence={
+                "current_usage": mb_used,
+                "baseline_average": ma7,
+                "threshold": spike_threshold,
+                "multiplier": self.spike_multiplier
+            }
+        )
+
+    def _drain_anomaly(self, sim_id: str, timestamp: datetime, recent_usage: List[float],
+                       ma7: float, drain_threshold: float) -> Anomaly:
+        """
+        Sustained drain anomalisini oluşturur
+        """
+        return Anomaly(
+            sim_id=sim_id,
+            type=AnomalyType.SUSTAINED_DRAIN,
+            detected_at=timestamp,
+            severity=RiskLevel.ORANGE,
+            reason=f"{self.drain_days} gün boyunca sürekli yüksek kullanım (ortalama: {ma7:.1f}MB, eşik: {drain_threshold:.1f}MB)",
+            evidence={
+                "days_count": self.drain_days,
+                "threshold": drain_threshold,
+                "recent_usage": recent_usage,
+                "baseline_average": ma7
+            }
+        )
+
+    def _inactivity_anomaly(self, sim_id: str, timestamp: datetime, inactive_hours: int,
+                            last_active: Optional[datetime]) -> Anomaly:
+        """
+        Inactivity anomalisini oluşturur
+        """
+        return Anomaly(
+            sim_id=sim_id,
+            type=AnomalyType.INACTIVITY,
+            detected_at=timestamp,
+            severity=RiskLevel.ORANGE,
+            reason=f"{inactive_hours} saattir veri kullanımı yok",
+            evidence={
+                "inactive_hours": inactive_hours,
+                "last_active": last_active,
+                "threshold_hours": self.inactivity_hours
+            }
+        )
+
+    def _roaming_anomaly(self, sim_id: str, timestamp: datetime, roaming_mb: float,
+                         roaming_expected: bool) -> Anomaly:
+        """
+        Unexpected roaming anomalisini oluşturur
+        """
+        return Anomaly(
+            sim_id=sim_id,
+            type=AnomalyType.UNEXPECTED_ROAMING,
+            detected_at=timestamp,
+            severity=RiskLevel.RED,
+            reason=f"Beklenmeyen roaming kullanımı: {roaming_mb}MB",
+            evidence={
+                "roaming_usage": roaming_mb,
+                "threshold": self.roaming_threshold,
+                "device_allows_roaming": roaming_expected
+            }
+        )
     
     def _calculate_risk_score(self, anomalies: List[Anomaly]) -> int:
         """
@@ -164,14 +514,8 @@ class AnomalyDetector:
         score = 0
         
         for anomaly in anomalies:
-            if anomaly.type == AnomalyType.SUDDEN_SPIKE:
-                score += self.risk_scores["SPIKE_SCORE"]
-            elif anomaly.type == AnomalyType.SUSTAINED_DRAIN:
-                score += self.risk_scores["DRAIN_SCORE"]
-            elif anomaly.type == AnomalyType.INACTIVITY:
-                score += self.risk_scores["INACTIVITY_SCORE"]
-            elif anomaly.type == AnomalyType.UNEXPECTED_ROAMING:
-                score += self.risk_scores["ROAMING_SCORE"]
+            anomaly_type = anomaly.type.value if hasattr(anomaly.type, 'value') else str(anomaly.type)
+            score += self.type_scores.get(anomaly_type, 0)
         
         return min(score, self.risk_scores["MAX_SCORE"])
     
@@ -213,5 +557,39 @@ class AnomalyDetector:
         
         return summary
 
+def stack_usage_columns(mb_lists: List[List[float]], roaming_lists: List[List[float]],
+                        timestamp_lists: List[List[datetime]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    SIM başına kullanım kolonlarını analyze_fleet'in beklediği sağa yaslı matrislere çevirir
+    """
+    day_count = max((len(mb_list) for mb_list in mb_lists), default=0)
+
+    mb_used = np.full((len(mb_lists), day_count), np.nan)
+    roaming_mb = np.zeros((len(mb_lists), day_count))
+    timestamps = np.full((len(mb_lists), day_count), np.datetime64("NaT"), dtype="datetime64[us]")
+
+    for row, (mb_list, roaming_list, timestamp_list) in enumerate(zip(mb_lists, roaming_lists, timestamp_lists)):
+        if not mb_list:
+            continue
+        offset = day_count - len(mb_list)
+        mb_used[row, offset:] = mb_list
+        roaming_mb[row, offset:] = [value or 0 for value in roaming_list]
+        timestamps[row, offset:] = timestamp_list
+
+    return mb_used, roaming_mb, timestamps
+
+def build_usage_matrix(usage_by_sim: Dict[str, List[Usage]]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """
+    SIM başına Usage listelerinden kullanım matrislerini oluşturur
+    """
+    sim_ids = list(usage_by_sim)
+    mb_used, roaming_mb, timestamps = stack_usage_columns(
+        [[usage.mb_used for usage in usage_by_sim[sim_id]] for sim_id in sim_ids],
+        [[usage.roaming_mb for usage in usage_by_sim[sim_id]] for sim_id in sim_ids],
+        [[usage.timestamp for usage in usage_by_sim[sim_id]] for sim_id in sim_ids]
+    )
+
+    return sim_ids, mb_used, roaming_mb, timestamps
+
 # Global anomali tespit motoru
 anomaly_detector = AnomalyDetector()
@@ -0,0 +1,248 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing   import List, Optional, Dict
+from datetime import datetime, timedelta
+from pymongo  import UpdateOne, ReturnDocument
+from CLI      import konsol
+from DB       import db_manager, redis_manager
+from Settings import IOT_SETTINGS
+from ..Models import Usage, WeekdayBaseline
+
+class BaselineStore:
+    """
+    SIM ve cihaz tipi başına haftanın günü baseline'larını Mongo'da tutar, Redis'te önbellekler
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["BASELINES"]
+        self.min_samples = settings["MIN_SAMPLES"]
+        self.max_samples = settings["MAX_SAMPLES"]
+        self.cache_seconds = settings["CACHE_SECONDS"]
+
+    def update_pipeline(self, timestamp: datetime, mb_used: float) -> List[dict]:
+        """
+        Baseline'ın ilgili gününe değeri sunucuda katlayan update pipeline'ı (oku-değiştir-yaz yarışı olmaz)
+
+        Welford güncellemesi; sayaç MAX_SAMPLES'da sabitlenir, sonrasında güncelleme üstel ortalamaya
+        döner ve eski haftaların etkisi azalır. Sıfır kullanımlar baseline'a girmez (record_usage).
+        """
+        weekday = timestamp.weekday()
+
+        def with_day(field: str, value) -> dict:
+            # Dizinin yalnızca ilgili gününü değiştirir
+            return {"$map": {
+                "input": list(range(7)),
+                "as": "day",
+                "in": {"$cond": [{"$eq": ["$$day", weekday]}, value, {"$arrayElemAt": [f"${field}", "$$day"]}]}
+            }}
+
+        return [
+            {"$set": {
+                "counts": {"$ifNull": ["$counts", [0] * 7]},
+                "means": {"$ifNull": ["$means", [0.0] * 7]},
+                "variances": {"$ifNull": ["$variances", [0.0] * 7]}
+            }},
+            {"$set": {
+                "_count": {"$min": [{"$add": [{"$arrayElemAt": ["$counts", weekday]}, 1]}, self.max_samples]},
+                "_mean": {"$arrayElemAt": ["$means", weekday]},
+                "_variance": {"$arrayElemAt": ["$variances", weekday]}
+            }},
+            {"$set": {"_new_mean": {"$add": ["$_mean", {"$divide": [{"$subtract": [mb_used, "$_mean"]}, "$_count"]}]}}},
+            {"$set": {
+                "counts": with_day("counts", "$_count"),
+                "means": with_day("means", "$_new_mean"),
+                "variances": with_day("variances", {"$add": ["$_variance", {"$divide": [
+                    {"$subtract": [
+                        {"$multiply": [{"$subtract": [mb_used, "$_mean"]}, {"$subtract": [mb_used, "$_new_mean"]}]},
+                        "$_variance"
+                    ]},
+                    "$_count"
+                ]}]}),
+                "updated_at": datetime.now()
+            }},
+            {"$project": {"_count": 0, "_mean": 0, "_variance": 0, "_new_mean": 0}}
+        ]
+
+    def resolve(self, sim_baseline: Optional[WeekdayBaseline],
+                device_baseline: Optional[WeekdayBaseline]) -> Optional[WeekdayBaseline]:
+        """
+        Her gün için yeterli örneği olan SIM baseline'ını, yoksa cihaz tipi baseline'ını seçer
+        """
+        if sim_baseline is None and device_baseline is None:
+            return None
+
+        resolved = WeekdayBaseline(scope="resolved", key=(sim_baseline or device_baseline).key)
+        for weekday in range(7):
+            for baseline in (sim_baseline, device_baseline):
+                if baseline is not None and baseline.counts[weekday] >= self.min_samples:
+                    resolved.counts[weekday] = baseline.counts[weekday]
+                    resolved.means[weekday] = baseline.means[weekday]
+                    resolved.variances[weekday] = baseline.variances[weekday]
+                    break
+
+        return resolved
+
+    async def get(self, scope: str, key: str) -> Optional[WeekdayBaseline]:
+        """
+        Baseline'ı önce Redis'ten, yoksa Mongo'dan okur
+        """
+        cached = await redis_manager.get_cache(self._cache_key(scope, key))
+        if isinstance(cached, dict):
+            return WeekdayBaseline(**cached)
+
+        collection = db_manager.get_collection("baselines")
+        baseline_doc = await collection.find_one({"scope": scope, "key": key}, {"_id": 0})
+        if not baseline_doc:
+            return None
+
+        baseline = WeekdayBaseline(**baseline_doc)
+        await redis_manager.set_cache(self._cache_key(scope, key), baseline.model_dump(), self.cache_seconds)
+
+        return baseline
+
+    async def save(self, baseline: WeekdayBaseline):
+        """
+        Baseline'ı Mongo'ya yazar ve önbelleği günceller
+        """
+        collection = db_manager.get_collection("baselines")
+        await collection.replace_one({"scope": baseline.scope, "key": baseline.key}, baseline.model_dump(), upsert=True)
+        await redis_manager.set_cache(self._cache_key(baseline.scope, baseline.key), baseline.model_dump(), self.cache_seconds)
+
+    async def get_for_sim(self, sim_id: str, device_type: str) -> Optional[WeekdayBaseline]:
+        """
+        SIM için tespitte kullanılacak baseline'ı döndürür
+        """
+        return self.resolve(await self.get("sim", sim_id), await self.get("device_type", device_type))
+
+    async def get_for_sims(self, sim_ids: List[str], device_types: List[str]) -> List[Optional[WeekdayBaseline]]:
+        """
+        Bir SIM parçası için baseline'ları tek sorguyla okur (sim_ids sırasıyla)
+        """
+        collection = db_manager.get_collection("baselines")
+        sim_baselines = {}
+        async for baseline_doc in collection.find({"scope": "sim", "key": {"$in": sim_ids}}, {"_id": 0}):
+            sim_baselines[baseline_doc["key"]] = WeekdayBaseline(**baseline_doc)
+
+        device_baselines = {device_type: await self.get("device_type", device_type) for device_type in set(device_types)}
+
+        return [
+            self.resolve(sim_baselines.get(sim_id), device_baselines[device_type])
+            for sim_id, device_type in zip(sim_ids, device_types)
+        ]
+
+    async def record_usage(self, usage: Usage):
+        """
+        Yeni kullanım kaydıyla SIM baseline'ını tek atomik güncellemeyle günceller
+
+        Cihaz tipi baseline'ları tüm SIM'lerin paylaştığı belgelerdir; kayıt başına yazılırlarsa sıcak nokta
+        olurlar. Onlar yalnızca `rebuild` ile yenilenir.
+        """
+        if usage.mb_used <= 0:
+            return
+
+        collection = db_manager.get_collection("baselines")
+        baseline_doc = await collection.find_one_and_update(
+            {"scope": "sim", "key": usage.sim_id},
+            self.update_pipeline(usage.timestamp, usage.mb_used),
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await redis_manager.set_cache(self._cache_key("sim", usage.sim_id), WeekdayBaseline(**baseline_doc).model_dump(), self.cache_seconds)
+
+    async def has_device_baselines(self) -> bool:
+        """
+        En az bir cihaz tipi baseline'ı var mı (yoksa açılışta `rebuild` çalıştırılır)
+        """
+        return await db_manager.get_collection("baselines").find_one({"scope": "device_type"}, {"_id": 1}) is not None
+
+    async def rebuild(self) -> Dict[str, int]:
+        """
+        Tüm baseline'ları son MAX_SAMPLES haftanın kullanımından tek aggregation ile yeniden hesaplar
+        """
+        usage_collection = db_manager.get_collection("usage")
+        baselines_collection = db_manager.get_collection("baselines")
+        start_date = datetime.now() - timedelta(weeks=self.max_samples)
+
+        # SIM → cihaz tipi eşlemesi (cihaz tipi baseline'ları SIM'lerden birleştirilir)
+        device_by_sim = {}
+        async for sim_doc in db_manager.get_collection("sims").find({}, {"_id": 0, "sim_id": 1, "device_type": 1}):
+            device_by_sim[sim_doc["sim_id"]] = sim_doc.get("device_type")
+
+        pipeline = [
+            {"$match": {"timestamp": {"$gte": start_date}, "mb_used": {"$gt": 0}}},
+            {"$group": {
+                "_id": {"sim_id": "$sim_id", "day": {"$dayOfWeek": "$timestamp"}},
+                "count": {"$sum": 1},
+                "mean": {"$avg": "$mb_used"},
+                "std": {"$stdDevPop": "$mb_used"}
+            }},
+            {"$sort": {"_id.sim_id": 1}}
+        ]
+
+        now = datetime.now()
+        sim_count = 0
+        pending: List[WeekdayBaseline] = []
+        device_totals: Dict[str, List[List[float]]] = {}
+        baseline = None
+
+        # SIM'e göre sıralı gruplar akarken 1000'lik parçalar halinde yazılır
+        async for group in await usage_collection.aggregate(pipeline, allowDiskUse=True):
+            sim_id = group["_id"]["sim_id"]
+            weekday = (group["_id"]["day"] + 5) % 7     # Mongo: Pazar=1 → Python: Pazartesi=0
+            variance = (group["std"] or 0.0) ** 2
+
+            if baseline is None or baseline.key != sim_id:
+                baseline = WeekdayBaseline(scope="sim", key=sim_id, updated_at=now)
+                pending.append(baseline)
+                sim_count += 1
+                if len(pending) > 1000:
+                    await self._write_many(baselines_collection, pending[:-1])
+                    pending = pending[-1:]
+
+            baseline.counts[weekday] = min(group["count"], self.max_samples)
+            baseline.means[weekday] = group["mean"]
+            baseline.variances[weekday] = variance
+
+            # Cihaz tipi için gün başına n, Σn·μ, Σn·(σ² + μ²)
+            device_type = device_by_sim.get(sim_id)
+            if device_type:
+                totals = device_totals.setdefault(device_type, [[0.0, 0.0, 0.0] for _ in range(7)])[weekday]
+                totals[0] += group["count"]
+                totals[1] += group["count"] * group["mean"]
+                totals[2] += group["count"] * (variance + group["mean"] ** 2)
+
+        for device_type, totals in device_totals.items():
+            device_baseline = WeekdayBaseline(scope="device_type", key=device_type, updated_at=now)
+            for weekday, (count, weighted_sum, weighted_square) in enumerate(totals):
+                if count:
+                    mean = weighted_sum / count
+                    device_baseline.counts[weekday] = min(int(count), self.max_samples)
+                    device_baseline.means[weekday] = mean
+                    device_baseline.variances[weekday] = max(weighted_square / count - mean ** 2, 0.0)
+            pending.append(device_baseline)
+
+        await self._write_many(baselines_collection, pending)
+
+        konsol.log(f"📐 [green]Baseline'lar yeniden hesaplandı:[/] {sim_count} SIM, {len(device_totals)} cihaz tipi")
+        return {"sims": sim_count, "device_types": len(device_totals)}
+
+    async def _write_many(self, collection, baselines: List[WeekdayBaseline]):
+        """
+        Baseline'ları tek bulk_write ile yazar ve önbellekteki eski kopyaları siler
+        """
+        if not baselines:
+            return
+
+        await collection.bulk_write([
+            UpdateOne({"scope": baseline.scope, "key": baseline.key}, {"$set": baseline.model_dump()}, upsert=True)
+            for baseline in baselines
+        ], ordered=False)
+
+        if redis_manager.is_connected:
+            await redis_manager.client.delete(*[self._cache_key(baseline.scope, baseline.key) for baseline in baselines])
+
+    def _cache_key(self, scope: str, key: str) -> str:
+        return f"baseline:{scope}:{key}"
+
+# Global baseline deposu
+baseline_store = BaselineStore()
@@ -0,0 +1,335 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing            import List, Optional, Tuple
+from datetime          import datetime, timedelta
+from pymongo           import ReturnDocument
+from pymongo.errors    import DuplicateKeyError
+from CLI               import konsol
+from DB                import db_manager
+from Settings          import IOT_SETTINGS
+from ..Models          import Usage, SimCard, BillingEvent, BillingEventType, BillingSegment, BillingAddon, BillingCycle, BillingEventRequest, QuotaProjectionDetail
+from .cost_simulator   import cost_simulator
+from .usage_rollups    import usage_rollups
+from .catalog_index    import catalog_index
+from .cost_cache       import cost_cache
+from .quota_projection import quota_projector
+from .fleet_changes    import fleet_changes
+import calendar
+import uuid
+
+class BillingCycles:
+    """
+    SIM başına fatura dönemi (takvim ayı) maliyetini `billing_cycles`ta hazır tutar
+
+    Dönem belgesi günlük özetlerden ve `billing_events`teki plan değişikliği / ek paket olaylarından
+    kurulur; sonrasında her kullanım kaydı yalnızca sayaçları artırır. Güncel dönem maliyeti tek okumadır.
+    """
+    # Yeniden hesaplama sırasında kayıt gelirse yeniden deneme sayısı
+    REBUILD_ATTEMPTS = 5
+
+    def __init__(self):
+        self.enabled = IOT_SETTINGS["BILLING_CYCLES"]["ENABLED"] and usage_rollups.enabled
+
+    def cycle_start(self, timestamp: datetime) -> datetime:
+        """
+        Zaman damgasının düştüğü fatura döneminin başlangıcı (ayın 1'i)
+        """
+        return timestamp.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    def days_in_cycle(self, cycle: datetime) -> int:
+        return calendar.monthrange(cycle.year, cycle.month)[1]
+
+    def overage_cost(self, billing_cycle: BillingCycle) -> float:
+        """
+        Son yeniden hesaplamadaki aşım maliyeti + sonrasında oluşan aşımın güncel ücretle maliyeti
+        """
+        return billing_cycle.overage_base_cost + (billing_cycle.overage_mb - billing_cycle.overage_base_mb) * billing_cycle.overage_per_mb
+
+    def build_segments(self, initial_plan_id: str, events: List[BillingEvent], cycle: datetime,
+                       days_in_cycle: int) -> Optional[Tuple[List[BillingSegment], List[BillingAddon]]]:
+        """
+        Dönemin plan aralıklarını ve ek paketlerini olaylardan çıkarır (plan kataloğda yoksa None)
+
+        Plan değişikliği geçerli olduğu günün tamamından itibaren uygulanır; aynı gün birden fazla
+        değişiklik varsa sonuncusu geçerlidir.
+        """
+        changes = [(0, initial_plan_id)]
+        addons = []
+        for event in sorted(events, key=lambda event: event.effective_at):
+            day = min(max((event.effective_at - cycle).days, 0), days_in_cycle - 1)
+            if event.type == BillingEventType.PLAN_CHANGE:
+                if changes[-1][0] == day:
+                    changes[-1] = (day, event.plan_id)
+                else:
+                    changes.append((day, event.plan_id))
+            else:
+                addon = catalog_index.get_addon(event.addon_id)
+                if addon:
+                    addons.append(BillingAddon(addon_id=addon.addon_id, name=addon.name, day=day, extra_mb=addon.extra_mb, price=addon.price))
+
+        segments = []
+        for index, (start_day, plan_id) in enumerate(changes):
+            plan = catalog_index.get_plan(plan_id)
+            if plan is None:
+                return None
+
+            end_day = changes[index + 1][0] if index + 1 < len(changes) else days_in_cycle
+            segments.append(BillingSegment(
+                plan_id=plan.plan_id,
+                plan_name=plan.plan_name,
+                start_day=start_day,
+                end_day=end_day,
+                monthly_price=plan.monthly_price,
+                monthly_quota_mb=plan.monthly_quota_mb,
+                overage_per_mb=plan.overage_per_mb
+            ))
+
+        return segments, addons
+
+    async def rebuild(self, sim_id: str, cycle: datetime) -> Optional[BillingCycle]:
+        """
+        Dönem belgesini günlük özetlerden ve fatura olaylarından baştan hesaplayıp yazar
+
+        Sayaçlar özetlerden yeniden kurulup yazıldığından, özetler okunduktan sonra gelen bir kaydın `$inc`'i
+        ezilmemelidir: belge yalnızca okunduğundan beri sürümü değişmediyse yazılır, değiştiyse baştan hesaplanır.
+        """
+        collection = db_manager.get_collection("billing_cycles")
+        for _ in range(self.REBUILD_ATTEMPTS):
+            # Sürüm özetlerden önce okunur: arada gelen kayıt sürümü artırır ve yazım reddedilir
+            current = await collection.find_one({"sim_id": sim_id, "cycle": cycle}, {"_id": 0, "version": 1})
+
+            billing_cycle = await self._build(sim_id, cycle)
+            if billing_cycle is None:
+                return None
+
+            # Dönemde bir kez gönderilen kota uyarısının zamanı korunur
+            if current is None:
+                try:
+                    await collection.insert_one(billing_cycle.model_dump(exclude={"quota_alerted_at"}))
+                    return billing_cycle
+                except DuplicateKeyError:
+                    continue
+
+            billing_cycle.version = current.get("version", 0) + 1
+            result = await collection.update_one(
+                {"sim_id": sim_id, "cycle": cycle, "version": current.get("version")},
+                {"$set": billing_cycle.model_dump(exclude={"quota_alerted_at"})}
+            )
+            if result.matched_count:
+                return billing_cycle
+
+        konsol.log(f"⚠️  [yellow]Fatura dönemi eşzamanlı kayıtlar yüzünden yazılamadı:[/] {sim_id}")
+        return billing_cycle
+
+    async def _build(self, sim_id: str, cycle: datetime) -> Optional[BillingCycle]:
+        """
+        Dönem belgesini günlük özetlerden ve fatura olaylarından hesaplar (yazmaz)
+        """
+        sim_doc = await db_manager.get_collection("sims").find_one({"sim_id": sim_id}, {"_id": 0, "plan_id": 1})
+        if not sim_doc:
+            return None
+
+        await catalog_index.ensure()
+        events_collection = db_manager.get_collection("billing_events")
+        days_in_cycle = self.days_in_cycle(cycle)
+        next_cycle = cycle + timedelta(days=days_in_cycle)
+
+        events = [
+            BillingEvent(**event_doc)
+            async for event_doc in events_collection.find(
+                {"sim_id": sim_id, "effective_at": {"$gte": cycle, "$lt": next_cycle}}, {"_id": 0}
+            ).sort("effective_at", 1)
+        ]
+
+        # Dönemin başındaki plan: bu dönemden sonraki ilk plan değişikliğinin önceki planı, yoksa SIM'in planı
+        first_change = await events_collection.find_one(
+            {"sim_id": sim_id, "type": BillingEventType.PLAN_CHANGE.value, "effective_at": {"$gte": cycle}},
+            {"_id": 0, "from_plan_id": 1},
+            sort=[("effective_at", 1)]
+        )
+        initial_plan_id = first_change["from_plan_id"] if first_change else sim_doc["plan_id"]
+
+        built = self.build_segments(initial_plan_id, events, cycle, days_in_cycle)
+        if built is None:
+            konsol.log(f"⚠️  [yellow]Fatura dönemi hesaplanamadı, plan kataloğda yok:[/] {sim_id}")
+            return None
+        segments, addons = built
+
+        daily_mb = {
+            str(rollup.bucket.day): rollup.mb_used
+            for rollup in await usage_rollups.get(sim_id, cycle, "day")
+            if rollup.bucket < next_cycle
+        }
+        accrual = cost_simulator.cycle_accrual(
+            [daily_mb.get(str(day), 0.0) for day in range(1, days_in_cycle + 1)], segments, addons
+        )
+        overage_mb = float(accrual["cumulative_overage_mb"][-1])
+
+        # Kullanım hızı: dönemin bugüne kadar tamamlanan günleri
+        burn_through_day = min(max((datetime.now() - cycle).days, 0), days_in_cycle)
+        burn_rate, burn_days = quota_projector.fold(0.0, 0, daily_mb, 1, burn_through_day)
+
+        billing_cycle = BillingCycle(
+            sim_id=sim_id,
+            cycle=cycle,
+            days_in_cycle=days_in_cycle,
+            plan_id=segments[-1].plan_id,
+            overage_per_mb=segments[-1].overage_per_mb,
+            allowance_mb=float(accrual["allowance_mb"][-1]),
+            base_cost=accrual["base_cost"],
+            addon_cost=accrual["addon_cost"],
+            used_mb=float(accrual["cumulative_mb"][-1]),
+            overage_mb=overage_mb,
+            overage_base_mb=overage_mb,
+            overage_base_cost=accrual["overage_cost"],
+            daily_mb=daily_mb,
+            segments=segments,
+            addons=addons,
+            burn_rate=burn_rate,
+            burn_days=burn_days,
+            burn_through_day=burn_through_day,
+            updated_at=datetime.now()
+        )
+
+        return billing_cycle
+
+    async def record(self, usage: Usage) -> Optional[QuotaProjectionDetail]:
+        """
+        Yeni kullanım kaydını dönem sayaçlarına ekler; havuz aşıldıysa aşım MB'ını yükseltir
+
+        Dönemin ilk kaydında belge günlük özetlerden (bu kayıt dahil) kurulur. Havuzun bu hızla dönem
+        bitmeden dolacağı ilk kez öngörülürse öngörüyü döndürür (SIM başına dönemde bir kez).
+        """
+        collection = db_manager.get_collection("billing_cycles")
+        if not self.enabled or collection is None:
+            return None
+
+        cycle = self.cycle_start(usage.timestamp)
+        cycle_doc = await collection.find_one_and_update(
+            {"sim_id": usage.sim_id, "cycle": cycle},
+            {
+                "$inc": {"used_mb": usage.mb_used, f"daily_mb.{usage.timestamp.day}": usage.mb_used, "version": 1},
+                "$set": {"updated_at": datetime.now()}
+            },
+            projection={
+                "_id": 0, "days_in_cycle": 1, "used_mb": 1, "allowance_mb": 1, "overage_mb": 1, "daily_mb": 1,
+                "burn_rate": 1, "burn_days": 1, "burn_through_day": 1, "quota_alerted_at": 1
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if cycle_doc is None:
+            billing_cycle = await self.rebuild(usage.sim_id, cycle)
+            if billing_cycle is None:
+                return None
+            cycle_doc = billing_cycle.model_dump()
+        else:
+            # Aşan MB geri alınmaz: aşım, kullanım - havuz farkının ulaştığı en yüksek değer
+            overage_mb = cycle_doc["used_mb"] - cycle_doc["allowance_mb"]
+            if overage_mb > cycle_doc["overage_mb"]:
+                await collection.update_one({"sim_id": usage.sim_id, "cycle": cycle}, {"$max": {"overage_mb": overage_mb}})
+
+        return await self._project_quota(collection, usage.sim_id, cycle, cycle_doc)
+
+    async def _project_quota(self, collection, sim_id: str, cycle: datetime, cycle_doc: dict) -> Optional[QuotaProjectionDetail]:
+        """
+        Gün değiştiyse tamamlanan günleri kullanım hızına ekler (SIM başına günde bir yazım) ve kota öngörüsü yapar
+        """
+        now = datetime.now()
+        if not quota_projector.enabled or cycle != self.cycle_start(now):
+            return None
+
+        burn_rate = cycle_doc.get("burn_rate", 0.0)
+        burn_days = cycle_doc.get("burn_days", 0)
+        burn_through_day = cycle_doc.get("burn_through_day", 0)
+        if burn_through_day < now.day - 1:
+            burn_rate, burn_days = quota_projector.fold(burn_rate, burn_days, cycle_doc["daily_mb"], burn_through_day + 1, now.day - 1)
+            await collection.update_one(
+                {"sim_id": sim_id, "cycle": cycle, "burn_through_day": cycle_doc.get("burn_through_day")},
+                {"$set": {"burn_rate": burn_rate, "burn_days": burn_days, "burn_through_day": now.day - 1}}
+            )
+
+        if cycle_doc.get("quota_alerted_at"):
+            return None
+
+        projection = quota_projector.project(
+            cycle_doc["used_mb"], cycle_doc["allowance_mb"], burn_rate, burn_days,
+            now, cycle + timedelta(days=cycle_doc["days_in_cycle"])
+        )
+        if projection is None:
+            return None
+
+        # Bayrağı ilk koyan istek uyarır
+        result = await collection.update_one(
+            {"sim_id": sim_id, "cycle": cycle, "quota_alerted_at": None},
+            {"$set": {"quota_alerted_at": now}}
+        )
+        return projection if result.modified_count else None
+
+    async def get(self, sim_id: str, cycle: datetime) -> Optional[BillingCycle]:
+        """
+        Dönem belgesini okur; henüz yoksa kurar
+        """
+        cycle_doc = await db_manager.get_collection("billing_cycles").find_one({"sim_id": sim_id, "cycle": cycle}, {"_id": 0})
+        if cycle_doc:
+            return BillingCycle(**cycle_doc)
+
+        return await self.rebuild(sim_id, cycle)
+
+    async def add_event(self, sim: SimCard, request: BillingEventRequest) -> BillingEvent:
+        """
+        İçinde bulunulan dönem için plan değişikliği ya da ek paket olayı kaydeder ve dönemi yeniden hesaplar
+
+        Geçersiz olaylarda ValueError; plan değişikliği SIM'in planını da günceller.
+        """
+        now = datetime.now()
+        effective_at = request.effective_at or now
+        if effective_at > now or self.cycle_start(effective_at) != self.cycle_start(now):
+            raise ValueError("Olay tarihi içinde bulunulan fatura döneminde ve ileri tarihli olmamalı")
+
+        await catalog_index.ensure()
+        events_collection = db_manager.get_collection("billing_events")
+
+        if request.type == BillingEventType.PLAN_CHANGE:
+            plan = catalog_index.get_plan(request.plan_id)
+            if not plan or plan.apn != sim.apn:
+                raise ValueError("Plan bulunamadı ya da SIM'in APN'ine uygun değil")
+            if plan.plan_id == sim.plan_id:
+                raise ValueError("SIM zaten bu planda")
+
+            last_change = await events_collection.find_one(
+                {"sim_id": sim.sim_id, "type": BillingEventType.PLAN_CHANGE.value, "effective_at": {"$gt": effective_at}}
+            )
+            if last_change:
+                raise ValueError("Plan değişikliği son plan değişikliğinden önceye tarihlenemez")
+        else:
+            addon = catalog_index.get_addon(request.addon_id)
+            if not addon or addon.apn != sim.apn:
+                raise ValueError("Ek paket bulunamadı ya da SIM'in APN'ine uygun değil")
+
+        event = BillingEvent(
+            event_id=str(uuid.uuid4()),
+            sim_id=sim.sim_id,
+            type=request.type,
+            effective_at=effective_at,
+            plan_id=request.plan_id if request.type == BillingEventType.PLAN_CHANGE else None,
+            from_plan_id=sim.plan_id if request.type == BillingEventType.PLAN_CHANGE else None,
+            addon_id=request.addon_id if request.type == BillingEventType.ADDON else None,
+            created_at=now
+        )
+        await events_collection.insert_one(event.model_dump())
+
+        if request.type == BillingEventType.PLAN_CHANGE:
+            async with fleet_changes.stamp() as seq:
+                await db_manager.get_collection("sims").update_one(
+                    {"sim_id": sim.sim_id},
+                    {"$set": {"plan_id": request.plan_id, "updated_seq": seq}}
+                )
+
+        await self.rebuild(sim.sim_id, self.cycle_start(effective_at))
+        await cost_cache.invalidate(sim.sim_id)
+
+        konsol.log(f"🧾 [green]Fatura olayı kaydedildi:[/] {sim.sim_id} {request.type.value}")
+        return event
+
+# Global fatura dönemleri
+billing_cycles = BillingCycles()
@@ -0,0 +1,157 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing   import List, Optional, Dict
+from bisect   import bisect_left
+from CLI      import konsol
+from DB       import db_manager, redis_manager
+from Settings import IOT_SETTINGS
+from ..Models import IoTPlan, AddOnPack
+import asyncio
+import time
+
+# Katalog her değiştiğinde artırılan sürüm damgası
+CATALOG_VERSION_KEY = "catalog:version"
+
+class CatalogIndex:
+    """
+    Plan ve ek paket kataloğunu APN'e göre gruplu, kotaya göre sıralı olarak bellekte tutar
+
+    Katalog bir kez yüklenir; Redis'teki sürüm damgası en fazla CHECK_SECONDS'ta bir okunur ve
+    değiştiyse yeniden yüklenir. Maliyet uçları isteğe özel katalog sorgusu yapmaz.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["CATALOG"]
+        self.check_seconds = settings["CHECK_SECONDS"]
+
+        self.version: Optional[str] = None
+        self.loaded = False
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._build([], [])
+
+    def _build(self, plans: List[IoTPlan], addons: List[AddOnPack]):
+        """
+        Sorgu tablolarını kurar: kimliğe göre, APN'e göre kota sıralı ve kapsayan en ucuz plan için son ek minimumları
+        """
+        self.plans = {plan.plan_id: plan for plan in plans}
+        self.addons = {addon.addon_id: addon for addon in addons}
+
+        plans_by_apn: Dict[str, List[IoTPlan]] = {}
+        for plan in sorted(plans, key=lambda plan: (plan.monthly_quota_mb, plan.monthly_price)):
+            plans_by_apn.setdefault(plan.apn, []).append(plan)
+
+        addons_by_apn: Dict[str, List[AddOnPack]] = {}
+        for addon in sorted(addons, key=lambda addon: (addon.extra_mb, addon.price)):
+            addons_by_apn.setdefault(addon.apn, []).append(addon)
+
+        self.plans_by_apn = plans_by_apn
+        self.addons_by_apn = addons_by_apn
+        self.quotas_by_apn = {apn: [plan.monthly_quota_mb for plan in apn_plans] for apn, apn_plans in plans_by_apn.items()}
+
+        # i. konumdan sonraki (kotası daha büyük) planlar arasında en ucuzu
+        self.cheapest_from: Dict[str, List[IoTPlan]] = {}
+        for apn, apn_plans in plans_by_apn.items():
+            suffix = list(apn_plans)
+            for index in range(len(suffix) - 2, -1, -1):
+                if suffix[index + 1].monthly_price < suffix[index].monthly_price:
+                    suffix[index] = suffix[index + 1]
+            self.cheapest_from[apn] = suffix
+
+    async def load(self):
+        """
+        Kataloğu Mongo'dan yükler ve güncel sürüm damgasını kaydeder
+        """
+        plans_collection = db_manager.get_collection("iot_plans")
+        addons_collection = db_manager.get_collection("add_on_packs")
+
+        version = await self._read_version()
+        plans = [IoTPlan(**plan_doc) async for plan_doc in plans_collection.find({}, {"_id": 0})]
+        addons = [AddOnPack(**addon_doc) async for addon_doc in addons_collection.find({}, {"_id": 0})]
+
+        self._build(plans, addons)
+        self.version = version
+        self.loaded = True
+        self.checked_at = time.monotonic()
+
+        konsol.log(f"📚 [green]Katalog yüklendi:[/] {len(plans)} plan, {len(addons)} ek paket (sürüm {version})")
+
+    async def ensure(self):
+        """
+        Katalog yüklü değilse ya da Redis'teki sürüm değiştiyse yeniden yükler
+        """
+        if self.loaded and time.monotonic() - self.checked_at < self.check_seconds:
+            return
+
+        async with self._lock:
+            if self.loaded and time.monotonic() - self.checked_at < self.check_seconds:
+                return
+
+            if not self.loaded or await self._read_version() != self.version:
+                await self.load()
+            else:
+                self.checked_at = time.monotonic()
+
+    async def refresh(self) -> Dict:
+        """
+        Sürüm damgasını artırır (tüm işçiler yeniden yükler) ve kataloğu hemen yeniden yükler
+        """
+        if redis_manager.is_connected:
+            await redis_manager.client.incr(CATALOG_VERSION_KEY)
+
+        async with self._lock:
+            await self.load()
+
+        return self.status()
+
+    def status(self) -> Dict:
+        """
+        Yüklü kataloğun özeti
+        """
+        return {
+            "version": self.version,
+            "plans": len(self.plans),
+            "addons": len(self.addons),
+            "apns": sorted(set(self.plans_by_apn) | set(self.addons_by_apn))
+        }
+
+    async def _read_version(self) -> Optional[str]:
+        if not redis_manager.is_connected:
+            return self.version
+
+        try:
+            return await redis_manager.client.get(CATALOG_VERSION_KEY)
+        except Exception as e:
+            konsol.log(f"❌ [red]Katalog sürümü okunamadı:[/] {e}")
+            return self.version
+
+    def get_plan(self, plan_id: str) -> Optional[IoTPlan]:
+        return self.plans.get(plan_id)
+
+    def get_addon(self, addon_id: str) -> Optional[AddOnPack]:
+        return self.addons.get(addon_id)
+
+    def plans_for(self, apn: str) -> List[IoTPlan]:
+        """
+        APN'deki planlar (kotaya göre artan)
+        """
+        return list(self.plans_by_apn.get(apn, []))
+
+    def addons_for(self, apn: str) -> List[AddOnPack]:
+        """
+        APN'deki ek paketler (MB'a göre artan)
+        """
+        return list(self.addons_by_apn.get(apn, []))
+
+    def cheapest_covering_plan(self, apn: str, usage_mb: float) -> Optional[IoTPlan]:
+        """
+        Kotası verilen kullanımı karşılayan en ucuz planı ikili aramayla bulur (yoksa None)
+        """
+        quotas = self.quotas_by_apn.get(apn, [])
+        index = bisect_left(quotas, usage_mb)
+        if index == len(quotas):
+            return None
+
+        return self.cheapest_from[apn][index]
+
+# Global katalog indeksi
+catalog_index = CatalogIndex()
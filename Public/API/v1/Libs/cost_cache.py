@@ -0,0 +1,92 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing        import Any, Optional, Tuple
+from datetime      import date
+from CLI           import konsol
+from DB            import redis_manager
+from Settings      import IOT_SETTINGS
+from .catalog_index import catalog_index
+import hashlib
+import json
+
+class CostCache:
+    """
+    Maliyet uçlarının sonuçlarını SIM başına Redis anahtarlarında önbellekler
+
+    Değer anahtarı (gün, katalog sürümü, uç, parametre özeti) taşır ve hesaplandığı andaki kullanım
+    filigranıyla yazılır. Kullanım alındıkça SIM'in filigran anahtarı artar, eski değerler kendiliğinden
+    geçersiz olur; filigran ve değer tek MGET ile okunur. Ay sonu tahmini kalan güne bağlı olduğu için
+    gün değişince de yeniden hesaplanır. Her değer kendi TTL'iyle düşer: eski gün, katalog sürümü ve
+    parametre setlerinin anahtarları birikmez, filigranın yenilenmesi değerlerin ömrünü uzatmaz.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["COST_CACHE"]
+        self.enabled = settings["ENABLED"]
+        self.ttl_seconds = settings["TTL_SECONDS"]
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and redis_manager.is_connected
+
+    def _watermark_key(self, sim_id: str) -> str:
+        return f"cost:{sim_id}:watermark"
+
+    def _key(self, sim_id: str, endpoint: str, params: dict) -> str:
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return f"cost:{sim_id}:{date.today().isoformat()}:{catalog_index.version}:{endpoint}:{digest}"
+
+    async def get(self, sim_id: str, endpoint: str, params: dict) -> Tuple[Optional[Any], int]:
+        """
+        Geçerli önbellek değerini ve o anki kullanım filigranını döndürür (yoksa None)
+        """
+        if not self.active:
+            return None, 0
+
+        try:
+            await catalog_index.ensure()
+            watermark, cached = await redis_manager.client.mget(self._watermark_key(sim_id), self._key(sim_id, endpoint, params))
+            watermark = int(watermark or 0)
+            if cached:
+                entry = json.loads(cached)
+                if entry["watermark"] == watermark:
+                    return entry["data"], watermark
+
+            return None, watermark
+        except Exception as e:
+            konsol.log(f"❌ [red]Maliyet önbelleği okunamadı:[/] {e}")
+            return None, 0
+
+    async def set(self, sim_id: str, endpoint: str, params: dict, watermark: int, data: Any):
+        """
+        Sonucu hesaplamanın başında okunan filigranla yazar; arada kullanım geldiyse değer hiç eşleşmez
+        """
+        if not self.active:
+            return
+
+        try:
+            # Filigran hiçbir değerden önce düşmemeli: sıfırdan yeniden sayarsa eski değer tekrar eşleşebilir
+            pipeline = redis_manager.client.pipeline()
+            pipeline.set(self._key(sim_id, endpoint, params), json.dumps({"watermark": watermark, "data": data}, default=str), ex=self.ttl_seconds)
+            pipeline.expire(self._watermark_key(sim_id), self.ttl_seconds)
+            await pipeline.execute()
+        except Exception as e:
+            konsol.log(f"❌ [red]Maliyet önbelleği yazılamadı:[/] {e}")
+
+    async def invalidate(self, sim_id: str):
+        """
+        SIM'in kullanım filigranını artırır (yeni kullanım kaydında çağrılır)
+        """
+        if not self.active:
+            return
+
+        try:
+            key = self._watermark_key(sim_id)
+            pipeline = redis_manager.client.pipeline()
+            pipeline.incr(key)
+            pipeline.expire(key, self.ttl_seconds)
+            await pipeline.execute()
+        except Exception as e:
+            konsol.log(f"❌ [red]Maliyet önbelleği geçersiz kılınamadı:[/] {e}")
+
+# Global maliyet önbelleği
+cost_cache = CostCache()
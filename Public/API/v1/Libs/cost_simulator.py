@@ -1,13 +1,18 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from typing   import List
+from typing   import List, Dict, Sequence, Tuple, Optional
 from datetime import datetime, timedelta
-from ..Models import Usage, IoTPlan, AddOnPack, WhatIfResponse, CostBreakdown
+from Settings import IOT_SETTINGS
+from ..Models import Usage, IoTPlan, AddOnPack, WhatIfResponse, CostBreakdown, BillingSegment, BillingAddon
+import numpy as np
 import statistics
+import math
 
 class CostSimulator:
     def __init__(self):
-        pass
+        self.max_sweep_axis = IOT_SETTINGS["WHATIF_SWEEP"]["MAX_AXIS_POINTS"]
+        self.max_sweep_points = IOT_SETTINGS["WHATIF_SWEEP"]["MAX_GRID_POINTS"]
+        self.max_addon_units = IOT_SETTINGS["ADDON_COMBINATION"]["MAX_UNITS"]
     
     def simulate_costs(self, sim_id: str, usage_data: List[Usage], 
                       current_plan: IoTPlan, target_plan: IoTPlan = None,
@@ -59,22 +64,197 @@ class CostSimulator:
             description=description
         )
     
-    def _calculate_forecast(self, usage_data: List[Usage]) -> float:
+    def scenario_cost_change(self, scenario: str, current_monthly, overage_per_mb):
         """
-        Son 7 günün ortalamasına göre ay sonu tahmini yapar
+        Hazır senaryonun (projected_monthly, cost_change) değerleri; skaler ya da SIM dizileriyle çalışır
         """
+        if scenario == 'increase_20':
+            # %20 artış senaryosu
+            projected_monthly = current_monthly * 1.2
+            cost_change = (projected_monthly - current_monthly) * overage_per_mb
+        elif scenario == 'decrease_30':
+            # %30 azalış senaryosu
+            projected_monthly = current_monthly * 0.7
+            cost_change = (projected_monthly - current_monthly) * overage_per_mb
+        elif scenario == 'spike_day':
+            # Günlük ani artış senaryosu (10x)
+            spike_usage = current_monthly / 30 * 10
+            projected_monthly = current_monthly + spike_usage
+            cost_change = spike_usage * overage_per_mb
+        elif scenario == 'roaming_week':
+            # Haftalık roaming senaryosu (2.5 TL/MB)
+            projected_monthly = current_monthly
+            cost_change = current_monthly / 4 * 2.5
+        else:
+            projected_monthly = current_monthly
+            cost_change = current_monthly * 0.0
+        
+        return projected_monthly, cost_change
+    
+    def simulate_fleet(self, forecast_mb: np.ndarray, used_so_far: np.ndarray, current_plans: Sequence[IoTPlan],
+                       target_plan: IoTPlan = None, addons: List[AddOnPack] = None) -> Dict[str, np.ndarray]:
+        """
+        simulate_costs'un filo karşılığı: SIM başına maliyetleri diziler halinde döndürür
+        
+        Dönen anahtarlar: current_total, candidate_total, saving, base_cost, overage_cost, addon_cost (N,)
+        """
+        total_usage = np.asarray(used_so_far, dtype=np.float64) + np.asarray(forecast_mb, dtype=np.float64)
+        price = np.array([plan.monthly_price for plan in current_plans], dtype=np.float64)
+        quota = np.array([plan.monthly_quota_mb for plan in current_plans], dtype=np.float64)
+        overage = np.array([plan.overage_per_mb for plan in current_plans], dtype=np.float64)
+        
+        current_totals = price + np.maximum(0, total_usage - quota) * overage
+        
+        if target_plan:
+            price, quota, overage = (np.full(len(total_usage), value, dtype=np.float64) for value in (
+                target_plan.monthly_price, target_plan.monthly_quota_mb, target_plan.overage_per_mb
+            ))
+        
+        addons = addons or []
+        addon_cost = np.full(len(total_usage), sum(addon.price for addon in addons), dtype=np.float64)
+        addon_mb = sum(addon.extra_mb for addon in addons)
+        overage_cost = np.maximum(0, total_usage - (quota + addon_mb)) * overage
+        candidate_totals = price + addon_cost + overage_cost
+        
+        return {
+            "current_total": current_totals,
+            "candidate_total": candidate_totals,
+            "saving": current_totals - candidate_totals,
+            "base_cost": price,
+            "overage_cost": overage_cost,
+            "addon_cost": addon_cost
+        }
+    
+    def sweep_axis(self, start: float, stop: float, step: float) -> np.ndarray:
+        """
+        Tarama ekseninin değerleri (stop dahil); geçersiz ya da çok büyük eksende ValueError
+        """
+        if step <= 0 or stop < start:
+            raise ValueError(f"Geçersiz tarama aralığı: {start} → {stop} (adım {step})")
+        
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        if count > self.max_sweep_axis:
+            raise ValueError(f"Tarama ekseni en fazla {self.max_sweep_axis} nokta olabilir ({count})")
+        
+        return start + step * np.arange(count)
+    
+    def sweep_grid(self, **ranges: dict) -> Dict[str, np.ndarray]:
+        """
+        Her eksenin değerleri (ad → sweep_axis parametreleri); eksen başına ve toplam nokta sınırı aşılırsa ValueError
+        """
+        axes = {name: self.sweep_axis(**axis_range) for name, axis_range in ranges.items()}
+        
+        points = int(np.prod([len(values) for values in axes.values()]))
+        if points > self.max_sweep_points:
+            raise ValueError(f"Tarama ızgarası en fazla {self.max_sweep_points} nokta olabilir ({points})")
+        
+        return axes
+    
+    def sweep_scenarios(self, current_monthly: float, plans: List[IoTPlan], growth: np.ndarray,
+                        spike_days: np.ndarray, roaming_days: np.ndarray, spike_multiplier: float = 10.0,
+                        roaming_cost_per_mb: float = 2.5) -> np.ndarray:
+        """
+        Tüm ızgara noktalarını tüm planlara karşı tek broadcast ile hesaplar, (plan × büyüme × spike × roaming) döndürür
+        
+        Senaryolar tekil what-if senaryolarıyla aynı kurallara dayanır: büyüme aylık kullanımı ölçekler,
+        her spike günü günlük ortalamanın `spike_multiplier` katı ekler, roaming günleri günlük ortalama
+        kadar roaming MB'ı `roaming_cost_per_mb` ile ücretlendirir (kotadan düşmez).
+        """
+        monthly = current_monthly * (1 + np.asarray(growth, dtype=np.float64))[:, None, None]
+        daily_average = monthly / 30
+        usage = monthly + daily_average * spike_multiplier * np.asarray(spike_days, dtype=np.float64)[None, :, None]
+        roaming_cost = daily_average * np.asarray(roaming_days, dtype=np.float64)[None, None, :] * roaming_cost_per_mb
+        
+        price = np.array([plan.monthly_price for plan in plans], dtype=np.float64)[:, None, None, None]
+        quota = np.array([plan.monthly_quota_mb for plan in plans], dtype=np.float64)[:, None, None, None]
+        overage = np.array([plan.overage_per_mb for plan in plans], dtype=np.float64)[:, None, None, None]
+        
+        return price + np.maximum(0, usage[None] - quota) * overage + roaming_cost[None]
+    
+    def _calculate_forecast(self, usage_data: List[Usage], now: datetime = None) -> float:
+        """
+        Tamamlanan son 7 günün ortalamasına göre ay sonu tahmini yapar (bugünün kısmi kullanımı ortalamaya girmez)
+        """
+        today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        usage_data = [usage for usage in usage_data if usage.timestamp < today]
         if len(usage_data) < 7:
             return 0
         
         last_7_days = usage_data[-7:]
         daily_average = statistics.mean([usage.mb_used for usage in last_7_days])
         
-        # Bu ayın kalan günlerini hesapla
-        now = datetime.now()
-        last_day_of_month = datetime(now.year, now.month + 1, 1) - timedelta(days=1)
-        remaining_days = (last_day_of_month - now).days
+        return daily_average * self.remaining_days()
+    
+    def forecast_fleet_usage(self, daily_usage: Sequence[Sequence[float]],
+                             today_usage: Optional[Sequence[float]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        SIM başına tamamlanan günlerin kullanım listelerinden ve bugünün kısmi kullanımından
+        (ay sonu tahmini, kullanılan MB) dizilerini döndürür
+
+        Tahmin kuralı _calculate_forecast ile aynıdır: tamamlanan son 7 günün ortalaması × kalan gün;
+        bugün yalnızca kullanılan MB'a eklenir.
+        """
+        remaining_days = self.remaining_days()
+        forecast_mb = np.array([statistics.mean(days[-7:]) * remaining_days if len(days) >= 7 else 0 for days in daily_usage], dtype=np.float64)
+        used_so_far = np.array([sum(days) for days in daily_usage], dtype=np.float64)
+        if today_usage is not None:
+            used_so_far += np.asarray(today_usage, dtype=np.float64)
+        
+        return forecast_mb, used_so_far
+    
+    def remaining_days(self, now: datetime = None) -> int:
+        """
+        Bu ayın kalan gün sayısı (ayın son gününe kadar, Aralık'ta yıl devrini de karşılar)
+        """
+        now = now or datetime.now()
+        first_of_next_month = (now.replace(day=28) + timedelta(days=4)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        last_day_of_month = first_of_next_month - timedelta(days=1)
+        
+        return (last_day_of_month - now).days
+    
+    def cycle_accrual(self, daily_mb: Sequence[float], segments: List[BillingSegment],
+                      addons: List[BillingAddon]) -> Dict:
+        """
+        Fatura dönemi için gün gün kümülatif kullanım ve maliyet eğrisi (dizi uzunluğu: dönemin gün sayısı)
+
+        Plan ücreti ve kotası planın geçerli olduğu gün sayısına göre kıst hesaplanır; ücret her gün
+        1/gün_sayısı olarak tahakkuk eder. Ek paket fiyatı aktive edildiği gün yansır, MB'ı o günden
+        itibaren havuza eklenir. Havuzu aşan MB o gün geçerli planın aşım ücretiyle faturalanır.
+        """
+        daily_mb = np.asarray(daily_mb, dtype=np.float64)
+        days_in_cycle = len(daily_mb)
+        
+        price = np.zeros(days_in_cycle)
+        quota = np.zeros(days_in_cycle)
+        rate = np.zeros(days_in_cycle)
+        for segment in segments:
+            price[segment.start_day:segment.end_day] = segment.monthly_price
+            quota[segment.start_day:segment.end_day] = segment.monthly_quota_mb
+            rate[segment.start_day:segment.end_day] = segment.overage_per_mb
+        
+        addon_mb = np.zeros(days_in_cycle)
+        addon_price = np.zeros(days_in_cycle)
+        for addon in addons:
+            addon_mb[addon.day] += addon.extra_mb
+            addon_price[addon.day] += addon.price
+        
+        # Aşan MB geri alınmaz: kümülatif aşım, (kullanım - havuz) farkının o güne kadarki maksimumu
+        cumulative_mb = np.cumsum(daily_mb)
+        allowance = quota.sum() / days_in_cycle + np.cumsum(addon_mb)
+        cumulative_overage = np.maximum.accumulate(np.maximum(cumulative_mb - allowance, 0))
+        daily_overage = np.diff(cumulative_overage, prepend=0.0)
         
-        return daily_average * remaining_days
+        daily_cost = price / days_in_cycle + addon_price + daily_overage * rate
+        
+        return {
+            "cumulative_mb": cumulative_mb,
+            "cumulative_cost": np.cumsum(daily_cost),
+            "cumulative_overage_mb": cumulative_overage,
+            "allowance_mb": allowance,
+            "base_cost": float(price.sum() / days_in_cycle),
+            "addon_cost": float(addon_price.sum()),
+            "overage_cost": float((daily_overage * rate).sum())
+        }
     
     def _calculate_plan_cost(self, used_so_far: float, forecast_mb: float,
                            plan: IoTPlan, addons: List[AddOnPack]) -> float:
@@ -138,31 +318,283 @@ class CostSimulator:
                         current_plan: IoTPlan, available_plans: List[IoTPlan],
                         available_addons: List[AddOnPack]) -> List[WhatIfResponse]:
         """
-        En iyi 3 seçeneği döndürür
+        En iyi 3 seçeneği döndürür (tek SIM'lik filo optimizasyonu)
         """
+        other_plans = [plan for plan in available_plans if plan.plan_id != current_plan.plan_id]
+        addons = [addon for addon in available_addons if addon.apn == current_plan.apn]
+        
+        if not usage_data:
+            current_option = self._empty_response()
+            current_option.description = f"Mevcut Plan: {current_plan.plan_name}"
+            return [current_option] + [self._empty_response() for _ in range(min(2, len(other_plans) + len(addons)))]
+        
+        best_options = self.optimize_fleet(
+            [sim_id],
+            np.array([self._calculate_forecast(usage_data)]),
+            np.array([sum(usage.mb_used for usage in usage_data)]),
+            np.array([0]),
+            [current_plan] + other_plans,
+            addons
+        )
+        
+        return best_options[sim_id]
+    
+    def optimize_fleet(self, sim_ids: Sequence[str], forecast_mb: np.ndarray, used_so_far: np.ndarray,
+                       current_plan_index: np.ndarray, plans: List[IoTPlan], addons: List[AddOnPack],
+                       top_k: int = 3) -> Dict[str, List[WhatIfResponse]]:
+        """
+        Tüm filo için plan × ek paket maliyet matrisini hesaplar ve SIM başına en ucuz top_k seçeneği döndürür
+
+        forecast_mb / used_so_far : SIM başına ay sonu tahmini ve kullanılan MB (N,)
+        current_plan_index        : SIM'in mevcut planının `plans` içindeki sırası (N,)
+
+        Adaylar get_best_options ile aynıdır: mevcut plan, aynı APN'deki diğer planlar ve mevcut
+        plana eklenen aynı APN'deki tekil ek paketler. Maliyetler (N × aday) matrisinde hesaplanır,
+        kazananlar argpartition ile seçilir; eşit maliyette sıra mevcut plan, planlar, ek paketler.
+        WhatIfResponse yalnızca kazananlar için oluşturulur.
+        """
+        current = np.asarray(current_plan_index, dtype=np.int64)
+        total_usage = np.asarray(used_so_far, dtype=np.float64) + np.asarray(forecast_mb, dtype=np.float64)
+        
+        winners, winner_costs, current_totals = self.rank_fleet(total_usage, current, plans, addons, top_k)
+        
+        plan_price = np.array([plan.monthly_price for plan in plans], dtype=np.float64)
+        plan_quota = np.array([plan.monthly_quota_mb for plan in plans], dtype=np.float64)
+        plan_overage = np.array([plan.overage_per_mb for plan in plans], dtype=np.float64)
+        addon_price = np.array([addon.price for addon in addons], dtype=np.float64)
+        addon_mb = np.array([addon.extra_mb for addon in addons], dtype=np.float64)
+        
+        # Kazananların döküm kolonları: plan sütunu o plan, ek paket sütunu mevcut plan + ek paket
+        is_addon = winners >= len(plans)
+        addon_index = np.where(is_addon, winners - len(plans), 0)
+        plan_index = np.where(is_addon, current[:, None], winners)
+        addon_cost = np.where(is_addon, addon_price[addon_index] if len(addons) else 0.0, 0.0)
+        quota = plan_quota[plan_index] + np.where(is_addon, addon_mb[addon_index] if len(addons) else 0.0, 0.0)
+        overage_cost = np.maximum(0, total_usage[:, None] - quota) * plan_overage[plan_index]
+        
+        plan_descriptions = [f"Plan değişikliği: {plan.plan_name}" for plan in plans]
+        addon_descriptions = [f"Ek paket: {addon.name}" for addon in addons]
+        
+        results: Dict[str, List[WhatIfResponse]] = {}
+        rows = zip(
+            sim_ids, current.tolist(), current_totals.tolist(), winners.tolist(), winner_costs.tolist(),
+            np.isfinite(winner_costs).tolist(), plan_price[plan_index].tolist(), addon_cost.tolist(), overage_cost.tolist()
+        )
+        for sim_id, current_column, current_total, columns, candidate_totals, valid, base_costs, addon_costs, overage_costs in rows:
+            options = []
+            for column, candidate_total, is_valid, base_cost, option_addon_cost, option_overage_cost in zip(
+                columns, candidate_totals, valid, base_costs, addon_costs, overage_costs
+            ):
+                if not is_valid:
+                    continue
+                
+                if column == current_column:
+                    description = f"Mevcut Plan: {plans[column].plan_name}"
+                elif column < len(plans):
+                    description = plan_descriptions[column]
+                else:
+                    description = addon_descriptions[column - len(plans)]
+                
+                options.append(WhatIfResponse(
+                    current_total=current_total,
+                    candidate_total=candidate_total,
+                    saving=current_total - candidate_total,
+                    breakdown=CostBreakdown(
+                        base_cost=base_cost,
+                        overage_cost=option_overage_cost,
+                        addon_cost=option_addon_cost,
+                        total_cost=base_cost + option_addon_cost + option_overage_cost
+                    ),
+                    description=description
+                ))
+            results[sim_id] = options
+        
+        return results
+    
+    def rank_fleet(self, total_usage: np.ndarray, current_plan_index: np.ndarray, plans: List[IoTPlan],
+                   addons: List[AddOnPack], top_k: int = 3) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Maliyet matrisini kurar ve SIM başına en ucuz top_k sütunu döndürür
+
+        Dönen değerler: kazanan sütunlar (N × k; < len(plans) plan, sonrası ek paket), kazananların
+        maliyetleri (N × k; APN dışı adaylar inf) ve mevcut plan maliyetleri (N,)
+        """
+        current = np.asarray(current_plan_index, dtype=np.int64)
+        total_usage = np.asarray(total_usage, dtype=np.float64)
+        
+        plan_price = np.array([plan.monthly_price for plan in plans], dtype=np.float64)
+        plan_quota = np.array([plan.monthly_quota_mb for plan in plans], dtype=np.float64)
+        plan_overage = np.array([plan.overage_per_mb for plan in plans], dtype=np.float64)
+        addon_price = np.array([addon.price for addon in addons], dtype=np.float64)
+        addon_mb = np.array([addon.extra_mb for addon in addons], dtype=np.float64)
+        
+        # APN kodları: aday sadece SIM'in mevcut planıyla aynı APN'deyse geçerli
+        apn_codes = {apn: code for code, apn in enumerate({plan.apn for plan in plans} | {addon.apn for addon in addons})}
+        plan_apn = np.array([apn_codes[plan.apn] for plan in plans], dtype=np.int64)
+        addon_apn = np.array([apn_codes[addon.apn] for addon in addons], dtype=np.int64)
+        sim_apn = plan_apn[current]
+        
+        # (N × plan): plan değişikliği, (N × ek paket): mevcut plan + ek paket
+        plan_costs = plan_price + np.maximum(0, total_usage[:, None] - plan_quota) * plan_overage
+        addon_costs = (
+            plan_price[current][:, None] + addon_price
+            + np.maximum(0, total_usage[:, None] - (plan_quota[current][:, None] + addon_mb)) * plan_overage[current][:, None]
+        )
+        costs = np.concatenate([
+            np.where(plan_apn == sim_apn[:, None], plan_costs, np.inf),
+            np.where(addon_apn == sim_apn[:, None], addon_costs, np.inf)
+        ], axis=1)
+        current_totals = plan_costs[np.arange(len(current)), current]
+        
+        # Eşitlikte sıra: mevcut plan önce, sonra katalog sırası
+        order = np.broadcast_to(np.arange(costs.shape[1], dtype=np.float64), costs.shape).copy()
+        order[np.arange(len(current)), current] = -1
+        
+        winners = self._top_k(costs, order, min(top_k, costs.shape[1]))
+        
+        return winners, np.take_along_axis(costs, winners, axis=1), current_totals
+    
+    def _top_k(self, costs: np.ndarray, order: np.ndarray, k: int) -> np.ndarray:
+        """
+        Satır başına en düşük maliyetli k sütunu (maliyet, sıra) düzeninde döndürür
+        """
+        if k < costs.shape[1]:
+            candidates = np.argpartition(costs, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(costs.shape[1]), costs.shape)
+        
+        candidate_costs = np.take_along_axis(costs, candidates, axis=1)
+        ranking = np.lexsort((np.take_along_axis(order, candidates, axis=1), candidate_costs), axis=1)
+        picked = np.take_along_axis(candidates, ranking, axis=1)
+        
+        # argpartition k. değerdeki eşitlerden herhangi birini seçebilir; bu satırlar tam sıralanır
+        kth = candidate_costs.max(axis=1, initial=-np.inf)
+        ties = np.isfinite(kth) & ((costs <= kth[:, None]).sum(axis=1) > k)
+        if ties.any():
+            tied_rows = np.flatnonzero(ties)
+            picked[tied_rows] = np.lexsort((order[tied_rows], costs[tied_rows]), axis=1)[:, :k]
+        
+        return picked
+    
+    def get_best_combinations(self, sim_id: str, usage_data: List[Usage],
+                              current_plan: IoTPlan, available_plans: List[IoTPlan],
+                              available_addons: List[AddOnPack], top_k: int = 3) -> List[WhatIfResponse]:
+        """
+        Her plan için en ucuz ek paket kombinasyonunu (aynı paketten birden fazla olabilir) bulur
+        ve en iyi top_k plan + paket seçeneğini döndürür
+        """
+        if not usage_data:
+            return self.get_best_options(sim_id, usage_data, current_plan, available_plans, available_addons)
+        
+        forecast_mb = self._calculate_forecast(usage_data)
+        used_so_far = sum(usage.mb_used for usage in usage_data)
+        total_usage = used_so_far + forecast_mb
+        
+        current_total = self._calculate_plan_cost(used_so_far, forecast_mb, current_plan, [])
+        other_plans = [plan for plan in available_plans if plan.plan_id != current_plan.plan_id and plan.apn == current_plan.apn]
+        addons = [addon for addon in available_addons if addon.apn == current_plan.apn]
+        
+        # Dal-sınır: planlar fiyat sırasıyla denenir, fiyatı top_k'nın en kötüsünü aşan plan atlanır
+        candidates: List[Tuple[float, int, IoTPlan, List[AddOnPack]]] = []
+        for order, plan in enumerate([current_plan] + sorted(other_plans, key=lambda plan: plan.monthly_price)):
+            if len(candidates) >= top_k and plan.monthly_price >= candidates[top_k - 1][0]:
+                break
+            
+            cost, combination = self.optimize_addon_combination(total_usage, plan, addons)
+            candidates.append((cost, order, plan, combination))
+            candidates.sort(key=lambda candidate: candidate[:2])
+        
         options = []
+        for _, _, plan, combination in candidates[:top_k]:
+            candidate_total = self._calculate_plan_cost(used_so_far, forecast_mb, plan, combination)
+            
+            description = f"Mevcut Plan: {plan.plan_name}" if plan.plan_id == current_plan.plan_id else f"Plan değişikliği: {plan.plan_name}"
+            if combination:
+                counts: Dict[str, int] = {}
+                for addon in combination:
+                    counts[addon.name] = counts.get(addon.name, 0) + 1
+                description += " + " + ", ".join(f"{count}× {name}" for name, count in counts.items())
+            
+            options.append(WhatIfResponse(
+                current_total=current_total,
+                candidate_total=candidate_total,
+                saving=current_total - candidate_total,
+                breakdown=self._get_cost_breakdown(used_so_far, forecast_mb, plan, combination),
+                description=description
+            ))
+        
+        return options
+    
+    def optimize_addon_combination(self, total_usage: float, plan: IoTPlan,
+                                   addons: List[AddOnPack]) -> Tuple[float, List[AddOnPack]]:
+        """
+        Plan üzerine eklenecek en ucuz ek paket çoklu kümesini sınırlı sırt çantası ile bulur
+        
+        Kota açığı paketlerin MB'larının EBOB'u birimine bölünür; her paketin adedi açığı kapatacak
+        kadarla sınırlanıp ikili parçalanır (1, 2, 4, ... adet) ve 0/1 adımları numpy ile işlenir.
+        Başka bir paketin baskıladığı ya da aşım ücretinden pahalı olan paketler baştan elenir.
+        Tablo ADDON_COMBINATION.MAX_UNITS hücreyi aşacaksa birim büyütülür ve paket boyları aşağı
+        yuvarlanır: sonuç yaklaşık olur, bellek sınırlı kalır. Dönen maliyet plan ücreti + paketler + kalan aşımdır.
+        """
+        deficit = total_usage - plan.monthly_quota_mb
+        if deficit <= 0 or plan.overage_per_mb <= 0:
+            return plan.monthly_price, []
+        
+        # Aşım ödemekten ucuz olmayan ya da daha büyük/ucuz bir paketin gölgesinde kalan paketleri ele
+        useful = [addon for addon in addons if addon.extra_mb > 0 and addon.price < addon.extra_mb * plan.overage_per_mb]
+        packs: List[AddOnPack] = []
+        for addon in sorted(useful, key=lambda addon: (addon.price, -addon.extra_mb)):
+            if all(addon.extra_mb > kept.extra_mb for kept in packs):
+                packs.append(addon)
+        if not packs:
+            return plan.monthly_price + deficit * plan.overage_per_mb, []
+        
+        unit = math.gcd(*[addon.extra_mb for addon in packs])
+        # En ucuz çözümde hiçbir paket çıkarılınca açık hâlâ kapanmaz; toplam < açık + en büyük paket
+        largest = max(addon.extra_mb for addon in packs)
+        if math.ceil(deficit / unit) + largest // unit > self.max_addon_units:
+            unit *= math.ceil((math.ceil(deficit / unit) + largest // unit) / self.max_addon_units)
+            packs = [addon for addon in packs if addon.extra_mb >= unit]
+            if not packs:
+                return plan.monthly_price + deficit * plan.overage_per_mb, []
+        
+        target = math.ceil(deficit / unit)
+        size = target + largest // unit
+        
+        best = np.full(size, np.inf)
+        best[0] = 0.0
+        # Adım başına "bu adımda alındı" bitleri paketlenmiş tutulur (hücre başına 1 bit)
+        steps: List[Tuple[int, int, np.ndarray]] = []
+        for pack_index, addon in enumerate(packs):
+            weight = addon.extra_mb // unit
+            remaining = math.ceil(target / weight)
+            chunk = 1
+            while remaining > 0:
+                count = min(chunk, remaining)
+                shift = weight * count
+                if shift < size:
+                    shifted = best[:-shift] + addon.price * count
+                    took = np.zeros(size, dtype=bool)
+                    took[shift:] = shifted < best[shift:]
+                    best[shift:] = np.where(took[shift:], shifted, best[shift:])
+                    steps.append((pack_index, count, np.packbits(took)))
+                remaining -= count
+                chunk *= 2
+        
+        covered = np.arange(size) * unit
+        costs = best + np.maximum(0, deficit - covered) * plan.overage_per_mb
+        reached = int(np.argmin(costs))
+        
+        combination: List[AddOnPack] = []
+        for pack_index, count, took in reversed(steps):
+            if took[reached >> 3] >> (7 - (reached & 7)) & 1:
+                combination += [packs[pack_index]] * count
+                reached -= (packs[pack_index].extra_mb // unit) * count
         
-        # Mevcut plan
-        current_option = self.simulate_costs(sim_id, usage_data, current_plan)
-        current_option.description = f"Mevcut Plan: {current_plan.plan_name}"
-        options.append(current_option)
-        
-        # Diğer planlar
-        for plan in available_plans:
-            if plan.plan_id != current_plan.plan_id:
-                option = self.simulate_costs(sim_id, usage_data, current_plan, plan)
-                options.append(option)
-        
-        # Ek paketler (tek tek)
-        for addon in available_addons:
-            if addon.apn == current_plan.apn:
-                option = self.simulate_costs(sim_id, usage_data, current_plan, 
-                                           addons=[addon])
-                options.append(option)
-        
-        # En düşük maliyetli 3 seçeneği döndür
-        options.sort(key=lambda x: x.candidate_total)
-        return options[:3]
+        # Büyütülmüş birimde tablo paketleri eksik sayar; maliyet gerçek MB'larla hesaplanır
+        extra_mb = sum(addon.extra_mb for addon in combination)
+        addon_cost = sum(addon.price for addon in combination)
+        return plan.monthly_price + addon_cost + max(0, deficit - extra_mb) * plan.overage_per_mb, combination
 
 # Global maliyet simülatörü
 cost_simulator = CostSimulator()
@@ -0,0 +1,181 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing   import List, Dict, Optional, Type, Tuple
+from datetime import datetime, timedelta
+from ..Models import Usage, Anomaly, AnomalyType, DeviceProfile
+import statistics
+
+class UsageFeatures:
+    """
+    Tüm dedektörlerin paylaştığı özellikler - kullanım verisi üzerinden tek geçişte çıkarılır
+    """
+    __slots__ = (
+        "sim_id", "usage_data", "device_profile", "now", "record_count", "baseline_mean", "baseline_std",
+        "weekday_baseline", "recent", "last_active", "inactive_since", "recent_roaming"
+    )
+
+    def __init__(self, sim_id: str, usage_data: List[Usage], device_profile: DeviceProfile,
+                 window: Optional[int], weekday_baseline: Optional[Dict[int, Tuple[float, float]]] = None,
+                 now: Optional[datetime] = None):
+        self.sim_id = sim_id
+        self.weekday_baseline = weekday_baseline or {}
+        self.device_profile = device_profile
+        self.now = now or datetime.now()
+        self.record_count = len(usage_data)
+        self.usage_data = usage_data if window is None else usage_data[-window:]
+
+        # Baseline: 10+ kayıtta son 10'un ilk 7'si, 7-9 kayıtta ilk yarı
+        if self.record_count >= 10:
+            baseline_data = usage_data[-10:-3]
+        else:
+            baseline_data = usage_data[:self.record_count // 2]
+        if len(baseline_data) < 2:
+            baseline_data = usage_data[:max(2, self.record_count // 2)]
+
+        # Sıfır kullanımlar hariç, hiç pozitif yoksa tüm değerler
+        daily_usage = [usage.mb_used for usage in baseline_data if usage.mb_used > 0]
+        if not daily_usage:
+            daily_usage = [usage.mb_used for usage in baseline_data]
+
+        self.baseline_mean = statistics.mean(daily_usage) if daily_usage else 0
+        self.baseline_std = statistics.stdev(daily_usage) if len(daily_usage) > 1 else self.baseline_mean * 0.3
+
+        self.recent = usage_data[-3:]
+
+        # Sondaki kesintisiz sıfır kullanım serisi ve son aktif an (tek ters geçiş)
+        self.last_active = None
+        self.inactive_since = None
+        for usage in reversed(usage_data):
+            if usage.mb_used > 0:
+                self.last_active = usage.timestamp
+                break
+            self.inactive_since = usage.timestamp
+
+        # Son 3 kaydın son 2 güne düşen roaming kullanımları
+        two_days_ago = self.now - timedelta(days=2)
+        self.recent_roaming = [usage for usage in self.recent if usage.timestamp >= two_days_ago and usage.roaming_mb]
+
+    def baseline_for(self, timestamp: datetime) -> Tuple[float, float]:
+        """
+        Kaydın haftanın günü baseline'ını, yoksa son günlerden hesaplanan baseline'ı döndürür
+        """
+        return self.weekday_baseline.get(timestamp.weekday(), (self.baseline_mean, self.baseline_std))
+
+class Detector:
+    """
+    Dedektör temel sınıfı - yeni dedektörler register_detector ile kaydedilir
+    ve IOT_SETTINGS.ANOMALY_DETECTION.DETECTORS listesine adıyla eklenir
+
+    Yerleşik olmayan dedektörler filo ve artımlı yollarda da `detect` ile çalışır; artımlı yol son
+    kayıtları durumda tuttuğundan bunların `window` değeri tanımlı olmalıdır.
+    """
+    name: str = ""
+    anomaly_type: AnomalyType = None
+    score_key: str = ""                 # IOT_SETTINGS.RISK_SCORING anahtarı
+    window: Optional[int] = None        # İhtiyaç duyulan son kayıt sayısı (None → tüm geçmiş)
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def detect(self, features: UsageFeatures) -> List[Anomaly]:
+        raise NotImplementedError
+
+DETECTOR_REGISTRY: Dict[str, Type[Detector]] = {}
+
+def register_detector(detector_class: Type[Detector]) -> Type[Detector]:
+    """
+    Dedektörü adıyla kayıt defterine ekler
+    """
+    DETECTOR_REGISTRY[detector_class.name] = detector_class
+    return detector_class
+
+@register_detector
+class SpikeDetector(Detector):
+    """Son 3 günde baseline'ın çok üstüne çıkan günlük kullanım"""
+    name = AnomalyType.SUDDEN_SPIKE.value
+    anomaly_type = AnomalyType.SUDDEN_SPIKE
+    score_key = "SPIKE_SCORE"
+    window = 3
+
+    def detect(self, features: UsageFeatures) -> List[Anomaly]:
+        anomalies = []
+        for usage in features.recent:
+            ma7, std7 = features.baseline_for(usage.timestamp)
+            spike_threshold = max(ma7 * self.engine.spike_multiplier, ma7 + 2 * std7, 20)
+            if usage.mb_used > spike_threshold and ma7 > 0:
+                anomalies.append(self.engine._spike_anomaly(
+                    features.sim_id, usage.timestamp, usage.mb_used, ma7, spike_threshold
+                ))
+
+        return anomalies
+
+@register_detector
+class DrainDetector(Detector):
+    """DRAIN_DAYS gün boyunca kesintisiz yüksek kullanım"""
+    name = AnomalyType.SUSTAINED_DRAIN.value
+    anomaly_type = AnomalyType.SUSTAINED_DRAIN
+    score_key = "DRAIN_SCORE"
+
+    def __init__(self, engine):
+        super().__init__(engine)
+        self.window = engine.drain_days
+
+    def detect(self, features: UsageFeatures) -> List[Anomaly]:
+        if features.record_count < self.window:
+            return []
+
+        # Her gün kendi haftanın günü baseline'ına göre değerlendirilir
+        drain_days = features.usage_data[-self.window:]
+        for usage in drain_days:
+            ma7, _ = features.baseline_for(usage.timestamp)
+            drain_threshold = max(ma7 * self.engine.drain_multiplier, 10)
+            if ma7 <= 0 or usage.mb_used <= drain_threshold:
+                return []
+
+        return [self.engine._drain_anomaly(
+            features.sim_id, drain_days[-1].timestamp, [usage.mb_used for usage in drain_days], ma7, drain_threshold
+        )]
+
+@register_detector
+class InactivityDetector(Detector):
+    """INACTIVITY_HOURS saatten uzun süren sıfır kullanım"""
+    name = AnomalyType.INACTIVITY.value
+    anomaly_type = AnomalyType.INACTIVITY
+    score_key = "INACTIVITY_SCORE"
+    window = 1      # Sıfır kullanım serisi özelliklerde tüm geçmiş üzerinden çıkarılır
+
+    def detect(self, features: UsageFeatures) -> List[Anomaly]:
+        if features.inactive_since is None:
+            return []
+
+        inactive_hours = int((features.now - features.inactive_since).total_seconds() / 3600)
+        if inactive_hours < self.engine.inactivity_hours:
+            return []
+
+        return [self.engine._inactivity_anomaly(
+            features.sim_id, features.usage_data[-1].timestamp, inactive_hours, features.last_active
+        )]
+
+@register_detector
+class RoamingDetector(Detector):
+    """Roaming beklenmeyen cihazda son 2 günde roaming kullanımı"""
+    name = AnomalyType.UNEXPECTED_ROAMING.value
+    anomaly_type = AnomalyType.UNEXPECTED_ROAMING
+    score_key = "ROAMING_SCORE"
+    window = 3
+
+    def detect(self, features: UsageFeatures) -> List[Anomaly]:
+        if features.device_profile.roaming_expected:
+            return []
+
+        for usage in features.recent_roaming:
+            if usage.roaming_mb > self.engine.roaming_threshold:
+                # Sadece bir roaming anomalisi eklenir
+                return [self.engine._roaming_anomaly(
+                    features.sim_id, usage.timestamp, usage.roaming_mb, features.device_profile.roaming_expected
+                )]
+
+        return []
+
+# analyze_fleet / update_state içinde vektörel ya da durumla hesaplanan dedektörler
+BUILTIN_DETECTORS = frozenset({SpikeDetector.name, DrainDetector.name, InactivityDetector.name, RoamingDetector.name})
@@ -0,0 +1,102 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing     import List, Tuple, AsyncIterator
+from datetime   import datetime, timedelta
+from contextlib import asynccontextmanager
+from pymongo    import ReturnDocument
+from DB         import db_manager
+from Settings   import IOT_SETTINGS
+
+SIMS_SEQ_ID = "sims"
+
+class FleetChanges:
+    """
+    Filo satırını etkileyen her SIM yazımına artan bir `updated_seq` damgası verir
+
+    Damga `counters` koleksiyonundaki tek sayaçtan alınır; `updated_seq` indeksli olduğundan bir filigrandan
+    sonraki değişiklikler filo boyutundan bağımsız, değişen SIM sayısı kadar okumayla bulunur.
+
+    Damga alınması ile SIM'in yazılması ayrı işlemlerdir; yazımlar damga sırasıyla inmeyebilir. Bu yüzden
+    ayrılan ama henüz yazılmamış damgalar sayaç belgesinde `pending` olarak tutulur ve okuyuculara verilen
+    filigran en küçük bekleyen damganın altında kalır.
+    """
+    def __init__(self):
+        # Yazarı çökmüş bir damga filigranı sonsuza dek tutmasın
+        self.pending_timeout = timedelta(seconds=IOT_SETTINGS["FLEET"]["PENDING_TIMEOUT"])
+
+    async def reserve(self, count: int = 1) -> int:
+        """
+        `count` adet ardışık damga ayırıp bekleyenlere ekler ve bloğun ilk damgasını döndürür
+
+        Yazım bitince `release` çağrılmalıdır; `stamp` bağlamı ikisini birlikte yapar.
+        """
+        now = datetime.now()
+        counter = await db_manager.get_collection("counters").find_one_and_update(
+            {"_id": SIMS_SEQ_ID},
+            [
+                {"$set": {"seq": {"$add": [{"$ifNull": ["$seq", 0]}, count]}}},
+                {"$set": {"pending": {"$concatArrays": [
+                    # Süresi dolmuş bekleyenler her ayırmada temizlenir
+                    {"$filter": {"input": {"$ifNull": ["$pending", []]}, "cond": {"$gt": ["$$this.at", now - self.pending_timeout]}}},
+                    # Yeni blok; $map, dizi içindeki ifadenin yeni sayaçla hesaplanmasını sağlar
+                    {"$map": {"input": [0], "in": {"first": {"$subtract": ["$seq", count - 1]}, "at": now}}}
+                ]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"] - count + 1
+
+    async def release(self, first: int):
+        """
+        `first` ile başlayan damga bloğunun yazıldığını bildirir
+        """
+        await db_manager.get_collection("counters").update_one(
+            {"_id": SIMS_SEQ_ID},
+            {"$pull": {"pending": {"first": first}}}
+        )
+
+    @asynccontextmanager
+    async def stamp(self, count: int = 1) -> AsyncIterator[int]:
+        """
+        Blok içindeki yazım için damga ayırır (ilk damgayı verir), blok bitince bekleyenlerden çıkarır
+        """
+        first = await self.reserve(count)
+        try:
+            yield first
+        finally:
+            await self.release(first)
+
+    async def position(self) -> Tuple[int, int]:
+        """
+        Şimdiye kadar verilen en büyük damga ve güvenli filigran
+
+        Güvenli filigran, altındaki tüm damgaların yazıldığı en büyük değerdir (bekleyen yoksa sayacın kendisi).
+        """
+        counter = await db_manager.get_collection("counters").find_one({"_id": SIMS_SEQ_ID})
+        if not counter:
+            return 0, 0
+
+        stale_before = datetime.now() - self.pending_timeout
+        pending = [entry["first"] for entry in counter.get("pending", []) if entry["at"] > stale_before]
+        return counter["seq"], min(pending, default=counter["seq"] + 1) - 1
+
+    async def watermark(self) -> int:
+        """
+        Okuyuculara verilecek güvenli filigran
+        """
+        _, watermark = await self.position()
+        return watermark
+
+    async def changed_since(self, since: int, until: int, limit: int, projection: dict = None) -> Tuple[List[dict], bool]:
+        """
+        Damgası (`since`, `until`] aralığındaki SIM dokümanlarını damga sırasıyla döndürür (en fazla `limit`, devamı var mı)
+        """
+        collection = db_manager.get_collection("sims")
+        cursor = collection.find({"updated_seq": {"$gt": since, "$lte": until}}, projection).sort("updated_seq", 1).limit(limit + 1)
+
+        sim_docs = [sim_doc async for sim_doc in cursor]
+        return sim_docs[:limit], len(sim_docs) > limit
+
+# Global filo değişiklik sayacı
+fleet_changes = FleetChanges()
@@ -0,0 +1,97 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing         import Any, List, Optional
+from datetime       import datetime
+from CLI            import konsol
+from Settings       import IOT_SETTINGS
+from ..Models       import FleetDeltaMessage
+from .fleet_changes import fleet_changes
+from .iot_service   import iot_service
+import asyncio
+
+class FleetDeltaPublisher:
+    """
+    Filo değişikliklerini abone dashboard'lara tik başına tek `fleet_delta` mesajıyla iter
+
+    Her tikte `updated_seq` filigranından sonra değişen SIM'ler bir kez okunur; tik içinde aynı SIM'e
+    gelen birden çok yazım SIM'in son haliyle tek satıra iner. Abone yokken döngü çalışmaz.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["FLEET_DELTA"]
+        self.enabled = settings["ENABLED"]
+        self.tick_seconds = settings["TICK_MS"] / 1000
+        self.max_changes = settings["MAX_CHANGES"]
+        self.subscribers: List[Any] = []
+        self.watermark: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def subscribe(self, websocket) -> bool:
+        """
+        Bağlantıyı abone yapar ve güncel filigranı bildirir (istemci aradaki boşluğu /fleet/changes ile kapatır)
+        """
+        if not self.enabled:
+            return False
+
+        if self.watermark is None:
+            self.watermark = await fleet_changes.watermark()
+
+        if websocket not in self.subscribers:
+            self.subscribers.append(websocket)
+        await websocket.send_text(FleetDeltaMessage(type="fleet_subscribed", since=self.watermark, watermark=self.watermark, timestamp=datetime.now()).model_dump_json())
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        konsol.log(f"🛰️  [green]Filo değişikliklerine abone olundu:[/] {len(self.subscribers)} abone")
+        return True
+
+    def unsubscribe(self, websocket):
+        """
+        Bağlantının aboneliğini kaldırır; son abone giderse döngü kendiliğinden durur
+        """
+        if websocket in self.subscribers:
+            self.subscribers.remove(websocket)
+
+    async def _run(self):
+        while self.subscribers:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self.publish()
+            except Exception as e:
+                konsol.log(f"❌ [red]Filo değişiklikleri yayınlanamadı:[/] {e}")
+
+        # Abone kalmadı: sonraki abonelik filigranı yeniden okur
+        self.watermark = None
+
+    async def publish(self) -> Optional[FleetDeltaMessage]:
+        """
+        Son tikten beri değişen SIM'leri tek mesajda abonelere gönderir (değişiklik yoksa None)
+
+        Filigran yalnızca güvenli filigrana kadar ilerler; henüz yazılmakta olan bir damga sonraki tiklere kalır.
+        """
+        changes, watermark, has_more, reset = await iot_service.get_fleet_changes(self.watermark, self.max_changes)
+        if not changes and not reset:
+            return None
+
+        # Fazlası sonraki tiklere kalır: mesaj boyutu sınırlı
+        message = FleetDeltaMessage(
+            since=self.watermark,
+            watermark=watermark,
+            has_more=has_more,
+            reset=reset,
+            changes=changes,
+            timestamp=datetime.now()
+        )
+        self.watermark = watermark
+
+        payload = message.model_dump_json()
+        for websocket in list(self.subscribers):
+            try:
+                await websocket.send_text(payload)
+            except Exception:
+                self.unsubscribe(websocket)
+
+        return message
+
+# Global filo değişiklik yayıncısı
+fleet_delta_publisher = FleetDeltaPublisher()
@@ -1,12 +1,113 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from typing            import List, Optional
+from typing            import List, Optional, Dict, Tuple, AsyncIterator
 from datetime          import datetime, timedelta
-from DB                import db_manager
-from ..Models          import SimCard, IoTPlan, Usage, DeviceProfile, AddOnPack, ActionLog, Anomaly, FleetResponse, AnomalyType, Severity
-from .anomaly_detector import anomaly_detector
+from pymongo           import UpdateOne
+from pymongo.errors    import BulkWriteError, DuplicateKeyError
+from CLI               import konsol
+from DB                import db_manager, redis_manager
+from DB.migrations     import is_applied, mark_applied
+from Settings          import IOT_SETTINGS
+from ..Models          import SimCard, IoTPlan, Usage, UsageRollup, DeviceProfile, AddOnPack, ActionLog, Anomaly, DetectorState, FleetResponse, AnomalyType, Severity, QuotaProjectionDetail
+from .anomaly_detector import anomaly_detector, stack_usage_columns
+from .usage_store      import usage_store
+from .baseline_store   import baseline_store
+from .usage_rollups    import usage_rollups
+from .catalog_index    import catalog_index
+from .cost_cache       import cost_cache
+from .billing_cycles   import billing_cycles
+from .fleet_changes    import fleet_changes
+import numpy as np
+import base64
+import json
+import re
 import uuid
 
+# Eşzamanlı kayıtlarla çakışan dedektör durumu yazımının yeniden deneme sayısı
+STATE_RETRIES = 3
+
+# FleetResponse alanı → sims dokümanındaki kaynak alan
+FLEET_FIELDS = {
+    "sim_id": "sim_id",
+    "device_type": "device_type",
+    "apn": "apn",
+    "plan": "plan_id",
+    "status": "status",
+    "city": "city",
+    "risk_score": "risk_score",
+    "risk_level": "risk_score",
+    "last_seen_at": "last_seen_at",
+    "anomaly_count": "anomaly_count"
+}
+
+def encode_fleet_cursor(values: list) -> str:
+    """
+    Sayfanın son SIM'inin sıralama anahtarlarını opak bir imlece çevirir
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+def decode_fleet_cursor(cursor: str, length: int) -> list:
+    """
+    İmleci sıralama anahtarlarına geri çevirir; bozuk imleçte ValueError
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Geçersiz sayfa imleci")
+    
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Geçersiz sayfa imleci")
+    
+    return values
+
+def keyset_filter(sort_spec: List[Tuple[str, int]], values: list) -> dict:
+    """
+    Sıralamada verilen anahtarlardan sonra gelen dokümanları seçen filtre (keyset sayfalama)
+
+    MongoDB eksik / null alanları her sayıdan küçük sıralar: imleçteki None korunur, artan sırada
+    null'dan sonra tüm değerler, azalan sırada her değerden sonra null'lar gelir. Son anahtar tekil ve
+    zorunlu alan olmalıdır (sim_id).
+    """
+    branches = []
+    for i, (field, direction) in enumerate(sort_spec):
+        prefix = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_spec[:i])}
+        if values[i] is None:
+            if direction == 1:
+                branches.append({**prefix, field: {"$ne": None}})
+            continue
+        
+        branches.append({**prefix, field: {"$gt" if direction == 1 else "$lt": values[i]}})
+        if direction == -1 and i < len(sort_spec) - 1:
+            branches.append({**prefix, field: None})
+    
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+def fleet_item(sim_doc: dict, fields: List[str]) -> dict:
+    """
+    SIM dokümanından istenen FleetResponse alanlarını çıkarır
+    """
+    item = {}
+    for field in fields:
+        if field == "risk_level":
+            item[field] = anomaly_detector.get_risk_level(sim_doc.get("risk_score", 0))
+        elif field in ("risk_score", "anomaly_count"):
+            item[field] = sim_doc.get(FLEET_FIELDS[field], 0)
+        else:
+            item[field] = sim_doc.get(FLEET_FIELDS[field])
+    
+    return item
+
+def last_roaming_pipeline() -> List[dict]:
+    """
+    SIM başına son roaming kullanımını `sims.last_roaming_at` alanına yazan aggregation
+    """
+    return [
+        {"$match": {"roaming_mb": {"$gt": 0}}},
+        {"$group": {"_id": "$sim_id", "last_roaming_at": {"$max": "$timestamp"}}},
+        {"$project": {"_id": 0, "sim_id": "$_id", "last_roaming_at": 1}},
+        {"$merge": {"into": "sims", "on": "sim_id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+    ]
+
 class IoTService:
     def __init__(self):
         self.db = db_manager
@@ -38,16 +139,35 @@ class IoTService:
         
         return sims
     
-    async def get_sim_usage(self, sim_id: str, days: int = 30) -> List[Usage]:
+    async def get_sim_usage(self, sim_id: str, days: int = 30, resolution: str = "raw") -> List[Usage]:
         """
-        SIM kartın kullanım geçmişini döndürür
+        SIM kartın kullanım geçmişini döndürür (önce bellekteki kullanım önbelleğinden)
+
+        `resolution` ham kayıt yerine dönem özetlerini ister ("auto" → aralığı karşılayan en kaba özet);
+        özet yoksa ham kayıtlara düşülür.
         """
+        if resolution != "raw":
+            rollups = await self.get_usage_rollups(sim_id, days, resolution)
+            if rollups:
+                return [
+                    Usage(sim_id=sim_id, timestamp=rollup.bucket, mb_used=rollup.mb_used, roaming_mb=rollup.roaming_mb)
+                    for rollup in rollups
+                ]
+        
+        await usage_store.ensure()
+        cached = usage_store.get(sim_id, days)
+        if cached is not None:
+            return cached
+        
+        # Önbelleği doldurmak için en az WARM_DAYS günlük pencere okunur
+        load_days = max(days, usage_store.warm_days) if usage_store.enabled else days
         collection = self.db.get_collection("usage")
         start_date = datetime.now() - timedelta(days=days)
+        load_date = datetime.now() - timedelta(days=load_days)
         
         cursor = collection.find({
             "sim_id": sim_id,
-            "timestamp": {"$gte": start_date}
+            "timestamp": {"$gte": load_date}
         }).sort("timestamp", 1)
         
         usage_list = []
@@ -60,7 +180,35 @@ class IoTService:
             )
             usage_list.append(usage)
         
-        return usage_list
+        if usage_list:
+            usage_store.put(sim_id, usage_list, load_date)
+            cached = usage_store.get(sim_id, days)
+            if cached is not None:
+                return cached
+        
+        return [usage for usage in usage_list if usage.timestamp >= start_date]
+    
+    async def get_usage_rollups(self, sim_id: str, days: int = 30, resolution: str = "auto") -> List[UsageRollup]:
+        """
+        SIM'in son `days` gününü kapsayan dönem özetlerini döndürür, özetler eksikse boş liste
+        """
+        if resolution == "auto":
+            resolution = usage_rollups.choose_resolution(days)
+        
+        start_date = datetime.now() - timedelta(days=days)
+        rollups = await usage_rollups.get(sim_id, start_date, resolution)
+        if not rollups:
+            return []
+        
+        # İlk dönemde özetlenmemiş kayıt varsa (özetlemeden önce yazılmış geçmiş) ham veriye düşülür
+        collection = self.db.get_collection("usage")
+        first_usage = await collection.find_one(
+            {"sim_id": sim_id, "timestamp": {"$gte": rollups[0].bucket}}, {"_id": 0, "timestamp": 1}, sort=[("timestamp", 1)]
+        )
+        if first_usage and rollups[0].first_at and first_usage["timestamp"] < rollups[0].first_at:
+            return []
+        
+        return rollups
     
     async def get_sim_by_id(self, sim_id: str) -> Optional[SimCard]:
         """
@@ -84,42 +232,173 @@ class IoTService:
             return DeviceProfile(**profile_doc)
         return None
     
-    async def get_plan_by_id(self, plan_id: str) -> Optional[IoTPlan]:
+    async def get_device_profiles(self) -> Dict[str, DeviceProfile]:
         """
-        Plan bilgilerini döndürür
+        Tüm cihaz profillerini device_type'a göre döndürür
         """
-        collection = self.db.get_collection("iot_plans")
-        plan_doc = await collection.find_one({"plan_id": plan_id})
+        collection = self.db.get_collection("device_profiles")
         
-        if plan_doc:
-            return IoTPlan(**plan_doc)
-        return None
+        profiles = {}
+        async for profile_doc in collection.find():
+            profile = DeviceProfile(**profile_doc)
+            profiles[profile.device_type.value] = profile
+        
+        return profiles
     
-    async def get_available_plans(self, apn: str) -> List[IoTPlan]:
+    def build_sim_query(self, sim_ids: List[str] = None, risk_level: str = None,
+                        device_type: str = None, city: str = None, apn: str = None,
+                        status: str = None, customer_id: str = None, has_roaming: bool = None,
+                        search: str = None, has_anomalies: bool = None) -> dict:
         """
-        APN'e uygun planları döndürür
+        Filo filtrelerinden MongoDB sorgusu oluşturur
         """
-        collection = self.db.get_collection("iot_plans")
-        cursor = collection.find({"apn": apn})
+        query = {}
         
-        plans = []
-        async for plan_doc in cursor:
-            plans.append(IoTPlan(**plan_doc))
+        if sim_ids:
+            query["sim_id"] = {"$in": sim_ids}
         
-        return plans
+        if risk_level:
+            red_risk = IOT_SETTINGS["THRESHOLDS"]["RED_RISK"]
+            orange_risk = IOT_SETTINGS["THRESHOLDS"]["ORANGE_RISK"]
+            if risk_level == "red":
+                query["risk_score"] = {"$gte": red_risk}
+            elif risk_level == "orange":
+                query["risk_score"] = {"$gte": orange_risk, "$lt": red_risk}
+            elif risk_level == "green":
+                query["risk_score"] = {"$lt": orange_risk}
+        
+        for field, value in (("device_type", device_type), ("city", city), ("apn", apn),
+                             ("status", status), ("customer_id", customer_id)):
+            if value:
+                query[field] = value
+        
+        # Son 7 günde roaming kullanımı (last_roaming_at kullanım yazımında güncellenir)
+        if has_roaming is not None:
+            roaming_since = {"$gte": datetime.now() - timedelta(days=7)}
+            query["last_roaming_at"] = roaming_since if has_roaming else {"$not": roaming_since}
+        
+        if has_anomalies is not None:
+            query["anomaly_count"] = {"$gt": 0} if has_anomalies else {"$not": {"$gt": 0}}
+        
+        # Arama: SIM ID ön eki (sim_id indeksinden okunur) ya da cihaz tipi ön eki (büyük/küçük harf duyarsız)
+        if search:
+            prefix = re.escape(search.strip())
+            query["$or"] = [
+                {"sim_id": {"$regex": f"^{prefix}"}},
+                {"device_type": {"$regex": f"^{prefix}", "$options": "i"}}
+            ]
+        
+        return query
     
-    async def get_available_addons(self, apn: str) -> List[AddOnPack]:
+    async def count_sims(self, query: dict) -> int:
         """
-        APN'e uygun ek paketleri döndürür
+        Sorguya uyan SIM sayısını döndürür
+        """
+        collection = self.db.get_collection("sims")
+        return await collection.count_documents(query)
+    
+    async def iter_sim_chunks(self, query: dict, chunk_size: int,
+                              projection: dict = None) -> AsyncIterator[List[dict]]:
+        """
+        Sorguya uyan SIM dokümanlarını parça parça döndürür
         """
-        collection = self.db.get_collection("add_on_packs")
-        cursor = collection.find({"apn": apn})
+        collection = self.db.get_collection("sims")
+        cursor = collection.find(query, projection).sort("sim_id", 1).batch_size(chunk_size)
         
-        addons = []
-        async for addon_doc in cursor:
-            addons.append(AddOnPack(**addon_doc))
+        chunk = []
+        async for sim_doc in cursor:
+            chunk.append(sim_doc)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
         
-        return addons
+        if chunk:
+            yield chunk
+    
+    async def get_fleet_usage_matrix(self, sim_ids: List[str], days: int = 30) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Birden çok SIM'in kullanım geçmişini tek aggregation ile (SIM × gün) matrislerine çevirir
+        """
+        collection = self.db.get_collection("usage")
+        start_date = datetime.now() - timedelta(days=days)
+        
+        pipeline = [
+            {"$match": {"sim_id": {"$in": sim_ids}, "timestamp": {"$gte": start_date}}},
+            {"$sort": {"sim_id": 1, "timestamp": 1}},
+            {"$group": {
+                "_id": "$sim_id",
+                "mb_used": {"$push": "$mb_used"},
+                "roaming_mb": {"$push": {"$ifNull": ["$roaming_mb", 0]}},
+                "timestamp": {"$push": "$timestamp"}
+            }}
+        ]
+        
+        columns = {}
+        async for group_doc in await collection.aggregate(pipeline):
+            columns[group_doc["_id"]] = group_doc
+        
+        empty = {"mb_used": [], "roaming_mb": [], "timestamp": []}
+        return stack_usage_columns(
+            [columns.get(sim_id, empty)["mb_used"] for sim_id in sim_ids],
+            [columns.get(sim_id, empty)["roaming_mb"] for sim_id in sim_ids],
+            [columns.get(sim_id, empty)["timestamp"] for sim_id in sim_ids]
+        )
+    
+    async def get_fleet_daily_usage(self, sim_ids: List[str], days: int = 30) -> Tuple[Dict[str, List[float]], Dict[str, float]]:
+        """
+        Birden çok SIM'in tamamlanan günlerdeki kullanım toplamlarını (eskiden yeniye) ve bugünün kısmi
+        kullanımını tek aggregation ile döndürür
+
+        Aralık, günlük özet okumalarıyla aynı şekilde tam `days` gün öncesinden başlar (ilk gün kırpılır).
+        """
+        collection = self.db.get_collection("usage")
+        now = datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        
+        pipeline = [
+            {"$match": {"sim_id": {"$in": sim_ids}, "timestamp": {"$gte": now - timedelta(days=days)}}},
+            {"$group": {
+                "_id": {"sim_id": "$sim_id", "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}},
+                "mb_used": {"$sum": "$mb_used"}
+            }},
+            {"$sort": {"_id.sim_id": 1, "_id.day": 1}},
+            {"$group": {"_id": "$_id.sim_id", "days": {"$push": {"day": "$_id.day", "mb_used": "$mb_used"}}}}
+        ]
+        
+        daily_usage, today_usage = {}, {}
+        async for group_doc in await collection.aggregate(pipeline):
+            daily_usage[group_doc["_id"]] = [day["mb_used"] for day in group_doc["days"] if day["day"] != today]
+            today_usage[group_doc["_id"]] = sum(day["mb_used"] for day in group_doc["days"] if day["day"] == today)
+        
+        return daily_usage, today_usage
+    
+    async def get_plan_by_id(self, plan_id: str) -> Optional[IoTPlan]:
+        """
+        Plan bilgilerini döndürür (bellekteki katalogdan)
+        """
+        await catalog_index.ensure()
+        return catalog_index.get_plan(plan_id)
+    
+    async def get_available_plans(self, apn: str) -> List[IoTPlan]:
+        """
+        APN'e uygun planları döndürür (kotaya göre artan)
+        """
+        await catalog_index.ensure()
+        return catalog_index.plans_for(apn)
+    
+    async def get_available_addons(self, apn: str) -> List[AddOnPack]:
+        """
+        APN'e uygun ek paketleri döndürür
+        """
+        await catalog_index.ensure()
+        return catalog_index.addons_for(apn)
+    
+    async def get_addons_by_ids(self, addon_ids: List[str]) -> List[AddOnPack]:
+        """
+        Kimlikleri verilen ek paketleri döndürür (bilinmeyenler atlanır)
+        """
+        await catalog_index.ensure()
+        return [addon for addon in map(catalog_index.get_addon, addon_ids) if addon]
     
     async def get_sim_anomalies(self, sim_id: str, days: int = 7) -> List[Anomaly]:
         """SIM'in son X gündeki anomalilerini al"""
@@ -164,31 +443,10 @@ class IoTService:
 
     async def save_anomaly(self, anomaly: Anomaly) -> str:
         """
-        Anomaliyi veritabanına kaydeder (duplicateları önler)
+        Anomaliyi veritabanına kaydeder (aynı gün aynı tipte kayıt varsa "existing")
         """
-        collection = self.db.get_collection("anomalies")
-        
-        # Son 24 saat içinde aynı SIM ve aynı tip anomali var mı kontrol et
-        last_24h = datetime.now() - timedelta(hours=24)
-        
-        existing = await collection.find_one({
-            "sim_id": anomaly.sim_id,
-            "type": anomaly.type.value if hasattr(anomaly.type, 'value') else str(anomaly.type),
-            "detected_at": {
-                "$gte": last_24h
-            }
-        })
-        
-        # Eğer son 24 saatte aynı tipte anomali varsa, kaydetme
-        if existing:
-            return existing.get("anomaly_id", "existing")
-        
-        # Yeni anomali kaydet
-        anomaly_dict = anomaly.dict()
-        anomaly_dict["anomaly_id"] = str(uuid.uuid4())
-        
-        result = await collection.insert_one(anomaly_dict)
-        return anomaly_dict["anomaly_id"]
+        saved = await self.save_anomalies_bulk([anomaly])
+        return saved[0].anomaly_id if saved else "existing"
     
     async def get_sim_anomalies(self, sim_id: str, days: int = 30) -> List[Anomaly]:
         """
@@ -208,6 +466,68 @@ class IoTService:
         
         return anomalies
     
+    async def get_recent_anomaly_summary(self, sim_ids: List[str], days: int = 7) -> Dict[str, dict]:
+        """
+        SIM'lerin son X gündeki anomali tiplerini ve sayılarını tek aggregation ile döndürür
+        """
+        collection = self.db.get_collection("anomalies")
+        start_date = datetime.now() - timedelta(days=days)
+        
+        pipeline = [
+            {"$match": {"sim_id": {"$in": sim_ids}, "detected_at": {"$gte": start_date}}},
+            {"$group": {"_id": "$sim_id", "types": {"$addToSet": "$type"}, "count": {"$sum": 1}}}
+        ]
+        
+        summary = {}
+        async for group_doc in await collection.aggregate(pipeline):
+            summary[group_doc["_id"]] = {"types": set(group_doc["types"]), "count": group_doc["count"]}
+        
+        return summary
+    
+    async def save_anomalies_bulk(self, anomalies: List[Anomaly]) -> List[Anomaly]:
+        """
+        Anomalileri tek sırasız bulk_write ile kaydeder ve sadece yeni eklenenleri döndürür
+
+        Tekilleştirme (sim_id, type, detection_day) benzersiz index'i ile yapılır: aynı SIM'de
+        aynı gün aynı tipte anomali varsa upsert eşleşir ve kayıt dokunulmadan kalır. Alanı olmayan
+        eski belgeler başlangıçta DB/migrations.py ile doldurulur.
+        """
+        if not anomalies:
+            return []
+        
+        collection = self.db.get_collection("anomalies")
+        
+        # Aynı parti içindeki tekrarlar tek işleme indirgenir
+        pending: Dict[tuple, Anomaly] = {}
+        for anomaly in anomalies:
+            detection_day = anomaly.detected_at.replace(hour=0, minute=0, second=0, microsecond=0)
+            pending.setdefault((anomaly.sim_id, anomaly.type.value, detection_day), anomaly)
+        
+        candidates = []
+        operations = []
+        for (sim_id, anomaly_type, detection_day), anomaly in pending.items():
+            candidate = anomaly.model_copy(update={"anomaly_id": str(uuid.uuid4())})
+            anomaly_doc = candidate.model_dump()
+            anomaly_doc["detection_day"] = detection_day
+            
+            candidates.append(candidate)
+            operations.append(UpdateOne(
+                {"sim_id": sim_id, "type": anomaly_type, "detection_day": detection_day},
+                {"$setOnInsert": anomaly_doc},
+                upsert=True
+            ))
+        
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as error:
+            # Eşzamanlı yazımda aynı anahtarı kaçıran upsert'ler (E11000) zaten kayıtlı demektir
+            if any(write_error["code"] != 11000 for write_error in error.details["writeErrors"]):
+                raise
+            upserted = {item["index"]: item["_id"] for item in error.details.get("upserted", [])}
+        
+        return [candidates[index] for index in sorted(upserted)]
+    
     async def get_latest_anomalies(self, sim_id: str, limit: int = 10) -> List[Anomaly]:
         """
         SIM'in en son anomalilerini döndürür
@@ -268,16 +588,266 @@ class IoTService:
         SIM'in risk skorunu günceller
         """
         collection = self.db.get_collection("sims")
-        await collection.update_one(
-            {"sim_id": sim_id},
-            {
-                "$set": {
-                    "risk_score": risk_score,
-                    "anomaly_count": anomaly_count,
-                    "last_analyzed": datetime.now()
+        async with fleet_changes.stamp() as seq:
+            await collection.update_one(
+                {"sim_id": sim_id},
+                {
+                    "$set": {
+                        "risk_score": risk_score,
+                        "anomaly_count": anomaly_count,
+                        "last_analyzed": datetime.now(),
+                        "updated_seq": seq
+                    }
                 }
-            }
-        )
+            )
+    
+    async def update_sim_risk_scores(self, updates: List[Tuple[str, int, int]]):
+        """
+        Birden çok SIM'in risk skorunu tek bulk_write ile günceller
+        """
+        if not updates:
+            return
+        
+        collection = self.db.get_collection("sims")
+        now = datetime.now()
+        
+        # Tek sayaç artışıyla ardışık damga bloğu; sırasız bulk_write bitene dek blok bekleyende kalır
+        async with fleet_changes.stamp(len(updates)) as first_seq:
+            await collection.bulk_write([
+                UpdateOne(
+                    {"sim_id": sim_id},
+                    {"$set": {"risk_score": risk_score, "anomaly_count": anomaly_count, "last_analyzed": now, "updated_seq": first_seq + i}}
+                )
+                for i, (sim_id, risk_score, anomaly_count) in enumerate(updates)
+            ], ordered=False)
+    
+    async def get_detector_state(self, sim_id: str) -> Optional[DetectorState]:
+        """
+        SIM'in kayıtlı artımlı dedektör durumunu döndürür
+        """
+        collection = self.db.get_collection("detector_state")
+        state_doc = await collection.find_one({"sim_id": sim_id}, {"_id": 0})
+
+        return DetectorState(**state_doc) if state_doc else None
+
+    async def save_detector_state(self, state: DetectorState, compare: bool = False) -> bool:
+        """
+        Dedektör durumunu kaydeder (upsert) ve `version` damgasını yeniler
+
+        `compare` ile yalnızca durum okunduğundan beri başka yazım olmadıysa yazar; araya yazım girdiyse
+        (damga eşleşmez, upsert sim_id tekil index'ine takılır) hiçbir şey yazmadan False döner.
+        """
+        collection = self.db.get_collection("detector_state")
+        query = {"sim_id": state.sim_id}
+        if compare:
+            query["version"] = state.version
+        
+        expected, state.version = state.version, uuid.uuid4().hex
+        try:
+            await collection.replace_one(query, state.dict(), upsert=True)
+        except DuplicateKeyError:
+            state.version = expected
+            return False
+        
+        return True
+
+    async def rebuild_detector_state(self, sim_id: str, device_type: str, days: int = 30) -> DetectorState:
+        """
+        Dedektör durumunu kullanım geçmişinden baştan hesaplayıp kaydeder (mutabakat)
+        """
+        usage_data = await self.get_sim_usage(sim_id, days)
+        baseline = await baseline_store.get_for_sim(sim_id, device_type)
+        state = anomaly_detector.rebuild_state(sim_id, usage_data, baseline)
+        await self.save_detector_state(state)
+
+        return state
+
+    async def ingest_usage(self, usage: Usage, device_profile: DeviceProfile) -> Tuple[List[Anomaly], int, Optional[QuotaProjectionDetail]]:
+        """
+        Yeni kullanım kaydını yazar, dedektör durumunu günceller ve bu kayıtla oluşan anomalileri döndürür
+
+        Durum yoksa bir kez geçmişten kurulur; sonraki kayıtlar geçmişi yeniden okumaz. Kota bu hızla
+        dönem bitmeden dolacaksa öngörü de döner (SIM başına dönemde bir kez).
+        """
+        baseline = await baseline_store.get_for_sim(usage.sim_id, device_profile.device_type)
+        state = await self.get_detector_state(usage.sim_id)
+        if state is None:
+            state = anomaly_detector.rebuild_state(usage.sim_id, await self.get_sim_usage(usage.sim_id), baseline)
+
+        collection = self.db.get_collection("usage")
+        await collection.insert_one(usage.dict())
+        await usage_store.record(usage)
+        await usage_rollups.record(usage)
+        quota_projection = await billing_cycles.record(usage)
+        await cost_cache.invalidate(usage.sim_id)
+
+        # Kayıt önce mevcut baseline ile skorlanır, sonra baseline'a eklenir. Aynı SIM'e eşzamanlı kayıt
+        # durumu değiştirdiyse güncel durum okunup kayıt yeniden uygulanır; olmazsa durum geçmişten kurulur
+        saved = False
+        for _ in range(STATE_RETRIES):
+            anomalies = anomaly_detector.update_state(state, usage, device_profile, baseline=baseline)
+            saved = await self.save_detector_state(state, compare=True)
+            if saved:
+                break
+            state = await self.get_detector_state(usage.sim_id)
+            if state is None:
+                break
+        if not saved:
+            state = await self.rebuild_detector_state(usage.sim_id, device_profile.device_type)
+        await baseline_store.record_usage(usage)
+
+        # Skor kaydın anomalilerinden değil, durumda hâlâ geçerli olanlardan: düşebilir de
+        risk_score = anomaly_detector.risk_score(state, device_profile, baseline=baseline)
+        await self.save_anomalies_bulk(anomalies)
+
+        sim_update = {"last_seen_at": usage.timestamp}
+        if usage.roaming_mb:
+            sim_update["last_roaming_at"] = usage.timestamp
+        
+        sims = self.db.get_collection("sims")
+        async with fleet_changes.stamp() as seq:
+            await sims.update_one(
+                {"sim_id": usage.sim_id},
+                {"$max": sim_update, "$set": {"risk_score": risk_score, "updated_seq": seq}}
+            )
+
+        return anomalies, risk_score, quota_projection
+
+    async def ensure_last_roaming(self):
+        """
+        `last_roaming_at` alanını kullanım geçmişinden bir kez doldurur
+
+        Tamamlanma `counters`'daki migrasyon işaretiyle tutulur; hiç roaming yapılmamış filoda da
+        sonraki başlangıçlar $merge'ü yeniden çalıştırmaz. Sonrasında alan ingest_usage ile güncellenir.
+        """
+        database = self.db.database
+        if await is_applied(database, "last_roaming_at"):
+            return
+        
+        usage_collection = self.db.get_collection("usage")
+        async for _ in await usage_collection.aggregate(last_roaming_pipeline(), allowDiskUse=True):
+            pass
+        await mark_applied(database, "last_roaming_at")
+        
+        sims = self.db.get_collection("sims")
+        filled = await sims.count_documents({"last_roaming_at": {"$exists": True}})
+        konsol.log(f"🛰️  [green]Roaming indeksi dolduruldu:[/] {filled} SIM")
+    
+    async def get_fleet_page(self, filters: dict = None, sort: str = "risk_score", order: str = "desc", limit: int = 200,
+                             cursor: str = None, fields: List[str] = None) -> Tuple[List[dict], Optional[str]]:
+        """
+        Filonun bir sayfasını ve sonraki sayfanın imlecini döndürür
+
+        (sort, sim_id) üzerinde keyset sayfalama yapılır; skip kullanılmadığından derin sayfalar da
+        indeksten okunur. Yalnızca istenen alanlar (ve imleç için sıralama anahtarları) çekilir.
+        `filters` build_sim_query parametreleridir.
+        """
+        collection = self.db.get_collection("sims")
+        query = self.build_sim_query(**(filters or {}))
+        
+        direction = -1 if order == "desc" else 1
+        if sort == "sim_id":
+            sort_spec = [("sim_id", direction)]
+        else:
+            # Eşit risk skorunda sim_id ters yönde: (risk_score, sim_id) indeksi iki yönde de kullanılır
+            sort_spec = [("risk_score", direction), ("sim_id", -direction)]
+        
+        if cursor:
+            after = keyset_filter(sort_spec, decode_fleet_cursor(cursor, len(sort_spec)))
+            query = {"$and": [query, after]} if query else after
+        
+        fields = list(dict.fromkeys(fields)) if fields else list(FLEET_FIELDS)
+        unknown = [field for field in fields if field not in FLEET_FIELDS]
+        if unknown:
+            raise ValueError(f"Bilinmeyen alan: {', '.join(unknown)}")
+        
+        projection = {"_id": 0, **{field: 1 for field, _ in sort_spec}}
+        projection.update({FLEET_FIELDS[field]: 1 for field in fields})
+        
+        sims = []
+        last_keys = None
+        next_cursor = None
+        async for sim_doc in collection.find(query, projection).sort(sort_spec).limit(limit + 1):
+            # limit + 1'inci doküman yalnızca sonraki sayfanın varlığını gösterir
+            if len(sims) == limit:
+                next_cursor = encode_fleet_cursor(last_keys)
+                break
+            
+            last_keys = [sim_doc.get(field) for field, _ in sort_spec]
+            sims.append(fleet_item(sim_doc, fields))
+        
+        return sims, next_cursor
+    
+    async def count_fleet(self, filters: dict = None) -> int:
+        """
+        Filtreye uyan toplam SIM sayısı
+
+        Filtresizde koleksiyon meta verisinden okunur; filtreli sayımlar kısa süre Redis'te tutulur.
+        """
+        collection = self.db.get_collection("sims")
+        filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        query = self.build_sim_query(**filters)
+        if not query:
+            return await collection.estimated_document_count()
+        
+        cache_key = "fleet:count:" + json.dumps(filters, sort_keys=True)
+        cached = await redis_manager.get_cache(cache_key)
+        if cached is not None:
+            return int(cached)
+        
+        total = await collection.count_documents(query)
+        await redis_manager.set_cache(cache_key, total, IOT_SETTINGS["FLEET"]["COUNT_TTL"])
+        return total
+    
+    async def get_fleet_stats(self) -> dict:
+        """
+        Filo istatistik kartları: toplam, aktif, yüksek riskli SIM sayısı, toplam anomali ve şehir listesi
+
+        Tüm filo tek bir $group ile sayılır ve kısa süre Redis'te tutulur; yüklenen sayfadan bağımsızdır.
+        """
+        cache_key = "fleet:stats"
+        cached = await redis_manager.get_cache(cache_key)
+        if cached is not None:
+            return cached
+        
+        red_risk = IOT_SETTINGS["THRESHOLDS"]["RED_RISK"]
+        pipeline = [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "active": {"$sum": {"$cond": [{"$eq": ["$status", "active"]}, 1, 0]}},
+                "high_risk": {"$sum": {"$cond": [{"$gte": [{"$ifNull": ["$risk_score", 0]}, red_risk]}, 1, 0]}},
+                "anomalies": {"$sum": {"$ifNull": ["$anomaly_count", 0]}},
+                "cities": {"$addToSet": "$city"}
+            }}
+        ]
+        
+        stats = {"total": 0, "active": 0, "high_risk": 0, "anomalies": 0, "cities": []}
+        async for group in await self.db.get_collection("sims").aggregate(pipeline):
+            stats.update({key: group[key] for key in ("total", "active", "high_risk", "anomalies")})
+            stats["cities"] = sorted(city for city in group["cities"] if city)
+        
+        await redis_manager.set_cache(cache_key, stats, IOT_SETTINGS["FLEET"]["COUNT_TTL"])
+        return stats
+    
+    async def get_fleet_changes(self, since: int, limit: int) -> Tuple[List[FleetResponse], int, bool, bool]:
+        """
+        `since` filigranından sonra değişen SIM'leri, yeni filigranı, devamı olup olmadığını ve
+        filigranın geçersiz (sayaç sıfırlanmış) olup olmadığını döndürür
+
+        Yalnızca güvenli filigrana kadar olan damgalar okunur: daha küçük bir damga hâlâ yazılıyorsa ondan
+        büyük damgalar da sonraki isteğe kalır, böylece sırasız inen yazımlar atlanmaz.
+        """
+        issued, safe = await fleet_changes.position()
+        if since > issued:
+            return [], safe, False, True
+        
+        projection = {"_id": 0, "updated_seq": 1, **{source: 1 for source in FLEET_FIELDS.values()}}
+        sim_docs, has_more = await fleet_changes.changed_since(since, safe, limit, projection)
+        
+        changes = [FleetResponse(**fleet_item(sim_doc, list(FLEET_FIELDS))) for sim_doc in sim_docs]
+        watermark = sim_docs[-1]["updated_seq"] if has_more else max(since, safe)
+        return changes, watermark, has_more, False
     
     async def get_filtered_sims(self, risk_level: str = None, 
                               has_roaming: bool = None) -> List[FleetResponse]:
@@ -285,36 +855,12 @@ class IoTService:
         Filtrelenmiş SIM listesi döndürür
         """
         collection = self.db.get_collection("sims")
-        query = {}
-        
-        if risk_level:
-            if risk_level == "red":
-                query["risk_score"] = {"$gte": 70}
-            elif risk_level == "orange":
-                query["risk_score"] = {"$gte": 40, "$lt": 70}
-            elif risk_level == "green":
-                query["risk_score"] = {"$lt": 40}
+        query = self.build_sim_query(risk_level=risk_level, has_roaming=has_roaming)
         
         cursor = collection.find(query)
         sims = []
         
         async for sim_doc in cursor:
-            # Roaming filtresi için usage kontrolü gerekebilir
-            if has_roaming is not None:
-                # Son 7 günde roaming kullanımı var mı?
-                usage_collection = self.db.get_collection("usage")
-                start_date = datetime.now() - timedelta(days=7)
-                roaming_usage = await usage_collection.find_one({
-                    "sim_id": sim_doc["sim_id"],
-                    "timestamp": {"$gte": start_date},
-                    "roaming_mb": {"$gt": 0}
-                })
-                
-                if has_roaming and not roaming_usage:
-                    continue
-                if not has_roaming and roaming_usage:
-                    continue
-            
             risk_level_enum = anomaly_detector.get_risk_level(sim_doc.get("risk_score", 0))
             
             fleet_item = FleetResponse(
@@ -0,0 +1,59 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing   import Dict, Optional, Tuple
+from datetime import datetime, timedelta
+from Settings import IOT_SETTINGS
+from ..Models import QuotaProjectionDetail
+
+class QuotaProjector:
+    """
+    Fatura dönemindeki günlük kullanım hızından kota dolum zamanını öngörür
+
+    Hız, tamamlanan günlerin kullanımının üstel ortalamasıdır ve gün değiştikçe dönem belgesindeki
+    günlük MB'lardan artımlı güncellenir; kullanım geçmişi taranmaz.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["QUOTA_PROJECTION"]
+        self.enabled = settings["ENABLED"]
+        self.alpha = settings["ALPHA"]
+        self.min_days = settings["MIN_DAYS"]
+
+    def fold(self, burn_rate: float, burn_days: int, daily_mb: Dict[str, float],
+             from_day: int, through_day: int) -> Tuple[float, int]:
+        """
+        [from_day, through_day] günlerini (ayın günü) üstel ortalamaya ekler; kullanımsız gün 0 MB sayılır
+        """
+        for day in range(from_day, through_day + 1):
+            mb_used = daily_mb.get(str(day), 0.0)
+            burn_days += 1
+            burn_rate = mb_used if burn_days == 1 else burn_rate + self.alpha * (mb_used - burn_rate)
+
+        return burn_rate, burn_days
+
+    def project(self, used_mb: float, allowance_mb: float, burn_rate: float, burn_days: int,
+                now: datetime, cycle_end: datetime) -> Optional[QuotaProjectionDetail]:
+        """
+        Bu hızla havuz dönem bitmeden dolacaksa öngörüyü döndürür (yeterli gün yoksa, havuz zaten
+        dolduysa ya da dönem sonuna yetiyorsa None)
+        """
+        if burn_days < self.min_days or burn_rate <= 0 or used_mb >= allowance_mb:
+            return None
+
+        remaining_days = max((cycle_end - now).total_seconds() / 86400, 0.0)
+        projected_mb = used_mb + burn_rate * remaining_days
+        if projected_mb <= allowance_mb:
+            return None
+
+        days_to_quota = (allowance_mb - used_mb) / burn_rate
+        return QuotaProjectionDetail(
+            burn_rate_mb_per_day=burn_rate,
+            used_mb=used_mb,
+            allowance_mb=allowance_mb,
+            projected_mb=projected_mb,
+            days_to_quota=days_to_quota,
+            quota_at=now + timedelta(days=days_to_quota),
+            cycle_end=cycle_end
+        )
+
+# Global kota öngörücüsü
+quota_projector = QuotaProjector()
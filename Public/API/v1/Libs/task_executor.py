@@ -0,0 +1,64 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing             import Callable, Any, Optional
+from concurrent.futures import ProcessPoolExecutor, BrokenExecutor
+from functools          import partial
+from CLI                import konsol
+from Settings           import IOT_SETTINGS
+import multiprocessing
+import asyncio
+import os
+
+class TaskExecutor:
+    """
+    CPU yoğun analiz ve simülasyon işlerini event loop dışında çalıştırır
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["EXECUTOR"]
+        self.max_workers = settings["MAX_WORKERS"] or os.cpu_count() or 1
+        self.start_method = settings["START_METHOD"]
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """
+        Process havuzunu başlatır (işçiler ilk işte ayağa kalkar)
+        """
+        if self.pool is not None:
+            return
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(self.start_method)
+        )
+        konsol.log(f"⚙️  [green]İşlem havuzu hazır:[/] {self.max_workers} işçi ({self.start_method})")
+
+    def shutdown(self):
+        """
+        Process havuzunu kapatır, bekleyen işler iptal edilir
+        """
+        if self.pool is None:
+            return
+
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pool = None
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Fonksiyonu process havuzunda çalıştırır; havuz yoksa thread'e düşer
+
+        Fonksiyon ve argümanlar pickle edilebilir olmalı (modül seviyesindeki nesneler, Pydantic modelleri).
+        """
+        call = partial(func, *args, **kwargs)
+        if self.pool is None:
+            return await asyncio.to_thread(call)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, call)
+        except BrokenExecutor:
+            konsol.log("⚠️  [yellow]İşlem havuzu çöktü, yeniden başlatılıyor[/]")
+            self.pool = None
+            self.start()
+            return await asyncio.to_thread(call)
+
+# Global işlem havuzu
+task_executor = TaskExecutor()
@@ -0,0 +1,101 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing   import List, Optional, Sequence
+from Settings import IOT_SETTINGS
+from ..Models import IoTPlan
+import numpy as np
+
+class UsageForecaster:
+    """
+    Ay sonu kullanımını SIM'in günlük kullanım dağılımından Monte Carlo ile tahmin eder
+
+    Her yol kalan günler için geçmiş günlerden iadeli örneklenir (bootstrap); SIM'ler aynı
+    matriste birlikte işlenir, maliyet ve süre SIM sayısıyla doğrusal büyür.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["FORECAST"]
+        self.paths = settings["PATHS"]                  # SIM başına yol sayısı
+        self.history_days = settings["HISTORY_DAYS"]    # Dağılım için bakılan gün
+        self.percentiles = settings["PERCENTILES"]      # Raporlanan yüzdelikler
+        self.risk_percentile = settings["RISK_PERCENTILE"]
+        self.seed = settings["SEED"]
+
+    def history_matrix(self, histories: Sequence[Sequence[float]]) -> np.ndarray:
+        """
+        SIM başına günlük kullanım listelerini NaN ile doldurulmuş (N × gün) matrise çevirir
+        """
+        width = max((len(history) for history in histories), default=0)
+        matrix = np.full((len(histories), max(width, 1)), np.nan)
+        for row, history in enumerate(histories):
+            matrix[row, :len(history)] = history
+
+        return matrix
+
+    def simulate(self, daily_usage: np.ndarray, remaining_days: int,
+                 paths: Optional[int] = None, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """
+        Kalan günlerin toplam kullanımı için (N × yol) örnek matrisi döndürür
+
+        daily_usage : (N × gün) geçmiş günlük kullanım, eksik günler NaN
+        Geçmişi olmayan SIM'lerin tüm yolları 0'dır.
+        """
+        paths = paths or self.paths
+        rng = rng or np.random.default_rng(self.seed)
+
+        # NaN'lar sıralamada sona düşer; geçerli günler her satırın başında kalır
+        days = np.sort(np.asarray(daily_usage, dtype=np.float64), axis=1)
+        counts = np.sum(~np.isnan(days), axis=1)
+        days = np.nan_to_num(days[:, :max(int(counts.max(initial=0)), 1)])
+
+        totals = np.zeros((days.shape[0], paths))
+        rows = np.arange(days.shape[0])[:, None]
+        # Gün gün biriktirilir; bellek (N × yol) ile sınırlı kalır
+        for _ in range(max(remaining_days, 0)):
+            picks = (rng.random((days.shape[0], paths)) * counts[:, None]).astype(np.int64)
+            totals += days[rows, picks]
+
+        return totals
+
+    def usage_percentiles(self, used_so_far: np.ndarray, samples: np.ndarray) -> np.ndarray:
+        """
+        Ay sonu toplam kullanımının (N × yüzdelik) değerleri
+
+        Yüzdelikler örneklerden biri seçilerek (inverted_cdf) alınır; plan maliyeti kullanımla
+        azalmadığı için maliyet yüzdeliği, kullanım yüzdeliğinin maliyetine eşittir.
+        """
+        bands = np.percentile(samples, self.percentiles, axis=1, method="inverted_cdf").T
+        return np.asarray(used_so_far, dtype=np.float64)[:, None] + bands
+
+    def plan_cost_bands(self, usage_bands: np.ndarray, plans: List[IoTPlan]) -> np.ndarray:
+        """
+        Yüzdelik kullanımlardan (N × plan × yüzdelik) maliyet bantlarını hesaplar
+        """
+        price = np.array([plan.monthly_price for plan in plans], dtype=np.float64)[None, :, None]
+        quota = np.array([plan.monthly_quota_mb for plan in plans], dtype=np.float64)[None, :, None]
+        overage = np.array([plan.overage_per_mb for plan in plans], dtype=np.float64)[None, :, None]
+
+        return price + np.maximum(0, usage_bands[:, None, :] - quota) * overage
+
+    def overage_probability(self, used_so_far: np.ndarray, samples: np.ndarray, plans: List[IoTPlan]) -> np.ndarray:
+        """
+        Yolların plan kotasını aşma oranı (N × plan)
+        """
+        quota = np.array([plan.monthly_quota_mb for plan in plans], dtype=np.float64)
+        totals = np.asarray(used_so_far, dtype=np.float64)[:, None] + samples
+
+        return np.stack([np.mean(totals > plan_quota, axis=1) for plan_quota in quota], axis=1)
+
+    def forecast_fleet(self, histories: Sequence[Sequence[float]], used_so_far: Sequence[float],
+                       remaining_days: int, plans: List[IoTPlan]):
+        """
+        Filo için kullanım yüzdeliklerini (N × yüzdelik), plan maliyet bantlarını (N × plan × yüzdelik)
+        ve plan başına aşım olasılığını (N × plan) döndürür
+        """
+        used_so_far = np.asarray(used_so_far, dtype=np.float64)
+        samples = self.simulate(self.history_matrix(histories), remaining_days)
+        usage_bands = self.usage_percentiles(used_so_far, samples)
+
+        return usage_bands, self.plan_cost_bands(usage_bands, plans), self.overage_probability(used_so_far, samples, plans)
+
+# Global kullanım tahmincisi
+usage_forecaster = UsageForecaster()
@@ -0,0 +1,219 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing   import List, Optional, Dict
+from datetime import datetime, timedelta
+from pymongo  import UpdateOne
+from CLI      import konsol
+from DB       import db_manager
+from Settings import IOT_SETTINGS
+from ..Models import Usage, UsageRollup
+
+# İnceden kabaya sıralı çözünürlükler
+RESOLUTIONS = ("hour", "day", "week", "month")
+
+# Aralığın başına kısmen düşen dönem bir ince çözünürlükten kırpılır (hafta ve ay, gün sınırında başlar)
+FINER = {"day": "hour", "week": "day", "month": "day"}
+
+def rollup_pipeline(resolution: str, match: Optional[dict] = None) -> List[dict]:
+    """
+    Ham kullanım kayıtlarını verilen çözünürlükte özetleyip `usage_rollups`a yazan aggregation
+
+    Yeniden çalıştırıldığında aynı dönemlerin özetleri baştan hesaplanıp üzerine yazılır.
+    """
+    bucket = {"date": "$timestamp", "unit": resolution}
+    if resolution == "week":
+        bucket["startOfWeek"] = "monday"
+
+    return [
+        {"$match": match or {}},
+        {"$group": {
+            "_id": {"sim_id": "$sim_id", "bucket": {"$dateTrunc": bucket}},
+            "mb_used": {"$sum": "$mb_used"},
+            "roaming_mb": {"$sum": {"$ifNull": ["$roaming_mb", 0]}},
+            "max_mb": {"$max": "$mb_used"},
+            "count": {"$sum": 1},
+            "first_at": {"$min": "$timestamp"},
+            "last_at": {"$max": "$timestamp"}
+        }},
+        {"$project": {
+            "_id": 0,
+            "sim_id": "$_id.sim_id",
+            "resolution": {"$literal": resolution},
+            "bucket": "$_id.bucket",
+            "mb_used": 1, "roaming_mb": 1, "max_mb": 1, "count": 1, "first_at": 1, "last_at": 1
+        }},
+        {"$merge": {
+            "into": "usage_rollups",
+            "on": ["sim_id", "resolution", "bucket"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+
+class UsageRollups:
+    """
+    Kullanım verisini saatlik, günlük, haftalık ve aylık özetler halinde tutar
+
+    Özetler kayıt alınırken güncellenir; okumalar sorguyu karşılayan en kaba çözünürlükten yapılır.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["USAGE_ROLLUPS"]
+        self.enabled = settings["ENABLED"]
+        self.auto_days = settings["AUTO_DAYS"]     # Çözünürlük → en fazla gün
+
+    def bucket_start(self, timestamp: datetime, resolution: str) -> datetime:
+        """
+        Zaman damgasının düştüğü dönemin başlangıcını döndürür
+        """
+        if resolution == "hour":
+            return timestamp.replace(minute=0, second=0, microsecond=0)
+
+        day = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+        if resolution == "day":
+            return day
+        if resolution == "week":
+            return day - timedelta(days=day.weekday())
+        if resolution == "month":
+            return day.replace(day=1)
+
+        raise ValueError(f"Bilinmeyen çözünürlük: {resolution}")
+
+    def next_bucket(self, bucket: datetime, resolution: str) -> datetime:
+        """
+        Dönem başlangıcından sonraki dönemin başlangıcını döndürür
+        """
+        if resolution == "hour":
+            return bucket + timedelta(hours=1)
+        if resolution == "day":
+            return bucket + timedelta(days=1)
+        if resolution == "week":
+            return bucket + timedelta(days=7)
+
+        return (bucket + timedelta(days=32)).replace(day=1)
+
+    def choose_resolution(self, days: int) -> str:
+        """
+        Gün aralığını karşılayan en kaba çözünürlüğü seçer (AUTO_DAYS eşiklerine göre)
+        """
+        for resolution in RESOLUTIONS[:-1]:
+            if days <= self.auto_days[resolution]:
+                return resolution
+
+        return RESOLUTIONS[-1]
+
+    async def record(self, usage: Usage):
+        """
+        Yeni kullanım kaydını tüm çözünürlüklerdeki dönem özetlerine ekler (tek bulk_write)
+        """
+        collection = db_manager.get_collection("usage_rollups")
+        if not self.enabled or collection is None:
+            return
+
+        await collection.bulk_write([
+            UpdateOne(
+                {"sim_id": usage.sim_id, "resolution": resolution, "bucket": self.bucket_start(usage.timestamp, resolution)},
+                {
+                    "$inc": {"mb_used": usage.mb_used, "roaming_mb": usage.roaming_mb or 0, "count": 1},
+                    "$max": {"max_mb": usage.mb_used, "last_at": usage.timestamp},
+                    "$min": {"first_at": usage.timestamp}
+                },
+                upsert=True
+            )
+            for resolution in RESOLUTIONS
+        ], ordered=False)
+
+    async def get(self, sim_id: str, start_date: datetime, resolution: str,
+                  end_date: Optional[datetime] = None) -> List[UsageRollup]:
+        """
+        SIM'in [`start_date`, `end_date`) aralığındaki dönem özetlerini eskiden yeniye döndürür
+
+        Aralığın başına kısmen düşen dönem atılmaz, kırpılır: `start_date`'ten dönem sonuna kadarki kısım
+        daha ince özetlerden (saatte ham kayıtlardan) toplanıp `bucket`ı `start_date` olan tek özet olarak
+        başa eklenir. Özet hiçbir zaman aralık dışı kullanımı içermez.
+        """
+        collection = db_manager.get_collection("usage_rollups")
+        if not self.enabled or collection is None:
+            return []
+
+        first_full = self.bucket_start(start_date, resolution)
+        if first_full < start_date:
+            first_full = self.next_bucket(first_full, resolution)
+
+        bucket_range = {"$gte": first_full}
+        if end_date is not None:
+            bucket_range["$lt"] = end_date
+
+        cursor = collection.find(
+            {"sim_id": sim_id, "resolution": resolution, "bucket": bucket_range},
+            {"_id": 0}
+        ).sort("bucket", 1)
+        rollups = [UsageRollup(**rollup_doc) async for rollup_doc in cursor]
+
+        if first_full > start_date:
+            head_end = first_full if end_date is None else min(first_full, end_date)
+            head = await self._clip(sim_id, start_date, head_end, resolution)
+            if head is not None:
+                rollups.insert(0, head)
+
+        return rollups
+
+    async def _clip(self, sim_id: str, start_date: datetime, end_date: datetime, resolution: str) -> Optional[UsageRollup]:
+        """
+        [`start_date`, `end_date`) aralığını bir ince çözünürlükten (saatte ham kayıtlardan) tek özete toplar
+        """
+        finer = FINER.get(resolution)
+        if finer is not None:
+            parts = [
+                (part.mb_used, part.roaming_mb, part.max_mb, part.count, part.first_at, part.last_at)
+                for part in await self.get(sim_id, start_date, finer, end_date)
+            ]
+        else:
+            cursor = db_manager.get_collection("usage").find(
+                {"sim_id": sim_id, "timestamp": {"$gte": start_date, "$lt": end_date}},
+                {"_id": 0, "timestamp": 1, "mb_used": 1, "roaming_mb": 1}
+            )
+            parts = [
+                (usage_doc["mb_used"], usage_doc.get("roaming_mb") or 0, usage_doc["mb_used"], 1, usage_doc["timestamp"], usage_doc["timestamp"])
+                async for usage_doc in cursor
+            ]
+
+        if not parts:
+            return None
+
+        mb_used, roaming_mb, max_mb, count, first_at, last_at = zip(*parts)
+        return UsageRollup(
+            sim_id=sim_id,
+            resolution=resolution,
+            bucket=start_date,
+            mb_used=sum(mb_used),
+            roaming_mb=sum(roaming_mb),
+            max_mb=max(max_mb),
+            count=sum(count),
+            first_at=min(filter(None, first_at), default=None),
+            last_at=max(filter(None, last_at), default=None)
+        )
+
+    async def rebuild(self, since: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Özetleri ham kullanım verisinden sunucu tarafında yeniden hesaplar
+
+        `since` verilirse yalnızca o andan itibaren dokunulan dönemler yeniden yazılır.
+        """
+        usage_collection = db_manager.get_collection("usage")
+        rollups_collection = db_manager.get_collection("usage_rollups")
+
+        if since is None:
+            await rollups_collection.delete_many({})
+
+        counts = {}
+        for resolution in RESOLUTIONS:
+            match = {} if since is None else {"timestamp": {"$gte": self.bucket_start(since, resolution)}}
+            async for _ in await usage_collection.aggregate(rollup_pipeline(resolution, match), allowDiskUse=True):
+                pass
+            counts[resolution] = await rollups_collection.count_documents({"resolution": resolution})
+
+        konsol.log(f"🧮 [green]Kullanım özetleri hesaplandı:[/] {counts}")
+        return counts
+
+# Global kullanım özetleri
+usage_rollups = UsageRollups()
@@ -0,0 +1,358 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from typing      import List, Optional, Dict
+from datetime    import datetime, timedelta
+from collections import OrderedDict
+from CLI         import konsol
+from DB          import db_manager, redis_manager
+from Settings    import IOT_SETTINGS
+from ..Models    import Usage
+import numpy as np
+import asyncio
+import math
+import time
+
+# Zaman damgaları bu andan itibaren int32 saniye olarak tutulur (2088'e kadar yeterli)
+EPOCH = datetime(2020, 1, 1)
+
+# `usage` koleksiyonu ingest_usage dışında yazıldığında artırılan sürüm damgası
+USAGE_VERSION_KEY = "usage:version"
+
+# ingest_usage yazımları: SIM başına son değişiklik sırası (sorted set, SIM başına tek üye) ve sayaç
+USAGE_CHANGES_KEY = "usage:changes"
+USAGE_SEQ_KEY = "usage:seq"
+
+# Sırayı artırır, SIM'in değişikliğini yazar ve önceki sırasını döndürür (tek atomik adım)
+RECORD_CHANGE_SCRIPT = """
+local previous = redis.call('ZSCORE', KEYS[2], ARGV[1])
+local seq = redis.call('INCR', KEYS[1])
+redis.call('ZADD', KEYS[2], seq, ARGV[1])
+return {seq, previous}
+"""
+
+# SIM başına kayıt (3 kolon × 4 byte) ve tampon nesne yükü
+RECORD_BYTES = 12
+BUFFER_OVERHEAD = 400
+
+class SimUsageBuffer:
+    """
+    Tek SIM'in kullanım geçmişi için halka tampon (kolon bazlı)
+
+    Doluyken en eski kayıt sıcak pencerenin içindeyse kapasite iki katına çıkar (en fazla `max_capacity`),
+    böylece sık raporlayan SIM'lerde tampon WARM_DAYS penceresini kapsar; pencere dışındaki kayıt düşürülür.
+    """
+    __slots__ = ("offsets", "mb_used", "roaming_mb", "head", "size", "covered_from")
+
+    def __init__(self, capacity: int, covered_from: int):
+        self.offsets = np.zeros(capacity, dtype=np.int32)
+        self.mb_used = np.zeros(capacity, dtype=np.float32)
+        self.roaming_mb = np.zeros(capacity, dtype=np.float32)
+        self.head = 0
+        self.size = 0
+        self.covered_from = covered_from    # Bu andan sonraki kayıtların tamamı tamponda
+
+    @property
+    def last_offset(self) -> Optional[int]:
+        if not self.size:
+            return None
+        return int(self.offsets[(self.head + self.size - 1) % len(self.offsets)])
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.offsets) * RECORD_BYTES + BUFFER_OVERHEAD
+
+    def append(self, offset: int, mb_used: float, roaming_mb: float, keep_from: int, max_capacity: int):
+        """
+        Kaydı sona ekler; tampon doluysa büyür ya da (en eski kayıt `keep_from` öncesindeyse, veya sınırdaysa) en eskiyi düşürür
+        """
+        capacity = len(self.offsets)
+        if self.size == capacity:
+            if self.offsets[self.head] >= keep_from and capacity < max_capacity:
+                self._grow(min(capacity * 2, max_capacity))
+            else:
+                self.covered_from = int(self.offsets[self.head]) + 1
+                self.head = (self.head + 1) % capacity
+                self.size -= 1
+        capacity = len(self.offsets)
+
+        index = (self.head + self.size) % capacity
+        self.offsets[index] = offset
+        self.mb_used[index] = mb_used
+        self.roaming_mb[index] = roaming_mb
+        self.size += 1
+
+    def _grow(self, capacity: int):
+        offsets, mb_used, roaming_mb = self.ordered()
+        self.offsets = np.zeros(capacity, dtype=np.int32)
+        self.mb_used = np.zeros(capacity, dtype=np.float32)
+        self.roaming_mb = np.zeros(capacity, dtype=np.float32)
+        self.offsets[:self.size] = offsets
+        self.mb_used[:self.size] = mb_used
+        self.roaming_mb[:self.size] = roaming_mb
+        self.head = 0
+
+    def ordered(self):
+        """
+        Kayıtları eskiden yeniye sıralı kolonlar olarak döndürür
+        """
+        index = (self.head + np.arange(self.size)) % len(self.offsets)
+        return self.offsets[index], self.mb_used[index], self.roaming_mb[index]
+
+class UsageStore:
+    """
+    Sıcak SIM'lerin kullanım geçmişini bellekte tutar, LRU ile bellek bütçesini korur
+
+    Tamponlar ingest_usage ile güncellenir. Önbellek süreç başınadır: her kayıt Redis'teki
+    USAGE_CHANGES_KEY kümesine SIM başına sırayla yazılır, diğer işçiler en fazla CHECK_SECONDS'ta bir
+    yeni sıraları okuyup o SIM'lerin tamponlarını atar. `usage` koleksiyonuna başka yoldan yazan araçlar
+    (ör. load_sample_data, toplu içe aktarım) USAGE_VERSION_KEY damgasını artırmalıdır; damga değiştiyse
+    tüm tamponlar atılır.
+    """
+    def __init__(self):
+        settings = IOT_SETTINGS["USAGE_STORE"]
+        self.enabled = settings["ENABLED"]
+        self.capacity = settings["CAPACITY"]
+        self.max_capacity = settings["MAX_CAPACITY"]
+        self.warm_days = settings["WARM_DAYS"]
+        self.check_seconds = settings["CHECK_SECONDS"]
+        self.memory_budget = settings["MEMORY_MB"] * 1024 * 1024
+
+        self.buffers: "OrderedDict[str, SimUsageBuffer]" = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self.version: Optional[str] = None
+        self.checked_at = 0.0
+        self.change_seq: Optional[int] = None     # Uygulanan son değişiklik sırası
+        self.own_changes: Dict[str, int] = {}     # Bu işçinin yazıp tamponuna eklediği kayıtların sırası
+        self._lock = asyncio.Lock()
+
+    async def warm(self):
+        """
+        Son WARM_DAYS günün kullanım verisini bütçe dolana kadar belleğe yükler
+        """
+        collection = db_manager.get_collection("usage")
+        if not self.enabled or collection is None:
+            return
+
+        start_date = datetime.now() - timedelta(days=self.warm_days)
+        cursor = collection.find(
+            {"timestamp": {"$gte": start_date}},
+            {"_id": 0, "sim_id": 1, "timestamp": 1, "mb_used": 1, "roaming_mb": 1}
+        ).sort([("sim_id", 1), ("timestamp", 1)])
+
+        self.version = await self._read_version()
+        self.change_seq = await self._read_change_seq()
+        self.checked_at = time.monotonic()
+
+        current_id, current = None, []
+        async for usage_doc in cursor:
+            if usage_doc["sim_id"] != current_id:
+                if current:
+                    self._load(current_id, current, start_date)
+                if self.memory_bytes >= self.memory_budget:
+                    current = []
+                    break
+                current_id, current = usage_doc["sim_id"], []
+            current.append((usage_doc["timestamp"], usage_doc["mb_used"], usage_doc.get("roaming_mb")))
+
+        if current:
+            self._load(current_id, current, start_date)
+
+        konsol.log(f"🧊 [green]Kullanım önbelleği ısıtıldı:[/] {len(self.buffers)} SIM")
+
+    async def ensure(self):
+        """
+        Diğer işçilerin kullanım yazdığı SIM'lerin tamponlarını, sürüm damgası değiştiyse
+        (kullanım ingest_usage dışında yazıldı) tüm tamponları atar
+        """
+        if not self.enabled or time.monotonic() - self.checked_at < self.check_seconds:
+            return
+
+        async with self._lock:
+            if time.monotonic() - self.checked_at < self.check_seconds:
+                return
+
+            version = await self._read_version()
+            if version != self.version:
+                self.clear()
+                self.version = version
+            await self._apply_changes()
+            self.checked_at = time.monotonic()
+
+    async def record(self, usage: Usage):
+        """
+        Bu işçide yazılan kaydı tampona ekler ve diğer işçiler için SIM değişikliğini yayınlar
+        """
+        self.append(usage)
+        if not self.enabled or not redis_manager.is_connected:
+            return
+
+        try:
+            seq, previous = await redis_manager.client.eval(RECORD_CHANGE_SCRIPT, 2, USAGE_SEQ_KEY, USAGE_CHANGES_KEY, usage.sim_id)
+        except Exception as e:
+            konsol.log(f"❌ [red]Kullanım değişikliği yayınlanamadı:[/] {e}")
+            self.invalidate(usage.sim_id)
+            return
+
+        if previous is not None and (self.change_seq is None or int(previous) > self.change_seq):
+            # Başka işçinin henüz uygulanmamış kaydı bu tamponda yok
+            self.invalidate(usage.sim_id)
+        else:
+            self.own_changes[usage.sim_id] = int(seq)
+
+    def get(self, sim_id: str, days: int) -> Optional[List[Usage]]:
+        """
+        SIM'in son `days` günlük kullanımını döndürür, bellekte tam değilse None
+        """
+        buffer = self.buffers.get(sim_id) if self.enabled else None
+        start = math.ceil((datetime.now() - timedelta(days=days) - EPOCH).total_seconds())
+
+        if buffer is None or start < buffer.covered_from:
+            self.misses += 1
+            return None
+
+        self.buffers.move_to_end(sim_id)
+        self.hits += 1
+
+        offsets, mb_used, roaming_mb = buffer.ordered()
+        first = int(np.searchsorted(offsets, start, side="left"))
+        timestamps = (np.datetime64(EPOCH, "s") + offsets[first:].astype("timedelta64[s]")).astype(datetime).tolist()
+
+        # float32 değerler en kısa gösterimleriyle float'a döner (12.34 → 12.34)
+        return [
+            Usage.model_construct(sim_id=sim_id, timestamp=timestamp, mb_used=float(mb), roaming_mb=float(roaming))
+            for timestamp, mb, roaming in zip(timestamps, mb_used[first:].astype(str), roaming_mb[first:].astype(str))
+        ]
+
+    def put(self, sim_id: str, usage_data: List[Usage], since: datetime):
+        """
+        Mongo'dan okunan `since` sonrası kullanım geçmişini belleğe alır
+        """
+        if not self.enabled:
+            return
+
+        self._load(sim_id, [(usage.timestamp, usage.mb_used, usage.roaming_mb) for usage in usage_data], since)
+
+    def append(self, usage: Usage):
+        """
+        Yeni kullanım kaydını bellekteki tampona ekler (tampon yoksa dokunmaz)
+        """
+        buffer = self.buffers.get(usage.sim_id)
+        if buffer is None:
+            return
+
+        offset = self._offset(usage.timestamp)
+        if buffer.last_offset is not None and offset < buffer.last_offset:
+            # Sırası bozuk kayıt: bir sonraki okumada Mongo'dan yeniden yüklenir
+            self.invalidate(usage.sim_id)
+            return
+
+        before = buffer.nbytes
+        buffer.append(offset, usage.mb_used, usage.roaming_mb or 0, self._keep_from(), self.max_capacity)
+        if buffer.nbytes != before:
+            self.memory_bytes += buffer.nbytes - before
+            self._evict()
+
+    def invalidate(self, sim_id: str):
+        """
+        SIM'in tamponunu bellekten atar
+        """
+        buffer = self.buffers.pop(sim_id, None)
+        if buffer is not None:
+            self.memory_bytes -= buffer.nbytes
+
+    def clear(self):
+        """
+        Tüm tamponları bellekten atar
+        """
+        self.buffers.clear()
+        self.memory_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Önbellek istatistiklerini döndürür
+        """
+        return {
+            "sims": len(self.buffers),
+            "memory_bytes": self.memory_bytes,
+            "memory_budget": self.memory_budget,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _load(self, sim_id: str, records: List[tuple], since: datetime):
+        # Kayıtların sığacağı kadar büyük başlanır: yükleme sırasında ara büyütmeler olmaz
+        capacity = self.capacity
+        while capacity < len(records) and capacity < self.max_capacity:
+            capacity = min(capacity * 2, self.max_capacity)
+
+        keep_from = self._keep_from()
+        buffer = SimUsageBuffer(capacity, self._offset(since))
+        for timestamp, mb_used, roaming_mb in records:
+            buffer.append(self._offset(timestamp), mb_used, roaming_mb or 0, keep_from, self.max_capacity)
+
+        self.invalidate(sim_id)
+        self.buffers[sim_id] = buffer
+        self.memory_bytes += buffer.nbytes
+        self._evict()
+
+    def _evict(self):
+        # En soğuk SIM'ler bütçe altına inene dek atılır (en son kullanılan tampon her zaman kalır)
+        while self.memory_bytes > self.memory_budget and len(self.buffers) > 1:
+            _, buffer = self.buffers.popitem(last=False)
+            self.memory_bytes -= buffer.nbytes
+
+    async def _apply_changes(self):
+        if not redis_manager.is_connected:
+            return
+
+        try:
+            if self.change_seq is None:
+                # Sıra takibi yokken yüklenen tamponların güncelliği bilinemez
+                self.change_seq = await self._read_change_seq()
+                self.clear()
+                return
+
+            changes = await redis_manager.client.zrangebyscore(USAGE_CHANGES_KEY, f"({self.change_seq}", "+inf", withscores=True)
+        except Exception as e:
+            konsol.log(f"❌ [red]Kullanım değişiklikleri okunamadı:[/] {e}")
+            return
+
+        for sim_id, seq in changes:
+            seq = int(seq)
+            if self.own_changes.get(sim_id) != seq:
+                self.invalidate(sim_id)
+            self.change_seq = max(self.change_seq, seq)
+
+        self.own_changes = {sim_id: seq for sim_id, seq in self.own_changes.items() if seq > self.change_seq}
+
+    async def _read_change_seq(self) -> Optional[int]:
+        if not redis_manager.is_connected:
+            return None
+
+        try:
+            return int(await redis_manager.client.get(USAGE_SEQ_KEY) or 0)
+        except Exception as e:
+            konsol.log(f"❌ [red]Kullanım değişiklik sırası okunamadı:[/] {e}")
+            return None
+
+    def _keep_from(self) -> int:
+        return self._offset(datetime.now() - timedelta(days=self.warm_days))
+
+    async def _read_version(self) -> Optional[str]:
+        if not redis_manager.is_connected:
+            return self.version
+
+        try:
+            return await redis_manager.client.get(USAGE_VERSION_KEY)
+        except Exception as e:
+            konsol.log(f"❌ [red]Kullanım sürümü okunamadı:[/] {e}")
+            return self.version
+
+    def _offset(self, timestamp: datetime) -> int:
+        return int((timestamp - EPOCH).total_seconds())
+
+# Global kullanım önbelleği
+usage_store = UsageStore()
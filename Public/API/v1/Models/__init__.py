@@ -5,6 +5,9 @@ from .enums import (
     SimStatus,
     DeviceType, 
     ActionType,
+    BillingEventType,
+    FleetSortField,
+    SortOrder,
     AnomalyType,
     RiskLevel,
     Severity
@@ -18,20 +21,50 @@ from .database import (
     DeviceProfile,
     AddOnPack,
     ActionLog,
-    Anomaly
+    Anomaly,
+    DetectorState,
+    WeekdayBaseline,
+    UsageRollup,
+    BillingEvent,
+    BillingSegment,
+    BillingAddon,
+    BillingCycle
 )
 
 # API Request/Response Models
 from .api import (
     FleetResponse,
+    FleetChangesResponse,
+    FleetStatsResponse,
     UsageResponse,
+    UsageIngestRequest,
     AnomalyResponse,
     AnalyzeResponse,
+    UsageIngestResponse,
+    BaselineResponse,
+    AnalyzeBatchRequest,
+    AnalyzeBatchStatus,
+    SavingsReportRequest,
+    SavingsReportStatus,
+    SavingsGroup,
     WhatIfRequest,
+    WhatIfBatchRequest,
+    WhatIfBatchItem,
+    WhatIfBatchResponse,
+    SweepRange,
+    WhatIfSweepRequest,
+    WhatIfSweepResponse,
     CostBreakdown,
     WhatIfResponse,
+    PlanCostBand,
+    ForecastResponse,
+    BillingEventRequest,
+    CycleDay,
+    CycleCostResponse,
     ActionRequest,
-    ActionResponse
+    ActionResponse,
+    IndexUsage,
+    IndexReportResponse
 )
 
 # WebSocket Models
@@ -39,5 +72,7 @@ from .websocket import (
     AlertMessage,
     ConnectionStatus,
     BroadcastMessage,
-    AnomalyDetail
+    AnomalyDetail,
+    QuotaProjectionDetail,
+    FleetDeltaMessage
 )
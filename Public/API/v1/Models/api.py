@@ -1,9 +1,10 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from pydantic import BaseModel
-from typing   import Optional, List
-from datetime import datetime
-from .enums   import RiskLevel, ActionType
+from pydantic  import BaseModel
+from typing    import Optional, List, Dict
+from datetime  import datetime
+from .enums    import RiskLevel, ActionType, BillingEventType
+from .database import WeekdayBaseline, BillingSegment, BillingAddon
 
 # Fleet API Models
 class FleetResponse(BaseModel):
@@ -19,12 +20,38 @@ class FleetResponse(BaseModel):
     last_seen_at: Optional[datetime]
     anomaly_count: int
 
+class FleetChangesResponse(BaseModel):
+    """Filigrandan sonra değişen SIM'ler"""
+    since: int
+    watermark: int  # Sonraki istekte `since` olarak gönderilir
+    has_more: bool = False
+    reset: bool = False  # Filigran geçersiz (sayaç sıfırlandı): filo baştan yüklenmeli
+    changes: List[FleetResponse] = []
+
+class FleetStatsResponse(BaseModel):
+    """Filonun tamamı için istatistik kartları"""
+    total: int
+    active: int
+    high_risk: int
+    anomalies: int                 # Toplam anomali sayısı
+    cities: List[str] = []
+
 # Usage API Models
 class UsageResponse(BaseModel):
-    """SIM kullanım geçmişi response"""
+    """SIM kullanım geçmişi response (özet okumalarda dönem alanları dolu)"""
     timestamp: datetime
     mb_used: float
     roaming_mb: float
+    max_mb: Optional[float] = None
+    count: Optional[int] = None
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+
+class UsageIngestRequest(BaseModel):
+    """Yeni kullanım kaydı request (timestamp boşsa şu an)"""
+    timestamp: Optional[datetime] = None
+    mb_used: float
+    roaming_mb: float = 0.0
 
 # Analyze API Models
 class AnomalyResponse(BaseModel):
@@ -41,6 +68,76 @@ class AnalyzeResponse(BaseModel):
     risk_level: RiskLevel
     summary: str
 
+class UsageIngestResponse(BaseModel):
+    """Kullanım kaydı sonrası artımlı analiz response"""
+    sim_id: str
+    anomalies: List[AnomalyResponse]
+    risk_score: int
+    risk_level: RiskLevel
+
+class BaselineResponse(BaseModel):
+    """SIM'in haftanın günü baseline'ları response"""
+    sim_id: str
+    device_type: str
+    sim: Optional[WeekdayBaseline] = None
+    device: Optional[WeekdayBaseline] = None
+    resolved: Optional[WeekdayBaseline] = None   # Tespitte kullanılan (gün bazında SIM → cihaz tipi)
+
+class AnalyzeBatchRequest(BaseModel):
+    """Toplu analiz request (boş bırakılırsa tüm filo)"""
+    sim_ids: Optional[List[str]] = None
+    risk_level: Optional[str] = None
+    device_type: Optional[str] = None
+    city: Optional[str] = None
+    apn: Optional[str] = None
+    status: Optional[str] = None
+    customer_id: Optional[str] = None
+
+class AnalyzeBatchStatus(BaseModel):
+    """Toplu analiz iş durumu"""
+    job_id: str
+    status: str  # running, completed, failed
+    total_sims: int = 0
+    processed_sims: int = 0
+    skipped_sims: int = 0
+    flagged_sims: int = 0
+    new_anomalies: int = 0
+    risk_distribution: Dict[str, int] = {}
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+# Reports API Models
+class SavingsReportRequest(AnalyzeBatchRequest):
+    """Filo tasarruf raporu request (boş bırakılırsa tüm filo)"""
+
+class SavingsReportStatus(BaseModel):
+    """Filo tasarruf raporu iş durumu"""
+    job_id: str
+    status: str  # running, completed, failed
+    total_sims: int = 0
+    processed_sims: int = 0
+    skipped_sims: int = 0
+    sims_with_saving: int = 0
+    current_total: float = 0.0
+    best_total: float = 0.0
+    total_saving: float = 0.0
+    sims_per_second: float = 0.0
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+
+class SavingsGroup(BaseModel):
+    """Tasarruf raporunun bir gruba (müşteri, APN, şehir, cihaz tipi) göre özeti"""
+    key: Optional[str] = None
+    sims: int
+    sims_with_saving: int
+    current_total: float
+    best_total: float
+    saving: float
+
 # What-If API Models
 class WhatIfRequest(BaseModel):
     """Maliyet simülasyon request"""
@@ -49,6 +146,60 @@ class WhatIfRequest(BaseModel):
     scenario: Optional[str] = None  # increase_20, decrease_30, spike_day, roaming_week
     parameters: Optional[dict] = {}
 
+class WhatIfBatchRequest(AnalyzeBatchRequest):
+    """Toplu maliyet simülasyonu request: SIM listesi ya da filo filtresi + tek hedef plan, ek paket seti veya senaryo"""
+    plan_id: Optional[str] = None
+    addons: Optional[List[str]] = []
+    scenario: Optional[str] = None  # increase_20, decrease_30, spike_day, roaming_week
+
+class WhatIfBatchItem(BaseModel):
+    """Toplu simülasyonda SIM başına sonuç"""
+    sim_id: str
+    current_plan_id: str
+    current_total: float
+    candidate_total: float
+    saving: float
+    base_cost: float
+    overage_cost: float
+    addon_cost: float
+
+class WhatIfBatchResponse(BaseModel):
+    """Toplu maliyet simülasyonu response (SIM başına sonuçlar ve toplamlar)"""
+    description: str
+    total_sims: int
+    simulated_sims: int
+    skipped_sim_ids: List[str] = []
+    current_total: float
+    candidate_total: float
+    saving: float
+    results: List[WhatIfBatchItem]
+
+class SweepRange(BaseModel):
+    """Tarama ekseni: start'tan stop'a (dahil) step adımlarla"""
+    start: float
+    stop: float
+    step: float
+
+class WhatIfSweepRequest(BaseModel):
+    """Senaryo ızgarası request (growth: kullanım değişim oranı, -0.5 → %50 azalış)"""
+    growth: SweepRange = SweepRange(start=-0.5, stop=2.0, step=0.25)
+    spike_days: SweepRange = SweepRange(start=0, stop=5, step=1)
+    roaming_days: SweepRange = SweepRange(start=0, stop=30, step=5)
+    plan_ids: Optional[List[str]] = None  # Boşsa APN'deki tüm planlar
+    spike_multiplier: float = 10.0
+    roaming_cost_per_mb: float = 2.5
+
+class WhatIfSweepResponse(BaseModel):
+    """Senaryo ızgarası sonucu: costs[plan][growth][spike][roaming]"""
+    sim_id: str
+    current_plan_id: str
+    current_monthly_mb: float
+    axes: Dict[str, List[float]]
+    plans: List[Dict[str, str]]
+    costs: List[List[List[List[float]]]]
+    best_plan: List[List[List[int]]]  # Her ızgara noktasında en ucuz planın `plans` içindeki sırası
+    best_cost: List[List[List[float]]]
+
 class CostBreakdown(BaseModel):
     """Maliyet detayları"""
     base_cost: float
@@ -69,6 +220,62 @@ class WhatIfResponse(BaseModel):
     risk_change: Optional[int] = 0
     recommendations: Optional[List[str]] = []
 
+class PlanCostBand(BaseModel):
+    """Plan için Monte Carlo maliyet bantları (anahtarlar: p50, p90, ...)"""
+    plan_id: str
+    plan_name: str
+    is_current: bool
+    costs: Dict[str, float]
+    overage_probability: float
+
+class ForecastResponse(BaseModel):
+    """Ay sonu kullanım tahmini ve plan maliyet bantları response"""
+    sim_id: str
+    remaining_days: int
+    paths: int
+    used_so_far: float
+    usage: Dict[str, float]
+    plans: List[PlanCostBand]
+    recommended_plan_id: Optional[str] = None
+    covering_plan_id: Optional[str] = None
+
+# Billing Cycle API Models
+class BillingEventRequest(BaseModel):
+    """Plan değişikliği ya da ek paket aktivasyonu request (effective_at boşsa şu an)"""
+    type: BillingEventType
+    plan_id: Optional[str] = None
+    addon_id: Optional[str] = None
+    effective_at: Optional[datetime] = None
+
+class CycleDay(BaseModel):
+    """Dönemin bir günü için kümülatif kullanım ve maliyet"""
+    date: datetime
+    mb_used: float
+    cumulative_mb: float
+    cumulative_cost: float
+
+class CycleCostResponse(BaseModel):
+    """Fatura dönemi maliyeti ve günlük kümülatif maliyet eğrisi response"""
+    sim_id: str
+    cycle_start: datetime
+    cycle_end: datetime
+    days_in_cycle: int
+    days_elapsed: int
+    plan_id: str
+    allowance_mb: float
+    used_mb: float
+    overage_mb: float
+    base_cost: float
+    addon_cost: float
+    overage_cost: float
+    total_cost: float                   # Tüm dönemin kıst plan ücreti + ek paketler + bugüne kadarki aşım
+    accrued_cost: float                 # Bugüne kadar tahakkuk eden (plan ücreti günlük)
+    burn_rate_mb_per_day: float
+    projected_mb: float                 # Bu hızla dönem sonundaki kullanım
+    segments: List[BillingSegment]
+    addons: List[BillingAddon]
+    daily: List[CycleDay]
+
 # Actions API Models
 class ActionRequest(BaseModel):
     """Toplu eylem request"""
@@ -81,3 +288,22 @@ class ActionResponse(BaseModel):
     status: str
     created: List[dict]
     message: str
+
+# Admin API Models
+class IndexUsage(BaseModel):
+    """Index durumu ve kullanım sayısı"""
+    collection: str
+    name: str
+    keys: List[list]
+    status: str  # ok, unused, missing, undeclared
+    purpose: Optional[str] = None
+    ops: int = 0
+    since: Optional[datetime] = None
+
+class IndexReportResponse(BaseModel):
+    """Index raporu"""
+    checked_at: datetime
+    missing: int
+    unused: int
+    undeclared: int
+    indexes: List[IndexUsage]
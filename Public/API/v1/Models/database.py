@@ -1,9 +1,9 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
 from pydantic import BaseModel
-from typing   import Optional
+from typing   import Optional, List, Dict
 from datetime import datetime
-from .enums   import SimStatus, DeviceType, ActionType, AnomalyType, RiskLevel
+from .enums   import SimStatus, DeviceType, ActionType, BillingEventType, AnomalyType, RiskLevel
 
 class SimCard(BaseModel):
     """SIM kart bilgileri"""
@@ -69,3 +69,96 @@ class Anomaly(BaseModel):
     reason: str
     evidence: dict
     resolved: bool = False
+
+class DetectorState(BaseModel):
+    """SIM başına artımlı anomali dedektörü durumu"""
+    sim_id: str
+    record_count: int = 0
+    recent_usage: List[float] = []      # Son 10 kayıt: 7 günlük baseline + son 3 gün
+    baseline_count: int = 0             # Welford - baseline penceresindeki pozitif kayıtlar
+    baseline_mean: float = 0.0
+    baseline_m2: float = 0.0
+    drain_streak: int = 0
+    last_timestamp: Optional[datetime] = None
+    last_active_at: Optional[datetime] = None
+    inactive_since: Optional[datetime] = None
+    last_roaming_at: Optional[datetime] = None
+    last_roaming_mb: float = 0.0
+    recent_spikes: List[bool] = []      # Son 3 kaydın spike sonucu (risk skoru için)
+    recent_records: List[Usage] = []    # Son kayıtlar: risk skoru için 3, yerleşik olmayan dedektörler varsa pencereleri kadar
+    updated_at: Optional[datetime] = None
+    version: Optional[str] = None       # Karşılaştır-ve-yaz damgası, her yazımda yenilenir
+
+class WeekdayBaseline(BaseModel):
+    """SIM ya da cihaz tipi için haftanın günü bazlı kullanım baseline'ı (Pazartesi=0)"""
+    scope: str                          # "sim" | "device_type"
+    key: str                            # sim_id ya da device_type
+    counts: List[int] = [0] * 7
+    means: List[float] = [0.0] * 7
+    variances: List[float] = [0.0] * 7  # Popülasyon varyansı
+    updated_at: Optional[datetime] = None
+
+class UsageRollup(BaseModel):
+    """SIM başına saatlik/günlük/haftalık/aylık kullanım özeti"""
+    sim_id: str
+    resolution: str                     # "hour" | "day" | "week" | "month"
+    bucket: datetime                    # Dönem başlangıcı (hafta Pazartesi, ay 1'i)
+    mb_used: float = 0.0
+    roaming_mb: float = 0.0
+    max_mb: float = 0.0
+    count: int = 0
+    first_at: Optional[datetime] = None
+    last_at: Optional[datetime] = None
+
+class BillingEvent(BaseModel):
+    """Fatura dönemi içindeki plan değişikliği ya da ek paket aktivasyonu"""
+    event_id: str
+    sim_id: str
+    type: BillingEventType
+    effective_at: datetime
+    plan_id: Optional[str] = None       # plan_change: yeni plan
+    from_plan_id: Optional[str] = None  # plan_change: önceki plan
+    addon_id: Optional[str] = None      # addon
+    created_at: datetime
+
+class BillingSegment(BaseModel):
+    """Dönemin tek planla faturalanan gün aralığı [start_day, end_day)"""
+    plan_id: str
+    plan_name: str
+    start_day: int
+    end_day: int
+    monthly_price: float
+    monthly_quota_mb: int
+    overage_per_mb: float
+
+class BillingAddon(BaseModel):
+    """Dönem içinde aktive edilen ek paket (day: dönemin 0 tabanlı günü)"""
+    addon_id: str
+    name: str
+    day: int
+    extra_mb: int
+    price: float
+
+class BillingCycle(BaseModel):
+    """SIM'in fatura dönemi (takvim ayı) maliyet özeti; kullanım geldikçe artımlı güncellenir"""
+    sim_id: str
+    cycle: datetime                     # Dönem başlangıcı (ayın 1'i)
+    days_in_cycle: int
+    plan_id: str                        # Dönem sonundaki plan
+    overage_per_mb: float               # Güncel aşım ücreti
+    allowance_mb: float                 # Kıst plan kotaları + ek paketler
+    base_cost: float                    # Kıst plan ücretleri (tüm dönem)
+    addon_cost: float
+    used_mb: float = 0.0
+    overage_mb: float = 0.0
+    overage_base_mb: float = 0.0        # Son yeniden hesaplamadaki aşım MB'ı ve maliyeti;
+    overage_base_cost: float = 0.0      # sonrasındaki aşım güncel ücretle eklenir
+    daily_mb: Dict[str, float] = {}     # Ayın günü ("1".."31") → MB
+    segments: List[BillingSegment] = []
+    addons: List[BillingAddon] = []
+    burn_rate: float = 0.0              # Tamamlanan günlerin kullanımının üstel ortalaması (MB/gün)
+    burn_days: int = 0                  # Ortalamaya katılan gün sayısı
+    burn_through_day: int = 0           # Ortalamaya katılan son gün (ayın günü)
+    quota_alerted_at: Optional[datetime] = None
+    version: int = 0                    # Her kayıt ve yeniden hesaplamada artar (iyimser kilit)
+    updated_at: Optional[datetime] = None
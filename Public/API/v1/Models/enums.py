@@ -22,6 +22,21 @@ class ActionType(str, Enum):
     THROTTLE = "throttle"
     NOTIFY = "notify"
 
+class BillingEventType(str, Enum):
+    """Fatura dönemini etkileyen olay tipleri"""
+    PLAN_CHANGE = "plan_change"
+    ADDON = "addon"
+
+class FleetSortField(str, Enum):
+    """Filo listesi sıralama alanları"""
+    RISK_SCORE = "risk_score"
+    SIM_ID = "sim_id"
+
+class SortOrder(str, Enum):
+    """Sıralama yönü"""
+    ASC = "asc"
+    DESC = "desc"
+
 class AnomalyType(str, Enum):
     """Anomali tipleri"""
     SUDDEN_SPIKE = "sudden_spike"
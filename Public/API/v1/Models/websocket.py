@@ -2,8 +2,9 @@
 
 from pydantic import BaseModel
 from datetime import datetime
-from typing   import Optional, Dict, Any
+from typing   import Optional, Dict, Any, List
 from .enums   import RiskLevel
+from .api     import FleetResponse
 
 class AnomalyDetail(BaseModel):
     """Anomali detay bilgisi"""
@@ -11,6 +12,16 @@ class AnomalyDetail(BaseModel):
     reason: Optional[str] = None
     evidence: Optional[Dict[str, Any]] = None
 
+class QuotaProjectionDetail(BaseModel):
+    """Kota dolum öngörüsü (günlük kullanım hızına göre)"""
+    burn_rate_mb_per_day: float
+    used_mb: float
+    allowance_mb: float
+    projected_mb: float                 # Bu hızla dönem sonundaki kullanım
+    days_to_quota: float
+    quota_at: datetime
+    cycle_end: datetime
+
 class AlertMessage(BaseModel):
     """WebSocket üzerinden gönderilen uyarı mesajları"""
     type: str
@@ -23,6 +34,21 @@ class AlertMessage(BaseModel):
     anomaly_count: Optional[int] = None
     new_anomaly_count: Optional[int] = None
     latest_anomaly: Optional[AnomalyDetail] = None
+    quota_projection: Optional[QuotaProjectionDetail] = None
+    # Toplu analiz ilerlemesi
+    job_id: Optional[str] = None
+    processed: Optional[int] = None
+    total: Optional[int] = None
+
+class FleetDeltaMessage(BaseModel):
+    """Tik başına birleştirilmiş filo değişiklikleri"""
+    type: str = "fleet_delta"
+    since: int
+    watermark: int
+    has_more: bool = False
+    reset: bool = False
+    changes: List[FleetResponse] = []
+    timestamp: datetime
 
 class ConnectionStatus(BaseModel):
     """WebSocket bağlantı durumu"""
@@ -3,6 +3,7 @@
 from fastapi import APIRouter, WebSocket
 from typing  import List
 from CLI     import konsol
+from ..Libs  import fleet_delta_publisher
 
 api_v1_router = APIRouter()
 
@@ -17,6 +18,7 @@ class ConnectionManager:
         konsol.log(f"✅ [green]WebSocket kabul edildi. Aktif bağlantı sayısı:[/] {len(self.active_connections)}")
 
     def disconnect(self, websocket: WebSocket):
+        fleet_delta_publisher.unsubscribe(websocket)
         if websocket in self.active_connections:
             self.active_connections.remove(websocket)
             konsol.log(f"🔌 [red]WebSocket bağlantısı kaldırıldı. Aktif bağlantı sayısı:[/] {len(self.active_connections)}")
@@ -38,9 +40,15 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 from .actions      import *
+from .admin        import *
 from .analyze      import *
+from .baselines    import *
 from .best_options import *
+from .catalog      import *
+from .cost         import *
 from .fleet        import *
+from .forecast     import *
+from .reports      import *
 from .usage        import *
 from .whatif       import *
 from .ws           import *
\ No newline at end of file
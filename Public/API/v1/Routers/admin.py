@@ -0,0 +1,28 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from fastapi  import HTTPException
+from .        import api_v1_router
+from datetime import datetime
+from DB       import db_manager
+from ..Models import IndexUsage, IndexReportResponse
+
+@api_v1_router.get("/admin/indexes", response_model=IndexReportResponse)
+async def get_index_report():
+    """
+    Tanımlı ve mevcut MongoDB index'lerini kullanım sayılarıyla raporlar (eksik, kullanılmayan, tanımsız)
+    """
+    if not db_manager.mongodb.is_connected:
+        raise HTTPException(status_code=503, detail="MongoDB bağlantısı yok")
+    
+    try:
+        indexes = [IndexUsage(**row) for row in await db_manager.mongodb.index_report()]
+        
+        return IndexReportResponse(
+            checked_at=datetime.now(),
+            missing=sum(index.status == "missing" for index in indexes),
+            unused=sum(index.status == "unused" for index in indexes),
+            undeclared=sum(index.status == "undeclared" for index in indexes),
+            indexes=indexes
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Index raporu alınamadı: {str(e)}")
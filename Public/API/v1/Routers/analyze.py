@@ -1,10 +1,159 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from fastapi  import HTTPException
-from .        import api_v1_router, manager
-from datetime import datetime
-from ..Models import AnalyzeResponse, AlertMessage, AnomalyResponse, AnomalyDetail
-from ..Libs   import iot_service, anomaly_detector
+from fastapi     import HTTPException
+from .           import api_v1_router, manager
+from CLI         import konsol
+from datetime    import datetime
+from collections import OrderedDict, Counter
+from Settings    import IOT_SETTINGS
+from ..Models    import AnalyzeResponse, AlertMessage, AnomalyResponse, AnomalyDetail, AnalyzeBatchRequest, AnalyzeBatchStatus, RiskLevel, DetectorState
+from ..Libs      import iot_service, anomaly_detector, task_executor, baseline_store
+import asyncio
+import uuid
+
+# Toplu analiz işleri (en yeniler sonda)
+batch_jobs: "OrderedDict[str, AnalyzeBatchStatus]" = OrderedDict()
+_batch_tasks = set()
+
+@api_v1_router.post("/analyze/batch", response_model=AnalyzeBatchStatus, status_code=202)
+async def start_batch_analysis(request: AnalyzeBatchRequest):
+    """
+    Filonun tamamını ya da filtrelenen kısmını arka planda toplu analiz eder
+    """
+    try:
+        query = iot_service.build_sim_query(**request.model_dump())
+        total_sims = await iot_service.count_sims(query)
+        
+        job = AnalyzeBatchStatus(
+            job_id=str(uuid.uuid4()),
+            status="running",
+            total_sims=total_sims,
+            started_at=datetime.now()
+        )
+        batch_jobs[job.job_id] = job
+        while len(batch_jobs) > IOT_SETTINGS["BATCH_ANALYSIS"]["MAX_JOBS"]:
+            batch_jobs.popitem(last=False)
+        
+        task = asyncio.create_task(_run_batch_analysis(job, query))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+        
+        return job
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Toplu analiz başlatılamadı: {str(e)}")
+
+@api_v1_router.get("/analyze/batch/{job_id}", response_model=AnalyzeBatchStatus)
+async def get_batch_analysis_status(job_id: str):
+    """
+    Toplu analiz işinin ilerlemesini döndürür
+    """
+    job = batch_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Analiz işi bulunamadı")
+    
+    return job
+
+async def _run_batch_analysis(job: AnalyzeBatchStatus, query: dict):
+    """
+    SIM'leri parça parça analiz eder, ilerlemeyi WebSocket ile bildirir
+    """
+    try:
+        # Cihaz profilleri iş başına bir kez okunur
+        device_profiles = await iot_service.get_device_profiles()
+        chunk_size = IOT_SETTINGS["BATCH_ANALYSIS"]["CHUNK_SIZE"]
+        projection = {"_id": 0, "sim_id": 1, "device_type": 1}
+        
+        async for sim_docs in iot_service.iter_sim_chunks(query, chunk_size, projection):
+            analyzable = [doc for doc in sim_docs if doc.get("device_type") in device_profiles]
+            job.skipped_sims += len(sim_docs) - len(analyzable)
+            
+            if analyzable:
+                await _analyze_chunk(job, analyzable, device_profiles)
+            
+            job.processed_sims += len(sim_docs)
+            
+            progress = AlertMessage(
+                type="analysis_progress",
+                sim_id="multiple",
+                message=f"{job.processed_sims}/{job.total_sims} SIM analiz edildi",
+                severity=RiskLevel.GREEN,
+                timestamp=datetime.now(),
+                job_id=job.job_id,
+                processed=job.processed_sims,
+                total=job.total_sims
+            )
+            await manager.broadcast(progress.model_dump_json())
+        
+        job.status = "completed"
+        
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        konsol.log(f"❌ [red]Toplu analiz hatası:[/] {e}")
+    
+    job.finished_at = datetime.now()
+    job.duration_seconds = round((job.finished_at - job.started_at).total_seconds(), 2)
+    
+    # Tek özet bildirimi
+    if job.risk_distribution.get(RiskLevel.RED.value):
+        severity = RiskLevel.RED
+    elif job.risk_distribution.get(RiskLevel.ORANGE.value):
+        severity = RiskLevel.ORANGE
+    else:
+        severity = RiskLevel.GREEN
+    
+    summary = AlertMessage(
+        type="batch_analysis_completed",
+        sim_id="multiple",
+        message=f"{job.processed_sims} SIM analiz edildi, {job.new_anomalies} yeni anomali tespit edildi",
+        severity=severity,
+        timestamp=datetime.now(),
+        new_anomaly_count=job.new_anomalies,
+        job_id=job.job_id,
+        processed=job.processed_sims,
+        total=job.total_sims
+    )
+    await manager.broadcast(summary.model_dump_json())
+
+async def _analyze_chunk(job: AnalyzeBatchStatus, sim_docs: list, device_profiles: dict):
+    """
+    Bir SIM parçasını tek aggregation, tek analiz ve toplu yazma ile işler
+    """
+    sim_ids = [doc["sim_id"] for doc in sim_docs]
+    device_types = [doc["device_type"] for doc in sim_docs]
+    roaming_expected = [device_profiles[device_type].roaming_expected for device_type in device_types]
+    
+    mb_used, roaming_mb, timestamps = await iot_service.get_fleet_usage_matrix(sim_ids, 30)
+    baselines = await baseline_store.get_for_sims(sim_ids, device_types)
+    anomalies_by_sim, risk_scores = await task_executor.run(
+        anomaly_detector.analyze_fleet, sim_ids, mb_used, roaming_mb, timestamps, roaming_expected, baselines,
+        device_profiles=[device_profiles[device_type] for device_type in device_types]
+    )
+    
+    # Son 7 günde zaten kayıtlı anomali tipleri tekrar yazılmaz
+    existing = await iot_service.get_recent_anomaly_summary(sim_ids, 7)
+    
+    fresh = []
+    for sim_id in sim_ids:
+        existing_types = existing.get(sim_id, {"types": set()})["types"]
+        fresh.extend(anomaly for anomaly in anomalies_by_sim.get(sim_id, []) if anomaly.type.value not in existing_types)
+    
+    # Parça başına tek bulk_write; sayımlar sadece gerçekten eklenen anomalilerle yapılır
+    new_anomalies = await iot_service.save_anomalies_bulk(fresh)
+    new_counts = Counter(anomaly.sim_id for anomaly in new_anomalies)
+    
+    risk_updates = []
+    for sim_id, risk_score in zip(sim_ids, risk_scores.tolist()):
+        risk_updates.append((sim_id, risk_score, existing.get(sim_id, {"count": 0})["count"] + new_counts[sim_id]))
+        
+        risk_level = anomaly_detector.get_risk_level(risk_score).value
+        job.risk_distribution[risk_level] = job.risk_distribution.get(risk_level, 0) + 1
+        if anomalies_by_sim.get(sim_id):
+            job.flagged_sims += 1
+    
+    await iot_service.update_sim_risk_scores(risk_updates)
+    job.new_anomalies += len(new_anomalies)
 
 @api_v1_router.post("/analyze/{sim_id}", response_model=AnalyzeResponse)
 async def analyze_sim_anomalies(sim_id: str):
@@ -22,8 +171,9 @@ async def analyze_sim_anomalies(sim_id: str):
         if not device_profile:
             raise HTTPException(status_code=404, detail="Cihaz profili bulunamadı")
         
-        # Kullanım verilerini al
+        # Kullanım verilerini ve haftanın günü baseline'ını al
         usage_data = await iot_service.get_sim_usage(sim_id, 30)
+        baseline = await baseline_store.get_for_sim(sim_id, sim.device_type)
         
         # Zaten tespit edilmiş anomalileri al (son 7 gün)
         existing_anomalies = await iot_service.get_sim_anomalies(sim_id, 7)  # son 7 gün
@@ -38,8 +188,8 @@ async def analyze_sim_anomalies(sim_id: str):
                 existing_types.append('unknown')
         
         # Anomali analizi yap
-        all_anomalies, risk_score = anomaly_detector.analyze_sim(
-            sim_id, usage_data, device_profile
+        all_anomalies, risk_score = await task_executor.run(
+            anomaly_detector.analyze_sim, sim_id, usage_data, device_profile, baseline
         )
         
         # Sadece yeni tipte anomalileri filtrele
@@ -49,15 +199,9 @@ async def analyze_sim_anomalies(sim_id: str):
             if anomaly_type not in existing_types:
                 new_anomalies.append(anomaly)
         
-        # Anomalileri veritabanına kaydet ve yeni olanları say
-        new_anomalies_count = 0
-        saved_anomaly_ids = []
-        
-        for anomaly in new_anomalies:
-            anomaly_id = await iot_service.save_anomaly(anomaly)
-            if anomaly_id != "existing":
-                new_anomalies_count += 1
-                saved_anomaly_ids.append(anomaly_id)
+        # Anomalileri tek bulk_write ile kaydet, sadece gerçekten yeni olanlar döner
+        new_anomalies = await iot_service.save_anomalies_bulk(new_anomalies)
+        new_anomalies_count = len(new_anomalies)
         
         # Toplam anomali listesi (mevcut + yeni)
         anomalies = existing_anomalies + new_anomalies
@@ -129,6 +273,23 @@ async def analyze_sim_anomalies(sim_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analiz gerçekleştirilemedi: {str(e)}")
 
+@api_v1_router.post("/analyze/{sim_id}/reconcile", response_model=DetectorState)
+async def reconcile_detector_state(sim_id: str):
+    """
+    SIM'in artımlı dedektör durumunu kullanım geçmişinden yeniden kurar
+    """
+    try:
+        sim = await iot_service.get_sim_by_id(sim_id)
+        if not sim:
+            raise HTTPException(status_code=404, detail="SIM bulunamadı")
+        
+        return await iot_service.rebuild_detector_state(sim_id, sim.device_type)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Dedektör durumu yeniden kurulamadı: {str(e)}")
+
 @api_v1_router.get("/analyze/{sim_id}/latest", response_model=AnalyzeResponse)
 async def get_latest_anomaly_analysis(sim_id: str):
     """
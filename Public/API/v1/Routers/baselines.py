@@ -0,0 +1,56 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from fastapi  import HTTPException
+from .        import api_v1_router
+from CLI      import konsol
+from ..Models import BaselineResponse
+from ..Libs   import iot_service, baseline_store
+import asyncio
+
+# Süren baseline yeniden hesaplama işi
+_rebuild_tasks = set()
+
+@api_v1_router.post("/baselines/rebuild", status_code=202)
+async def rebuild_baselines():
+    """
+    Tüm SIM ve cihaz tipi baseline'larını arka planda yeniden hesaplar
+    """
+    if _rebuild_tasks:
+        raise HTTPException(status_code=409, detail="Baseline hesaplaması zaten sürüyor")
+    
+    task = asyncio.create_task(_run_rebuild())
+    _rebuild_tasks.add(task)
+    task.add_done_callback(_rebuild_tasks.discard)
+    
+    return {"status": "started"}
+
+async def _run_rebuild():
+    try:
+        await baseline_store.rebuild()
+    except Exception as e:
+        konsol.log(f"❌ [red]Baseline hesaplama hatası:[/] {e}")
+
+@api_v1_router.get("/baselines/{sim_id}", response_model=BaselineResponse)
+async def get_sim_baselines(sim_id: str):
+    """
+    SIM'in ve cihaz tipinin haftanın günü baseline'larını döndürür
+    """
+    try:
+        sim = await iot_service.get_sim_by_id(sim_id)
+        if not sim:
+            raise HTTPException(status_code=404, detail="SIM bulunamadı")
+        
+        sim_baseline = await baseline_store.get("sim", sim_id)
+        device_baseline = await baseline_store.get("device_type", sim.device_type)
+        
+        return BaselineResponse(
+            sim_id=sim_id,
+            device_type=sim.device_type,
+            sim=sim_baseline,
+            device=device_baseline,
+            resolved=baseline_store.resolve(sim_baseline, device_baseline)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Baseline alınamadı: {str(e)}")
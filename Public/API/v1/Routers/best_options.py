@@ -1,15 +1,26 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from fastapi import HTTPException
-from .       import api_v1_router
-from ..Libs  import iot_service, cost_simulator
+from fastapi          import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from .                import api_v1_router
+from ..Libs           import iot_service, cost_simulator, task_executor, cost_cache
 
 @api_v1_router.get("/best-options/{sim_id}")
-async def get_best_cost_options(sim_id: str):
+async def get_best_cost_options(
+    sim_id: str,
+    mode: str = Query("single", pattern="^(single|combo)$", description="Tekil ek paket ya da plan + ek paket kombinasyonu")
+):
     """
-    En iyi maliyet seçeneklerini döndürür
+    En iyi maliyet seçeneklerini döndürür (combo: her plan için en ucuz ek paket kombinasyonu)
+
+    Sonuç yeni kullanım ya da katalog değişikliği olana kadar önbellekten döner.
     """
     try:
+        cache_params = {"mode": mode}
+        cached, watermark = await cost_cache.get(sim_id, "best-options", cache_params)
+        if cached is not None:
+            return cached
+        
         # SIM ve plan bilgilerini al
         sim = await iot_service.get_sim_by_id(sim_id)
         if not sim:
@@ -19,18 +30,22 @@ async def get_best_cost_options(sim_id: str):
         if not current_plan:
             raise HTTPException(status_code=404, detail="Mevcut plan bulunamadı")
         
-        # Kullanım verilerini al
-        usage_data = await iot_service.get_sim_usage(sim_id, 30)
+        # Kullanım verilerini al (günlük özetler)
+        usage_data = await iot_service.get_sim_usage(sim_id, 30, resolution="day")
         
         # Mevcut APN'e uygun planları ve ek paketleri al
         available_plans = await iot_service.get_available_plans(current_plan.apn)
         available_addons = await iot_service.get_available_addons(current_plan.apn)
         
         # En iyi seçenekleri hesapla
-        best_options = cost_simulator.get_best_options(
-            sim_id, usage_data, current_plan, available_plans, available_addons
+        optimizer = cost_simulator.get_best_combinations if mode == "combo" else cost_simulator.get_best_options
+        best_options = await task_executor.run(
+            optimizer, sim_id, usage_data, current_plan, available_plans, available_addons
         )
         
+        best_options = jsonable_encoder(best_options)
+        await cost_cache.set(sim_id, "best-options", cache_params, watermark, best_options)
+        
         return best_options
         
     except HTTPException:
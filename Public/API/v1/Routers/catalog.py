@@ -0,0 +1,27 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from fastapi import HTTPException
+from .       import api_v1_router
+from ..Libs  import catalog_index
+
+@api_v1_router.get("/catalog")
+async def get_catalog_status():
+    """
+    Bellekteki plan / ek paket kataloğunun sürümünü ve özetini döndürür
+    """
+    try:
+        await catalog_index.ensure()
+        return catalog_index.status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Katalog durumu alınamadı: {str(e)}")
+
+
+@api_v1_router.post("/catalog/refresh")
+async def refresh_catalog():
+    """
+    Katalog sürümünü artırır; tüm işçiler plan ve ek paketleri yeniden yükler
+    """
+    try:
+        return await catalog_index.refresh()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Katalog yenilenemedi: {str(e)}")
@@ -0,0 +1,104 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from fastapi  import HTTPException, Query
+from .        import api_v1_router
+from datetime import datetime, timedelta
+from typing   import Optional
+from ..Models import BillingEvent, BillingEventRequest, CycleDay, CycleCostResponse
+from ..Libs   import iot_service, cost_simulator, billing_cycles, quota_projector
+
+@api_v1_router.get("/cost/{sim_id}/cycle", response_model=CycleCostResponse)
+async def get_cycle_cost(
+    sim_id: str,
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Fatura dönemi (YYYY-MM), boşsa içinde bulunulan ay")
+):
+    """
+    Fatura dönemi maliyetini (kıst plan değişiklikleri ve ek paketlerle) ve gün gün kümülatif maliyet eğrisini döndürür
+    """
+    if not billing_cycles.enabled:
+        raise HTTPException(status_code=503, detail="Fatura dönemi hesaplama devre dışı")
+    
+    try:
+        sim = await iot_service.get_sim_by_id(sim_id)
+        if not sim:
+            raise HTTPException(status_code=404, detail="SIM bulunamadı")
+        
+        now = datetime.now()
+        cycle = billing_cycles.cycle_start(datetime.strptime(month, "%Y-%m") if month else now)
+        billing_cycle = await billing_cycles.get(sim_id, cycle)
+        if not billing_cycle:
+            raise HTTPException(status_code=404, detail="Fatura dönemi hesaplanamadı: plan kataloğda yok")
+        
+        days_in_cycle = billing_cycle.days_in_cycle
+        days_elapsed = min(max((now - cycle).days + 1, 0), days_in_cycle)
+        daily_mb = [billing_cycle.daily_mb.get(str(day), 0.0) for day in range(1, days_in_cycle + 1)]
+        accrual = cost_simulator.cycle_accrual(daily_mb, billing_cycle.segments, billing_cycle.addons)
+        
+        daily = [
+            CycleDay(
+                date=cycle + timedelta(days=day),
+                mb_used=daily_mb[day],
+                cumulative_mb=float(accrual["cumulative_mb"][day]),
+                cumulative_cost=float(accrual["cumulative_cost"][day])
+            )
+            for day in range(days_elapsed)
+        ]
+        
+        # Dönem toplamları belgeden tek okumayla; eğri yalnızca gösterim için
+        overage_cost = billing_cycles.overage_cost(billing_cycle)
+        
+        # Kullanım hızı henüz eklenmemiş tamamlanan günlerle (yazmadan) güncellenir
+        burn_rate, _ = quota_projector.fold(
+            billing_cycle.burn_rate, billing_cycle.burn_days, billing_cycle.daily_mb,
+            billing_cycle.burn_through_day + 1, max(days_elapsed - 1, 0)
+        )
+        remaining_days = max((cycle + timedelta(days=days_in_cycle) - now).total_seconds() / 86400, 0.0)
+        
+        return CycleCostResponse(
+            sim_id=sim_id,
+            cycle_start=cycle,
+            cycle_end=cycle + timedelta(days=days_in_cycle),
+            days_in_cycle=days_in_cycle,
+            days_elapsed=days_elapsed,
+            plan_id=billing_cycle.plan_id,
+            allowance_mb=billing_cycle.allowance_mb,
+            used_mb=billing_cycle.used_mb,
+            overage_mb=billing_cycle.overage_mb,
+            base_cost=billing_cycle.base_cost,
+            addon_cost=billing_cycle.addon_cost,
+            overage_cost=overage_cost,
+            total_cost=billing_cycle.base_cost + billing_cycle.addon_cost + overage_cost,
+            accrued_cost=daily[-1].cumulative_cost if daily else 0.0,
+            burn_rate_mb_per_day=burn_rate,
+            projected_mb=billing_cycle.used_mb + burn_rate * remaining_days,
+            segments=billing_cycle.segments,
+            addons=billing_cycle.addons,
+            daily=daily
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fatura dönemi maliyeti alınamadı: {str(e)}")
+
+@api_v1_router.post("/cost/{sim_id}/events", response_model=BillingEvent, status_code=201)
+async def add_billing_event(sim_id: str, request: BillingEventRequest):
+    """
+    İçinde bulunulan dönem için plan değişikliği ya da ek paket aktivasyonu kaydeder (kıst faturalanır)
+    """
+    if not billing_cycles.enabled:
+        raise HTTPException(status_code=503, detail="Fatura dönemi hesaplama devre dışı")
+    
+    try:
+        sim = await iot_service.get_sim_by_id(sim_id)
+        if not sim:
+            raise HTTPException(status_code=404, detail="SIM bulunamadı")
+        
+        return await billing_cycles.add_event(sim, request)
+    
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fatura olayı kaydedilemedi: {str(e)}")
@@ -1,25 +1,89 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from fastapi  import HTTPException, Query
-from .        import api_v1_router
-from typing   import List, Optional
-from ..Models import FleetResponse
-from ..Libs   import iot_service
+from fastapi           import HTTPException, Query
+from fastapi.responses import JSONResponse
+from fastapi.encoders  import jsonable_encoder
+from .                 import api_v1_router
+from typing            import List, Optional
+from Settings          import IOT_SETTINGS
+from ..Models          import FleetResponse, FleetChangesResponse, FleetStatsResponse, FleetSortField, SortOrder, SimStatus
+from ..Libs            import iot_service, fleet_changes
 
 @api_v1_router.get("/fleet", response_model=List[FleetResponse])
 async def get_fleet_overview(
     risk_level: Optional[str] = Query(None, description="Risk seviyesi filtresi: green, orange, red"),
-    has_roaming: Optional[bool] = Query(None, description="Roaming kullanımı filtresi")
+    has_roaming: Optional[bool] = Query(None, description="Roaming kullanımı filtresi"),
+    status: Optional[SimStatus] = Query(None, description="SIM durumu filtresi"),
+    city: Optional[str] = Query(None, description="Şehir filtresi"),
+    has_anomalies: Optional[bool] = Query(None, description="Anomalisi olan SIM'ler"),
+    search: Optional[str] = Query(None, max_length=64, description="SIM ID ya da cihaz tipi ön eki"),
+    sort: FleetSortField = Query(FleetSortField.RISK_SCORE, description="Sıralama alanı"),
+    order: SortOrder = Query(SortOrder.DESC, description="Sıralama yönü"),
+    limit: int = Query(IOT_SETTINGS["FLEET"]["PAGE_SIZE"], ge=1, le=IOT_SETTINGS["FLEET"]["MAX_PAGE_SIZE"], description="Sayfa boyutu"),
+    cursor: Optional[str] = Query(None, description="Önceki yanıtın X-Next-Cursor başlığı"),
+    fields: Optional[str] = Query(None, description="Virgülle ayrılmış alanlar (ör. sim_id,risk_score,status)")
 ):
     """
-    IoT SIM filosunun genel görünümünü döndürür
+    IoT SIM filosunun genel görünümünü sayfa sayfa döndürür
+
+    Sonraki sayfanın imleci `X-Next-Cursor`, filtreye uyan toplam SIM sayısı `X-Total-Count`, /fleet/changes
+    için başlangıç filigranı `X-Fleet-Watermark` başlığındadır.
     """
     try:
-        if risk_level or has_roaming is not None:
-            sims = await iot_service.get_filtered_sims(risk_level, has_roaming)
-        else:
-            sims = await iot_service.get_fleet_overview()
+        field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        filters = {
+            "risk_level": risk_level,
+            "has_roaming": has_roaming,
+            "status": status.value if status else None,
+            "city": city,
+            "has_anomalies": has_anomalies,
+            "search": search or None
+        }
+        
+        # Filigran sayfadan önce okunur: okuma sırasında değişenler sonraki delta'da tekrar gelir
+        watermark = await fleet_changes.watermark()
+        sims, next_cursor = await iot_service.get_fleet_page(
+            filters, sort.value, order.value, limit, cursor, field_list
+        )
+        total = await iot_service.count_fleet(filters)
         
-        return sims
+        headers = {"X-Total-Count": str(total), "X-Fleet-Watermark": str(watermark)}
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        
+        return JSONResponse(content=jsonable_encoder(sims), headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Filo verileri alınamadı: {str(e)}")
+
+@api_v1_router.get("/fleet/stats", response_model=FleetStatsResponse)
+async def get_fleet_stats():
+    """
+    Filonun tamamı için toplam, aktif, yüksek riskli SIM ve anomali sayıları ile şehir listesi
+    """
+    try:
+        return FleetStatsResponse(**await iot_service.get_fleet_stats())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Filo istatistikleri alınamadı: {str(e)}")
+
+@api_v1_router.get("/fleet/changes", response_model=FleetChangesResponse)
+async def get_fleet_changes(
+    since: int = Query(0, ge=0, description="Önceki yanıtın filigranı (watermark / X-Fleet-Watermark)"),
+    limit: int = Query(IOT_SETTINGS["FLEET"]["MAX_PAGE_SIZE"], ge=1, le=IOT_SETTINGS["FLEET"]["MAX_PAGE_SIZE"], description="En fazla SIM")
+):
+    """
+    Filigrandan sonra risk skoru, durumu, anomali sayısı ya da son görülmesi değişen SIM'leri döndürür
+    """
+    try:
+        changes, watermark, has_more, reset = await iot_service.get_fleet_changes(since, limit)
+        
+        return FleetChangesResponse(
+            since=since,
+            watermark=watermark,
+            has_more=has_more,
+            reset=reset,
+            changes=changes
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Filo değişiklikleri alınamadı: {str(e)}")
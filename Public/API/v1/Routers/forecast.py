@@ -0,0 +1,75 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from fastapi  import HTTPException
+from datetime import datetime
+from .        import api_v1_router
+from ..Models import ForecastResponse, PlanCostBand
+from ..Libs   import iot_service, cost_simulator, usage_forecaster, catalog_index
+
+@api_v1_router.get("/forecast/{sim_id}", response_model=ForecastResponse)
+async def get_usage_forecast(sim_id: str):
+    """
+    Ay sonu kullanımını Monte Carlo ile tahmin eder ve aynı APN'deki planlar için P50/P90/P99 maliyet döndürür
+    """
+    try:
+        sim = await iot_service.get_sim_by_id(sim_id)
+        if not sim:
+            raise HTTPException(status_code=404, detail="SIM bulunamadı")
+        
+        current_plan = await iot_service.get_plan_by_id(sim.plan_id)
+        if not current_plan:
+            raise HTTPException(status_code=404, detail="Mevcut plan bulunamadı")
+        
+        # Tek günlük özet okuması iki pencereyi de kapsar: dağılım son HISTORY_DAYS tamamlanan günden,
+        # şu ana kadarki kullanım ay başından (bugün dahil)
+        now = datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        month_start = today.replace(day=1)
+        days = max(usage_forecaster.history_days + 1, (now - month_start).days + 1)
+        usage_data = await iot_service.get_sim_usage(sim_id, days, resolution="day")
+        available_plans = await iot_service.get_available_plans(current_plan.apn)
+        plans = [current_plan] + [plan for plan in available_plans if plan.plan_id != current_plan.plan_id]
+        
+        history = [usage.mb_used for usage in usage_data if usage.timestamp < today][-usage_forecaster.history_days:]
+        used_so_far = sum(usage.mb_used for usage in usage_data if usage.timestamp >= month_start)
+        remaining_days = cost_simulator.remaining_days(now)
+        usage_bands, cost_bands, overage_probability = usage_forecaster.forecast_fleet(
+            [history], [used_so_far], remaining_days, plans
+        )
+        
+        labels = [f"p{percentile}" for percentile in usage_forecaster.percentiles]
+        risk_column = usage_forecaster.percentiles.index(usage_forecaster.risk_percentile)
+        
+        # Aşım riskini hesaba katmak için planlar risk yüzdeliğindeki maliyete göre sıralanır
+        bands = sorted(
+            (
+                PlanCostBand(
+                    plan_id=plan.plan_id,
+                    plan_name=plan.plan_name,
+                    is_current=index == 0,
+                    costs=dict(zip(labels, cost_bands[0, index].tolist())),
+                    overage_probability=float(overage_probability[0, index])
+                )
+                for index, plan in enumerate(plans)
+            ),
+            key=lambda band: band.costs[labels[risk_column]]
+        )
+        
+        # Risk yüzdeliğindeki kullanımı aşımsız karşılayan en ucuz plan
+        covering_plan = catalog_index.cheapest_covering_plan(current_plan.apn, float(usage_bands[0, risk_column]))
+        
+        return ForecastResponse(
+            sim_id=sim_id,
+            remaining_days=remaining_days,
+            paths=usage_forecaster.paths,
+            used_so_far=used_so_far,
+            usage=dict(zip(labels, usage_bands[0].tolist())),
+            plans=bands,
+            recommended_plan_id=bands[0].plan_id if usage_data else None,
+            covering_plan_id=covering_plan.plan_id if covering_plan else None
+        )
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Kullanım tahmini yapılamadı: {str(e)}")
@@ -0,0 +1,240 @@
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+from fastapi           import HTTPException, Query
+from fastapi.responses import StreamingResponse
+from .                 import api_v1_router, manager
+from CLI               import konsol
+from datetime          import datetime
+from collections       import OrderedDict
+from typing            import List
+from Settings          import IOT_SETTINGS
+from ..Models          import SavingsReportRequest, SavingsReportStatus, SavingsGroup, AlertMessage, RiskLevel
+from ..Libs            import iot_service, cost_simulator, task_executor, catalog_index
+import numpy as np
+import asyncio
+import uuid
+import json
+import csv
+import io
+
+# Tasarruf raporu işleri (en yeniler sonda)
+savings_jobs: "OrderedDict[str, SavingsReportStatus]" = OrderedDict()
+_savings_tasks = set()
+
+RESULT_FIELDS = [
+    "sim_id", "customer_id", "apn", "city", "device_type", "current_plan_id", "used_mb", "forecast_mb",
+    "current_total", "best_total", "saving", "best_option", "target_plan_id", "addon_id"
+]
+GROUP_FIELDS = ("customer_id", "apn", "city", "device_type")
+
+@api_v1_router.post("/reports/savings", response_model=SavingsReportStatus, status_code=202)
+async def start_savings_report(request: SavingsReportRequest):
+    """
+    Filonun tamamı ya da filtrelenen kısmı için "en iyi seçeneğe geçilirse tasarruf" raporunu arka planda hesaplar
+    """
+    try:
+        query = iot_service.build_sim_query(**request.model_dump())
+        total_sims = await iot_service.count_sims(query)
+        
+        job = SavingsReportStatus(
+            job_id=str(uuid.uuid4()),
+            status="running",
+            total_sims=total_sims,
+            started_at=datetime.now()
+        )
+        savings_jobs[job.job_id] = job
+        
+        # Eski raporların sonuçları da silinir
+        results_collection = iot_service.db.get_collection("savings_results")
+        while len(savings_jobs) > IOT_SETTINGS["SAVINGS_REPORT"]["MAX_JOBS"]:
+            old_job_id, _ = savings_jobs.popitem(last=False)
+            await results_collection.delete_many({"job_id": old_job_id})
+        
+        task = asyncio.create_task(_run_savings_report(job, query))
+        _savings_tasks.add(task)
+        task.add_done_callback(_savings_tasks.discard)
+        
+        return job
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tasarruf raporu başlatılamadı: {str(e)}")
+
+@api_v1_router.get("/reports/savings/{job_id}", response_model=SavingsReportStatus)
+async def get_savings_report_status(job_id: str):
+    """
+    Tasarruf raporunun ilerlemesini, anlık hızını ve toplamlarını döndürür
+    """
+    job = savings_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rapor işi bulunamadı")
+    
+    return job
+
+@api_v1_router.get("/reports/savings/{job_id}/summary", response_model=List[SavingsGroup])
+async def get_savings_report_summary(
+    job_id: str,
+    by: str = Query("customer_id", pattern="^(customer_id|apn|city|device_type)$", description="Gruplama alanı")
+):
+    """
+    Rapor sonuçlarını müşteri, APN, şehir ya da cihaz tipine göre toplar (en çok tasarruf önce)
+    """
+    if job_id not in savings_jobs:
+        raise HTTPException(status_code=404, detail="Rapor işi bulunamadı")
+    
+    try:
+        collection = iot_service.db.get_collection("savings_results")
+        pipeline = [
+            {"$match": {"job_id": job_id}},
+            {"$group": {
+                "_id": f"${by}",
+                "sims": {"$sum": 1},
+                "sims_with_saving": {"$sum": {"$cond": [{"$gt": ["$saving", 0]}, 1, 0]}},
+                "current_total": {"$sum": "$current_total"},
+                "best_total": {"$sum": "$best_total"},
+                "saving": {"$sum": "$saving"}
+            }},
+            {"$sort": {"saving": -1, "_id": 1}}
+        ]
+        
+        return [
+            SavingsGroup(key=group_doc.pop("_id"), **group_doc)
+            async for group_doc in await collection.aggregate(pipeline, allowDiskUse=True)
+        ]
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rapor özeti alınamadı: {str(e)}")
+
+@api_v1_router.get("/reports/savings/{job_id}/results")
+async def download_savings_report(
+    job_id: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="İndirme biçimi")
+):
+    """
+    SIM başına rapor satırlarını NDJSON ya da CSV olarak akıtır (iş sürerken o ana kadarki satırlar)
+    """
+    if job_id not in savings_jobs:
+        raise HTTPException(status_code=404, detail="Rapor işi bulunamadı")
+    
+    collection = iot_service.db.get_collection("savings_results")
+    cursor = collection.find({"job_id": job_id}, {"_id": 0, "job_id": 0}).sort("sim_id", 1).batch_size(1000)
+    
+    async def ndjson_rows():
+        async for result_doc in cursor:
+            yield json.dumps(result_doc, ensure_ascii=False) + "\n"
+    
+    async def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        async for result_doc in cursor:
+            writer.writerow(result_doc)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        csv_rows() if format == "csv" else ndjson_rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="savings-{job_id}.{format}"'}
+    )
+
+async def _run_savings_report(job: SavingsReportStatus, query: dict):
+    """
+    SIM'leri parça parça filo maliyet matrisinden geçirir, sonuçları `savings_results`a yazar
+    """
+    try:
+        # Katalog iş başına bir kez sabitlenir
+        await catalog_index.ensure()
+        plans = list(catalog_index.plans.values())
+        addons = list(catalog_index.addons.values())
+        plan_positions = {plan.plan_id: index for index, plan in enumerate(plans)}
+        
+        chunk_size = IOT_SETTINGS["SAVINGS_REPORT"]["CHUNK_SIZE"]
+        projection = {"_id": 0, "sim_id": 1, "plan_id": 1, **{field: 1 for field in GROUP_FIELDS}}
+        
+        async for sim_docs in iot_service.iter_sim_chunks(query, chunk_size, projection):
+            await _report_chunk(job, sim_docs, plans, addons, plan_positions)
+            
+            job.processed_sims += len(sim_docs)
+            elapsed = (datetime.now() - job.started_at).total_seconds()
+            job.sims_per_second = round(job.processed_sims / elapsed, 1) if elapsed else 0.0
+        
+        job.status = "completed"
+    
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        konsol.log(f"❌ [red]Tasarruf raporu hatası:[/] {e}")
+    
+    job.finished_at = datetime.now()
+    job.duration_seconds = round((job.finished_at - job.started_at).total_seconds(), 2)
+    
+    summary = AlertMessage(
+        type="savings_report_completed",
+        sim_id="multiple",
+        message=f"{job.processed_sims} SIM için tasarruf raporu hazır: ₺{job.total_saving:.2f}",
+        severity=RiskLevel.GREEN,
+        timestamp=datetime.now(),
+        job_id=job.job_id,
+        processed=job.processed_sims,
+        total=job.total_sims
+    )
+    await manager.broadcast(summary.model_dump_json())
+
+async def _report_chunk(job: SavingsReportStatus, sim_docs: list, plans: list, addons: list, plan_positions: dict):
+    """
+    Bir SIM parçası için tek aggregation, tek maliyet matrisi ve tek insert_many
+    """
+    daily_usage, today_usage = await iot_service.get_fleet_daily_usage([doc["sim_id"] for doc in sim_docs], 30)
+    
+    # Planı katalogda olmayan ya da kullanımı olmayan SIM'ler (best-options'ta "Yetersiz veri") atlanır
+    reportable = [doc for doc in sim_docs if doc.get("plan_id") in plan_positions and doc["sim_id"] in daily_usage]
+    job.skipped_sims += len(sim_docs) - len(reportable)
+    if not reportable:
+        return
+    
+    forecast_mb, used_so_far = cost_simulator.forecast_fleet_usage(
+        [daily_usage[doc["sim_id"]] for doc in reportable], [today_usage[doc["sim_id"]] for doc in reportable]
+    )
+    current = np.array([plan_positions[doc["plan_id"]] for doc in reportable], dtype=np.int64)
+    winners, best_totals, current_totals = await task_executor.run(
+        cost_simulator.rank_fleet, used_so_far + forecast_mb, current, plans, addons, 1
+    )
+    
+    result_docs = []
+    rows = zip(reportable, winners[:, 0].tolist(), best_totals[:, 0].tolist(), current_totals.tolist(), used_so_far.tolist(), forecast_mb.tolist())
+    for sim_doc, column, best_total, current_total, used_mb, sim_forecast in rows:
+        if column < len(plans):
+            target = plans[column]
+            best_option = "Mevcut Plan" if target.plan_id == sim_doc["plan_id"] else f"Plan değişikliği: {target.plan_name}"
+            target_plan_id, addon_id = target.plan_id, None
+        else:
+            addon = addons[column - len(plans)]
+            best_option = f"Ek paket: {addon.name}"
+            target_plan_id, addon_id = sim_doc["plan_id"], addon.addon_id
+        
+        saving = current_total - best_total
+        result_docs.append({
+            "job_id": job.job_id,
+            **{field: sim_doc.get(field) for field in ("sim_id", *GROUP_FIELDS)},
+            "current_plan_id": sim_doc["plan_id"],
+            "used_mb": used_mb,
+            "forecast_mb": sim_forecast,
+            "current_total": current_total,
+            "best_total": best_total,
+            "saving": saving,
+            "best_option": best_option,
+            "target_plan_id": target_plan_id,
+            "addon_id": addon_id
+        })
+        
+        job.current_total += current_total
+        job.best_total += best_total
+        job.total_saving += saving
+        if saving > 0:
+            job.sims_with_saving += 1
+    
+    await iot_service.db.get_collection("savings_results").insert_many(result_docs, ordered=False)
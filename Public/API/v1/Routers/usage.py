@@ -1,21 +1,40 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
 from fastapi  import HTTPException, Query
-from .        import api_v1_router
-from typing   import List
-from ..Models import UsageResponse
-from ..Libs   import iot_service
+from .        import api_v1_router, manager
+from typing   import List, Optional
+from datetime import datetime
+from ..Models import UsageResponse, UsageIngestRequest, UsageIngestResponse, Usage, AnomalyResponse, AnomalyDetail, AlertMessage, RiskLevel
+from ..Libs   import iot_service, anomaly_detector, usage_rollups
 
 
 @api_v1_router.get("/usage/{sim_id}", response_model=List[UsageResponse])
 async def get_sim_usage(
     sim_id: str,
-    days: int = Query(30, ge=1, le=90, description="Kaç günlük veri")
+    days: int = Query(30, ge=1, le=90, description="Kaç günlük veri"),
+    resolution: str = Query("raw", pattern="^(auto|raw|hour|day|week|month)$", description="Ham kayıt ya da dönem özeti (auto: aralığı karşılayan en kaba özet)")
 ):
     """
-    Belirtilen SIM'in kullanım geçmişini döndürür
+    Belirtilen SIM'in kullanım geçmişini döndürür (varsayılan: ham kayıtlar)
     """
     try:
+        if resolution != "raw":
+            rollups = await iot_service.get_usage_rollups(sim_id, days, resolution)
+            if rollups:
+                return [
+                    UsageResponse(
+                        timestamp=rollup.bucket,
+                        mb_used=rollup.mb_used,
+                        roaming_mb=rollup.roaming_mb,
+                        max_mb=rollup.max_mb,
+                        count=rollup.count,
+                        first_at=rollup.first_at,
+                        last_at=rollup.last_at
+                    )
+                    for rollup in rollups
+                ]
+        
+        # Özeti olmayan SIM'ler için ham kayıtlar
         usage_data = await iot_service.get_sim_usage(sim_id, days)
         
         if not usage_data:
@@ -35,3 +54,92 @@ async def get_sim_usage(
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Kullanım verileri alınamadı: {str(e)}")
+
+
+@api_v1_router.post("/usage/{sim_id}", response_model=UsageIngestResponse, status_code=201)
+async def ingest_sim_usage(sim_id: str, request: UsageIngestRequest):
+    """
+    Yeni kullanım kaydını alır ve SIM'in dedektör durumuyla anında skorlar
+    """
+    try:
+        sim = await iot_service.get_sim_by_id(sim_id)
+        if not sim:
+            raise HTTPException(status_code=404, detail="SIM bulunamadı")
+        
+        device_profile = await iot_service.get_device_profile(sim.device_type)
+        if not device_profile:
+            raise HTTPException(status_code=404, detail="Cihaz profili bulunamadı")
+        
+        usage = Usage(
+            sim_id=sim_id,
+            timestamp=request.timestamp or datetime.now(),
+            mb_used=request.mb_used,
+            roaming_mb=request.roaming_mb
+        )
+        anomalies, risk_score, quota_projection = await iot_service.ingest_usage(usage, device_profile)
+        risk_level = anomaly_detector.get_risk_level(risk_score)
+        
+        # WebSocket ile canlı uyarı gönder
+        if anomalies:
+            latest_anomaly = anomalies[-1]
+            alert = AlertMessage(
+                type="anomaly_detected",
+                sim_id=sim_id,
+                message=f"{len(anomalies)} yeni anomali tespit edildi",
+                severity=risk_level,
+                timestamp=datetime.now(),
+                risk_score=risk_score,
+                new_anomaly_count=len(anomalies),
+                latest_anomaly=AnomalyDetail(
+                    type=latest_anomaly.type.value,
+                    reason=latest_anomaly.reason,
+                    evidence=latest_anomaly.evidence
+                )
+            )
+            await manager.broadcast(alert.model_dump_json())
+        
+        # Kota dönem bitmeden dolacaksa erken uyarı
+        if quota_projection:
+            alert = AlertMessage(
+                type="quota_projection",
+                sim_id=sim_id,
+                message=(
+                    f"Kota {quota_projection.quota_at:%d.%m %H:%M} civarında dolacak "
+                    f"({quota_projection.burn_rate_mb_per_day:.0f} MB/gün, dönem sonu tahmini "
+                    f"{quota_projection.projected_mb:.0f}/{quota_projection.allowance_mb:.0f} MB)"
+                ),
+                severity=RiskLevel.ORANGE,
+                timestamp=datetime.now(),
+                quota_projection=quota_projection
+            )
+            await manager.broadcast(alert.model_dump_json())
+        
+        return UsageIngestResponse(
+            sim_id=sim_id,
+            anomalies=[
+                AnomalyResponse(
+                    type=anomaly.type.value,
+                    detected_at=anomaly.detected_at,
+                    reason=anomaly.reason,
+                    evidence=anomaly.evidence
+                )
+                for anomaly in anomalies
+            ],
+            risk_score=risk_score,
+            risk_level=risk_level
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Kullanım kaydı işlenemedi: {str(e)}")
+
+
+@api_v1_router.post("/usage-rollups/rebuild")
+async def rebuild_usage_rollups(since: Optional[datetime] = Query(None, description="Bu andan itibaren dokunulan dönemler")):
+    """
+    Kullanım özetlerini ham kayıtlardan yeniden hesaplar
+    """
+    try:
+        return {"resolutions": await usage_rollups.rebuild(since)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Kullanım özetleri hesaplanamadı: {str(e)}")
\ No newline at end of file
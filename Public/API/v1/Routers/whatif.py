@@ -1,17 +1,231 @@
 # Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
 
-from fastapi  import HTTPException
-from .        import api_v1_router
-from ..Models import WhatIfResponse, WhatIfRequest, AddOnPack, CostBreakdown
-from ..Libs   import iot_service, cost_simulator
+from fastapi          import HTTPException
+from fastapi.encoders import jsonable_encoder
+from .                import api_v1_router
+from Settings         import IOT_SETTINGS
+from ..Models         import WhatIfResponse, WhatIfRequest, CostBreakdown, WhatIfSweepRequest, WhatIfSweepResponse, AnalyzeBatchRequest, WhatIfBatchRequest, WhatIfBatchItem, WhatIfBatchResponse
+from ..Libs           import iot_service, cost_simulator, task_executor, cost_cache
+import numpy as np
+
+# Senaryo bazlı öneriler
+SCENARIO_RECOMMENDATIONS = {
+    "increase_20": [
+        "Kullanım artışına karşı plan yükseltmeyi değerlendirin",
+        "Uyarı limitleri ayarlayın"
+    ],
+    "decrease_30": [
+        "Daha düşük kotaya sahip plana geçiş yapabilirsiniz",
+        "Tasarruf edilen bütçeyi ek özelliklerde kullanabilirsiniz"
+    ],
+    "spike_day": [
+        "Ani artışlara karşı acil durum planı hazırlayın",
+        "Otomatik dondurma limitleri belirleyin"
+    ],
+    "roaming_week": [
+        "Roaming öncesi yerel veri paketi satın alın",
+        "Roaming kullanımını sınırlandırın"
+    ]
+}
+
+# /whatif/{sim_id}'den önce tanımlanmalı, yoksa "batch" SIM kimliği olarak eşleşir
+@api_v1_router.post("/whatif/batch", response_model=WhatIfBatchResponse)
+async def simulate_costs_batch(request: WhatIfBatchRequest):
+    """
+    Çok sayıda SIM için tek hedef plan, ek paket seti ya da senaryoyu tek istekte simüle eder
+    """
+    try:
+        settings = IOT_SETTINGS["WHATIF_BATCH"]
+        query = iot_service.build_sim_query(**request.model_dump(include=set(AnalyzeBatchRequest.model_fields)))
+        total_sims = await iot_service.count_sims(query)
+        if total_sims > settings["MAX_SIMS"]:
+            raise HTTPException(status_code=400, detail=f"En fazla {settings['MAX_SIMS']} SIM simüle edilebilir ({total_sims})")
+        
+        target_plan = None
+        if request.plan_id and not request.scenario:
+            target_plan = await iot_service.get_plan_by_id(request.plan_id)
+            if not target_plan:
+                raise HTTPException(status_code=404, detail="Hedef plan bulunamadı")
+        
+        addons = await iot_service.get_addons_by_ids(request.addons) if request.addons and not request.scenario else []
+        
+        if request.scenario:
+            description = f"Senaryo: {request.scenario}"
+        elif target_plan:
+            description = f"Plan değişikliği: {target_plan.plan_name}"
+        elif addons:
+            description = f"Ek paket: {', '.join(addon.name for addon in addons)}"
+        else:
+            description = "Değişiklik yok"
+        
+        results, skipped_sim_ids = [], []
+        plan_lookup = {}
+        projection = {"_id": 0, "sim_id": 1, "plan_id": 1}
+        
+        async for sim_docs in iot_service.iter_sim_chunks(query, settings["CHUNK_SIZE"], projection):
+            daily_usage, today_usage = await iot_service.get_fleet_daily_usage([doc["sim_id"] for doc in sim_docs], 30)
+            for plan_id in {doc["plan_id"] for doc in sim_docs} - set(plan_lookup):
+                plan_lookup[plan_id] = await iot_service.get_plan_by_id(plan_id)
+            
+            # Senaryolar kullanımsız SIM'de de çalışır; plan/ek paket simülasyonu veri ister (tekil uçta "Yetersiz veri")
+            simulable = [
+                doc for doc in sim_docs
+                if plan_lookup[doc["plan_id"]] and (request.scenario or doc["sim_id"] in daily_usage)
+            ]
+            simulable_ids = {doc["sim_id"] for doc in simulable}
+            skipped_sim_ids += [doc["sim_id"] for doc in sim_docs if doc["sim_id"] not in simulable_ids]
+            if not simulable:
+                continue
+            
+            current_plans = [plan_lookup[doc["plan_id"]] for doc in simulable]
+            histories = [daily_usage.get(doc["sim_id"], []) for doc in simulable]
+            todays = [today_usage.get(doc["sim_id"], 0.0) for doc in simulable]
+            
+            if request.scenario:
+                price = np.array([plan.monthly_price for plan in current_plans])
+                _, cost_change = cost_simulator.scenario_cost_change(
+                    request.scenario, np.array([sum(days) + today for days, today in zip(histories, todays)], dtype=np.float64),
+                    np.array([plan.overage_per_mb for plan in current_plans])
+                )
+                columns = {
+                    "current_total": price,
+                    "candidate_total": price + cost_change,
+                    "saving": -cost_change,
+                    "base_cost": price,
+                    "overage_cost": np.maximum(0, cost_change),
+                    "addon_cost": np.zeros(len(price))
+                }
+            else:
+                forecast_mb, used_so_far = cost_simulator.forecast_fleet_usage(histories, todays)
+                columns = cost_simulator.simulate_fleet(forecast_mb, used_so_far, current_plans, target_plan, addons)
+            
+            columns = {name: values.tolist() for name, values in columns.items()}
+            for index, sim_doc in enumerate(simulable):
+                results.append(WhatIfBatchItem(
+                    sim_id=sim_doc["sim_id"],
+                    current_plan_id=sim_doc["plan_id"],
+                    **{name: values[index] for name, values in columns.items()}
+                ))
+        
+        current_total = sum(item.current_total for item in results)
+        candidate_total = sum(item.candidate_total for item in results)
+        
+        return WhatIfBatchResponse(
+            description=description,
+            total_sims=total_sims,
+            simulated_sims=len(results),
+            skipped_sim_ids=skipped_sim_ids,
+            current_total=current_total,
+            candidate_total=candidate_total,
+            saving=current_total - candidate_total,
+            results=results
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Toplu maliyet simülasyonu yapılamadı: {str(e)}")
 
 @api_v1_router.post("/whatif/{sim_id}", response_model=WhatIfResponse)
 async def simulate_costs(sim_id: str, request: WhatIfRequest):
     """
     Maliyet simülasyonu yapar (What-If analizi)
+
+    Sonuç yeni kullanım ya da katalog değişikliği olana kadar önbellekten döner.
+    """
+    try:
+        cache_params = request.model_dump()
+        cached, watermark = await cost_cache.get(sim_id, "whatif", cache_params)
+        if cached is not None:
+            return cached
+        
+        result = jsonable_encoder(await _simulate_costs(sim_id, request))
+        await cost_cache.set(sim_id, "whatif", cache_params, watermark, result)
+        
+        return result
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Maliyet simülasyonu yapılamadı: {str(e)}")
+
+async def _simulate_costs(sim_id: str, request: WhatIfRequest) -> WhatIfResponse:
+    """
+    Tek SIM için senaryo ya da plan / ek paket simülasyonu
+    """
+    # SIM ve plan bilgilerini al
+    sim = await iot_service.get_sim_by_id(sim_id)
+    if not sim:
+        raise HTTPException(status_code=404, detail="SIM bulunamadı")
+    
+    current_plan = await iot_service.get_plan_by_id(sim.plan_id)
+    if not current_plan:
+        raise HTTPException(status_code=404, detail="Mevcut plan bulunamadı")
+    
+    # Kullanım verilerini al (günlük özetler)
+    usage_data = await iot_service.get_sim_usage(sim_id, 30, resolution="day")
+    current_monthly = sum(u.mb_used for u in usage_data)
+    
+    # Senaryo varsa özel simülasyon yap
+    if request.scenario:
+        duration_days = request.parameters.get('duration_days', 30)
+        
+        projected_monthly, cost_change = cost_simulator.scenario_cost_change(
+            request.scenario, current_monthly, current_plan.overage_per_mb
+        )
+        recommendations = SCENARIO_RECOMMENDATIONS.get(request.scenario, [])
+        
+        # Risk değişimi hesapla
+        risk_change = 0
+        if cost_change > current_plan.monthly_price * 0.5:
+            risk_change = 2
+        elif cost_change > current_plan.monthly_price * 0.2:
+            risk_change = 1
+        elif cost_change < 0:
+            risk_change = -1
+        
+        return WhatIfResponse(
+            current_total=current_plan.monthly_price,
+            candidate_total=current_plan.monthly_price + cost_change,
+            saving=-cost_change,
+            breakdown=CostBreakdown(
+                base_cost=current_plan.monthly_price,
+                overage_cost=max(0, cost_change),
+                addon_cost=0.0,
+                total_cost=current_plan.monthly_price + max(0, cost_change)
+            ),
+            description=f"Senaryo: {request.scenario}",
+            current_monthly=current_plan.monthly_price,
+            projected_monthly=current_plan.monthly_price + cost_change,
+            cost_change=cost_change,
+            risk_change=risk_change,
+            recommendations=recommendations
+        )
+    
+    # Normal plan/addon simülasyonu (eski kod)
+    # Hedef plan
+    target_plan = None
+    if request.plan_id:
+        target_plan = await iot_service.get_plan_by_id(request.plan_id)
+        if not target_plan:
+            raise HTTPException(status_code=404, detail="Hedef plan bulunamadı")
+    
+    # Ek paketler
+    addons = await iot_service.get_addons_by_ids(request.addons) if request.addons else []
+    
+    # Simülasyon yap
+    result = await task_executor.run(
+        cost_simulator.simulate_costs, sim_id, usage_data, current_plan, target_plan, addons
+    )
+    
+    return result
+
+@api_v1_router.post("/whatif/{sim_id}/sweep", response_model=WhatIfSweepResponse)
+async def sweep_scenarios(sim_id: str, request: WhatIfSweepRequest):
+    """
+    Büyüme × spike günü × roaming günü ızgarasını aday planlara karşı tek istekte hesaplar
     """
     try:
-        # SIM ve plan bilgilerini al
         sim = await iot_service.get_sim_by_id(sim_id)
         if not sim:
             raise HTTPException(status_code=404, detail="SIM bulunamadı")
@@ -20,112 +234,41 @@ async def simulate_costs(sim_id: str, request: WhatIfRequest):
         if not current_plan:
             raise HTTPException(status_code=404, detail="Mevcut plan bulunamadı")
         
-        # Kullanım verilerini al
-        usage_data = await iot_service.get_sim_usage(sim_id, 30)
-        current_monthly = sum(u.mb_used for u in usage_data)
+        # Aday planlar: istenenler ya da APN'deki tümü (mevcut plan her zaman ilk sırada)
+        available_plans = await iot_service.get_available_plans(current_plan.apn)
+        if request.plan_ids:
+            available_plans = [plan for plan in available_plans if plan.plan_id in request.plan_ids]
+        plans = [current_plan] + [plan for plan in available_plans if plan.plan_id != current_plan.plan_id]
         
-        # Senaryo varsa özel simülasyon yap
-        if request.scenario:
-            duration_days = request.parameters.get('duration_days', 30)
-            
-            if request.scenario == 'increase_20':
-                # %20 artış senaryosu
-                projected_monthly = current_monthly * 1.2
-                cost_change = (projected_monthly - current_monthly) * current_plan.overage_per_mb
-                recommendations = [
-                    "Kullanım artışına karşı plan yükseltmeyi değerlendirin",
-                    "Uyarı limitleri ayarlayın"
-                ]
-                
-            elif request.scenario == 'decrease_30':
-                # %30 azalış senaryosu  
-                projected_monthly = current_monthly * 0.7
-                cost_change = (projected_monthly - current_monthly) * current_plan.overage_per_mb
-                recommendations = [
-                    "Daha düşük kotaya sahip plana geçiş yapabilirsiniz",
-                    "Tasarruf edilen bütçeyi ek özelliklerde kullanabilirsiniz"
-                ]
-                
-            elif request.scenario == 'spike_day':
-                # Günlük ani artış senaryosu
-                daily_avg = current_monthly / 30
-                spike_usage = daily_avg * 10  # 10x artış
-                projected_monthly = current_monthly + spike_usage
-                cost_change = spike_usage * current_plan.overage_per_mb
-                recommendations = [
-                    "Ani artışlara karşı acil durum planı hazırlayın",
-                    "Otomatik dondurma limitleri belirleyin"
-                ]
-                
-            elif request.scenario == 'roaming_week':
-                # Haftalık roaming senaryosu
-                roaming_cost_per_mb = 2.5  # TL
-                weekly_usage = current_monthly / 4  # haftalık kullanım
-                cost_change = weekly_usage * roaming_cost_per_mb
-                projected_monthly = current_monthly
-                recommendations = [
-                    "Roaming öncesi yerel veri paketi satın alın",
-                    "Roaming kullanımını sınırlandırın"
-                ]
-                
-            else:
-                # Varsayılan senaryo
-                projected_monthly = current_monthly
-                cost_change = 0.0
-                recommendations = []
-            
-            # Risk değişimi hesapla
-            risk_change = 0
-            if cost_change > current_plan.monthly_price * 0.5:
-                risk_change = 2
-            elif cost_change > current_plan.monthly_price * 0.2:
-                risk_change = 1
-            elif cost_change < 0:
-                risk_change = -1
-            
-            return WhatIfResponse(
-                current_total=current_plan.monthly_price,
-                candidate_total=current_plan.monthly_price + cost_change,
-                saving=-cost_change,
-                breakdown=CostBreakdown(
-                    base_cost=current_plan.monthly_price,
-                    overage_cost=max(0, cost_change),
-                    addon_cost=0.0,
-                    total_cost=current_plan.monthly_price + max(0, cost_change)
-                ),
-                description=f"Senaryo: {request.scenario}",
-                current_monthly=current_plan.monthly_price,
-                projected_monthly=current_plan.monthly_price + cost_change,
-                cost_change=cost_change,
-                risk_change=risk_change,
-                recommendations=recommendations
+        try:
+            axes = cost_simulator.sweep_grid(
+                growth=request.growth.model_dump(),
+                spike_days=request.spike_days.model_dump(),
+                roaming_days=request.roaming_days.model_dump()
             )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
-        # Normal plan/addon simülasyonu (eski kod)
-        # Hedef plan
-        target_plan = None
-        if request.plan_id:
-            target_plan = await iot_service.get_plan_by_id(request.plan_id)
-            if not target_plan:
-                raise HTTPException(status_code=404, detail="Hedef plan bulunamadı")
+        usage_data = await iot_service.get_sim_usage(sim_id, 30, resolution="day")
+        current_monthly = sum(u.mb_used for u in usage_data)
         
-        # Ek paketler
-        addons = []
-        if request.addons:
-            for addon_id in request.addons:
-                addon_collection = iot_service.db.get_collection("add_on_packs")
-                addon_doc = await addon_collection.find_one({"addon_id": addon_id})
-                if addon_doc:
-                    addons.append(AddOnPack(**addon_doc))
-        
-        # Simülasyon yap
-        result = cost_simulator.simulate_costs(
-            sim_id, usage_data, current_plan, target_plan, addons
+        costs = await task_executor.run(
+            cost_simulator.sweep_scenarios, current_monthly, plans, axes["growth"], axes["spike_days"], axes["roaming_days"],
+            request.spike_multiplier, request.roaming_cost_per_mb
         )
         
-        return result
+        return WhatIfSweepResponse(
+            sim_id=sim_id,
+            current_plan_id=current_plan.plan_id,
+            current_monthly_mb=current_monthly,
+            axes={name: np.round(values, 4).tolist() for name, values in axes.items()},
+            plans=[{"plan_id": plan.plan_id, "plan_name": plan.plan_name} for plan in plans],
+            costs=np.round(costs, 2).tolist(),
+            best_plan=costs.argmin(axis=0).tolist(),
+            best_cost=np.round(costs.min(axis=0), 2).tolist()
+        )
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Maliyet simülasyonu yapılamadı: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Senaryo taraması yapılamadı: {str(e)}")
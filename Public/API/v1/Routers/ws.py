@@ -3,11 +3,15 @@
 from fastapi import WebSocket, WebSocketDisconnect
 from .       import api_v1_router, manager
 from CLI     import konsol
+from ..Libs  import fleet_delta_publisher
+import json
 
 @api_v1_router.websocket("/ws/alerts")
 async def websocket_alerts(websocket: WebSocket):
     """
     Canlı anomali uyarıları için WebSocket endpoint
+
+    `{"type": "subscribe", "channel": "fleet_delta"}` gönderen bağlantılar filo değişikliklerini de alır.
     """
     konsol.log("🔌 [cyan]WebSocket bağlantı isteği alındı[/]")
     await manager.connect(websocket)
@@ -18,6 +22,14 @@ async def websocket_alerts(websocket: WebSocket):
             # Bağlantıyı canlı tut
             message = await websocket.receive_text()
             konsol.log(f"📨 [yellow]WebSocket mesajı alındı:[/] {message}")
+            
+            try:
+                request = json.loads(message)
+            except ValueError:
+                continue
+            
+            if isinstance(request, dict) and request.get("type") == "subscribe" and request.get("channel") == "fleet_delta":
+                await fleet_delta_publisher.subscribe(websocket)
     except WebSocketDisconnect:
         konsol.log("🔌 [red]WebSocket bağlantısı kesildi[/]")
         manager.disconnect(websocket)
\ No newline at end of file
@@ -44,57 +44,26 @@ class AnalysisManager {
     btn.innerHTML = '🔄 Tüm SIM\'ler analiz ediliyor...';
     btn.disabled = true;
     
-    let successCount = 0;
-    let errorCount = 0;
-    const totalSims = this.dashboard.sims.length;
-    
-    this.dashboard.appendLog(`🚀 ${totalSims} SIM'in toplu analizi başlatıldı...`);
-    
     try {
-      // SIM'leri paralel olarak analiz et (maksimum 5'li gruplar halinde)
-      const batchSize = 5;
-      const batches = [];
+      // Tüm filo tek istekle sunucu tarafında analiz edilir
+      let job = await apiCall('/api/v1/analyze/batch', {
+        method: 'POST',
+        body: JSON.stringify({})
+      });
       
-      for (let i = 0; i < this.dashboard.sims.length; i += batchSize) {
-        batches.push(this.dashboard.sims.slice(i, i + batchSize));
-      }
+      this.dashboard.appendLog(`🚀 ${job.total_sims} SIM'in toplu analizi başlatıldı...`);
       
-      for (const batch of batches) {
-        const promises = batch.map(async (sim) => {
-          try {
-            await apiCall(`/api/v1/analyze/${encodeURIComponent(sim.sim_id)}`, {
-              method: 'POST'
-            });
-            successCount++;
-            
-            // Progress göster
-            const progress = Math.round(((successCount + errorCount) / totalSims) * 100);
-            btn.innerHTML = `🔄 İlerleme: ${progress}% (${successCount + errorCount}/${totalSims})`;
-            
-            return { success: true, sim_id: sim.sim_id };
-          } catch (error) {
-            errorCount++;
-            // Sadece kritik hatalar için log
-            if (error.message.includes('500')) {
-              console.error(`%c❌ ${sim.sim_id} analiz hatası:`, 'color: #e74c3c;', error.message);
-            }
-            return { success: false, sim_id: sim.sim_id, error: error.message };
-          }
-        });
-        
-        await Promise.all(promises);
-        
-        // Her batch arasında kısa bir bekleme
-        if (batches.indexOf(batch) < batches.length - 1) {
-          await new Promise(resolve => setTimeout(resolve, 1000));
-        }
+      while (job.status === 'running') {
+        this.updateBatchProgress(job.processed_sims, job.total_sims);
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = await apiCall(`/api/v1/analyze/batch/${encodeURIComponent(job.job_id)}`);
       }
       
       // Sonuç mesajı
-      if (errorCount === 0) {
-        this.dashboard.appendLog(`✅ Toplu analiz tamamlandı: ${successCount} SIM başarıyla analiz edildi`);
+      if (job.status === 'completed') {
+        this.dashboard.appendLog(`✅ Toplu analiz tamamlandı: ${job.processed_sims - job.skipped_sims} SIM analiz edildi, ${job.new_anomalies} yeni anomali (${job.duration_seconds} sn)`);
       } else {
-        this.dashboard.appendLog(`⚠️ Toplu analiz tamamlandı: ${successCount} başarılı, ${errorCount} hatalı`);
+        this.dashboard.appendLog(`⚠️ Toplu analiz tamamlanamadı: ${job.error || 'bilinmeyen hata'}`);
       }
       
       // Fleet data'yı yenile
@@ -113,6 +82,14 @@ class AnalysisManager {
     }
   }
   
+  updateBatchProgress(processed, total) {
+    const btn = this.dashboard.elements.analyzeAllBtn;
+    if (!btn.disabled || !total) return;
+    
+    const progress = Math.round((processed / total) * 100);
+    btn.innerHTML = `🔄 İlerleme: ${progress}% (${processed}/${total})`;
+  }
+  
   formatAnalysisLog(result) {
     const sim = this.dashboard.selectedSim;
     if (!sim || !result) return 'Analiz sonucu alınamadı';
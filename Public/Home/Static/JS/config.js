@@ -4,6 +4,12 @@ const WS_BASE = (location.protocol === 'https:' ? 'wss' : 'ws') + '://' + window
 
 // API call yardımcı fonksiyonu
 async function apiCall(path, options = {}) {
+  const { data } = await apiCallWithHeaders(path, options);
+  return data;
+}
+
+// Yanıt başlıklarını da döndüren API call (sayfalı uçlar için)
+async function apiCallWithHeaders(path, options = {}) {
   try {
     const response = await fetch(API_BASE + path, {
       headers: { 'Accept': 'application/json', 'Content-Type': 'application/json' },
@@ -14,7 +20,7 @@ async function apiCall(path, options = {}) {
       throw new Error(`HTTP ${response.status}: ${response.statusText}`);
     }
     
-    return await response.json();
+    return { data: await response.json(), headers: response.headers };
   } catch (error) {
     console.error(`API call failed for ${path}:`, error);
     throw error;
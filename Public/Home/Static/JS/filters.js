@@ -3,6 +3,7 @@ class FilterManager {
   constructor(dashboard) {
     this.dashboard = dashboard;
     this.activeStatFilter = null; // Aktif stat filtresini takip et
+    this.searchTimer = null;
   }
   
   clearStatFilter() {
@@ -15,51 +16,70 @@ class FilterManager {
     });
   }
   
-  filterAndRender() {
-    const searchTerm = this.dashboard.elements.searchInput.value.toLowerCase();
+  queryParams() {
+    // Aktif filtreler /fleet sorgu parametrelerine çevrilir; filtreleme sunucuda tüm filoda yapılır
+    const params = {};
+    const searchTerm = this.dashboard.elements.searchInput.value.trim();
     const riskFilter = this.dashboard.elements.riskFilter.value;
     const statusFilter = this.dashboard.elements.statusFilter.value;
     const cityFilter = this.dashboard.elements.cityFilter.value;
     
-    let filtered = [...this.dashboard.sims];
+    if (searchTerm) params.search = searchTerm;
+    if (riskFilter) params.risk_level = riskFilter;
+    if (statusFilter) params.status = statusFilter;
+    if (cityFilter) params.city = cityFilter;
     
-    // Önce stat filtresini uygula (varsa)
-    if (this.activeStatFilter) {
-      switch (this.activeStatFilter) {
-        case 'active':
-          filtered = filtered.filter(sim => sim.status === 'active');
-          break;
-        case 'high-risk':
-          filtered = filtered.filter(sim => (sim.risk_score || 0) >= 70);
-          break;
-        case 'anomaly':
-          filtered = filtered.filter(sim => (sim.anomaly_count || 0) > 0);
-          break;
-        // 'all' durumunda tüm SIM'ler gösterilir, ek filtre gerekmez
-      }
+    switch (this.activeStatFilter) {
+      case 'active':
+        params.status = 'active';
+        break;
+      case 'high-risk':
+        params.risk_level = 'red';
+        break;
+      case 'anomaly':
+        params.has_anomalies = 'true';
+        break;
     }
+    return params;
+  }
+  
+  matches(sim) {
+    // Sunucu filtresinin aynısı; yalnızca canlı değişikliklerle güncellenen satırlar için
+    const params = this.queryParams();
+    const riskScore = sim.risk_score || 0;
     
-    // Sonra diğer filtreleri uygula
-    filtered = filtered.filter(sim => {
-      const matchesSearch = !searchTerm || 
-        sim.sim_id.toLowerCase().includes(searchTerm) ||
-        (sim.device_type || '').toLowerCase().includes(searchTerm);
-      
-      const matchesRisk = !riskFilter || sim.risk_level === riskFilter || 
-        (riskFilter === 'red' && (sim.risk_score || 0) >= 70) ||
-        (riskFilter === 'orange' && (sim.risk_score || 0) >= 40 && (sim.risk_score || 0) < 70) ||
-        (riskFilter === 'green' && (sim.risk_score || 0) < 40);
-      
-      const matchesStatus = !statusFilter || sim.status === statusFilter;
-      const matchesCity = !cityFilter || sim.city === cityFilter;
-      
-      return matchesSearch && matchesRisk && matchesStatus && matchesCity;
-    });
-    
+    if (params.search) {
+      const term = params.search.toLowerCase();
+      const matchesSearch = sim.sim_id.startsWith(params.search) ||
+        (sim.device_type || '').toLowerCase().startsWith(term);
+      if (!matchesSearch) return false;
+    }
+    if (params.risk_level === 'red' && riskScore < 70) return false;
+    if (params.risk_level === 'orange' && (riskScore < 40 || riskScore >= 70)) return false;
+    if (params.risk_level === 'green' && riskScore >= 40) return false;
+    if (params.status && sim.status !== params.status) return false;
+    if (params.city && sim.city !== params.city) return false;
+    if (params.has_anomalies && (sim.anomaly_count || 0) <= 0) return false;
+    return true;
+  }
+  
+  applyFilters({ debounce = false } = {}) {
+    // Filtre değişince ilk sayfa sunucudan yeniden çekilir; aramada yazım bitene kadar beklenir
+    clearTimeout(this.searchTimer);
+    if (debounce) {
+      this.searchTimer = setTimeout(() => this.dashboard.fleetManager.loadFleetData({ reset: true }), 300);
+      return;
+    }
+    return this.dashboard.fleetManager.loadFleetData({ reset: true });
+  }
+  
+  filterAndRender() {
+    // Yüklü SIM'ler sunucuda filtrelenmiştir; canlı güncellemeyle filtreden çıkanlar gizlenir
+    const filtered = this.dashboard.sims.filter(sim => this.matches(sim));
     this.dashboard.fleetManager.renderFleet(filtered);
   }
   
-  applyStatFilter(filterType, clickedElement) {
+  async applyStatFilter(filterType, clickedElement) {
     // Önceki aktif istatistik kartını temizle
     document.querySelectorAll('.clickable-stat').forEach(stat => {
       stat.classList.remove('active');
@@ -68,8 +88,8 @@ class FilterManager {
     // Tıklanan kartı aktif yap
     clickedElement.classList.add('active');
     
-    // Aktif stat filtresini kaydet
-    this.activeStatFilter = filterType;
+    // Aktif stat filtresini kaydet ('all' seçildiğinde filtre temizlenir)
+    this.activeStatFilter = filterType === 'all' ? null : filterType;
     
     // Manuel filtreleri temizle (sadece stat filtresi aktif olacak)
     this.dashboard.elements.searchInput.value = '';
@@ -77,34 +97,16 @@ class FilterManager {
     this.dashboard.elements.statusFilter.value = '';
     this.dashboard.elements.cityFilter.value = '';
     
-    let filtered = [...this.dashboard.sims];
-    let logMessage = '';
-    
-    switch (filterType) {
-      case 'all':
-        this.activeStatFilter = null; // 'all' seçildiğinde filtreyi temizle
-        // Hiçbir filtre uygulamaya gerek yok
-        logMessage = '📊 Tüm SIM\'ler gösteriliyor';
-        break;
-        
-      case 'active':
-        filtered = this.dashboard.sims.filter(sim => sim.status === 'active');
-        logMessage = `🟢 ${filtered.length} aktif SIM gösteriliyor`;
-        break;
-        
-      case 'high-risk':
-        filtered = this.dashboard.sims.filter(sim => (sim.risk_score || 0) >= 70);
-        logMessage = `🔴 ${filtered.length} yüksek riskli SIM gösteriliyor`;
-        break;
-        
-      case 'anomaly':
-        filtered = this.dashboard.sims.filter(sim => (sim.anomaly_count || 0) > 0);
-        logMessage = `⚠️ ${filtered.length} anomalili SIM gösteriliyor`;
-        break;
-    }
+    await this.applyFilters();
     
-    this.dashboard.fleetManager.renderFleet(filtered);
-    this.dashboard.appendLog(logMessage);
+    const total = this.dashboard.fleetManager.totalSims;
+    const logMessages = {
+      'all': '📊 Tüm SIM\'ler gösteriliyor',
+      'active': `🟢 ${total} aktif SIM gösteriliyor`,
+      'high-risk': `🔴 ${total} yüksek riskli SIM gösteriliyor`,
+      'anomaly': `⚠️ ${total} anomalili SIM gösteriliyor`
+    };
+    this.dashboard.appendLog(logMessages[filterType]);
     
     // Eğer 'all' seçildiyse visual aktif durumu da kaldır
     if (filterType === 'all') {
@@ -2,9 +2,31 @@
 class FleetManager {
   constructor(dashboard) {
     this.dashboard = dashboard;
+    this.pageSize = 200;     // Sunucudaki FLEET.PAGE_SIZE ile aynı
+    this.maxPageSize = 1000; // Sunucudaki FLEET.MAX_PAGE_SIZE ile aynı
+    this.nextCursor = null;
+    this.totalSims = 0;
+    this.watermark = null;   // /fleet/changes filigranı
+    this.statsRequest = null;
   }
   
-  async loadFleetData() {
+  async fetchFleetPage(limit, cursor = null) {
+    const params = new URLSearchParams({ limit, ...this.dashboard.filterManager.queryParams() });
+    if (cursor) params.set('cursor', cursor);
+    
+    const { data, headers } = await apiCallWithHeaders(`/api/v1/fleet?${params}`);
+    const sims = Array.isArray(data) ? data : (data.sims || []);
+    const total = parseInt(headers.get('X-Total-Count'), 10);
+    
+    return {
+      sims,
+      nextCursor: headers.get('X-Next-Cursor'),
+      total: Number.isNaN(total) ? sims.length : total,
+      watermark: headers.has('X-Fleet-Watermark') ? parseInt(headers.get('X-Fleet-Watermark'), 10) : null
+    };
+  }
+  
+  async loadFleetData({ reset = false } = {}) {
     try {
       this.dashboard.elements.fleetList.innerHTML = '<div class="muted">📡 Filo verileri yükleniyor...</div>';
       this.dashboard.elements.apiStatus.textContent = 'bağlanıyor...';
@@ -12,12 +34,18 @@ class FleetManager {
       this.dashboard.elements.apiDot.classList.remove('connected');
       this.dashboard.elements.apiDot.classList.add('disconnected');
       
-      const data = await apiCall('/api/v1/fleet');
-      this.dashboard.sims = Array.isArray(data) ? data : (data.sims || []);
+      // Yenilemede yalnızca ekrandaki kadar SIM (en riskliler önce) yeniden çekilir, tüm filo değil;
+      // filtre değişince ilk sayfadan başlanır
+      const loaded = reset ? 0 : this.dashboard.sims.length;
+      const limit = Math.min(Math.max(loaded, this.pageSize), this.maxPageSize);
+      const page = await this.fetchFleetPage(limit);
+      this.dashboard.sims = page.sims;
+      this.nextCursor = page.nextCursor;
+      this.totalSims = page.total;
+      this.watermark = page.watermark;
       
-      this.updateStatistics();
-      this.populateCityFilter();
       this.dashboard.filterManager.filterAndRender();
+      this.updateStatistics();
       
       this.dashboard.elements.apiStatus.textContent = 'bağlı ✓';
       this.dashboard.elements.apiStatus.style.color = 'var(--accent)';
@@ -41,20 +69,111 @@ class FleetManager {
     }
   }
   
-  updateStatistics() {
-    const total = this.dashboard.sims.length;
-    const active = this.dashboard.sims.filter(s => s.status === 'active').length;
-    const highRisk = this.dashboard.sims.filter(s => (s.risk_level === 'red' || s.risk_score >= 70)).length;
-    const anomalies = this.dashboard.sims.reduce((sum, s) => sum + (s.anomaly_count || 0), 0);
+  async refreshFleetChanges() {
+    // Filigran yoksa (ilk yükleme başarısız) tam yükleme
+    if (this.watermark === null) {
+      return this.loadFleetData();
+    }
+    
+    try {
+      let changed = 0;
+      let hasMore = true;
+      while (hasMore) {
+        const delta = await apiCall(`/api/v1/fleet/changes?since=${encodeURIComponent(this.watermark)}`);
+        if (delta.reset) {
+          return this.loadFleetData();
+        }
+        
+        changed += this.applyFleetChanges(delta.changes);
+        this.watermark = Math.max(this.watermark, delta.watermark);
+        hasMore = delta.has_more;
+      }
+      
+      if (changed > 0) {
+        this.dashboard.filterManager.filterAndRender();
+        this.updateStatistics();
+      }
+    } catch (error) {
+      console.error('%c❌ Filo değişikliklerinde hata:', 'color: #e74c3c; font-weight: bold;', error);
+    }
+  }
+  
+  applyFleetDelta(delta) {
+    // WebSocket fleet_delta: filigran boşluğu varsa /fleet/changes ile tamamlanır
+    if (delta.reset) {
+      return this.loadFleetData();
+    }
+    if (this.watermark === null || delta.watermark <= this.watermark) {
+      return;
+    }
+    if (delta.since > this.watermark) {
+      return this.refreshFleetChanges();
+    }
+    
+    this.watermark = delta.watermark;
+    if (this.applyFleetChanges(delta.changes) > 0) {
+      this.dashboard.filterManager.filterAndRender();
+      this.updateStatistics();
+    }
+  }
+  
+  applyFleetChanges(changes) {
+    // Yüklü SIM'ler yerinde güncellenir; filtreye uyanların tamamı yüklüyse filtreye uyan yeni SIM'ler eklenir
+    let applied = 0;
+    changes.forEach(change => {
+      const index = this.dashboard.sims.findIndex(sim => sim.sim_id === change.sim_id);
+      if (index >= 0) {
+        this.dashboard.sims[index] = { ...this.dashboard.sims[index], ...change };
+        applied++;
+      } else if (!this.nextCursor && this.dashboard.filterManager.matches(change)) {
+        this.dashboard.sims.push(change);
+        applied++;
+      }
+      
+      if (this.dashboard.selectedSim && this.dashboard.selectedSim.sim_id === change.sim_id) {
+        Object.assign(this.dashboard.selectedSim, change);
+      }
+    });
+    return applied;
+  }
+  
+  async loadMoreFleet() {
+    if (!this.nextCursor) return;
     
-    document.getElementById('total-sims').textContent = total;
-    document.getElementById('active-sims').textContent = active;
-    document.getElementById('high-risk-sims').textContent = highRisk;
-    document.getElementById('anomaly-count').textContent = anomalies;
+    try {
+      const page = await this.fetchFleetPage(this.pageSize, this.nextCursor);
+      this.dashboard.sims = this.dashboard.sims.concat(page.sims);
+      this.nextCursor = page.nextCursor;
+      this.totalSims = page.total;
+      
+      this.dashboard.filterManager.filterAndRender();
+    } catch (error) {
+      this.dashboard.appendLog(`❌ Sonraki filo sayfası yüklenemedi: ${error.message}`);
+    }
   }
   
-  populateCityFilter() {
-    const cities = [...new Set(this.dashboard.sims.map(s => s.city).filter(Boolean))].sort();
+  async updateStatistics() {
+    // Kartlar ve şehir listesi filonun tamamı için sunucudan (Redis'te kısa süre tutulur); aynı anda tek istek
+    if (this.statsRequest) return this.statsRequest;
+    
+    this.statsRequest = (async () => {
+      try {
+        const stats = await apiCall('/api/v1/fleet/stats');
+        document.getElementById('total-sims').textContent = stats.total;
+        document.getElementById('active-sims').textContent = stats.active;
+        document.getElementById('high-risk-sims').textContent = stats.high_risk;
+        document.getElementById('anomaly-count').textContent = stats.anomalies;
+        this.populateCityFilter(stats.cities);
+      } catch (error) {
+        console.error('%c❌ Filo istatistiklerinde hata:', 'color: #e74c3c; font-weight: bold;', error);
+      } finally {
+        this.statsRequest = null;
+      }
+    })();
+    return this.statsRequest;
+  }
+  
+  populateCityFilter(cities) {
     const cityFilter = this.dashboard.elements.cityFilter;
     
     // Mevcut seçimi koru
@@ -80,6 +199,17 @@ class FleetManager {
       const element = this.createSimElement(sim);
       this.dashboard.elements.fleetList.appendChild(element);
     });
+    
+    if (this.nextCursor) {
+      const moreBtn = document.createElement('button');
+      moreBtn.className = 'secondary';
+      moreBtn.textContent = `⬇️ Daha fazla yükle (${this.dashboard.sims.length} / ${this.totalSims})`;
+      moreBtn.addEventListener('click', () => {
+        moreBtn.disabled = true;
+        this.loadMoreFleet();
+      });
+      this.dashboard.elements.fleetList.appendChild(moreBtn);
+    }
   }
   
   createSimElement(sim) {
@@ -15,8 +15,12 @@ class SimShieldDashboard {
       this.appendLog('🚀 SimShield Dashboard başlatıldı - IoT filo izleme sistemi aktif');
     }, 1000);
     
-    // Auto refresh every 30 seconds
-    setInterval(() => this.loadFleetData(), 30000);
+    // Değişiklikler WebSocket fleet_delta ile gelir; akış yokken 30 saniyede bir /fleet/changes yoklanır
+    setInterval(() => {
+      if (!this.wsManager.fleetLive) {
+        this.fleetManager.refreshFleetChanges();
+      }
+    }, 30000);
   }
   
   initElements() {
@@ -72,19 +76,19 @@ class SimShieldDashboard {
     // Filtreler
     this.elements.searchInput.addEventListener('input', () => {
       this.filterManager.clearStatFilter(); // Manuel arama yapıldığında stat filtresini temizle
-      this.filterManager.filterAndRender();
+      this.filterManager.applyFilters({ debounce: true });
     });
     this.elements.riskFilter.addEventListener('change', () => {
       this.filterManager.clearStatFilter(); // Manuel filtre değişikliğinde stat filtresini temizle
-      this.filterManager.filterAndRender();
+      this.filterManager.applyFilters();
     });
     this.elements.statusFilter.addEventListener('change', () => {
       this.filterManager.clearStatFilter(); // Manuel filtre değişikliğinde stat filtresini temizle
-      this.filterManager.filterAndRender();
+      this.filterManager.applyFilters();
     });
     this.elements.cityFilter.addEventListener('change', () => {
       this.filterManager.clearStatFilter(); // Manuel filtre değişikliğinde stat filtresini temizle
-      this.filterManager.filterAndRender();
+      this.filterManager.applyFilters();
     });
     
     // Tıklanabilir istatistik kartları
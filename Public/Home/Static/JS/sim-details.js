@@ -114,7 +114,7 @@ class SimDetailsManager {
   async loadSimDates(simId) {
     try {
       // Kullanım verilerinden tarih bilgilerini al
-      const data = await apiCall(`/api/v1/usage/${encodeURIComponent(simId)}?days=90`); // 90 günlük veri
+      const data = await apiCall(`/api/v1/usage/${encodeURIComponent(simId)}?days=90&resolution=auto`); // 90 günlük özet
       
       if (data && (Array.isArray(data) ? data.length > 0 : data.usage && data.usage.length > 0)) {
         const usage = Array.isArray(data) ? data : data.usage || [];
@@ -122,8 +122,11 @@ class SimDetailsManager {
         if (usage.length > 0) {
           // En eski ve en yeni tarihleri bul
           const sortedUsage = usage.sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
-          const firstDate = new Date(sortedUsage[0].timestamp);
-          const lastDate = new Date(sortedUsage[sortedUsage.length - 1].timestamp);
+          // Özet satırlarında dönemin ilk/son kaydı first_at/last_at alanlarında
+          const firstUsage = sortedUsage[0];
+          const lastUsage = sortedUsage[sortedUsage.length - 1];
+          const firstDate = new Date(firstUsage.first_at || firstUsage.timestamp);
+          const lastDate = new Date(lastUsage.last_at || lastUsage.timestamp);
           
           // Tarihleri güncelle
           this.updateSimDetailDate('📅 Aktivasyon', firstDate.toLocaleDateString('tr-TR'));
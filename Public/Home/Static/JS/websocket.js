@@ -3,6 +3,7 @@ class WebSocketManager {
   constructor(dashboard) {
     this.dashboard = dashboard;
     this.ws = null;
+    this.fleetLive = false; // Sunucu fleet_delta aboneliğini onayladı mı
     this.connectWebSocket();
   }
   
@@ -17,6 +18,9 @@ class WebSocketManager {
         this.dashboard.elements.wsDot.classList.remove('disconnected');
         this.dashboard.elements.wsDot.classList.add('connected');
         
+        // Filo değişikliklerine abone ol (onaylanana kadar yoklama devam eder)
+        this.ws.send(JSON.stringify({ type: 'subscribe', channel: 'fleet_delta' }));
+        
         // İlk bağlantıda placeholder mesajını güncelle
         const alertsContainer = document.getElementById('alerts-list-panel');
         const placeholder = alertsContainer.querySelector('.alert-placeholder');
@@ -33,6 +37,7 @@ class WebSocketManager {
       };
       
       this.ws.onclose = () => {
+        this.fleetLive = false;
         console.log('%c🔌 WebSocket bağlantısı kesildi - yeniden bağlanılıyor...', 'color: #f39c12;');
         this.dashboard.elements.wsStatus.textContent = 'bağlantı yok ✗';
         this.dashboard.elements.wsStatus.style.color = 'var(--danger)';
@@ -62,6 +67,26 @@ class WebSocketManager {
     try {
       const alert = JSON.parse(event.data);
       
+      // Filo değişiklikleri tabloya sessizce uygulanır
+      if (alert.type === 'fleet_subscribed') {
+        this.fleetLive = true;
+        // Yeniden bağlanırken kaçırılan değişiklikler (ilk yükleme sürüyorsa gerek yok)
+        if (this.dashboard.fleetManager.watermark !== null) {
+          this.dashboard.fleetManager.refreshFleetChanges();
+        }
+        return;
+      }
+      if (alert.type === 'fleet_delta') {
+        this.dashboard.fleetManager.applyFleetDelta(alert);
+        return;
+      }
+      
+      // Toplu analiz ilerlemesi sessizce buton üzerinde gösterilir
+      if (alert.type === 'analysis_progress') {
+        this.dashboard.analysisManager.updateBatchProgress(alert.processed, alert.total);
+        return;
+      }
+      
       // Ses bildirimini çal
       playNotificationSound();
       
@@ -75,8 +100,19 @@ class WebSocketManager {
         // Popup göster
         this.dashboard.showAlertPopup(alert);
         
-        // Fleet data'yı yenile
-        setTimeout(() => this.dashboard.loadFleetData(), 1000);
+        // Canlı filo akışı yoksa fleet data'yı yenile (varsa değişiklik fleet_delta ile gelir)
+        if (!this.fleetLive) {
+          setTimeout(() => this.dashboard.fleetManager.refreshFleetChanges(), 1000);
+        }
+      } else if (alert.type === 'quota_projection') {
+        // Kota erken uyarısı SIM başına dönemde bir kez gelir, sadece mini panelde gösterilir
+        const clickableSimId = `<span class="clickable-sim-id" data-sim-id="${alert.sim_id}">${alert.sim_id}</span>`;
+        this.dashboard.appendMiniAlert(`📈 ${clickableSimId}: ${alert.message}`);
+      } else if (alert.type === 'batch_analysis_completed') {
+        // Toplu analiz özeti - tek bildirim
+        const message = `${this.getSeverityIcon(alert.severity)} ${alert.message}`;
+        this.dashboard.appendMiniAlert(message);
+        this.dashboard.showAlertPopup(alert);
       } else {
         // Bulk action veya diğer alert türleri için
         if (alert.type === 'bulk_action') {
@@ -10,26 +10,51 @@ db.createCollection('device_profiles');
 db.createCollection('add_on_packs');
 db.createCollection('actions_log');
 db.createCollection('anomalies');
+db.createCollection('usage_rollups');
+db.createCollection('savings_results');
+db.createCollection('billing_cycles');
+db.createCollection('billing_events');
+db.createCollection('counters');
 
-// Create indexes for better performance
+// Create indexes (DB/indexes.py ile aynı; API başlangıçta eksikleri tamamlar)
 db.sims.createIndex({ "sim_id": 1 }, { unique: true });
 db.sims.createIndex({ "customer_id": 1 });
+db.sims.createIndex({ "device_type": 1 });
 db.sims.createIndex({ "status": 1 });
-db.sims.createIndex({ "risk_score": 1 });
+db.sims.createIndex({ "risk_score": -1, "sim_id": 1 });
+db.sims.createIndex({ "last_roaming_at": 1 });
+db.sims.createIndex({ "updated_seq": 1 });
 
 db.usage.createIndex({ "sim_id": 1, "timestamp": -1 });
 db.usage.createIndex({ "timestamp": 1 });
 
+db.anomalies.createIndex({ "sim_id": 1, "detected_at": -1 });
+db.anomalies.createIndex(
+  { "sim_id": 1, "type": 1, "detection_day": 1 },
+  { unique: true, partialFilterExpression: { "detection_day": { "$type": "date" } } }
+);
+
+db.actions_log.createIndex({ "action_id": 1 }, { unique: true });
+db.actions_log.createIndex({ "sim_id": 1, "created_at": -1 });
+
+db.detector_state.createIndex({ "sim_id": 1 }, { unique: true });
+
+db.baselines.createIndex({ "scope": 1, "key": 1 }, { unique: true });
+
+db.usage_rollups.createIndex({ "sim_id": 1, "resolution": 1, "bucket": 1 }, { unique: true });
+
+db.savings_results.createIndex({ "job_id": 1, "sim_id": 1 }, { unique: true });
+
+db.billing_cycles.createIndex({ "sim_id": 1, "cycle": 1 }, { unique: true });
+
+db.billing_events.createIndex({ "sim_id": 1, "effective_at": 1 });
+
 db.customers.createIndex({ "customer_id": 1 }, { unique: true });
+
 db.iot_plans.createIndex({ "plan_id": 1 }, { unique: true });
-db.device_profiles.createIndex({ "device_type": 1 }, { unique: true });
-db.add_on_packs.createIndex({ "addon_id": 1 }, { unique: true });
 
-db.actions_log.createIndex({ "sim_id": 1 });
-db.actions_log.createIndex({ "created_at": -1 });
+db.device_profiles.createIndex({ "device_type": 1 }, { unique: true });
 
-db.anomalies.createIndex({ "sim_id": 1, "detected_at": -1 });
-db.anomalies.createIndex({ "type": 1 });
-db.anomalies.createIndex({ "detected_at": -1 });
+db.add_on_packs.createIndex({ "addon_id": 1 }, { unique: true });
 
 print('✅ SimShield IoT database initialized successfully');
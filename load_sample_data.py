@@ -15,6 +15,12 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import random
 import logging
 from Settings import AYAR
+from Public.API.v1.Libs.usage_rollups import RESOLUTIONS, rollup_pipeline
+from Public.API.v1.Libs.iot_service import last_roaming_pipeline
+from Public.API.v1.Libs.catalog_index import CATALOG_VERSION_KEY
+from Public.API.v1.Libs.usage_store import USAGE_VERSION_KEY
+from DB.indexes import ensure_indexes
+from DB.migrations import mark_applied
 
 # Logging yapılandırması
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -345,26 +351,46 @@ async def load_sample_data():
         
         logger.info(f"✅ {len(usage_data)} normal kullanım kaydı yüklendi")
         
-        # Veritabanı indekslerini oluştur
-        logger.info("🔍 Veritabanı indeksleri oluşturuluyor...")
+        # Türetilmiş koleksiyonlar yeni kullanım verisinden yeniden kurulur
+        rollups_collection = db["usage_rollups"]
+        await rollups_collection.delete_many({})
+        
+        # Haftanın günü baseline'ları API açılışında yeni kullanım verisinden yeniden hesaplanır
+        await db["baselines"].delete_many({})
         
-        await sims_collection.create_index("sim_id", unique=True)
-        await sims_collection.create_index("customer_id")
-        await sims_collection.create_index("status")
-        await sims_collection.create_index("risk_score")
-        await sims_collection.create_index("device_type")
+        # Artımlı dedektör durumu SIM'in ilk kaydında yeni geçmişten kurulur
+        await db["detector_state"].delete_many({})
         
-        await usage_collection.create_index([("sim_id", 1), ("timestamp", -1)])
-        await usage_collection.create_index("timestamp")
-        await usage_collection.create_index("sim_id")
+        # Fatura dönemleri yeni kullanım verisinden ilk okumada yeniden kurulur
+        cycles_collection = db["billing_cycles"]
+        events_collection = db["billing_events"]
+        await cycles_collection.delete_many({})
+        await events_collection.delete_many({})
         
-        await customers_collection.create_index("customer_id", unique=True)
-        await plans_collection.create_index("plan_id", unique=True)
-        await actions_collection.create_index("sim_id")
-        await actions_collection.create_index("created_at")
+        # Filo değişiklik sayacı sıfırlanır; eski filigranlı istemciler filoyu baştan yükler
+        await db["counters"].delete_one({"_id": "sims"})
+        
+        # Veritabanı indekslerini oluştur (API ile aynı tanımlar: DB/indexes.py)
+        logger.info("🔍 Veritabanı indeksleri oluşturuluyor...")
+        index_result = await ensure_indexes(db)
+        if index_result["failed"]:
+            logger.warning(f"⚠️ Oluşturulamayan indeksler: {index_result['failed']}")
         
         logger.info("✅ Veritabanı indeksleri oluşturuldu")
         
+        # Saatlik/günlük/haftalık/aylık kullanım özetleri (sunucu tarafında $merge ile)
+        logger.info("🧮 Kullanım özetleri hesaplanıyor...")
+        for resolution in RESOLUTIONS:
+            async for _ in usage_collection.aggregate(rollup_pipeline(resolution), allowDiskUse=True):
+                pass
+        logger.info(f"✅ {await rollups_collection.count_documents({})} kullanım özeti oluşturuldu")
+        
+        # Roaming filtresi için SIM başına son roaming zamanı
+        async for _ in usage_collection.aggregate(last_roaming_pipeline(), allowDiskUse=True):
+            pass
+        await mark_applied(db, "last_roaming_at")
+        logger.info(f"✅ {await sims_collection.count_documents({'last_roaming_at': {'$exists': True}})} SIM'de roaming kaydı işlendi")
+        
         # Redis cache'i başlat
         logger.info("🚀 Redis cache başlatılıyor...")
         try:
@@ -380,6 +406,16 @@ async def load_sample_data():
             await redis_client.set("total_sims", str(len(sims_data)), ex=3600)
             await redis_client.set("total_customers", str(len(customers_data)), ex=3600)
             
+            # Katalog değişti: çalışan API işçileri planları yeniden yüklesin
+            await redis_client.incr(CATALOG_VERSION_KEY)
+            
+            # Kullanım ingest dışında yeniden yazıldı: çalışan API işçileri kullanım önbelleğini boşaltsın
+            await redis_client.incr(USAGE_VERSION_KEY)
+            
+            # Silinen baseline'ların önbellekteki kopyaları
+            async for key in redis_client.scan_iter(match="baseline:*"):
+                await redis_client.delete(key)
+            
             logger.info("✅ Redis cache başlatıldı")
             await redis_client.aclose()
             
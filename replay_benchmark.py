@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# Bu araç @keyiflerolsun tarafından | CodeNight için yazılmıştır.
+
+"""
+Anomali dedektörünü geçmiş ya da sentetik bir filo üzerinde gün gün oynatarak ölçer
+
+Hız (SIM-gün/sn), gecikme yüzdelikleri, bellek tepe değeri ve anomaly_scenarios.json'daki
+senaryolara göre precision/recall raporlanır. Eşik ayarı ya da dedektör değişikliği yayına
+almadan önce aynı veriyle karşılaştırılabilir:
+
+    python replay_benchmark.py --sims 10000 --days 60
+    python replay_benchmark.py --mode fleet --spike-multiplier 2.2 --json rapor.json
+    python replay_benchmark.py --usage gecmis.jsonl
+"""
+
+from datetime import datetime, timedelta
+from pathlib  import Path
+from typing   import Dict, List, Optional, Set, Tuple
+from rich.table import Table
+from CLI      import konsol
+from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+from Public.API.v1.Models import Usage, DetectorState, DeviceProfile
+import numpy as np
+import subprocess
+import argparse
+import tracemalloc
+import json
+import time
+
+# JSON dosyalarının bulunduğu dizin
+SAMPLE_DATA_DIR = Path(__file__).parent / "sample_datas"
+
+class ReplayFleet:
+    """
+    Oynatılacak filo: SIM × gün kullanım matrisleri (kaydı olmayan günler NaN)
+    """
+    def __init__(self, sim_ids: List[str], device_types: List[str], days: List[datetime],
+                 mb_used: np.ndarray, roaming_mb: np.ndarray, labels: Dict[str, str]):
+        self.sim_ids = sim_ids
+        self.device_types = device_types
+        self.days = days
+        self.mb_used = mb_used
+        self.roaming_mb = roaming_mb
+        self.labels = labels            # sim_id → beklenen anomali tipi
+
+    @property
+    def sim_days(self) -> int:
+        return int((~np.isnan(self.mb_used)).sum())
+
+def load_json_file(filename: str):
+    """JSON dosyasını yükler"""
+    with open(SAMPLE_DATA_DIR / filename, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def load_profiles() -> Dict[str, DeviceProfile]:
+    """Cihaz profillerini device_type → DeviceProfile olarak yükler"""
+    return {
+        profile["device_type"]: DeviceProfile(**profile)
+        for profile in load_json_file("device_profiles.json")
+    }
+
+def generate_fleet(sim_count: int, day_count: int = 30, seed: int = 42,
+                   start: Optional[datetime] = None) -> ReplayFleet:
+    """
+    sims.json'daki SIM'leri çoğaltarak sentetik filo üretir
+
+    Normal kullanım load_sample_data ile aynı desende (hafta sonu ×0.7, gündüz/gece çarpanı,
+    ±%20 gürültü) üretilir. Senaryolu SIM'lerin tüm kopyalarına anomaly_scenarios.json'daki
+    senaryo, oynatmanın son `usage_days` gününe hizalanarak uygulanır.
+    """
+    rng = np.random.default_rng(seed)
+    templates = load_json_file("sims.json")
+    profiles = load_profiles()
+    scenario_file = load_json_file("anomaly_scenarios.json")
+    scenarios = scenario_file["anomaly_scenarios"]
+    offset = day_count - scenario_file["_metadata"]["usage_days"]
+
+    start = start or (datetime.now() - timedelta(days=day_count)).replace(hour=12, minute=0, second=0, microsecond=0)
+    days = [start + timedelta(days=day) for day in range(day_count)]
+    weekend = np.array([day.weekday() >= 5 for day in days])
+
+    sim_ids, device_types, labels = [], [], {}
+    mb_used = np.empty((sim_count, day_count))
+    roaming_mb = np.zeros((sim_count, day_count))
+
+    for row in range(sim_count):
+        template = templates[row % len(templates)]
+        copy = row // len(templates)
+        sim_id = template["sim_id"] if copy == 0 else f"{template['sim_id']}-{copy}"
+        profile = profiles[template["device_type"]]
+
+        usage = rng.uniform(profile.expected_daily_mb_min, profile.expected_daily_mb_max, day_count)
+        usage *= np.where(weekend, 0.7, 1.0)
+        usage *= np.where(rng.integers(0, 24, day_count) >= 6, 1.2, 0.6)
+        usage *= rng.uniform(0.8, 1.2, day_count)
+
+        scenario = scenarios.get(template["sim_id"])
+        if scenario:
+            labels[sim_id] = scenario["type"]
+            if scenario["type"] == "sudden_spike":
+                usage[offset + scenario["day"]] *= scenario["factor"]
+            elif scenario["type"] == "sustained_drain":
+                usage[offset + scenario["start_day"]:offset + scenario["start_day"] + scenario["duration"]] *= scenario["factor"]
+            elif scenario["type"] == "inactivity":
+                usage[offset + scenario["start_day"]:offset + scenario["start_day"] + scenario["duration"]] = 0
+            elif scenario["type"] == "unexpected_roaming":
+                roaming_mb[row, offset + scenario["day"]] = scenario["roaming_mb"]
+
+        mb_used[row] = np.round(usage, 2)
+        sim_ids.append(sim_id)
+        device_types.append(template["device_type"])
+
+    return ReplayFleet(sim_ids, device_types, days, mb_used, roaming_mb, labels)
+
+def load_fleet(usage_path: Path) -> ReplayFleet:
+    """
+    Geçmiş kullanımı JSON listesi ya da JSONL dosyasından okur ve günlük toplamlara çevirir
+
+    Kayıtlar: {"sim_id", "timestamp" (ISO), "mb_used", "roaming_mb"}. Cihaz tipleri kayıtta
+    yoksa sims.json'dan, beklenen anomaliler anomaly_scenarios.json'dan SIM kimliğiyle eşlenir.
+    """
+    text = usage_path.read_text(encoding="utf-8")
+    records = json.loads(text) if text.lstrip().startswith("[") else [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    known_types = {sim["sim_id"]: sim["device_type"] for sim in load_json_file("sims.json")}
+    scenarios = load_json_file("anomaly_scenarios.json")["anomaly_scenarios"]
+
+    totals: Dict[Tuple[str, datetime], List[float]] = {}
+    device_by_sim: Dict[str, str] = {}
+    for record in records:
+        timestamp = datetime.fromisoformat(record["timestamp"])
+        key = (record["sim_id"], timestamp.replace(hour=12, minute=0, second=0, microsecond=0))
+        total = totals.setdefault(key, [0.0, 0.0])
+        total[0] += record["mb_used"]
+        total[1] += record.get("roaming_mb") or 0
+        device_by_sim.setdefault(record["sim_id"], record.get("device_type") or known_types.get(record["sim_id"], "Sensor"))
+
+    sim_ids = sorted(device_by_sim)
+    first_day, last_day = min(day for _, day in totals), max(day for _, day in totals)
+    days = [first_day + timedelta(days=day) for day in range((last_day - first_day).days + 1)]
+
+    row_of = {sim_id: row for row, sim_id in enumerate(sim_ids)}
+    mb_used = np.full((len(sim_ids), len(days)), np.nan)
+    roaming_mb = np.zeros((len(sim_ids), len(days)))
+    for (sim_id, day), (mb, roaming) in totals.items():
+        mb_used[row_of[sim_id], (day - first_day).days] = round(mb, 2)
+        roaming_mb[row_of[sim_id], (day - first_day).days] = roaming
+
+    labels = {sim_id: scenarios[sim_id]["type"] for sim_id in sim_ids if sim_id in scenarios}
+    return ReplayFleet(sim_ids, [device_by_sim[sim_id] for sim_id in sim_ids], days, mb_used, roaming_mb, labels)
+
+def replay_incremental(detector: AnomalyDetector, fleet: ReplayFleet,
+                       profiles: Dict[str, DeviceProfile]) -> Tuple[Set[Tuple[str, str]], List[int]]:
+    """
+    Her SIM-günü ingest yolundaki gibi update_state ile skorlar, kayıt başına gecikmeyi ölçer
+    """
+    states = [DetectorState(sim_id=sim_id) for sim_id in fleet.sim_ids]
+    sim_profiles = [profiles[device_type] for device_type in fleet.device_types]
+    detected: Set[Tuple[str, str]] = set()
+    latencies: List[int] = []
+
+    for column, day in enumerate(fleet.days):
+        for row, sim_id in enumerate(fleet.sim_ids):
+            mb_used = fleet.mb_used[row, column]
+            if np.isnan(mb_used):
+                continue
+
+            usage = Usage.model_construct(
+                sim_id=sim_id, timestamp=day, mb_used=float(mb_used), roaming_mb=float(fleet.roaming_mb[row, column])
+            )
+            started = time.perf_counter_ns()
+            anomalies = detector.update_state(states[row], usage, sim_profiles[row], now=day)
+            latencies.append(time.perf_counter_ns() - started)
+
+            for anomaly in anomalies:
+                detected.add((sim_id, anomaly.type.value))
+
+    return detected, latencies
+
+def align_right(mb_used: np.ndarray, roaming_mb: np.ndarray,
+                timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Eksik günleri (NaN) satırın başına alır, kayıtları sırası bozulmadan sağa yaslar
+
+    analyze_fleet kayıtların satır sonunda bitişik olmasını bekler; toplu analiz yolundaki
+    stack_usage_columns ile aynı yerleşim ve SIM başına zaman damgası matrisi üretilir.
+    """
+    missing = np.isnan(mb_used)
+    order = np.argsort(~missing, axis=1, kind="stable")
+    stamps = np.where(missing, np.datetime64("NaT"), np.broadcast_to(timestamps, mb_used.shape))
+
+    return (
+        np.take_along_axis(mb_used, order, axis=1),
+        np.take_along_axis(np.where(missing, 0.0, roaming_mb), order, axis=1),
+        np.take_along_axis(stamps, order, axis=1)
+    )
+
+def replay_fleet(detector: AnomalyDetector, fleet: ReplayFleet,
+                 profiles: Dict[str, DeviceProfile]) -> Tuple[Set[Tuple[str, str]], List[int]]:
+    """
+    Her gün sonunda tüm filoyu toplu analiz yolundaki gibi analyze_fleet ile skorlar, gün başına gecikmeyi ölçer
+    """
+    sim_profiles = [profiles[device_type] for device_type in fleet.device_types]
+    roaming_expected = np.array([profile.roaming_expected for profile in sim_profiles])
+    timestamps = np.array(fleet.days, dtype="datetime64[us]")
+    detected: Set[Tuple[str, str]] = set()
+    latencies: List[int] = []
+
+    for column, day in enumerate(fleet.days):
+        mb_used, roaming_mb, day_stamps = align_right(
+            fleet.mb_used[:, :column + 1], fleet.roaming_mb[:, :column + 1], timestamps[:column + 1]
+        )
+        started = time.perf_counter_ns()
+        anomalies_by_sim, _ = detector.analyze_fleet(
+            fleet.sim_ids, mb_used, roaming_mb, day_stamps, roaming_expected, now=day, device_profiles=sim_profiles
+        )
+        latencies.append(time.perf_counter_ns() - started)
+
+        for sim_id, anomalies in anomalies_by_sim.items():
+            for anomaly in anomalies:
+                detected.add((sim_id, anomaly.type.value))
+
+    return detected, latencies
+
+REPLAY_MODES = {"incremental": replay_incremental, "fleet": replay_fleet}
+
+def evaluate(detected: Set[Tuple[str, str]], labels: Dict[str, str], sim_ids: List[str]) -> Dict[str, Dict[str, float]]:
+    """
+    SIM düzeyinde anomali tipi başına precision/recall hesaplar
+
+    Senaryosu olan SIM'de aynı tipte en az bir tespit doğru pozitif, senaryosu farklı ya da
+    olmayan SIM'deki tespit yanlış pozitif sayılır.
+    """
+    expected = set(labels.items())
+    sim_set = set(sim_ids)
+    types = sorted({anomaly_type for _, anomaly_type in expected | detected})
+
+    metrics = {}
+    for anomaly_type in types + ["all"]:
+        truth = {pair for pair in expected if anomaly_type in ("all", pair[1]) and pair[0] in sim_set}
+        found = {pair for pair in detected if anomaly_type in ("all", pair[1])}
+        true_positive = len(truth & found)
+        metrics[anomaly_type] = {
+            "expected": len(truth),
+            "detected": len(found),
+            "precision": round(true_positive / len(found), 4) if found else 0.0,
+            "recall": round(true_positive / len(truth), 4) if truth else 0.0
+        }
+
+    return metrics
+
+def run_benchmark(fleet: ReplayFleet, mode: str = "incremental", detector: Optional[AnomalyDetector] = None,
+                  trace_memory: bool = True) -> dict:
+    """
+    Filoyu seçilen yolda oynatır ve karşılaştırılabilir bir rapor döndürür
+
+    Zamanlama ölçümü tracemalloc kapalıyken yapılır; bellek tepe değeri için aynı oynatma ayrıca izlenir.
+    """
+    detector = detector or AnomalyDetector()
+    profiles = load_profiles()
+    replay = REPLAY_MODES[mode]
+
+    started = time.perf_counter()
+    detected, latencies = replay(detector, fleet, profiles)
+    elapsed = time.perf_counter() - started
+
+    peak_mb = None
+    if trace_memory:
+        tracemalloc.start()
+        replay(detector, fleet, profiles)
+        peak_mb = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+
+    latency_us = np.asarray(latencies, dtype=np.float64) / 1000
+    return {
+        "version": git_version(),
+        "mode": mode,
+        "settings": {
+            "spike_multiplier": detector.spike_multiplier,
+            "drain_days": detector.drain_days,
+            "drain_multiplier": detector.drain_multiplier,
+            "inactivity_hours": detector.inactivity_hours,
+            "roaming_threshold": detector.roaming_threshold,
+            "detectors": [d.name for d in detector.detectors]
+        },
+        "sims": len(fleet.sim_ids),
+        "days": len(fleet.days),
+        "sim_days": fleet.sim_days,
+        "seconds": round(elapsed, 4),
+        "sim_days_per_second": round(fleet.sim_days / elapsed, 1) if elapsed else None,
+        "latency_us": {
+            "unit": "kayıt" if mode == "incremental" else "gün",
+            "p50": round(float(np.percentile(latency_us, 50)), 2),
+            "p95": round(float(np.percentile(latency_us, 95)), 2),
+            "p99": round(float(np.percentile(latency_us, 99)), 2),
+            "max": round(float(latency_us.max()), 2)
+        },
+        "memory_peak_mb": peak_mb,
+        "metrics": evaluate(detected, fleet.labels, fleet.sim_ids)
+    }
+
+def git_version() -> str:
+    """Çalışma ağacının kısa commit özetini döndürür (git yoksa 'unknown')"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_report(report: dict):
+    """Raporu tablo olarak yazdırır"""
+    latency = report["latency_us"]
+    konsol.print(
+        f"[bold]🔁 Replay[/] {report['version']} · {report['mode']} · {report['sims']} SIM × {report['days']} gün"
+        f" · spike ×{report['settings']['spike_multiplier']}"
+    )
+    konsol.print(
+        f"⚡ {report['sim_days_per_second']} SIM-gün/sn ({report['sim_days']} SIM-gün, {report['seconds']} sn)"
+        f" · ⏱️  {latency['unit']} başına p50 {latency['p50']}µs p95 {latency['p95']}µs p99 {latency['p99']}µs"
+        f" · 🧠 tepe {report['memory_peak_mb']} MB"
+    )
+
+    table = Table(title="Senaryo Başarımı")
+    for column in ("Tip", "Beklenen", "Tespit", "Precision", "Recall"):
+        table.add_column(column)
+    for anomaly_type, metric in report["metrics"].items():
+        table.add_row(
+            anomaly_type, str(metric["expected"]), str(metric["detected"]),
+            f"{metric['precision']:.2%}", f"{metric['recall']:.2%}"
+        )
+    konsol.print(table)
+
+def main():
+    parser = argparse.ArgumentParser(description="Anomali dedektörü replay ve backtest aracı")
+    parser.add_argument("--mode", choices=sorted(REPLAY_MODES), default="incremental", help="Oynatılacak tespit yolu")
+    parser.add_argument("--sims", type=int, default=1000, help="Sentetik filodaki SIM sayısı")
+    parser.add_argument("--days", type=int, default=30, help="Sentetik filodaki gün sayısı")
+    parser.add_argument("--seed", type=int, default=42, help="Sentetik veri tohumu")
+    parser.add_argument("--usage", type=Path, help="Geçmiş kullanım dosyası (JSON/JSONL) - verilirse sentetik filo üretilmez")
+    parser.add_argument("--spike-multiplier", type=float, help="SPIKE_MULTIPLIER yerine denenecek değer")
+    parser.add_argument("--drain-multiplier", type=float, help="DRAIN_MULTIPLIER yerine denenecek değer")
+    parser.add_argument("--no-memory", action="store_true", help="Bellek ölçümü için ikinci oynatmayı atla")
+    parser.add_argument("--json", type=Path, help="Raporun yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    fleet = load_fleet(args.usage) if args.usage else generate_fleet(args.sims, args.days, args.seed)
+
+    detector = AnomalyDetector()
+    if args.spike_multiplier is not None:
+        detector.spike_multiplier = args.spike_multiplier
+    if args.drain_multiplier is not None:
+        detector.drain_multiplier = args.drain_multiplier
+
+    report = run_benchmark(fleet, args.mode, detector, trace_memory=not args.no_memory)
+    print_report(report)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        konsol.print(f"💾 Rapor yazıldı: {args.json}")
+
+if __name__ == "__main__":
+    main()
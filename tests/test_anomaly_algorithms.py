@@ -381,3 +381,597 @@ class TestAnomalyDetectionIntegration:
 
         # Mock get_usage çağrıldı mı?
         # mock_get_usage.assert_called_once_with(sim_id, days=30)  # Would be called in real implementation
+
+
+class TestFleetAnomalyEngine:
+    """Vektörel filo analizi testleri"""
+
+    def _build_fleet(self):
+        """Farklı uzunluk ve senaryolarda örnek filo oluşturur"""
+        from Public.API.v1.Models import Usage
+
+        base = datetime.now().replace(minute=30, second=0, microsecond=0)
+        patterns = {
+            "spike": [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 10.0, 300.0],
+            "drain": [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 40.0, 45.0, 50.0],
+            "inactive": [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 0.0, 0.0, 0.0],
+            "roaming": [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 11.0],
+            "normal": [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0],
+            "short": [10.0, 12.0, 11.0],
+        }
+
+        usage_by_sim = {}
+        for sim_id, values in patterns.items():
+            usage_by_sim[sim_id] = [
+                Usage(
+                    sim_id=sim_id,
+                    timestamp=base - timedelta(days=len(values) - 1 - i),
+                    mb_used=value,
+                    roaming_mb=80.0 if sim_id == "roaming" and i == len(values) - 1 else 0.0,
+                )
+                for i, value in enumerate(values)
+            ]
+
+        return usage_by_sim
+
+    def test_fleet_matches_per_sim_analysis(self):
+        """analyze_fleet, analyze_sim ile aynı anomalileri ve skorları üretmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector, build_usage_matrix
+        from Public.API.v1.Models import DeviceProfile
+
+        detector = AnomalyDetector()
+        usage_by_sim = self._build_fleet()
+        profile = DeviceProfile(
+            device_type="POS", expected_daily_mb_min=5, expected_daily_mb_max=25, roaming_expected=False
+        )
+
+        sim_ids, mb_used, roaming_mb, timestamps = build_usage_matrix(usage_by_sim)
+        fleet_anomalies, fleet_scores = detector.analyze_fleet(
+            sim_ids, mb_used, roaming_mb, timestamps, [False] * len(sim_ids)
+        )
+
+        for index, sim_id in enumerate(sim_ids):
+            anomalies, risk_score = detector.analyze_sim(sim_id, usage_by_sim[sim_id], profile)
+            fleet_list = fleet_anomalies.get(sim_id, [])
+
+            assert fleet_scores[index] == risk_score
+            assert [a.type for a in fleet_list] == [a.type for a in anomalies]
+            assert [a.detected_at for a in fleet_list] == [a.detected_at for a in anomalies]
+            assert [a.reason for a in fleet_list] == [a.reason for a in anomalies]
+
+        assert "normal" not in fleet_anomalies
+        assert "short" not in fleet_anomalies
+
+    def test_fleet_respects_roaming_expectation(self):
+        """Roaming beklenen cihazlarda roaming anomalisi üretilmemeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector, build_usage_matrix
+
+        detector = AnomalyDetector()
+        usage_by_sim = {"roaming": self._build_fleet()["roaming"]}
+
+        sim_ids, mb_used, roaming_mb, timestamps = build_usage_matrix(usage_by_sim)
+        anomalies, scores = detector.analyze_fleet(sim_ids, mb_used, roaming_mb, timestamps, [True])
+
+        assert anomalies == {}
+        assert scores.tolist() == [0]
+
+    def test_fleet_rejects_non_matrix_input(self):
+        """Tek boyutlu girdi reddedilmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+
+        with pytest.raises(ValueError):
+            AnomalyDetector().analyze_fleet(["2001"], [1.0, 2.0], [0.0, 0.0], [], [False])
+
+
+class TestIncrementalDetectorState:
+    """Artımlı dedektör durumu testleri"""
+
+    def _usage(self, values, roaming_last=0.0):
+        """Günlük kullanım listesinden Usage kayıtları oluşturur"""
+        from Public.API.v1.Models import Usage
+
+        base = datetime.now().replace(minute=30, second=0, microsecond=0)
+        return [
+            Usage(
+                sim_id="2001",
+                timestamp=base - timedelta(days=len(values) - 1 - i),
+                mb_used=value,
+                roaming_mb=roaming_last if i == len(values) - 1 else 0.0,
+            )
+            for i, value in enumerate(values)
+        ]
+
+    def _profile(self):
+        from Public.API.v1.Models import DeviceProfile
+
+        return DeviceProfile(
+            device_type="POS", expected_daily_mb_min=5, expected_daily_mb_max=25, roaming_expected=False
+        )
+
+    def test_rolling_baseline_matches_statistics(self):
+        """Kayan Welford baseline'ı analyze_sim penceresiyle aynı olmalı"""
+        import statistics
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+
+        detector = AnomalyDetector()
+        values = [10.0, 0.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 14.0, 0.0, 9.5, 16.0, 11.0]
+        state = detector.rebuild_state("2001", self._usage(values))
+
+        baseline = [v for v in values[-10:-3] if v > 0]
+        assert state.record_count == len(values)
+        assert state.recent_usage == values[-10:]
+        assert state.baseline_count == len(baseline)
+        assert state.baseline_mean == pytest.approx(statistics.mean(baseline))
+        assert state.baseline_m2 / (state.baseline_count - 1) == pytest.approx(statistics.variance(baseline))
+
+    def test_new_record_scored_without_history(self):
+        """Yeni kayıt, geçmiş okunmadan analyze_sim ile aynı spike ve roaming anomalilerini üretmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Public.API.v1.Models import AnomalyType
+
+        detector = AnomalyDetector()
+        usage_data = self._usage([10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 300.0], roaming_last=80.0)
+        state = detector.rebuild_state("2001", usage_data[:-1])
+
+        anomalies = detector.update_state(state, usage_data[-1], self._profile())
+        expected, _ = detector.analyze_sim("2001", usage_data, self._profile())
+
+        assert {a.type for a in anomalies} == {AnomalyType.SUDDEN_SPIKE, AnomalyType.UNEXPECTED_ROAMING}
+        assert [a.reason for a in anomalies] == [a.reason for a in expected]
+        assert state.last_roaming_at == usage_data[-1].timestamp
+
+    def test_drain_streak_and_inactivity(self):
+        """Drain serisi ve inaktivite başlangıcı kayıt kayıt izlenmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Public.API.v1.Models import AnomalyType
+
+        detector = AnomalyDetector()
+        usage_data = self._usage([10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 40.0, 45.0, 50.0, 0.0, 0.0])
+        state = detector.rebuild_state("2001", usage_data[:9])
+
+        anomalies = detector.update_state(state, usage_data[9], self._profile())
+        assert state.drain_streak >= detector.drain_days
+        assert AnomalyType.SUSTAINED_DRAIN in [a.type for a in anomalies]
+
+        for usage in usage_data[10:]:
+            detector.update_state(state, usage, self._profile())
+        assert state.drain_streak == 0
+        assert state.inactive_since == usage_data[10].timestamp
+        assert state.last_active_at == usage_data[9].timestamp
+
+    def test_out_of_order_record_ignored(self):
+        """Eski tarihli kayıt durumu değiştirmemeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+
+        detector = AnomalyDetector()
+        usage_data = self._usage([10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0])
+        state = detector.rebuild_state("2001", usage_data)
+        snapshot = state.model_dump()
+
+        assert detector.update_state(state, usage_data[0], self._profile()) == []
+        assert state.model_dump() == snapshot
+
+    def test_state_risk_score_matches_analysis_and_decays(self):
+        """Durumdan hesaplanan risk skoru analyze_sim ile aynı olmalı, spike pencereden çıkınca düşmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+
+        detector = AnomalyDetector()
+        profile = self._profile()
+        values = [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 300.0, 11.0, 10.0, 12.0]
+        usage_data = self._usage(values)
+
+        state = detector.rebuild_state("2001", usage_data[:7])
+        scores = []
+        for end in range(8, len(usage_data) + 1):
+            detector.update_state(state, usage_data[end - 1], profile)
+            _, expected = detector.analyze_sim("2001", usage_data[:end], profile)
+            assert detector.risk_score(state, profile) == expected
+            scores.append(expected)
+
+        # Spike 3 kayıt boyunca sayılır, sonra skor sıfıra döner
+        assert max(scores) > 0 and scores[-1] == 0
+
+
+    def test_concurrent_ingests_do_not_lose_state(self):
+        """Aynı SIM'e eşzamanlı iki kayıt durumu ezmemeli: çakışan yazım güncel durumla yeniden denenmeli"""
+        import asyncio
+        import mongomock
+        from contextlib import asynccontextmanager
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        class AsyncCollection:
+            """mongomock koleksiyonu; her çağrı olay döngüsüne döner ki iki kayıt iç içe geçsin"""
+            def __init__(self, collection):
+                self.collection = collection
+
+            async def find_one(self, *args, **kwargs):
+                await asyncio.sleep(0)
+                return self.collection.find_one(*args, **kwargs)
+
+            async def replace_one(self, *args, **kwargs):
+                await asyncio.sleep(0)
+                return self.collection.replace_one(*args, **kwargs)
+
+        states = mongomock.MongoClient().db.detector_state
+        states.create_index("sim_id", unique=True)
+        usage_data = self._usage([10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 12.5, 9.5])
+        states.insert_one(AnomalyDetector().rebuild_state("2001", usage_data[:10]).model_dump())
+
+        collections = {"detector_state": AsyncCollection(states), "usage": MagicMock(), "sims": MagicMock()}
+        collections["usage"].insert_one = AsyncMock()
+        collections["sims"].update_one = AsyncMock()
+
+        @asynccontextmanager
+        async def stamp():
+            yield 1
+
+        service = IoTService()
+        with patch.object(service, "db") as db, \
+             patch("Public.API.v1.Libs.iot_service.baseline_store", MagicMock(get_for_sim=AsyncMock(return_value=None), record_usage=AsyncMock())), \
+             patch("Public.API.v1.Libs.iot_service.usage_store", MagicMock(record=AsyncMock())), \
+             patch("Public.API.v1.Libs.iot_service.usage_rollups", MagicMock(record=AsyncMock())), \
+             patch("Public.API.v1.Libs.iot_service.billing_cycles", MagicMock(record=AsyncMock(return_value=None))), \
+             patch("Public.API.v1.Libs.iot_service.cost_cache", MagicMock(invalidate=AsyncMock())), \
+             patch("Public.API.v1.Libs.iot_service.fleet_changes", MagicMock(stamp=stamp)):
+            db.get_collection.side_effect = collections.__getitem__
+
+            async def ingest_both():
+                await asyncio.gather(*[service.ingest_usage(usage, self._profile()) for usage in usage_data[10:]])
+            asyncio.run(ingest_both())
+
+        state = states.find_one({"sim_id": "2001"}, {"_id": 0})
+        assert state["record_count"] == 12
+        assert sorted(state["recent_usage"][-2:]) == [9.5, 12.5]
+
+class TestDetectorPipeline:
+    """Dedektör kayıt defteri ve tek geçişli özellik hattı testleri"""
+
+    def _usage(self, values):
+        from Public.API.v1.Models import Usage
+
+        base = datetime.now().replace(minute=30, second=0, microsecond=0)
+        return [
+            Usage(sim_id="2001", timestamp=base - timedelta(days=len(values) - 1 - i), mb_used=v, roaming_mb=0.0)
+            for i, v in enumerate(values)
+        ]
+
+    def _profile(self):
+        from Public.API.v1.Models import DeviceProfile
+
+        return DeviceProfile(
+            device_type="POS", expected_daily_mb_min=5, expected_daily_mb_max=25, roaming_expected=False
+        )
+
+    def test_detectors_follow_settings_order(self):
+        """Etkin dedektörler AYAR.yml'deki sırayla kurulmalı"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Settings import IOT_SETTINGS
+
+        detector = AnomalyDetector()
+
+        assert [d.name for d in detector.detectors] == IOT_SETTINGS["ANOMALY_DETECTION"]["DETECTORS"]
+        assert detector.window >= detector.drain_days
+
+    def test_disabled_detector_is_skipped(self):
+        """Listeden çıkarılan dedektör ne tekli ne de filo analizinde anomali üretmemeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector, build_usage_matrix
+        from Public.API.v1.Models import AnomalyType
+        from Settings import IOT_SETTINGS
+
+        settings = {"DETECTORS": ["sustained_drain", "inactivity", "unexpected_roaming"]}
+        with patch.dict(IOT_SETTINGS["ANOMALY_DETECTION"], settings):
+            detector = AnomalyDetector()
+
+        usage_data = self._usage([10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 300.0])
+        anomalies, risk_score = detector.analyze_sim("2001", usage_data, self._profile())
+        assert AnomalyType.SUDDEN_SPIKE not in [a.type for a in anomalies]
+
+        sim_ids, mb_used, roaming_mb, timestamps = build_usage_matrix({"2001": usage_data})
+        fleet_anomalies, fleet_scores = detector.analyze_fleet(sim_ids, mb_used, roaming_mb, timestamps, [False])
+        assert "2001" not in fleet_anomalies
+        assert fleet_scores[0] == risk_score == 0
+
+    def test_custom_detector_uses_shared_features(self):
+        """Kayıt defterine eklenen dedektör ortak özelliklerle çalışmalı"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Public.API.v1.Libs.detectors import Detector, DETECTOR_REGISTRY, register_detector
+        from Settings import IOT_SETTINGS
+
+        seen = []
+
+        @register_detector
+        class BaselineProbe(Detector):
+            name = "baseline_probe"
+            window = 3
+
+            def detect(self, features):
+                seen.append((features.baseline_mean, len(features.usage_data)))
+                return []
+
+        try:
+            names = IOT_SETTINGS["ANOMALY_DETECTION"]["DETECTORS"] + ["baseline_probe"]
+            with patch.dict(IOT_SETTINGS["ANOMALY_DETECTION"], {"DETECTORS": names}):
+                detector = AnomalyDetector()
+
+            detector.analyze_sim("2001", self._usage([10.0] * 12), self._profile())
+        finally:
+            DETECTOR_REGISTRY.pop("baseline_probe")
+
+        assert seen == [(10.0, detector.window)]
+
+    def test_custom_detector_runs_in_every_path(self):
+        """Kayıtlı ek dedektör tekli, filo ve artımlı yollarda aynı anomaliyi ve skoru üretmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector, build_usage_matrix
+        from Public.API.v1.Libs.detectors import Detector, DETECTOR_REGISTRY, register_detector
+        from Public.API.v1.Models import Anomaly, AnomalyType, DetectorState, RiskLevel
+        from Settings import IOT_SETTINGS
+
+        @register_detector
+        class ExactValueDetector(Detector):
+            name = "exact_value_probe"
+            anomaly_type = AnomalyType.SUDDEN_SPIKE
+            score_key = "SPIKE_SCORE"
+            window = 2
+
+            def detect(self, features):
+                return [
+                    Anomaly(sim_id=features.sim_id, type=self.anomaly_type, detected_at=usage.timestamp,
+                            severity=RiskLevel.RED, reason=f"probe {usage.mb_used}", evidence={})
+                    for usage in features.usage_data[-self.window:] if usage.mb_used == 42.0
+                ]
+
+        try:
+            with patch.dict(IOT_SETTINGS["ANOMALY_DETECTION"], {"DETECTORS": ["inactivity", "exact_value_probe"]}):
+                detector = AnomalyDetector()
+
+            usage_data = self._usage([10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 42.0])
+            anomalies, risk_score = detector.analyze_sim("2001", usage_data, self._profile())
+
+            sim_ids, mb_used, roaming_mb, timestamps = build_usage_matrix({"2001": usage_data})
+            with pytest.raises(ValueError):
+                detector.analyze_fleet(sim_ids, mb_used, roaming_mb, timestamps, [False])
+            fleet_anomalies, fleet_scores = detector.analyze_fleet(
+                sim_ids, mb_used, roaming_mb, timestamps, [False], device_profiles=[self._profile()]
+            )
+
+            state = detector.rebuild_state("2001", usage_data[:-1])
+            incremental = detector.update_state(state, usage_data[-1], self._profile())
+        finally:
+            DETECTOR_REGISTRY.pop("exact_value_probe")
+
+        assert [a.reason for a in anomalies] == ["probe 42.0"] and risk_score > 0
+        assert [a.reason for a in fleet_anomalies["2001"]] == ["probe 42.0"] and fleet_scores[0] == risk_score
+        assert [a.reason for a in incremental] == ["probe 42.0"]
+        assert detector._calculate_risk_score(incremental) == risk_score
+        assert len(state.recent_records) == detector.history_window
+
+    def test_custom_detector_without_window_rejected(self):
+        """Penceresi olmayan ek dedektör artımlı yolda çalışamayacağı için kurulumda reddedilmeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Public.API.v1.Libs.detectors import Detector, DETECTOR_REGISTRY, register_detector
+        from Settings import IOT_SETTINGS
+
+        @register_detector
+        class FullHistoryProbe(Detector):
+            name = "full_history_probe"
+
+            def detect(self, features):
+                return []
+
+        try:
+            with patch.dict(IOT_SETTINGS["ANOMALY_DETECTION"], {"DETECTORS": ["full_history_probe"]}):
+                with pytest.raises(ValueError, match="full_history_probe"):
+                    AnomalyDetector()
+        finally:
+            DETECTOR_REGISTRY.pop("full_history_probe")
+
+    def test_unknown_detector_rejected(self):
+        """Tanımsız dedektör adı hata vermeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+        from Settings import IOT_SETTINGS
+
+        with patch.dict(IOT_SETTINGS["ANOMALY_DETECTION"], {"DETECTORS": ["nope"]}):
+            with pytest.raises(ValueError):
+                AnomalyDetector()
+
+
+class TestWeekdayBaselines:
+    """Haftanın günü baseline testleri"""
+
+    def _weekly_usage(self, weeks=4):
+        """Cuma-Pazar yoğun, hafta içi sakin ve Pazar günü biten kullanım serisi"""
+        from Public.API.v1.Models import Usage
+
+        today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        last_sunday = today - timedelta(days=(today.weekday() + 1) % 7)
+        days = weeks * 7
+        usage_data = []
+        for i in range(days):
+            timestamp = last_sunday - timedelta(days=days - 1 - i)
+            mb_used = 300.0 + i % 3 if timestamp.weekday() >= 4 else 100.0 + i % 5
+            usage_data.append(Usage(sim_id="2001", timestamp=timestamp, mb_used=mb_used, roaming_mb=0.0))
+
+        return usage_data
+
+    def _baseline(self, usage_data):
+        """record_usage'ın update pipeline'ını mongomock üzerinde çalıştırıp baseline'ı döndürür"""
+        import mongomock
+        from pymongo import ReturnDocument
+        from Public.API.v1.Libs.baseline_store import BaselineStore
+        from Public.API.v1.Models import WeekdayBaseline
+
+        store = BaselineStore()
+        collection = mongomock.MongoClient().db.baselines
+        baseline_doc = None
+        for usage in usage_data:
+            if usage.mb_used > 0:
+                baseline_doc = collection.find_one_and_update(
+                    {"scope": "sim", "key": "2001"}, store.update_pipeline(usage.timestamp, usage.mb_used),
+                    projection={"_id": 0}, upsert=True, return_document=ReturnDocument.AFTER
+                )
+
+        return store, WeekdayBaseline(**baseline_doc)
+
+    def test_capped_welford_matches_statistics(self):
+        """Sınır altında Welford güncellemesi popülasyon ortalama/varyansı ile aynı olmalı"""
+        import statistics
+
+        usage_data = self._weekly_usage(weeks=4)
+        store, baseline = self._baseline(usage_data)
+        mondays = [u.mb_used for u in usage_data if u.timestamp.weekday() == 0]
+
+        assert baseline.counts[0] == len(mondays) <= store.max_samples
+        assert baseline.means[0] == pytest.approx(statistics.mean(mondays))
+        assert baseline.variances[0] == pytest.approx(statistics.pvariance(mondays))
+
+    def test_capped_count_switches_to_moving_average(self):
+        """Sayaç MAX_SAMPLES'da sabitlenmeli, sonrasında yeni haftalar ortalamayı 1/MAX_SAMPLES ağırlıkla çekmeli"""
+        from Public.API.v1.Models import Usage
+
+        usage_data = [u for u in self._weekly_usage(weeks=10) if u.timestamp.weekday() == 0]
+        store, baseline = self._baseline(usage_data)
+
+        expected_mean = 0.0
+        for count, usage in enumerate(usage_data, start=1):
+            expected_mean += (usage.mb_used - expected_mean) / min(count, store.max_samples)
+
+        assert baseline.counts[0] == store.max_samples < len(usage_data)
+        assert baseline.means[0] == pytest.approx(expected_mean)
+        assert baseline.counts[1:] == [0] * 6
+
+        _, shifted = self._baseline(usage_data + [Usage(sim_id="2001", timestamp=usage_data[-1].timestamp, mb_used=1000.0, roaming_mb=0.0)])
+        assert shifted.means[0] == pytest.approx(expected_mean + (1000.0 - expected_mean) / store.max_samples)
+
+    def test_record_usage_is_one_atomic_sim_update(self):
+        """Kayıt SIM baseline'ını tek pipeline güncellemesiyle katlamalı, cihaz tipi belgesine yazmamalı"""
+        import asyncio
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.baseline_store import BaselineStore
+        from Public.API.v1.Models import Usage
+
+        usage = Usage(sim_id="2001", timestamp=datetime(2026, 1, 5, 12), mb_used=120.0, roaming_mb=0.0)
+        baselines = MagicMock()
+        baselines.find_one_and_update = AsyncMock(return_value={
+            "scope": "sim", "key": "2001", "counts": [1] + [0] * 6, "means": [120.0] + [0.0] * 6, "variances": [0.0] * 7
+        })
+
+        store = BaselineStore()
+        with patch("Public.API.v1.Libs.baseline_store.db_manager") as db_manager, \
+             patch("Public.API.v1.Libs.baseline_store.redis_manager") as redis_manager:
+            db_manager.get_collection.return_value = baselines
+            redis_manager.set_cache = AsyncMock()
+            asyncio.run(store.record_usage(usage))
+            asyncio.run(store.record_usage(usage.model_copy(update={"mb_used": 0.0})))
+
+        baselines.find_one_and_update.assert_awaited_once()
+        query, pipeline = baselines.find_one_and_update.call_args.args
+        assert query == {"scope": "sim", "key": "2001"} and isinstance(pipeline, list)
+        assert baselines.find_one_and_update.call_args.kwargs["upsert"] is True
+
+    def test_resolve_prefers_sim_then_device(self):
+        """Yeterli örneği olan gün SIM'den, olmayan gün cihaz tipinden alınmalı"""
+        from Public.API.v1.Models import WeekdayBaseline
+
+        store, sim_baseline = self._baseline(self._weekly_usage(weeks=4))
+        sim_baseline.counts[2] = 1
+        device_baseline = WeekdayBaseline(
+            scope="device_type", key="POS", counts=[8] * 7, means=[50.0] * 7, variances=[4.0] * 7
+        )
+
+        resolved = store.resolve(sim_baseline, device_baseline)
+
+        assert resolved.means[0] == sim_baseline.means[0]
+        assert resolved.means[2] == 50.0
+        assert store.resolve(None, None) is None
+
+    def test_weekend_pattern_not_flagged(self):
+        """Hafta sonu yoğunluğu baseline ile sürekli tüketim sayılmamalı, filo yolu da aynı sonucu vermeli"""
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector, build_usage_matrix
+        from Public.API.v1.Models import DeviceProfile, AnomalyType
+
+        detector = AnomalyDetector()
+        profile = DeviceProfile(
+            device_type="POS", expected_daily_mb_min=5, expected_daily_mb_max=500, roaming_expected=False
+        )
+        usage_data = self._weekly_usage(weeks=4)
+        _, baseline = self._baseline(usage_data[:-7])
+
+        plain, _ = detector.analyze_sim("2001", usage_data, profile)
+        weekday_aware, risk_score = detector.analyze_sim("2001", usage_data, profile, baseline)
+
+        assert AnomalyType.SUSTAINED_DRAIN in [a.type for a in plain]
+        assert AnomalyType.SUSTAINED_DRAIN not in [a.type for a in weekday_aware]
+
+        sim_ids, mb_used, roaming_mb, timestamps = build_usage_matrix({"2001": usage_data})
+        fleet_anomalies, fleet_scores = detector.analyze_fleet(
+            sim_ids, mb_used, roaming_mb, timestamps, [False], [baseline]
+        )
+        assert [a.reason for a in fleet_anomalies.get("2001", [])] == [a.reason for a in weekday_aware]
+        assert fleet_scores[0] == risk_score
+
+
+class TestAnomalyPersistence:
+    """Toplu anomali kaydı ve gün bazlı tekilleştirme testleri"""
+
+    def _anomaly(self, anomaly_type, detected_at):
+        from Public.API.v1.Models import Anomaly, RiskLevel
+
+        return Anomaly(
+            sim_id="2001", type=anomaly_type, detected_at=detected_at,
+            severity=RiskLevel.RED, reason="test", evidence={}
+        )
+
+    def test_single_bulk_write_with_day_key(self):
+        """Parti tek bulk_write olmalı, aynı gün aynı tip tek upsert'e inmeli, sadece yeniler dönmeli"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from Public.API.v1.Libs.iot_service import IoTService
+        from Public.API.v1.Models import AnomalyType
+
+        collection = MagicMock()
+        collection.bulk_write = AsyncMock(return_value=MagicMock(upserted_ids={1: "new-id"}))
+        anomalies = [
+            self._anomaly(AnomalyType.SUDDEN_SPIKE, datetime(2025, 8, 14, 9)),
+            self._anomaly(AnomalyType.SUDDEN_SPIKE, datetime(2025, 8, 14, 18)),
+            self._anomaly(AnomalyType.INACTIVITY, datetime(2025, 8, 14, 18)),
+        ]
+
+        service = IoTService()
+        with patch.object(service.db, "get_collection", return_value=collection):
+            saved = asyncio.run(service.save_anomalies_bulk(anomalies))
+
+        operations = collection.bulk_write.call_args.args[0]
+        assert collection.bulk_write.await_count == 1
+        assert collection.bulk_write.call_args.kwargs["ordered"] is False
+        assert [op._filter for op in operations] == [
+            {"sim_id": "2001", "type": "sudden_spike", "detection_day": datetime(2025, 8, 14)},
+            {"sim_id": "2001", "type": "inactivity", "detection_day": datetime(2025, 8, 14)},
+        ]
+        assert [a.type for a in saved] == [AnomalyType.INACTIVITY]
+        assert saved[0].anomaly_id is not None
+
+    def test_concurrent_duplicate_is_not_new(self):
+        """Eşzamanlı yazımda oluşan duplicate key hatası yeni anomali sayılmamalı"""
+        import asyncio
+        from unittest.mock import AsyncMock
+        from pymongo.errors import BulkWriteError
+        from Public.API.v1.Libs.iot_service import IoTService
+        from Public.API.v1.Models import AnomalyType
+
+        collection = MagicMock()
+        collection.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            "writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}],
+            "upserted": [{"index": 1, "_id": "new-id"}]
+        }))
+        anomalies = [
+            self._anomaly(AnomalyType.SUDDEN_SPIKE, datetime(2025, 8, 14, 9)),
+            self._anomaly(AnomalyType.INACTIVITY, datetime(2025, 8, 14, 9)),
+        ]
+
+        service = IoTService()
+        with patch.object(service.db, "get_collection", return_value=collection):
+            saved = asyncio.run(service.save_anomalies_bulk(anomalies))
+
+        assert [a.type for a in saved] == [AnomalyType.INACTIVITY]
@@ -102,6 +102,15 @@ class TestUsageAPI:
         # Validation error bekleniyor
         assert response.status_code == 422
 
+    def test_get_sim_usage_with_resolution(self, test_client, sample_sim_id):
+        """Dönem özeti çözünürlüğü ile kullanım verisi testi"""
+        response = test_client.get(f"/api/v1/usage/{sample_sim_id}?days=90&resolution=week")
+
+        assert response.status_code in [200, 404, 500]
+
+        invalid = test_client.get(f"/api/v1/usage/{sample_sim_id}?resolution=minute")
+        assert invalid.status_code == 422
+
     def test_get_sim_usage_nonexistent_sim(self, test_client):
         """Var olmayan SIM testi"""
         response = test_client.get("/api/v1/usage/nonexistent")
@@ -109,6 +118,25 @@ class TestUsageAPI:
         # 404 veya 500 bekleniyor, ancak 307 redirect olabilir
         assert response.status_code in [404, 500, 307]
 
+    def test_ingest_sim_usage(self, test_client, sample_sim_id):
+        """Yeni kullanım kaydı artımlı analiz testi"""
+        response = test_client.post(
+            f"/api/v1/usage/{sample_sim_id}", json={"mb_used": 12.5, "roaming_mb": 0}
+        )
+
+        assert response.status_code in [201, 404, 500]
+
+        if response.status_code == 201:
+            data = response.json()
+            for field in ["sim_id", "anomalies", "risk_score", "risk_level"]:
+                assert field in data
+
+    def test_ingest_sim_usage_invalid_body(self, test_client, sample_sim_id):
+        """Eksik kullanım kaydı validation testi"""
+        response = test_client.post(f"/api/v1/usage/{sample_sim_id}", json={})
+
+        assert response.status_code == 422
+
 
 class TestAnalyzeAPI:
     """Analyze API testleri"""
@@ -135,6 +163,49 @@ class TestAnalyzeAPI:
 
         assert response.status_code in [404, 500]
 
+    def test_analyze_batch_start(self, test_client):
+        """Toplu analiz başlatma testi"""
+        response = test_client.post("/api/v1/analyze/batch", json={"risk_level": "red"})
+
+        assert response.status_code in [202, 500]
+
+        if response.status_code == 202:
+            data = response.json()
+            for field in ["job_id", "status", "total_sims", "processed_sims"]:
+                assert field in data
+
+    def test_analyze_batch_unknown_job(self, test_client):
+        """Var olmayan toplu analiz işi testi"""
+        response = test_client.get("/api/v1/analyze/batch/unknown-job")
+
+        assert response.status_code == 404
+
+    def test_reconcile_detector_state(self, test_client, sample_sim_id):
+        """Dedektör durumu mutabakat testi"""
+        response = test_client.post(f"/api/v1/analyze/{sample_sim_id}/reconcile")
+
+        assert response.status_code in [200, 404, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            assert data["sim_id"] == sample_sim_id
+            assert "record_count" in data
+
+
+class TestBaselinesAPI:
+    """Baseline API testleri"""
+
+    def test_get_sim_baselines(self, test_client, sample_sim_id):
+        """SIM baseline'ları testi"""
+        response = test_client.get(f"/api/v1/baselines/{sample_sim_id}")
+
+        assert response.status_code in [200, 404, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            for field in ["sim_id", "device_type", "sim", "device", "resolved"]:
+                assert field in data
+
 
 class TestActionsAPI:
     """Actions API testleri"""
@@ -260,6 +331,35 @@ class TestWhatIfAPI:
 
         assert response.status_code in [200, 404, 500]
 
+    def test_whatif_batch(self, test_client):
+        """Toplu maliyet simülasyonu testi"""
+        response = test_client.post("/api/v1/whatif/batch", json={"sim_ids": ["2001", "2002"], "plan_id": "12"})
+
+        assert response.status_code in [200, 400, 404, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            for field in ["description", "total_sims", "simulated_sims", "saving", "results"]:
+                assert field in data
+            assert data["simulated_sims"] == len(data["results"])
+
+    def test_whatif_sweep(self, test_client, sample_sim_id):
+        """Senaryo ızgarası testi"""
+        request = {
+            "growth": {"start": -0.5, "stop": 2.0, "step": 0.5},
+            "spike_days": {"start": 0, "stop": 2, "step": 1},
+            "roaming_days": {"start": 0, "stop": 30, "step": 15},
+        }
+        response = test_client.post(f"/api/v1/whatif/{sample_sim_id}/sweep", json=request)
+
+        assert response.status_code in [200, 404, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            assert len(data["axes"]["growth"]) == 6
+            assert len(data["costs"]) == len(data["plans"])
+            assert len(data["best_plan"]) == 6
+
     def test_whatif_nonexistent_sim(self, test_client):
         """Var olmayan SIM what-if testi"""
         response = test_client.post("/api/v1/whatif/nonexistent", json={})
@@ -267,6 +367,132 @@ class TestWhatIfAPI:
         assert response.status_code in [404, 500]
 
 
+class TestForecastAPI:
+    """Forecast API testleri"""
+
+    def test_get_usage_forecast(self, test_client, sample_sim_id):
+        """Monte Carlo ay sonu tahmini testi"""
+        response = test_client.get(f"/api/v1/forecast/{sample_sim_id}")
+
+        assert response.status_code in [200, 404, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            for field in ["sim_id", "remaining_days", "usage", "plans", "recommended_plan_id"]:
+                assert field in data
+
+            for band in data["plans"]:
+                assert band["costs"]["p50"] <= band["costs"]["p90"] <= band["costs"]["p99"]
+
+    def test_forecast_uses_month_to_date_usage(self, test_client):
+        """Şu ana kadarki kullanım ay başından, dağılım tamamlanan günlerden alınmalı"""
+        from datetime import datetime, timedelta
+        from unittest.mock import AsyncMock, patch
+        from Public.API.v1.Models import SimCard, IoTPlan, Usage
+        from Public.API.v1.Libs import usage_forecaster
+
+        now = datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        days = [today - timedelta(days=offset) for offset in range(40, -1, -1)]
+        usage_data = [Usage(sim_id="2001", timestamp=day, mb_used=10.0) for day in days]
+
+        sim = SimCard(sim_id="2001", customer_id="9001", device_type="POS", apn="apn-iot", plan_id="11", status="active", city="İstanbul")
+        plan = IoTPlan(plan_id="11", plan_name="IoT Mini", monthly_quota_mb=500, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot")
+
+        with patch("Public.API.v1.Routers.forecast.iot_service") as iot_service, \
+             patch.object(usage_forecaster, "forecast_fleet", wraps=usage_forecaster.forecast_fleet) as forecast_fleet:
+            iot_service.get_sim_by_id = AsyncMock(return_value=sim)
+            iot_service.get_plan_by_id = AsyncMock(return_value=plan)
+            iot_service.get_available_plans = AsyncMock(return_value=[plan])
+            iot_service.get_sim_usage = AsyncMock(return_value=usage_data)
+
+            response = test_client.get("/api/v1/forecast/2001")
+
+        assert response.status_code == 200
+        assert response.json()["used_so_far"] == pytest.approx(10.0 * sum(1 for day in days if day >= today.replace(day=1)))
+
+        histories = forecast_fleet.call_args.args[0]
+        assert len(histories[0]) == usage_forecaster.history_days
+        assert iot_service.get_sim_usage.call_args.args[1] > usage_forecaster.history_days
+
+
+class TestCatalogAPI:
+    """Katalog API testleri"""
+
+    def test_get_catalog_status(self, test_client):
+        """Katalog durumu testi"""
+        response = test_client.get("/api/v1/catalog")
+
+        assert response.status_code in [200, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            for field in ["version", "plans", "addons", "apns"]:
+                assert field in data
+
+    def test_refresh_catalog(self, test_client):
+        """Katalog yenileme testi"""
+        response = test_client.post("/api/v1/catalog/refresh")
+
+        assert response.status_code in [200, 500]
+
+
+class TestCycleCostAPI:
+    """Fatura dönemi maliyet API testleri"""
+
+    def test_get_cycle_cost(self, test_client, sample_sim_id):
+        """Dönem maliyeti ve kümülatif maliyet eğrisi testi"""
+        response = test_client.get(f"/api/v1/cost/{sample_sim_id}/cycle")
+
+        assert response.status_code in [200, 404, 500]
+
+        if response.status_code == 200:
+            data = response.json()
+            for field in ["cycle_start", "days_in_cycle", "used_mb", "total_cost", "accrued_cost", "segments", "daily"]:
+                assert field in data
+
+            costs = [day["cumulative_cost"] for day in data["daily"]]
+            assert costs == sorted(costs)
+
+    def test_cycle_cost_invalid_month(self, test_client, sample_sim_id):
+        """Geçersiz dönem parametresi testi"""
+        response = test_client.get(f"/api/v1/cost/{sample_sim_id}/cycle?month=2025-8")
+
+        assert response.status_code == 422
+
+    def test_billing_event_invalid_type(self, test_client, sample_sim_id):
+        """Bilinmeyen fatura olayı tipi testi"""
+        response = test_client.post(f"/api/v1/cost/{sample_sim_id}/events", json={"type": "refund"})
+
+        assert response.status_code == 422
+
+
+class TestReportsAPI:
+    """Tasarruf raporu API testleri"""
+
+    def test_savings_report_start(self, test_client):
+        """Tasarruf raporu başlatma testi"""
+        response = test_client.post("/api/v1/reports/savings", json={"apn": "apn-iot"})
+
+        assert response.status_code in [202, 500]
+
+        if response.status_code == 202:
+            data = response.json()
+            for field in ["job_id", "status", "total_sims", "processed_sims", "total_saving", "sims_per_second"]:
+                assert field in data
+
+    def test_savings_report_unknown_job(self, test_client):
+        """Var olmayan rapor işi testi"""
+        assert test_client.get("/api/v1/reports/savings/unknown-job").status_code == 404
+        assert test_client.get("/api/v1/reports/savings/unknown-job/summary?by=city").status_code == 404
+        assert test_client.get("/api/v1/reports/savings/unknown-job/results?format=csv").status_code == 404
+
+    def test_savings_report_invalid_params(self, test_client):
+        """Geçersiz gruplama ve indirme biçimi testi"""
+        assert test_client.get("/api/v1/reports/savings/unknown-job/summary?by=plan").status_code == 422
+        assert test_client.get("/api/v1/reports/savings/unknown-job/results?format=xlsx").status_code == 422
+
+
 class TestAPIIntegration:
     """API entegrasyon testleri"""
 
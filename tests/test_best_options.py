@@ -57,6 +57,15 @@ class TestBestOptionsAPI:
                 )
                 assert has_upgrade or len(recommendations) == 0
 
+    def test_get_best_options_combo_mode(self, test_client, sample_sim_id):
+        """Ek paket kombinasyonu modu testi"""
+        response = test_client.get(f"/api/v1/best-options/{sample_sim_id}?mode=combo")
+
+        assert response.status_code in [200, 404, 500]
+
+        invalid = test_client.get(f"/api/v1/best-options/{sample_sim_id}?mode=bruteforce")
+        assert invalid.status_code == 422
+
     def test_get_best_options_nonexistent_sim(self, test_client):
         """Var olmayan SIM için en iyi seçenekler testi"""
         response = test_client.get("/api/v1/best-options/nonexistent_sim")
@@ -441,3 +441,688 @@ class TestCostSimulationBusinessLogic:
 
         total_percentage = base_percentage + addon_percentage + overage_percentage
         assert abs(total_percentage - 100.0) < 0.1  # Should sum to 100%
+
+
+class TestFleetCostOptimizer:
+    """Vektörel filo maliyet optimizasyonu testleri"""
+
+    def _catalog(self):
+        from Public.API.v1.Models import IoTPlan, AddOnPack
+
+        plans = [
+            IoTPlan(plan_id="11", plan_name="IoT Mini 100MB", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot"),
+            IoTPlan(plan_id="12", plan_name="IoT Basic 500MB", monthly_quota_mb=500, monthly_price=19.9, overage_per_mb=0.02, apn="apn-iot"),
+            IoTPlan(plan_id="13", plan_name="IoT Pro 2GB", monthly_quota_mb=2000, monthly_price=39.9, overage_per_mb=0.01, apn="apn-iot"),
+            IoTPlan(plan_id="21", plan_name="Cam 5GB", monthly_quota_mb=5000, monthly_price=59.9, overage_per_mb=0.01, apn="apn-cam"),
+        ]
+        addons = [
+            AddOnPack(addon_id="a1", name="+100MB", extra_mb=100, price=4.0, apn="apn-iot"),
+            AddOnPack(addon_id="a2", name="+500MB", extra_mb=500, price=12.0, apn="apn-iot"),
+            AddOnPack(addon_id="c1", name="+1GB", extra_mb=1000, price=15.0, apn="apn-cam"),
+        ]
+        return plans, addons
+
+    def _reference(self, simulator, usage_data, current_plan, plans, addons):
+        """Eski get_best_options: her aday için simulate_costs ve tam sıralama"""
+        options = [simulator.simulate_costs("2001", usage_data, current_plan)]
+        options[0].description = f"Mevcut Plan: {current_plan.plan_name}"
+        options += [simulator.simulate_costs("2001", usage_data, current_plan, plan) for plan in plans if plan.plan_id != current_plan.plan_id]
+        options += [simulator.simulate_costs("2001", usage_data, current_plan, addons=[addon]) for addon in addons if addon.apn == current_plan.apn]
+        options.sort(key=lambda option: option.candidate_total)
+        return options[:3]
+
+    def test_matches_per_sim_best_options(self):
+        """Tek SIM'lik optimizasyon eski aday bazlı hesapla birebir aynı olmalı"""
+        import random
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import Usage
+
+        simulator = CostSimulator()
+        plans, addons = self._catalog()
+        iot_plans = [plan for plan in plans if plan.apn == "apn-iot"]
+        rng = random.Random(11)
+
+        for _ in range(200):
+            daily = rng.choice([1, 10, 40, 120])
+            usage_data = [
+                Usage(sim_id="2001", timestamp=datetime.now() - timedelta(days=30 - day), mb_used=round(daily * rng.random(), 2))
+                for day in range(rng.randint(1, 30))
+            ]
+            current_plan = rng.choice(iot_plans)
+
+            expected = self._reference(simulator, usage_data, current_plan, iot_plans, addons)
+            actual = simulator.get_best_options("2001", usage_data, current_plan, iot_plans, addons)
+
+            assert [option.model_dump() for option in actual] == [option.model_dump() for option in expected]
+
+    def test_forecast_fleet_usage_matches_single_forecast(self):
+        """Filo girdileri tek SIM'lik tahmin kuralıyla aynı olmalı"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import Usage
+
+        simulator = CostSimulator()
+        histories = [[10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0], [5.0, 5.0], []]
+
+        forecast_mb, used_so_far = simulator.forecast_fleet_usage(histories)
+
+        for history, sim_forecast, sim_used in zip(histories, forecast_mb, used_so_far):
+            usage_data = [Usage(sim_id="2001", timestamp=datetime(2025, 1, 1) + timedelta(days=day), mb_used=mb) for day, mb in enumerate(history)]
+            assert sim_forecast == pytest.approx(simulator._calculate_forecast(usage_data))
+            assert sim_used == pytest.approx(sum(history))
+
+    def test_forecast_excludes_partial_today(self):
+        """Bugünün kısmi kullanımı tahmin ortalamasına girmemeli, yalnızca kullanılan MB'a eklenmeli"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import Usage
+
+        simulator = CostSimulator()
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        history = [10.0, 20.0, 30.0, 40.0, 50.0, 60.0, 70.0, 80.0]
+        usage_data = [Usage(sim_id="2001", timestamp=today - timedelta(days=len(history) - day), mb_used=mb) for day, mb in enumerate(history)]
+        usage_data.append(Usage(sim_id="2001", timestamp=today + timedelta(hours=1), mb_used=1.0))
+
+        expected = (sum(history[-7:]) / 7) * simulator.remaining_days()
+        assert simulator._calculate_forecast(usage_data) == pytest.approx(expected)
+
+        forecast_mb, used_so_far = simulator.forecast_fleet_usage([history], [1.0])
+        assert forecast_mb[0] == pytest.approx(expected)
+        assert used_so_far[0] == pytest.approx(sum(history) + 1.0)
+
+    def test_simulate_fleet_matches_simulate_costs(self):
+        """Toplu simülasyon tekil simulate_costs ile aynı maliyetleri vermeli"""
+        import random
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import Usage
+
+        simulator = CostSimulator()
+        plans, addons = self._catalog()
+        iot_plans = [plan for plan in plans if plan.apn == "apn-iot"]
+        rng = random.Random(17)
+
+        histories = [[rng.uniform(0, 80) for _ in range(rng.randint(1, 30))] for _ in range(50)]
+        current_plans = [rng.choice(iot_plans) for _ in histories]
+        forecast_mb, used_so_far = simulator.forecast_fleet_usage(histories)
+
+        for target_plan, target_addons in [(None, []), (iot_plans[2], []), (None, addons[:2]), (iot_plans[1], addons[:1])]:
+            columns = simulator.simulate_fleet(forecast_mb, used_so_far, current_plans, target_plan, target_addons)
+
+            for index, (history, current_plan) in enumerate(zip(histories, current_plans)):
+                usage_data = [Usage(sim_id="2001", timestamp=datetime(2025, 1, 1) + timedelta(days=day), mb_used=mb) for day, mb in enumerate(history)]
+                expected = simulator.simulate_costs("2001", usage_data, current_plan, target_plan, target_addons)
+
+                assert columns["current_total"][index] == pytest.approx(expected.current_total)
+                assert columns["candidate_total"][index] == pytest.approx(expected.candidate_total)
+                assert columns["overage_cost"][index] == pytest.approx(expected.breakdown.overage_cost)
+                assert columns["addon_cost"][index] == pytest.approx(expected.breakdown.addon_cost)
+
+    def test_fleet_matrix_respects_apn_and_top_k(self):
+        """Filo matrisi SIM'in APN'i dışındaki adayları elemeli ve SIM başına top_k döndürmeli"""
+        import numpy as np
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+
+        simulator = CostSimulator()
+        plans, addons = self._catalog()
+
+        results = simulator.optimize_fleet(
+            ["2001", "2002", "2003"],
+            forecast_mb=np.array([0.0, 500.0, 1500.0]),
+            used_so_far=np.array([50.0, 1000.0, 3000.0]),
+            current_plan_index=np.array([0, 1, 3]),
+            plans=plans,
+            addons=addons,
+            top_k=2
+        )
+
+        assert [option.description for option in results["2001"]] == ["Mevcut Plan: IoT Mini 100MB", "Ek paket: +100MB"]
+        # Eşit maliyette (39.9) mevcut plan önce gelmeli
+        assert [option.description for option in results["2002"]] == ["Mevcut Plan: IoT Basic 500MB", "Plan değişikliği: IoT Pro 2GB"]
+        assert results["2002"][1].saving == 0
+        assert [option.description for option in results["2003"]] == ["Mevcut Plan: Cam 5GB", "Ek paket: +1GB"]
+        assert all(len(options) == 2 for options in results.values())
+
+
+class TestAddonCombinationOptimizer:
+    """Ek paket kombinasyonu (sınırlı sırt çantası) testleri"""
+
+    def test_matches_brute_force(self):
+        """DP sonucu tüm adet kombinasyonlarını deneyen aramayla aynı olmalı"""
+        import random
+        import itertools
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import IoTPlan, AddOnPack
+
+        simulator = CostSimulator()
+        rng = random.Random(12)
+
+        for _ in range(100):
+            plan = IoTPlan(
+                plan_id="11", plan_name="IoT Mini", monthly_quota_mb=rng.choice([100, 500]),
+                monthly_price=9.9, overage_per_mb=rng.choice([0.02, 0.05, 0.1]), apn="apn-iot"
+            )
+            addons = [
+                AddOnPack(addon_id=str(index), name=f"+{extra_mb}MB", extra_mb=extra_mb, price=round(rng.uniform(1, 30), 2), apn="apn-iot")
+                for index, extra_mb in enumerate(rng.sample([50, 100, 250, 500, 1000], 3))
+            ]
+            total_usage = rng.uniform(0, 2000)
+
+            cost, combination = simulator.optimize_addon_combination(total_usage, plan, addons)
+
+            expected = min(
+                simulator._calculate_plan_cost(total_usage, 0, plan, [addon for addon, count in zip(addons, counts) for _ in range(count)])
+                for counts in itertools.product(*[range(2000 // addon.extra_mb + 2) for addon in addons])
+            )
+            assert cost == pytest.approx(expected)
+            assert simulator._calculate_plan_cost(total_usage, 0, plan, combination) == pytest.approx(cost)
+
+    def test_large_deficit_table_is_capped(self):
+        """Küçük EBOB'lu paketlerde büyük açık tablo sınırını aşmamalı, sonuç tam çözüme yakın kalmalı"""
+        import tracemalloc
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import IoTPlan, AddOnPack
+
+        simulator = CostSimulator()
+        plan = IoTPlan(plan_id="11", plan_name="IoT Mini", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot")
+        addons = [
+            AddOnPack(addon_id="a1", name="+7MB", extra_mb=7, price=0.3, apn="apn-iot"),
+            AddOnPack(addon_id="a2", name="+1000MB", extra_mb=1000, price=35.0, apn="apn-iot"),
+            AddOnPack(addon_id="a3", name="+4999MB", extra_mb=4999, price=170.0, apn="apn-iot"),
+        ]
+
+        exact_cost, _ = simulator.optimize_addon_combination(150_000, plan, addons)
+        simulator.max_addon_units = 2_000
+        approx_cost, combination = simulator.optimize_addon_combination(150_000, plan, addons)
+        assert simulator._calculate_plan_cost(150_000, 0, plan, combination) == pytest.approx(approx_cost)
+        assert exact_cost <= approx_cost <= exact_cost * 1.02
+
+        simulator.max_addon_units = 200_000
+        tracemalloc.start()
+        cost, combination = simulator.optimize_addon_combination(500_000_000, plan, addons)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert peak < 64 * 1024 * 1024
+        assert simulator._calculate_plan_cost(500_000_000, 0, plan, combination) == pytest.approx(cost)
+
+    def test_best_combinations_uses_multiple_packs(self):
+        """Aynı paketten birden fazla adet plan değişikliğinden ucuzsa önerilmeli"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import IoTPlan, AddOnPack, Usage
+
+        simulator = CostSimulator()
+        plans = [
+            IoTPlan(plan_id="11", plan_name="IoT Mini 100MB", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot"),
+            IoTPlan(plan_id="13", plan_name="IoT Pro 2GB", monthly_quota_mb=2000, monthly_price=39.9, overage_per_mb=0.01, apn="apn-iot"),
+        ]
+        addons = [AddOnPack(addon_id="a1", name="+100MB", extra_mb=100, price=4.0, apn="apn-iot")]
+        usage_data = [Usage(sim_id="2001", timestamp=datetime(2025, 1, 1) + timedelta(days=day), mb_used=50) for day in range(6)]
+
+        options = simulator.get_best_combinations("2001", usage_data, plans[0], plans, addons)
+
+        # 300MB: Mini + 2×100MB = 17.9 < Mini aşımı 19.9 < Pro 39.9
+        assert options[0].description == "Mevcut Plan: IoT Mini 100MB + 2× +100MB"
+        assert options[0].candidate_total == pytest.approx(17.9)
+        assert options[0].breakdown.addon_cost == pytest.approx(8.0)
+        assert options[0].saving == pytest.approx(2.0)
+
+
+class TestUsageForecast:
+    """Monte Carlo ay sonu tahmini testleri"""
+
+    def test_remaining_days_in_december(self):
+        """Aralık ayında kalan gün hesabı yıl devrinde hata vermemeli"""
+        from datetime import datetime
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+
+        simulator = CostSimulator()
+
+        assert simulator.remaining_days(datetime(2025, 12, 15, 10)) == 15
+        assert simulator.remaining_days(datetime(2025, 1, 15, 10)) == 15
+        assert simulator.remaining_days(datetime(2024, 2, 1)) == 28
+
+    def test_constant_history_gives_exact_bands(self):
+        """Sabit günlük kullanımda tüm yollar ve yüzdelikler aynı olmalı"""
+        from Public.API.v1.Libs.usage_forecast import UsageForecaster
+        from Public.API.v1.Models import IoTPlan
+
+        forecaster = UsageForecaster()
+        plans = [
+            IoTPlan(plan_id="11", plan_name="IoT Mini 100MB", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot"),
+            IoTPlan(plan_id="12", plan_name="IoT Basic 500MB", monthly_quota_mb=500, monthly_price=19.9, overage_per_mb=0.02, apn="apn-iot"),
+        ]
+
+        usage_bands, cost_bands, overage_probability = forecaster.forecast_fleet([[10.0] * 7, []], [150.0, 0.0], 10, plans)
+
+        # 150 + 10 gün × 10MB = 250MB; geçmişi olmayan SIM 0'da kalır
+        assert usage_bands[0].tolist() == pytest.approx([250.0] * len(forecaster.percentiles))
+        assert usage_bands[1].tolist() == pytest.approx([0.0] * len(forecaster.percentiles))
+        assert cost_bands[0, 0].tolist() == pytest.approx([9.9 + 150 * 0.05] * len(forecaster.percentiles))
+        assert cost_bands[0, 1].tolist() == pytest.approx([19.9] * len(forecaster.percentiles))
+        assert overage_probability[0].tolist() == [1.0, 0.0]
+
+    def test_bands_are_ordered_and_batch_is_independent(self):
+        """Yüzdelikler artan olmalı ve toplu tahmin SIM sayısına göre doğrusal ölçeklenmeli"""
+        import numpy as np
+        from Public.API.v1.Libs.usage_forecast import UsageForecaster
+
+        forecaster = UsageForecaster()
+        rng = np.random.default_rng(13)
+        histories = rng.gamma(2.0, 10.0, size=(200, 30))
+
+        samples = forecaster.simulate(histories, 20, paths=1000, rng=np.random.default_rng(1))
+        bands = forecaster.usage_percentiles(np.zeros(200), samples)
+
+        assert samples.shape == (200, 1000)
+        assert np.all(np.diff(bands, axis=1) >= 0)
+        # Örnekler SIM'in kendi geçmişinin toplam sınırları içinde kalır
+        assert np.all(samples >= histories.min(axis=1, keepdims=True) * 20 - 1e-9)
+        assert np.all(samples <= histories.max(axis=1, keepdims=True) * 20 + 1e-9)
+
+
+class TestCatalogIndex:
+    """Bellek içi plan / ek paket kataloğu testleri"""
+
+    def _index(self):
+        from Public.API.v1.Libs.catalog_index import CatalogIndex
+        from Public.API.v1.Models import IoTPlan, AddOnPack
+
+        index = CatalogIndex()
+        index._build(
+            [
+                IoTPlan(plan_id="13", plan_name="IoT Pro 2GB", monthly_quota_mb=2000, monthly_price=39.9, overage_per_mb=0.01, apn="apn-iot"),
+                IoTPlan(plan_id="11", plan_name="IoT Mini 100MB", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot"),
+                IoTPlan(plan_id="14", plan_name="IoT Promo 5GB", monthly_quota_mb=5000, monthly_price=29.9, overage_per_mb=0.01, apn="apn-iot"),
+                IoTPlan(plan_id="12", plan_name="IoT Basic 500MB", monthly_quota_mb=500, monthly_price=19.9, overage_per_mb=0.02, apn="apn-iot"),
+                IoTPlan(plan_id="21", plan_name="Cam 5GB", monthly_quota_mb=5000, monthly_price=59.9, overage_per_mb=0.01, apn="apn-cam"),
+            ],
+            [
+                AddOnPack(addon_id="a2", name="+500MB", extra_mb=500, price=12.0, apn="apn-iot"),
+                AddOnPack(addon_id="a1", name="+100MB", extra_mb=100, price=4.0, apn="apn-iot"),
+            ]
+        )
+        return index
+
+    def test_groups_by_apn_sorted_by_quota(self):
+        """Planlar ve paketler APN'e göre gruplanıp kotaya göre sıralanmalı"""
+        index = self._index()
+
+        assert [plan.plan_id for plan in index.plans_for("apn-iot")] == ["11", "12", "13", "14"]
+        assert [plan.plan_id for plan in index.plans_for("apn-cam")] == ["21"]
+        assert [addon.addon_id for addon in index.addons_for("apn-iot")] == ["a1", "a2"]
+        assert index.addons_for("apn-cam") == []
+        assert index.get_plan("12").plan_name == "IoT Basic 500MB"
+        assert index.get_addon("missing") is None
+
+    def test_cheapest_covering_plan(self):
+        """Kullanımı karşılayan en ucuz plan ikili aramayla bulunmalı"""
+        index = self._index()
+
+        assert index.cheapest_covering_plan("apn-iot", 80).plan_id == "11"
+        assert index.cheapest_covering_plan("apn-iot", 500).plan_id == "12"
+        # 2GB'ı karşılayanlardan 5GB kampanya planı Pro'dan ucuz
+        assert index.cheapest_covering_plan("apn-iot", 1500).plan_id == "14"
+        assert index.cheapest_covering_plan("apn-iot", 6000) is None
+        assert index.cheapest_covering_plan("apn-unknown", 10) is None
+
+
+class TestScenarioSweep:
+    """What-if senaryo ızgarası testleri"""
+
+    def test_grid_matches_pointwise_costs(self):
+        """Izgaradaki her nokta tekil hesapla aynı olmalı"""
+        import numpy as np
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import IoTPlan
+
+        simulator = CostSimulator()
+        plans = [
+            IoTPlan(plan_id="11", plan_name="IoT Mini 100MB", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot"),
+            IoTPlan(plan_id="13", plan_name="IoT Pro 2GB", monthly_quota_mb=2000, monthly_price=39.9, overage_per_mb=0.01, apn="apn-iot"),
+        ]
+        growth = simulator.sweep_axis(-0.5, 2.0, 0.5)
+        spike_days = simulator.sweep_axis(0, 3, 1)
+        roaming_days = simulator.sweep_axis(0, 30, 10)
+
+        costs = simulator.sweep_scenarios(600.0, plans, growth, spike_days, roaming_days, spike_multiplier=10, roaming_cost_per_mb=2.5)
+
+        assert costs.shape == (2, 6, 4, 4)
+        for p, plan in enumerate(plans):
+            for g, rate in enumerate(growth):
+                for s, spikes in enumerate(spike_days):
+                    for r, roaming in enumerate(roaming_days):
+                        monthly = 600.0 * (1 + rate)
+                        usage = monthly + monthly / 30 * 10 * spikes
+                        expected = plan.monthly_price + max(0, usage - plan.monthly_quota_mb) * plan.overage_per_mb + monthly / 30 * roaming * 2.5
+                        assert costs[p, g, s, r] == pytest.approx(expected)
+
+    def test_sweep_axis_validation(self):
+        """Eksen değerleri stop dahil üretilmeli, geçersiz aralıklar reddedilmeli"""
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+
+        simulator = CostSimulator()
+
+        assert simulator.sweep_axis(-0.5, 2.0, 0.25).tolist() == pytest.approx([-0.5 + 0.25 * i for i in range(11)])
+        assert simulator.sweep_axis(0, 0, 1).tolist() == [0]
+
+        for start, stop, step in [(1, 0, 0.1), (0, 1, 0), (0, 10000, 1)]:
+            with pytest.raises(ValueError):
+                simulator.sweep_axis(start, stop, step)
+
+    def test_sweep_grid_total_limit(self):
+        """Eksenler tek tek sınırda olsa da toplam ızgara noktası sınırı aşılırsa reddedilmeli"""
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+
+        simulator = CostSimulator()
+        axis = {"start": 0, "stop": 100, "step": 1}  # 101 nokta: eksen sınırında
+
+        axes = simulator.sweep_grid(growth=axis, spike_days={"start": 0, "stop": 3, "step": 1})
+        assert [len(values) for values in axes.values()] == [101, 4]
+
+        with pytest.raises(ValueError):
+            simulator.sweep_grid(growth=axis, spike_days=axis, roaming_days=axis)
+
+
+class TestCostCache:
+    """Kullanım filigranlı maliyet önbelleği testleri"""
+
+    class _FakeRedis:
+        """string komutlarının TTL'li bellek içi karşılığı (`now` elle ilerletilir)"""
+
+        def __init__(self):
+            self.values = {}
+            self.expires = {}
+            self.commands = []
+            self.now = 0
+
+        def _live(self, key):
+            if key in self.expires and self.expires[key] <= self.now:
+                self.values.pop(key, None)
+                self.expires.pop(key)
+            return self.values.get(key)
+
+        def keys(self):
+            return [key for key in list(self.values) if self._live(key) is not None]
+
+        async def mget(self, *keys):
+            return [self._live(key) for key in keys]
+
+        def pipeline(self):
+            return self
+
+        def set(self, key, value, ex=None):
+            def write():
+                self.values[key] = value
+                self.expires[key] = self.now + ex
+            self.commands.append(write)
+
+        def incr(self, key):
+            def increment():
+                self.values[key] = str(int(self._live(key) or 0) + 1)
+            self.commands.append(increment)
+
+        def expire(self, key, seconds):
+            def refresh():
+                if self._live(key) is not None:
+                    self.expires[key] = self.now + seconds
+            self.commands.append(refresh)
+
+        async def execute(self):
+            for command in self.commands:
+                command()
+            self.commands = []
+
+    def _cache(self, fake_redis):
+        import asyncio
+        import importlib
+        from unittest.mock import AsyncMock
+
+        cost_cache_module = importlib.import_module("Public.API.v1.Libs.cost_cache")
+
+        redis_manager = MagicMock(is_connected=True, client=fake_redis)
+        catalog_index = MagicMock(version="1", ensure=AsyncMock())
+        patches = [
+            patch.object(cost_cache_module, "redis_manager", redis_manager),
+            patch.object(cost_cache_module, "catalog_index", catalog_index),
+        ]
+        for active_patch in patches:
+            active_patch.start()
+        self._patches = patches
+
+        return cost_cache_module.CostCache(), catalog_index, asyncio.run
+
+    def teardown_method(self):
+        for active_patch in getattr(self, "_patches", []):
+            active_patch.stop()
+
+    def test_hit_until_new_usage(self):
+        """Aynı parametreler önbellekten dönmeli, yeni kullanım kaydı değeri geçersiz kılmalı"""
+        cache, _, run = self._cache(self._FakeRedis())
+
+        data, watermark = run(cache.get("2001", "best-options", {"mode": "single"}))
+        assert data is None and watermark == 0
+
+        run(cache.set("2001", "best-options", {"mode": "single"}, watermark, {"saving": 5.0}))
+        assert run(cache.get("2001", "best-options", {"mode": "single"})) == ({"saving": 5.0}, 0)
+        assert run(cache.get("2001", "best-options", {"mode": "combo"}))[0] is None
+        assert run(cache.get("2002", "best-options", {"mode": "single"}))[0] is None
+
+        run(cache.invalidate("2001"))
+        assert run(cache.get("2001", "best-options", {"mode": "single"})) == (None, 1)
+
+    def test_stale_write_and_catalog_change(self):
+        """Hesaplama sırasında kullanım gelirse yazılan değer eşleşmemeli; katalog sürümü değişince de kaçmalı"""
+        cache, catalog_index, run = self._cache(self._FakeRedis())
+        params = {"plan_id": "12", "addons": []}
+
+        _, watermark = run(cache.get("2001", "whatif", params))
+        run(cache.invalidate("2001"))
+        run(cache.set("2001", "whatif", params, watermark, {"saving": 1.0}))
+        assert run(cache.get("2001", "whatif", params)) == (None, 1)
+
+        run(cache.set("2001", "whatif", params, 1, {"saving": 2.0}))
+        assert run(cache.get("2001", "whatif", params))[0] == {"saving": 2.0}
+
+        catalog_index.version = "2"
+        assert run(cache.get("2001", "whatif", params))[0] is None
+
+    def test_stale_entries_expire_while_sim_is_active(self):
+        """Sürekli kullanım alan SIM'de eski gün / katalog / parametre değerleri kendi TTL'iyle düşmeli"""
+        fake_redis = self._FakeRedis()
+        cache, catalog_index, run = self._cache(fake_redis)
+
+        for step in range(96):
+            fake_redis.now = step * 1800
+            catalog_index.version = str(step // 12)
+            _, watermark = run(cache.get("2001", "whatif", {"plan_id": str(step)}))
+            run(cache.set("2001", "whatif", {"plan_id": str(step)}, watermark, {"saving": step}))
+            run(cache.invalidate("2001"))
+
+        # Yarım saatte bir yazım, 1 saatlik TTL: filigran ve son iki değer yaşar
+        assert len(fake_redis.keys()) == 3 and "cost:2001:watermark" in fake_redis.keys()
+        assert run(cache.get("2001", "whatif", {"plan_id": "95"})) == (None, 96)
+
+    def test_inactive_without_redis(self):
+        """Redis yoksa ya da hata verirse önbellek devre dışı kalmalı, uç çalışmaya devam etmeli"""
+        from unittest.mock import AsyncMock
+
+        broken_redis = MagicMock()
+        broken_redis.mget = AsyncMock(side_effect=ConnectionError("redis down"))
+        cache, _, run = self._cache(broken_redis)
+
+        assert run(cache.get("2001", "best-options", {"mode": "single"})) == (None, 0)
+
+        cache.enabled = False
+        run(cache.set("2001", "best-options", {"mode": "single"}, 0, {"saving": 5.0}))
+        run(cache.invalidate("2001"))
+        broken_redis.pipeline.assert_not_called()
+
+
+class TestBillingCycle:
+    """Kıst faturalı dönem maliyeti testleri"""
+
+    def _segment(self, plan_id, start_day, end_day, price, quota, overage):
+        from Public.API.v1.Models import BillingSegment
+
+        return BillingSegment(plan_id=plan_id, plan_name=plan_id, start_day=start_day, end_day=end_day,
+                              monthly_price=price, monthly_quota_mb=quota, overage_per_mb=overage)
+
+    def test_single_plan_matches_monthly_cost(self):
+        """Değişiklik yoksa dönem sonu maliyeti aylık maliyet formülüyle aynı olmalı"""
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import IoTPlan
+
+        simulator = CostSimulator()
+        plan = IoTPlan(plan_id="12", plan_name="IoT Basic 500MB", monthly_quota_mb=500, monthly_price=19.9, overage_per_mb=0.02, apn="apn-iot")
+        daily_mb = [30.0] * 30
+
+        accrual = simulator.cycle_accrual(daily_mb, [self._segment("12", 0, 30, 19.9, 500, 0.02)], [])
+
+        assert accrual["cumulative_cost"][-1] == pytest.approx(simulator._calculate_plan_cost(900, 0, plan, []))
+        assert accrual["cumulative_overage_mb"][-1] == pytest.approx(400)
+        # Ücret günlük tahakkuk eder, kota dolana kadar aşım yok
+        assert accrual["cumulative_cost"][9] == pytest.approx(19.9 * 10 / 30)
+        assert all(b >= a for a, b in zip(accrual["cumulative_cost"], accrual["cumulative_cost"][1:]))
+
+    def test_prorated_plan_change_and_addon(self):
+        """Plan ücreti / kotası gün oranında bölünmeli, ek paket aktivasyon gününden itibaren sayılmalı"""
+        from Public.API.v1.Libs.cost_simulator import CostSimulator
+        from Public.API.v1.Models import BillingAddon
+
+        simulator = CostSimulator()
+        segments = [self._segment("11", 0, 10, 9.9, 100, 0.05), self._segment("13", 10, 30, 39.9, 2000, 0.01)]
+        addons = [BillingAddon(addon_id="a1", name="+100MB", day=20, extra_mb=100, price=4.0)]
+        daily_mb = [100.0] * 30
+
+        accrual = simulator.cycle_accrual(daily_mb, segments, addons)
+
+        assert accrual["base_cost"] == pytest.approx(9.9 / 3 + 39.9 * 2 / 3)
+        assert accrual["addon_cost"] == pytest.approx(4.0)
+        # Havuz: 100 × 10/30 + 2000 × 20/30 (+100 MB 21. günden itibaren)
+        assert accrual["allowance_mb"][19] == pytest.approx(100 / 3 + 4000 / 3)
+        assert accrual["allowance_mb"][20] == pytest.approx(100 / 3 + 4000 / 3 + 100)
+
+        # Gün gün açgözlü havuz tüketimiyle aynı sonuç
+        pool, expected_cost, expected_overage = 100 / 3 + 4000 / 3, 0.0, 0.0
+        for day, usage in enumerate(daily_mb):
+            segment = segments[0] if day < 10 else segments[1]
+            if day == 20:
+                pool += 100
+                expected_cost += 4.0
+            taken = min(usage, pool)
+            pool -= taken
+            expected_overage += usage - taken
+            expected_cost += segment.monthly_price / 30 + (usage - taken) * segment.overage_per_mb
+
+        assert accrual["cumulative_overage_mb"][-1] == pytest.approx(expected_overage)
+        assert accrual["cumulative_cost"][-1] == pytest.approx(expected_cost)
+
+    def test_build_segments_from_events(self):
+        """Plan değişikliği olayları gün aralıklarına, aynı gün değişiklikler tek aralığa dönüşmeli"""
+        from datetime import datetime
+        from Public.API.v1.Libs.billing_cycles import BillingCycles
+        from Public.API.v1.Libs.catalog_index import CatalogIndex
+        from Public.API.v1.Models import IoTPlan, AddOnPack, BillingEvent, BillingEventType
+
+        index = CatalogIndex()
+        index._build(
+            [
+                IoTPlan(plan_id="11", plan_name="IoT Mini 100MB", monthly_quota_mb=100, monthly_price=9.9, overage_per_mb=0.05, apn="apn-iot"),
+                IoTPlan(plan_id="12", plan_name="IoT Basic 500MB", monthly_quota_mb=500, monthly_price=19.9, overage_per_mb=0.02, apn="apn-iot"),
+                IoTPlan(plan_id="13", plan_name="IoT Pro 2GB", monthly_quota_mb=2000, monthly_price=39.9, overage_per_mb=0.01, apn="apn-iot"),
+            ],
+            [AddOnPack(addon_id="a1", name="+100MB", extra_mb=100, price=4.0, apn="apn-iot")]
+        )
+        cycle = datetime(2025, 8, 1)
+        created_at = datetime(2025, 8, 20)
+
+        def event(event_type, day, hour, **fields):
+            return BillingEvent(event_id=f"{day}-{hour}", sim_id="2001", type=event_type, effective_at=datetime(2025, 8, day, hour), created_at=created_at, **fields)
+
+        events = [
+            event(BillingEventType.PLAN_CHANGE, 11, 9, plan_id="12", from_plan_id="11"),
+            event(BillingEventType.PLAN_CHANGE, 11, 15, plan_id="13", from_plan_id="12"),
+            event(BillingEventType.ADDON, 5, 8, addon_id="a1"),
+        ]
+
+        with patch("Public.API.v1.Libs.billing_cycles.catalog_index", index):
+            segments, addons = BillingCycles().build_segments("11", events, cycle, 31)
+            assert BillingCycles().build_segments("99", [], cycle, 31) is None
+
+        assert [(s.plan_id, s.start_day, s.end_day) for s in segments] == [("11", 0, 10), ("13", 10, 31)]
+        assert [(a.addon_id, a.day) for a in addons] == [("a1", 4)]
+
+    def test_rebuild_retries_when_usage_lands_meanwhile(self):
+        """Özetler okunduktan sonra gelen kaydın sayaçları ezilmemeli: sürüm değiştiyse yeniden hesaplanmalı"""
+        import asyncio
+        from datetime import datetime
+        from unittest.mock import AsyncMock
+        from pymongo.errors import DuplicateKeyError
+        from Public.API.v1.Libs.billing_cycles import BillingCycles
+        from Public.API.v1.Models import BillingCycle
+
+        cycle = datetime(2025, 8, 1)
+        built = [
+            BillingCycle(sim_id="2001", cycle=cycle, days_in_cycle=31, plan_id="11", overage_per_mb=0.05,
+                         allowance_mb=100, base_cost=9.9, addon_cost=0, used_mb=used_mb)
+            for used_mb in (10.0, 15.0, 20.0)
+        ]
+
+        collection = MagicMock()
+        # İlk kayıtla belge oluştu (ekleme çakışır), sonra bir kayıt daha sürümü artırdı
+        collection.find_one = AsyncMock(side_effect=[None, {"version": 1}, {"version": 2}])
+        collection.insert_one = AsyncMock(side_effect=DuplicateKeyError("E11000"))
+        collection.update_one = AsyncMock(side_effect=[MagicMock(matched_count=0), MagicMock(matched_count=1)])
+
+        billing = BillingCycles()
+        with patch("Public.API.v1.Libs.billing_cycles.db_manager") as db_manager, \
+             patch.object(billing, "_build", AsyncMock(side_effect=built)):
+            db_manager.get_collection.return_value = collection
+            billing_cycle = asyncio.run(billing.rebuild("2001", cycle))
+
+        assert billing_cycle.used_mb == 20.0 and billing_cycle.version == 3
+        filters = [call.args[0]["version"] for call in collection.update_one.call_args_list]
+        assert filters == [1, 2]
+        assert "quota_alerted_at" not in collection.update_one.call_args.args[1]["$set"]
+
+
+class TestQuotaProjection:
+    """Kullanım hızına dayalı kota öngörüsü testleri"""
+
+    def test_incremental_fold_matches_full_fold(self):
+        """Günler parça parça eklendiğinde de aynı kullanım hızı bulunmalı"""
+        from Public.API.v1.Libs.quota_projection import QuotaProjector
+
+        projector = QuotaProjector()
+        daily_mb = {str(day): float(day * 10) for day in range(1, 11) if day != 4}
+
+        full = projector.fold(0.0, 0, daily_mb, 1, 10)
+        partial = projector.fold(0.0, 0, daily_mb, 1, 3)
+        partial = projector.fold(*partial, daily_mb, 4, 7)
+        partial = projector.fold(*partial, daily_mb, 8, 10)
+
+        assert partial[1] == full[1] == 10
+        assert partial[0] == pytest.approx(full[0])
+        # Yeni günler daha ağır basar
+        assert full[0] > sum(daily_mb.values()) / 10
+
+    def test_projection_only_when_quota_runs_out_before_cycle_end(self):
+        """Havuz dönem bitmeden dolacaksa öngörü dönmeli, dolum zamanı hızdan hesaplanmalı"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.quota_projection import QuotaProjector
+
+        projector = QuotaProjector()
+        now = datetime(2025, 8, 21, 12)
+        cycle_end = datetime(2025, 9, 1)
+
+        projection = projector.project(400, 500, 20, 5, now, cycle_end)
+        assert projection.days_to_quota == pytest.approx(5)
+        assert projection.quota_at == now + timedelta(days=5)
+        assert projection.projected_mb == pytest.approx(400 + 20 * 10.5)
+
+        # Dönem sonuna yetiyor, havuz zaten dolu ya da yeterli gün yok
+        assert projector.project(400, 500, 5, 5, now, cycle_end) is None
+        assert projector.project(600, 500, 20, 5, now, cycle_end) is None
+        assert projector.project(400, 500, 20, projector.min_days - 1, now, cycle_end) is None
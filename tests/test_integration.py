@@ -292,3 +292,107 @@ class TestDataConsistency:
                     assert risk_level == "orange"
                 else:
                     assert risk_level == "green"
+
+
+class TestIndexMigrations:
+    """Tanımlı index migrasyonu testleri"""
+
+    class _Collection:
+        def __init__(self, indexes):
+            self.indexes = indexes  # ad → anahtar çiftleri
+            self.created = []
+
+        async def index_information(self):
+            return {name: {"key": keys} for name, keys in self.indexes.items()}
+
+        async def create_indexes(self, models):
+            for model in models:
+                self.indexes[model.document["name"]] = list(model.document["key"].items())
+                self.created.append(model.document)
+
+        async def aggregate(self, pipeline):
+            indexes = self.indexes
+
+            async def stats():
+                for name, keys in indexes.items():
+                    yield {"name": name, "key": dict(keys), "accesses": {"ops": 5 if name == "sim_id_1" else 0, "since": None}}
+            return stats()
+
+    def _database(self):
+        from collections import defaultdict
+
+        database = defaultdict(lambda: self._Collection({"_id_": [("_id", 1)]}))
+        database["sims"] = self._Collection({"_id_": [("_id", 1)], "sim_id_1": [("sim_id", 1)], "risk_score_1": [("risk_score", 1)]})
+        return database
+
+    def test_ensure_creates_only_missing(self):
+        """Sadece eksik index'ler oluşturulmalı, ikinci çalıştırma hiçbir şey yapmamalı"""
+        from DB.indexes import INDEX_SPECS, ensure_indexes
+
+        database = self._database()
+        first = asyncio.run(ensure_indexes(database))
+        second = asyncio.run(ensure_indexes(database))
+
+        assert "sims.sim_id_1" not in first["created"]
+        assert len(first["created"]) == len(INDEX_SPECS) - 1 and first["existing"] == 1
+        assert second["created"] == [] and second["existing"] == len(INDEX_SPECS)
+
+        anomaly_key = next(doc for doc in database["anomalies"].created if doc["name"] == "sim_id_1_type_1_detection_day_1")
+        assert anomaly_key["unique"] and "partialFilterExpression" in anomaly_key
+
+    def test_report_statuses(self):
+        """Rapor kullanılan, kullanılmayan, eksik ve tanımsız index'leri ayırmalı"""
+        from DB.indexes import index_report
+
+        rows = asyncio.run(index_report(self._database()))
+        sims = {row["name"]: row["status"] for row in rows if row["collection"] == "sims"}
+
+        assert sims["sim_id_1"] == "ok"
+        assert sims["risk_score_1"] == "undeclared"
+        assert sims["updated_seq_1"] == "missing"
+        assert all(row["name"] != "_id_" for row in rows)
+
+    def test_mongo_init_matches_specs(self):
+        """docker/mongo-init.js tanımlı index'lerin hepsini oluşturmalı"""
+        from pathlib import Path
+        from DB.indexes import INDEX_SPECS
+
+        init_script = (Path(__file__).parent.parent / "docker" / "mongo-init.js").read_text()
+        for spec in INDEX_SPECS:
+            keys = ", ".join(f'"{field}": {direction}' for field, direction in spec.keys)
+            assert f"db.{spec.collection}.createIndex(" in init_script and f"{{ {keys} }}" in init_script, spec.name
+
+    def test_backfill_detection_day_runs_once(self):
+        """Eski anomalilere detection_day bir kez eklenmeli, çakışan (E11000) belgeler atlanmalı"""
+        from datetime import datetime
+        from pymongo.errors import BulkWriteError
+        from DB.migrations import backfill_detection_day, MIGRATIONS_ID
+
+        day = datetime(2025, 1, 1)
+        groups = [{"_id": {"sim_id": "2001", "type": "sudden_spike", "day": day}, "doc_id": 1},
+                  {"_id": {"sim_id": "2002", "type": "inactivity", "day": day}, "doc_id": 2}]
+
+        async def aggregate(pipeline, **kwargs):
+            async def docs():
+                for group in groups:
+                    yield group
+            return docs()
+
+        markers = {}
+        counters = MagicMock()
+        counters.find_one = AsyncMock(side_effect=lambda query, projection: markers or None)
+        counters.update_one = AsyncMock(side_effect=lambda query, update, upsert: markers.update(update["$set"]))
+        anomalies = MagicMock()
+        anomalies.aggregate = AsyncMock(side_effect=aggregate)
+        anomalies.bulk_write = AsyncMock(side_effect=BulkWriteError({
+            "writeErrors": [{"index": 1, "code": 11000}], "nModified": 1
+        }))
+        database = {"counters": counters, "anomalies": anomalies}
+
+        assert asyncio.run(backfill_detection_day(database)) == 1
+        operations = anomalies.bulk_write.call_args.args[0]
+        assert [operation._doc["$set"]["detection_day"] for operation in operations] == [day, day]
+        assert counters.update_one.call_args.args[0] == {"_id": MIGRATIONS_ID} and "anomaly_detection_day" in markers
+
+        assert asyncio.run(backfill_detection_day(database)) == 0
+        assert anomalies.aggregate.call_count == 1
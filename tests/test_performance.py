@@ -160,3 +160,694 @@ class TestAPILoad:
 
         # 50MB'dan fazla artış olmamalı
         assert memory_increase < 50
+
+
+class TestUsageStore:
+    """Bellek içi kullanım önbelleği testleri"""
+
+    def _usage(self, sim_id, days):
+        from datetime import datetime, timedelta
+        from Public.API.v1.Models import Usage
+
+        base = datetime.now().replace(microsecond=0) - timedelta(days=days - 1)
+        return [
+            Usage(sim_id=sim_id, timestamp=base + timedelta(days=i), mb_used=round(10.37 + i, 2), roaming_mb=0.25 * (i % 3))
+            for i in range(days)
+        ]
+
+    def test_round_trip_values(self):
+        """float32 kolonlardan dönen değerler orijinalleriyle aynı olmalı"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.usage_store import UsageStore
+
+        store = UsageStore()
+        usage_data = self._usage("2001", 60)
+        store.put("2001", usage_data, datetime.now() - timedelta(days=90))
+
+        cached = store.get("2001", 30)
+        expected = [u for u in usage_data if u.timestamp >= datetime.now() - timedelta(days=30)]
+
+        assert [(u.timestamp, u.mb_used, u.roaming_mb) for u in cached] == [
+            (u.timestamp, u.mb_used, u.roaming_mb) for u in expected
+        ]
+
+    def test_miss_outside_covered_window(self):
+        """Kapsanmayan pencere ve bilinmeyen SIM için None dönmeli"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.usage_store import UsageStore
+
+        store = UsageStore()
+        store.put("2001", self._usage("2001", 10), datetime.now() - timedelta(days=10))
+
+        assert store.get("2001", 30) is None
+        assert store.get("9999", 7) is None
+        assert store.get("2001", 7) is not None
+
+    def test_ring_buffer_and_lru_eviction(self):
+        """Tampon kapasiteyi aşınca en eskiyi, bütçe aşılınca en soğuk SIM'i düşürmeli"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.usage_store import UsageStore
+
+        from Public.API.v1.Libs.usage_store import RECORD_BYTES, BUFFER_OVERHEAD
+
+        store = UsageStore()
+        store.capacity = store.max_capacity = 5
+        store.memory_budget = 2 * (5 * RECORD_BYTES + BUFFER_OVERHEAD)
+
+        since = datetime.now() - timedelta(days=90)
+        usage_a = self._usage("a", 10)
+        store.put("a", usage_a[:3], since)
+        store.put("b", self._usage("b", 3), since)
+        store.get("a", 90)
+        store.put("c", self._usage("c", 3), since)
+
+        assert list(store.buffers) == ["a", "c"]
+
+        for usage in usage_a[3:]:
+            store.append(usage)
+
+        assert store.buffers["a"].size == 5
+        assert store.get("a", 90) is None
+        assert [u.mb_used for u in store.get("a", 5)] == [u.mb_used for u in usage_a[-5:]]
+
+    def test_buffer_grows_to_cover_warm_window(self):
+        """Günde çok kez raporlayan SIM'de tampon WARM_DAYS penceresini kapsayacak kadar büyümeli"""
+        from datetime import datetime, timedelta
+        from Public.API.v1.Libs.usage_store import UsageStore
+        from Public.API.v1.Models import Usage
+
+        store = UsageStore()
+        store.capacity = 8
+
+        # 30 gün boyunca saatte bir kayıt: başlangıç kapasitesinin çok üstünde
+        now = datetime.now().replace(microsecond=0)
+        usage_data = [Usage(sim_id="2001", timestamp=now - timedelta(hours=hour), mb_used=float(hour), roaming_mb=0)
+                      for hour in range(30 * 24 - 1, 0, -1)]
+        store.put("2001", usage_data[:10], now - timedelta(days=90))
+        for usage in usage_data[10:]:
+            store.append(usage)
+
+        cached = store.get("2001", 30)
+        assert cached is not None and len(cached) == len(usage_data)
+        assert store.memory_bytes == store.buffers["2001"].nbytes
+
+    def test_external_usage_write_clears_store(self):
+        """Redis'teki kullanım sürümü değişince tüm tamponlar atılmalı"""
+        from datetime import datetime, timedelta
+        from unittest.mock import AsyncMock, patch
+        from Public.API.v1.Libs.usage_store import UsageStore
+
+        store = UsageStore()
+        store.version = "1"
+        store.put("2001", self._usage("2001", 10), datetime.now() - timedelta(days=10))
+
+        with patch.object(store, "_read_version", AsyncMock(return_value="1")):
+            asyncio.run(store.ensure())
+        assert store.get("2001", 7) is not None
+
+        store.checked_at = 0.0
+        with patch.object(store, "_read_version", AsyncMock(return_value="2")):
+            asyncio.run(store.ensure())
+        assert store.get("2001", 7) is None and store.memory_bytes == 0
+
+
+    def test_other_worker_writes_invalidate_sim(self):
+        """Başka işçide yazılan kayıt bu işçide yalnızca o SIM'in tamponunu atmalı, kendi yazımı atmamalı"""
+        from datetime import datetime, timedelta
+        from unittest.mock import MagicMock, patch
+        from Public.API.v1.Libs.usage_store import UsageStore, USAGE_SEQ_KEY, USAGE_CHANGES_KEY
+        from Public.API.v1.Models import Usage
+
+        class FakeRedis:
+            def __init__(self):
+                self.seq, self.changes = 0, {}
+
+            async def get(self, key):
+                return {USAGE_SEQ_KEY: str(self.seq)}.get(key)
+
+            async def eval(self, script, key_count, seq_key, changes_key, sim_id):
+                previous = self.changes.get(sim_id)
+                self.seq += 1
+                self.changes[sim_id] = self.seq
+                return [self.seq, None if previous is None else str(previous)]
+
+            async def zrangebyscore(self, key, low, high, withscores):
+                assert key == USAGE_CHANGES_KEY
+                return sorted(((sim_id, float(seq)) for sim_id, seq in self.changes.items() if seq > int(low.lstrip("("))), key=lambda item: item[1])
+
+        with patch("Public.API.v1.Libs.usage_store.redis_manager", MagicMock(is_connected=True, client=FakeRedis())):
+            since = datetime.now() - timedelta(days=10)
+            workers = [UsageStore(), UsageStore()]
+            for worker in workers:
+                worker.change_seq = 0
+                for sim_id in ("2001", "2002"):
+                    worker.put(sim_id, self._usage(sim_id, 10), since)
+
+            usage = Usage(sim_id="2001", timestamp=datetime.now().replace(microsecond=0), mb_used=99.0, roaming_mb=0)
+            asyncio.run(workers[0].record(usage))
+            for worker in workers:
+                worker.checked_at = 0.0
+                asyncio.run(worker.ensure())
+
+            assert workers[0].get("2001", 7)[-1].mb_used == 99.0
+            assert workers[1].get("2001", 7) is None and workers[1].get("2002", 7) is not None
+
+            # İkinci işçi ilk işçinin kaydını uygulamadan aynı SIM'e yazarsa kendi tamponu da eksik kalır
+            workers[1].put("2001", self._usage("2001", 10), since)
+            asyncio.run(workers[0].record(usage))
+            asyncio.run(workers[1].record(usage))
+            assert "2001" not in workers[1].buffers
+
+class TestUsageRollups:
+    """Çok çözünürlüklü kullanım özeti testleri"""
+
+    def test_bucket_start(self):
+        """Dönem başlangıçları saat, gün, Pazartesi ve ayın 1'ine yuvarlanmalı"""
+        from datetime import datetime
+        from Public.API.v1.Libs.usage_rollups import UsageRollups
+
+        rollups = UsageRollups()
+        timestamp = datetime(2025, 8, 14, 17, 45, 12)   # Perşembe
+
+        assert rollups.bucket_start(timestamp, "hour") == datetime(2025, 8, 14, 17)
+        assert rollups.bucket_start(timestamp, "day") == datetime(2025, 8, 14)
+        assert rollups.bucket_start(timestamp, "week") == datetime(2025, 8, 11)
+        assert rollups.bucket_start(timestamp, "month") == datetime(2025, 8, 1)
+
+        with pytest.raises(ValueError):
+            rollups.bucket_start(timestamp, "minute")
+
+    def test_choose_resolution(self):
+        """Uzun aralıklar için daha kaba özet seçilmeli"""
+        from Public.API.v1.Libs.usage_rollups import UsageRollups
+
+        rollups = UsageRollups()
+
+        assert rollups.choose_resolution(1) == "hour"
+        assert rollups.choose_resolution(30) == "day"
+        assert rollups.choose_resolution(90) == "week"
+        assert rollups.choose_resolution(365) == "month"
+
+    def test_rollup_pipeline(self):
+        """Aggregation haftayı Pazartesi başlatmalı ve özet koleksiyonuna yazmalı"""
+        from Public.API.v1.Libs.usage_rollups import rollup_pipeline
+
+        pipeline = rollup_pipeline("week", {"sim_id": "2001"})
+
+        assert pipeline[0] == {"$match": {"sim_id": "2001"}}
+        assert pipeline[1]["$group"]["_id"]["bucket"]["$dateTrunc"]["startOfWeek"] == "monday"
+        assert pipeline[-1]["$merge"]["on"] == ["sim_id", "resolution", "bucket"]
+        assert "startOfWeek" not in rollup_pipeline("day")[1]["$group"]["_id"]["bucket"]["$dateTrunc"]
+
+    def test_partial_first_bucket_is_clipped(self):
+        """Aralığın başına kısmen düşen dönem atılmamalı, ince özetlerden kırpılarak eklenmeli"""
+        from datetime import datetime, timedelta
+        from unittest.mock import MagicMock, patch
+        from Public.API.v1.Libs.usage_rollups import UsageRollups, RESOLUTIONS
+
+        rollups = UsageRollups()
+
+        # 20 gün boyunca saatte bir kayıt (her saatin 45. dakikası)
+        usage_docs = [
+            {"sim_id": "2001", "timestamp": datetime(2025, 8, 1, 0, 45) + timedelta(hours=hour), "mb_used": float(hour % 7 + 1), "roaming_mb": 0.0}
+            for hour in range(20 * 24)
+        ]
+        rollup_docs = {}
+        for usage_doc in usage_docs:
+            for resolution in RESOLUTIONS:
+                key = (resolution, rollups.bucket_start(usage_doc["timestamp"], resolution))
+                rollup = rollup_docs.setdefault(key, {"sim_id": "2001", "resolution": resolution, "bucket": key[1], "mb_used": 0.0,
+                                                      "roaming_mb": 0.0, "max_mb": 0.0, "count": 0,
+                                                      "first_at": usage_doc["timestamp"], "last_at": usage_doc["timestamp"]})
+                rollup["mb_used"] += usage_doc["mb_used"]
+                rollup["max_mb"] = max(rollup["max_mb"], usage_doc["mb_used"])
+                rollup["count"] += 1
+                rollup["last_at"] = usage_doc["timestamp"]
+
+        def in_range(value, condition):
+            return value >= condition["$gte"] and ("$lt" not in condition or value < condition["$lt"])
+
+        class Cursor(list):
+            def sort(self, *args):
+                return self
+            def __aiter__(self):
+                async def docs():
+                    for doc in self:
+                        yield doc
+                return docs()
+
+        collections = {"usage_rollups": MagicMock(), "usage": MagicMock()}
+        collections["usage_rollups"].find.side_effect = lambda query, projection=None: Cursor(sorted(
+            (doc for doc in rollup_docs.values() if doc["resolution"] == query["resolution"] and in_range(doc["bucket"], query["bucket"])),
+            key=lambda doc: doc["bucket"]
+        ))
+        collections["usage"].find.side_effect = lambda query, projection=None: Cursor(
+            doc for doc in usage_docs if in_range(doc["timestamp"], query["timestamp"])
+        )
+
+        start = datetime(2025, 8, 6, 10, 30)   # Çarşamba, saat ortası
+        expected = sum(doc["mb_used"] for doc in usage_docs if doc["timestamp"] >= start)
+        with patch("Public.API.v1.Libs.usage_rollups.db_manager") as db_manager:
+            db_manager.get_collection.side_effect = collections.__getitem__
+            for resolution in ("day", "week", "month"):
+                result = asyncio.run(rollups.get("2001", start, resolution))
+
+                assert result[0].bucket == start and result[0].first_at == datetime(2025, 8, 6, 10, 45)
+                assert sum(rollup.mb_used for rollup in result) == pytest.approx(expected)
+                assert sum(rollup.count for rollup in result) == sum(1 for doc in usage_docs if doc["timestamp"] >= start)
+
+
+class TestRoamingFilter:
+    """Denormalize roaming alanıyla filo filtresi testleri"""
+
+    def test_has_roaming_query(self):
+        """Roaming filtresi sims üzerinde tek koşula dönüşmeli"""
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        service = IoTService()
+
+        with_roaming = service.build_sim_query(risk_level="red", has_roaming=True)
+        without_roaming = service.build_sim_query(has_roaming=False)
+
+        assert "$gte" in with_roaming["last_roaming_at"] and "risk_score" in with_roaming
+        assert without_roaming["last_roaming_at"] == {"$not": {"$gte": without_roaming["last_roaming_at"]["$not"]["$gte"]}}
+        assert "last_roaming_at" not in service.build_sim_query()
+
+    def test_filtered_sims_single_query(self):
+        """Filtre SIM başına kullanım sorgusu yapmamalı"""
+        from unittest.mock import MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        sim_doc = {"sim_id": "2001", "device_type": "POS", "apn": "apn-pos", "plan_id": "11", "status": "active", "city": "İstanbul"}
+
+        class Cursor:
+            def __aiter__(self):
+                async def docs():
+                    yield sim_doc
+                return docs()
+
+        collections = {"sims": MagicMock(), "usage": MagicMock()}
+        collections["sims"].find.return_value = Cursor()
+
+        service = IoTService()
+        with patch.object(service.db, "get_collection", side_effect=collections.__getitem__):
+            sims = asyncio.run(service.get_filtered_sims(has_roaming=True))
+
+        assert [sim.sim_id for sim in sims] == ["2001"]
+        assert collections["sims"].find.call_count == 1
+        assert "last_roaming_at" in collections["sims"].find.call_args.args[0]
+        collections["usage"].find_one.assert_not_called()
+
+    def test_last_roaming_fill_runs_once(self):
+        """Roaming alanı bir kez doldurulmalı, hiç roaming olmayan filoda da yeniden çalışmamalı"""
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        async def aggregate(pipeline, **kwargs):
+            async def docs():
+                return
+                yield
+            return docs()
+
+        markers = {}
+        collections = {"counters": MagicMock(), "usage": MagicMock(), "sims": MagicMock()}
+        collections["counters"].find_one = AsyncMock(side_effect=lambda query, projection: markers or None)
+        collections["counters"].update_one = AsyncMock(side_effect=lambda query, update, upsert: markers.update(update["$set"]))
+        collections["usage"].aggregate = AsyncMock(side_effect=aggregate)
+        collections["sims"].count_documents = AsyncMock(return_value=0)
+
+        service = IoTService()
+        with patch.object(service, "db") as db:
+            db.database = collections
+            db.get_collection.side_effect = collections.__getitem__
+            asyncio.run(service.ensure_last_roaming())
+            asyncio.run(service.ensure_last_roaming())
+
+        assert collections["usage"].aggregate.call_count == 1
+        assert "last_roaming_at" in markers
+
+
+class TestFleetPaging:
+    """Filo keyset sayfalama testleri"""
+
+    def test_keyset_filter_and_cursor(self):
+        """İmleç sıralama anahtarlarını taşımalı, filtre sonraki dokümanları seçmeli"""
+        import pytest
+        from Public.API.v1.Libs.iot_service import keyset_filter, encode_fleet_cursor, decode_fleet_cursor
+
+        sort_spec = [("risk_score", -1), ("sim_id", 1)]
+        cursor = encode_fleet_cursor([80, "2004"])
+
+        assert decode_fleet_cursor(cursor, 2) == [80, "2004"]
+        assert keyset_filter(sort_spec, [80, "2004"]) == {
+            "$or": [{"risk_score": {"$lt": 80}}, {"risk_score": None}, {"risk_score": 80, "sim_id": {"$gt": "2004"}}]
+        }
+        assert keyset_filter([("sim_id", -1)], ["2004"]) == {"sim_id": {"$lt": "2004"}}
+
+        with pytest.raises(ValueError):
+            decode_fleet_cursor("bozuk", 2)
+        with pytest.raises(ValueError):
+            decode_fleet_cursor(cursor, 1)
+
+    def test_keyset_pages_through_missing_risk_score(self):
+        """risk_score'u eksik / null SIM'ler iki sıralama yönünde de sayfalar arasında kaybolmamalı"""
+        from Public.API.v1.Libs.iot_service import keyset_filter
+
+        sim_docs = [{"sim_id": "2001", "risk_score": 40}, {"sim_id": "2002"}, {"sim_id": "2003", "risk_score": 0},
+                    {"sim_id": "2004", "risk_score": None}, {"sim_id": "2005", "risk_score": 0}, {"sim_id": "2006"}]
+
+        def matches(doc, query):
+            # MongoDB karşılaştırma anlamı: eşitlikte None eksik alanı da kapsar, $lt / $gt null'u kapsamaz
+            if "$or" in query:
+                return any(matches(doc, branch) for branch in query["$or"])
+            for field, condition in query.items():
+                value = doc.get(field)
+                if isinstance(condition, dict):
+                    operator, bound = next(iter(condition.items()))
+                    if operator == "$ne":
+                        if value == bound:
+                            return False
+                    elif value is None or not (value > bound if operator == "$gt" else value < bound):
+                        return False
+                elif value != condition:
+                    return False
+            return True
+
+        for direction in (-1, 1):
+            sort_spec = [("risk_score", direction), ("sim_id", -direction)]
+
+            def order(doc):
+                risk = doc.get("risk_score")
+                return ((risk is not None, risk or 0) if direction == 1 else (risk is None, -(risk or 0)), -int(doc["sim_id"]) * direction)
+
+            expected = sorted(sim_docs, key=order)
+            paged, last = [], None
+            while True:
+                remaining = [doc for doc in expected if last is None or matches(doc, keyset_filter(sort_spec, last))]
+                if not remaining:
+                    break
+                paged += remaining[:2]
+                last = [remaining[:2][-1].get(field) for field, _ in sort_spec]
+
+            assert [doc["sim_id"] for doc in paged] == [doc["sim_id"] for doc in expected]
+
+    def test_fleet_page_projection_and_limit(self):
+        """Sayfa limit + 1 doküman okumalı, yalnızca istenen alanları çekmeli"""
+        from unittest.mock import MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService, decode_fleet_cursor
+
+        sim_docs = [{"sim_id": sim_id, "risk_score": 80} for sim_id in ("2001", "2002", "2003")]
+
+        class Cursor:
+            def __aiter__(self):
+                async def docs():
+                    for sim_doc in sim_docs:
+                        yield sim_doc
+                return docs()
+
+        sims_collection = MagicMock()
+        sims_collection.find.return_value.sort.return_value.limit.return_value = Cursor()
+
+        service = IoTService()
+        with patch.object(service.db, "get_collection", return_value=sims_collection):
+            sims, next_cursor = asyncio.run(service.get_fleet_page(limit=2, fields=["sim_id", "risk_level"]))
+
+        assert sims == [{"sim_id": "2001", "risk_level": "red"}, {"sim_id": "2002", "risk_level": "red"}]
+        assert decode_fleet_cursor(next_cursor, 2) == [80, "2002"]
+        assert sims_collection.find.call_args.args[1] == {"_id": 0, "risk_score": 1, "sim_id": 1}
+        sims_collection.find.return_value.sort.return_value.limit.assert_called_once_with(3)
+
+    def test_fleet_filters_run_on_server(self):
+        """Arama, durum, şehir ve anomali filtreleri sorguya girmeli; filtreli sayım anahtarı filtreleri içermeli"""
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        service = IoTService()
+        query = service.build_sim_query(risk_level="red", status="active", city="Ankara", has_anomalies=True, search="20.1")
+        assert query["risk_score"] == {"$gte": 70}
+        assert (query["status"], query["city"], query["anomaly_count"]) == ("active", "Ankara", {"$gt": 0})
+        assert query["$or"] == [{"sim_id": {"$regex": "^20\\.1"}}, {"device_type": {"$regex": "^20\\.1", "$options": "i"}}]
+
+        sims_collection = MagicMock()
+        sims_collection.count_documents = AsyncMock(return_value=3)
+        with patch.object(service.db, "get_collection", return_value=sims_collection), \
+             patch("Public.API.v1.Libs.iot_service.redis_manager") as redis_manager:
+            redis_manager.get_cache = AsyncMock(return_value=None)
+            redis_manager.set_cache = AsyncMock()
+            assert asyncio.run(service.count_fleet({"city": "Ankara", "risk_level": None})) == 3
+
+        assert sims_collection.count_documents.call_args.args[0] == {"city": "Ankara"}
+        assert redis_manager.set_cache.call_args.args[0] == 'fleet:count:{"city": "Ankara"}'
+
+    def test_fleet_stats_cover_whole_fleet(self):
+        """İstatistikler tek aggregation ile filonun tamamından hesaplanıp önbelleğe yazılmalı"""
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        class Cursor:
+            def __aiter__(self):
+                async def docs():
+                    yield {"_id": None, "total": 5000, "active": 4800, "high_risk": 12, "anomalies": 40,
+                           "cities": ["İzmir", None, "Ankara"]}
+                return docs()
+
+        sims_collection = MagicMock()
+        sims_collection.aggregate = AsyncMock(return_value=Cursor())
+
+        service = IoTService()
+        with patch.object(service.db, "get_collection", return_value=sims_collection), \
+             patch("Public.API.v1.Libs.iot_service.redis_manager") as redis_manager:
+            redis_manager.get_cache = AsyncMock(return_value=None)
+            redis_manager.set_cache = AsyncMock()
+            stats = asyncio.run(service.get_fleet_stats())
+
+        assert stats == {"total": 5000, "active": 4800, "high_risk": 12, "anomalies": 40, "cities": ["Ankara", "İzmir"]}
+        assert sims_collection.aggregate.call_count == 1
+        assert redis_manager.set_cache.call_args.args[:2] == ("fleet:stats", stats)
+
+
+class TestFleetChanges:
+    """Filigranlı filo değişiklikleri testleri"""
+
+    def test_changes_watermark(self):
+        """Devamı varsa filigran son dönen SIM'in damgası, yoksa güvenli filigran olmalı; ileri filigran sıfırlama bildirmeli"""
+        from unittest.mock import AsyncMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+        from Public.API.v1.Libs.fleet_changes import fleet_changes
+
+        sim_doc = {"sim_id": "2001", "device_type": "POS", "apn": "apn-pos", "plan_id": "11", "status": "active",
+                   "city": "İstanbul", "risk_score": 85, "anomaly_count": 2, "updated_seq": 7}
+
+        service = IoTService()
+        with patch.object(fleet_changes, "position", AsyncMock(return_value=(9, 8))), \
+             patch.object(fleet_changes, "changed_since", AsyncMock(return_value=([sim_doc], True))) as changed_since:
+            changes, watermark, has_more, reset = asyncio.run(service.get_fleet_changes(5, 1))
+            assert changed_since.call_args.args[:3] == (5, 8, 1)
+
+            assert [change.sim_id for change in changes] == ["2001"] and changes[0].risk_level == "red"
+            assert (watermark, has_more, reset) == (7, True, False)
+
+            changed_since.return_value = ([sim_doc], False)
+            assert asyncio.run(service.get_fleet_changes(5, 1))[1:] == (8, False, False)
+
+            assert asyncio.run(service.get_fleet_changes(12, 1)) == ([], 8, False, True)
+
+    def test_out_of_order_write_is_not_skipped(self):
+        """Büyük damga küçükten önce yazılırsa filigran küçük damga yazılana dek onu geçmemeli"""
+        from datetime import datetime, timedelta
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        def sim_doc(sim_id, seq):
+            return {"sim_id": sim_id, "device_type": "POS", "apn": "apn-pos", "plan_id": "11", "status": "active",
+                    "city": "İstanbul", "risk_score": 10, "anomaly_count": 0, "updated_seq": seq}
+
+        # 5 ve 6 damgaları ayrıldı; 6 önce indi, 5 hâlâ yazılıyor
+        counter = {"_id": "sims", "seq": 6, "pending": [{"first": 5, "at": datetime.now()}]}
+        sims = {"2001": sim_doc("2001", 4), "2002": sim_doc("2002", 6)}
+
+        class Cursor:
+            def __init__(self, docs):
+                self.docs = docs
+            def sort(self, *args):
+                self.docs.sort(key=lambda doc: doc["updated_seq"])
+                return self
+            def limit(self, count):
+                self.docs = self.docs[:count]
+                return self
+            def __aiter__(self):
+                async def docs():
+                    for doc in self.docs:
+                        yield doc
+                return docs()
+
+        def find(query, projection=None):
+            bounds = query["updated_seq"]
+            return Cursor([doc for doc in sims.values() if bounds["$gt"] < doc["updated_seq"] <= bounds["$lte"]])
+
+        collections = {"counters": MagicMock(), "sims": MagicMock()}
+        collections["counters"].find_one = AsyncMock(side_effect=lambda *args: counter)
+        collections["sims"].find.side_effect = find
+
+        service = IoTService()
+        with patch("Public.API.v1.Libs.fleet_changes.db_manager") as db_manager:
+            db_manager.get_collection.side_effect = collections.__getitem__
+            changes, watermark, _, _ = asyncio.run(service.get_fleet_changes(4, 10))
+            assert (changes, watermark) == ([], 4)
+
+            # 5 yazıldı ve bekleyenlerden çıktı: iki SIM de gelir
+            sims["2001"]["updated_seq"] = 5
+            counter["pending"] = []
+            changes, watermark, _, _ = asyncio.run(service.get_fleet_changes(watermark, 10))
+            assert [change.sim_id for change in changes] == ["2001", "2002"] and watermark == 6
+
+            # Yazarı çökmüş (süresi dolmuş) bekleyen filigranı tutmaz
+            counter.update(seq=7, pending=[{"first": 7, "at": datetime.now() - timedelta(hours=1)}])
+            sims["2002"]["updated_seq"] = 7
+            changes, watermark, _, _ = asyncio.run(service.get_fleet_changes(watermark, 10))
+            assert [change.sim_id for change in changes] == ["2002"] and watermark == 7
+
+    def test_bulk_risk_updates_reserve_one_block(self):
+        """Toplu risk güncellemesi tek sayaç artışıyla ardışık damgalar almalı"""
+        from unittest.mock import AsyncMock, MagicMock, patch
+        from Public.API.v1.Libs.iot_service import IoTService
+        from Public.API.v1.Libs.fleet_changes import fleet_changes
+
+        sims_collection = MagicMock()
+        sims_collection.bulk_write = AsyncMock()
+
+        service = IoTService()
+        with patch.object(service.db, "get_collection", return_value=sims_collection), \
+             patch.object(fleet_changes, "reserve", AsyncMock(return_value=10)) as reserve, \
+             patch.object(fleet_changes, "release", AsyncMock()) as release:
+            asyncio.run(service.update_sim_risk_scores([("2001", 80, 2), ("2002", 10, 0), ("2003", 50, 1)]))
+
+        reserve.assert_awaited_once_with(3)
+        release.assert_awaited_once_with(10)
+        operations = sims_collection.bulk_write.call_args.args[0]
+        assert [operation._doc["$set"]["updated_seq"] for operation in operations] == [10, 11, 12]
+
+
+class TestTaskExecutor:
+    """İşlem havuzu testleri"""
+
+    def _usage(self):
+        from datetime import datetime, timedelta
+        from Public.API.v1.Models import Usage
+
+        base = datetime.now().replace(microsecond=0)
+        values = [10.0, 12.0, 11.0, 9.0, 13.0, 10.5, 11.5, 10.0, 12.0, 11.0, 300.0]
+        return [
+            Usage(sim_id="2001", timestamp=base - timedelta(days=len(values) - 1 - i), mb_used=v, roaming_mb=0.0)
+            for i, v in enumerate(values)
+        ]
+
+    def _profile(self):
+        from Public.API.v1.Models import DeviceProfile
+
+        return DeviceProfile(
+            device_type="POS", expected_daily_mb_min=5, expected_daily_mb_max=25, roaming_expected=False
+        )
+
+    def test_thread_fallback_without_pool(self):
+        """Havuz başlatılmadan iş thread'de çalışmalı"""
+        from Public.API.v1.Libs.task_executor import TaskExecutor
+        from Public.API.v1.Libs import anomaly_detector
+
+        executor = TaskExecutor()
+        anomalies, risk_score = asyncio.run(
+            executor.run(anomaly_detector.analyze_sim, "2001", self._usage(), self._profile())
+        )
+
+        assert risk_score == anomaly_detector.analyze_sim("2001", self._usage(), self._profile())[1]
+
+    def test_process_pool_matches_inline(self):
+        """Process havuzundaki analiz, doğrudan çağrı ile aynı sonucu vermeli"""
+        from Public.API.v1.Libs.task_executor import TaskExecutor
+        from Public.API.v1.Libs import anomaly_detector
+
+        executor = TaskExecutor()
+        executor.max_workers = 1
+        executor.start()
+        try:
+            anomalies, risk_score = asyncio.run(
+                executor.run(anomaly_detector.analyze_sim, "2001", self._usage(), self._profile())
+            )
+        finally:
+            executor.shutdown()
+
+        expected, expected_score = anomaly_detector.analyze_sim("2001", self._usage(), self._profile())
+        assert risk_score == expected_score
+        assert [a.reason for a in anomalies] == [a.reason for a in expected]
+        assert executor.pool is None
+
+
+class TestReplayBenchmark:
+    """Dedektör replay/backtest aracı testleri"""
+
+    def test_synthetic_replay_report(self):
+        """Sentetik filo oynatması hız, gecikme ve senaryo başarımı raporlamalı"""
+        from replay_benchmark import generate_fleet, run_benchmark
+
+        fleet = generate_fleet(17, 30, seed=7)
+        report = run_benchmark(fleet, "incremental", trace_memory=False)
+
+        assert report["sim_days"] == 17 * 30
+        assert report["sim_days_per_second"] > 0
+        assert report["latency_us"]["p50"] <= report["latency_us"]["p99"]
+        assert report["metrics"]["sudden_spike"]["recall"] == 1.0
+        assert report["metrics"]["inactivity"]["recall"] == 1.0
+
+    def test_fleet_mode_and_file_input(self, tmp_path):
+        """Dosyadan okunan geçmiş toplu analiz yolunda oynatılabilmeli"""
+        import json
+        from datetime import datetime, timedelta
+        from replay_benchmark import load_fleet, run_benchmark
+
+        start = datetime(2025, 1, 1, 8)
+        records = [
+            {"sim_id": "2001", "timestamp": (start + timedelta(days=day)).isoformat(), "mb_used": 300.0 if day == 13 else 10.0 + day % 3}
+            for day in range(14)
+        ]
+        usage_path = tmp_path / "usage.jsonl"
+        usage_path.write_text("\n".join(json.dumps(record) for record in records))
+
+        fleet = load_fleet(usage_path)
+        report = run_benchmark(fleet, "fleet")
+
+        assert fleet.sim_ids == ["2001"] and fleet.labels == {"2001": "sudden_spike"}
+        assert report["memory_peak_mb"] is not None
+        assert report["metrics"]["sudden_spike"] == {"expected": 1, "detected": 1, "precision": 1.0, "recall": 1.0}
+
+
+    def test_fleet_mode_aligns_missing_days(self, tmp_path):
+        """Eksik günlü SIM'ler toplu analiz yoluna sağa yaslı ulaşmalı, artımlı yolla aynı tespitler çıkmalı"""
+        import json
+        import numpy as np
+        from datetime import datetime, timedelta
+        from replay_benchmark import load_fleet, replay_fleet, replay_incremental, align_right, load_profiles
+        from Public.API.v1.Libs.anomaly_detector import AnomalyDetector
+
+        start = datetime(2025, 1, 1, 8)
+        records = [
+            {"sim_id": "2001", "timestamp": (start + timedelta(days=day)).isoformat(), "mb_used": 300.0 if day == 13 else 10.0 + day % 3}
+            for day in range(14) if day not in (4, 9, 12)
+        ] + [
+            {"sim_id": "2002", "timestamp": (start + timedelta(days=day)).isoformat(), "mb_used": 50.0}
+            for day in range(5, 11)
+        ]
+        usage_path = tmp_path / "usage.jsonl"
+        usage_path.write_text("\n".join(json.dumps(record) for record in records))
+        fleet = load_fleet(usage_path)
+
+        timestamps = np.array(fleet.days, dtype="datetime64[us]")
+        mb_used, roaming_mb, stamps = align_right(fleet.mb_used, fleet.roaming_mb, timestamps)
+        assert not np.isnan(mb_used[0, -11:]).any() and np.isnan(mb_used[0, :3]).all()
+        assert not np.isnan(mb_used[1, -6:]).any() and np.isnan(stamps[1, :8]).all()
+        assert stamps[1, -1] == timestamps[10]
+
+        detector, profiles = AnomalyDetector(), load_profiles()
+        fleet_detected, _ = replay_fleet(detector, fleet, profiles)
+        incremental_detected, _ = replay_incremental(detector, fleet, profiles)
+        assert ("2001", "sudden_spike") in fleet_detected
+        assert {pair for pair in fleet_detected if pair[1] == "sudden_spike"} == {pair for pair in incremental_detected if pair[1] == "sudden_spike"}
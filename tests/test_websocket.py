@@ -453,3 +453,101 @@ class TestWebSocketPerformance:
         # Tüm connection'lar tüm mesajları almalı
         for ws in connections:
             assert len(ws.messages) == 20
+
+
+class TestFleetDelta:
+    """fleet_delta yayını testleri"""
+
+    def test_publish_sends_one_message_per_tick(self):
+        """Tik başına değişiklikler tek mesajda gitmeli, bozuk abone düşmeli, filigran ilerlemeli"""
+        import importlib
+        from Public.API.v1.Models import FleetResponse
+
+        fleet_delta = importlib.import_module("Public.API.v1.Libs.fleet_delta")
+        publisher = fleet_delta.FleetDeltaPublisher()
+        publisher.watermark = 3
+
+        change = FleetResponse(sim_id="2001", device_type="POS", apn="apn-pos", plan="11", status="active",
+                               city="İstanbul", risk_score=85, risk_level="red", last_seen_at=None, anomaly_count=2)
+
+        class GoodWebSocket:
+            def __init__(self):
+                self.messages = []
+
+            async def send_text(self, message):
+                self.messages.append(json.loads(message))
+
+        class BrokenWebSocket:
+            async def send_text(self, message):
+                raise RuntimeError("kapalı")
+
+        good, broken = GoodWebSocket(), BrokenWebSocket()
+        publisher.subscribers = [good, broken]
+
+        get_fleet_changes = AsyncMock(side_effect=[([change], 7, False, False), ([], 7, False, False)])
+        with patch.object(fleet_delta.iot_service, "get_fleet_changes", get_fleet_changes):
+            message = asyncio.run(publisher.publish())
+            assert asyncio.run(publisher.publish()) is None
+
+        assert message.type == "fleet_delta" and (message.since, message.watermark) == (3, 7)
+        assert get_fleet_changes.call_args_list[1].args[0] == 7
+        assert [m["changes"][0]["sim_id"] for m in good.messages] == ["2001"]
+        assert publisher.subscribers == [good]
+
+    def test_out_of_order_write_reaches_subscribers(self):
+        """Küçük damga büyükten sonra yazılsa da sonraki tikte abonelere ulaşmalı"""
+        import importlib
+        from Public.API.v1.Libs.iot_service import IoTService
+
+        fleet_delta = importlib.import_module("Public.API.v1.Libs.fleet_delta")
+        publisher = fleet_delta.FleetDeltaPublisher()
+        publisher.watermark = 4
+
+        def sim_doc(sim_id, seq):
+            return {"sim_id": sim_id, "device_type": "POS", "apn": "apn-pos", "plan_id": "11", "status": "active",
+                    "city": "İstanbul", "risk_score": 10, "anomaly_count": 0, "updated_seq": seq}
+
+        # 5 hâlâ yazılıyor, 6 indi
+        counter = {"_id": "sims", "seq": 6, "pending": [{"first": 5, "at": datetime.now()}]}
+        sims = [sim_doc("2002", 6)]
+
+        async def changed_since(since, until, limit, projection=None):
+            docs = sorted((doc for doc in sims if since < doc["updated_seq"] <= until), key=lambda doc: doc["updated_seq"])
+            return docs[:limit], len(docs) > limit
+
+        class WebSocket:
+            def __init__(self):
+                self.messages = []
+
+            async def send_text(self, message):
+                self.messages.append(json.loads(message))
+
+        ws = WebSocket()
+        publisher.subscribers = [ws]
+
+        counters = MagicMock()
+        counters.find_one = AsyncMock(side_effect=lambda *args: counter)
+        with patch.object(fleet_delta, "iot_service", IoTService()), \
+             patch("Public.API.v1.Libs.fleet_changes.db_manager") as db_manager, \
+             patch.object(fleet_delta.fleet_changes, "changed_since", changed_since):
+            db_manager.get_collection.return_value = counters
+
+            assert asyncio.run(publisher.publish()) is None and publisher.watermark == 4
+
+            sims.append(sim_doc("2001", 5))
+            counter["pending"] = []
+            asyncio.run(publisher.publish())
+
+        assert [change["sim_id"] for change in ws.messages[0]["changes"]] == ["2001", "2002"]
+        assert publisher.watermark == 6
+
+    def test_disconnect_unsubscribes(self):
+        """Bağlantı kapanınca fleet_delta aboneliği de kalkmalı"""
+        from Public.API.v1.Routers import ConnectionManager
+        from Public.API.v1.Libs import fleet_delta_publisher
+
+        ws = object()
+        fleet_delta_publisher.subscribers.append(ws)
+        ConnectionManager().disconnect(ws)
+
+        assert ws not in fleet_delta_publisher.subscribers